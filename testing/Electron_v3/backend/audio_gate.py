@@ -0,0 +1,97 @@
+import os
+from typing import Optional
+
+import numpy as np
+
+# PCM uploads are signed 16-bit little-endian mono at PCM_SAMPLE_RATE unless
+# the uploader passes ?sample_rate=
+PCM_SAMPLE_RATE = int(os.getenv("PCM_SAMPLE_RATE", "16000"))
+# "drop": silent chunks never reach Kafka. "mark": they are produced with a
+# silent=1 header so consumers such as ASR can skip them cheaply.
+AUDIO_GATE_MODE = os.getenv("AUDIO_GATE_MODE", "drop")
+AUDIO_GATE_FRAME_MS = int(os.getenv("AUDIO_GATE_FRAME_MS", "20"))
+AUDIO_GATE_HANGOVER_MS = int(os.getenv("AUDIO_GATE_HANGOVER_MS", "300"))
+# RMS threshold in dBFS per stream type; system audio has a lower noise floor
+AUDIO_GATE_THRESHOLDS_DB = {
+    "mic": float(os.getenv("AUDIO_GATE_THRESHOLD_DB_MIC", "-45")),
+    "system": float(os.getenv("AUDIO_GATE_THRESHOLD_DB_SYSTEM", "-50")),
+}
+
+
+class SilenceGate:
+    """Frame-level RMS energy gate with hangover for one PCM audio stream.
+
+    Each chunk is split into fixed frames and all frame energies are
+    computed in one vectorized pass. A frame is kept if it is loud enough or
+    lies within the hangover after a loud frame, including a loud frame at
+    the end of a previous chunk. Samples that do not fill a whole frame are
+    carried over to the next chunk.
+    """
+
+    def __init__(self, threshold_db: float, sample_rate: int = PCM_SAMPLE_RATE,
+                 frame_ms: int = AUDIO_GATE_FRAME_MS, hangover_ms: int = AUDIO_GATE_HANGOVER_MS):
+        self.sample_rate = sample_rate
+        self.frame_len = max(sample_rate * frame_ms // 1000, 1)
+        self.hangover_frames = hangover_ms // frame_ms
+        # Mean square of int16 samples at the threshold level
+        self.threshold = (10 ** (threshold_db / 20) * 32768) ** 2
+        # Frames since the last voiced frame; starts "long ago"
+        self.silent_run = self.hangover_frames + 1
+        self.remainder = b""
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.chunks_in = 0
+        self.chunks_silent = 0
+
+    def voiced_frames(self, chunk: bytes) -> np.ndarray:
+        """Boolean mask of kept frames for ``chunk`` (plus any carried-over samples)."""
+        data = self.remainder + chunk
+        frame_bytes = self.frame_len * 2
+        count = len(data) // frame_bytes
+        self.remainder = data[count * frame_bytes:]
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+
+        samples = np.frombuffer(data, dtype="<i2", count=count * self.frame_len)
+        frames = samples.reshape(count, self.frame_len).astype(np.float32)
+        loud = np.einsum("ij,ij->i", frames, frames) / self.frame_len >= self.threshold
+
+        # Index of the most recent loud frame at or before each frame
+        positions = np.arange(count)
+        last_loud = np.where(loud, positions, -1 - self.silent_run)
+        last_loud = np.maximum.accumulate(last_loud)
+        self.silent_run = int(count - 1 - last_loud[-1])
+        return positions - last_loud <= self.hangover_frames
+
+    def is_silent(self, chunk: bytes) -> bool:
+        """Feed one uploaded chunk and report whether it can skip Kafka.
+
+        A chunk too short to complete a frame is undecided and never silent.
+        """
+        kept = self.voiced_frames(chunk)
+        silent = kept.size > 0 and not kept.any()
+        self.bytes_in += len(chunk)
+        self.chunks_in += 1
+        if silent:
+            self.chunks_silent += 1
+        else:
+            self.bytes_out += len(chunk)
+        return silent
+
+    def stats(self) -> dict:
+        produced = self.bytes_out if AUDIO_GATE_MODE == "drop" else self.bytes_in
+        return {
+            "chunks_in": self.chunks_in,
+            "chunks_silent": self.chunks_silent,
+            "bytes_in": self.bytes_in,
+            "bytes_produced": produced,
+            "bytes_saved_ratio": 1 - produced / self.bytes_in if self.bytes_in else 0.0,
+        }
+
+
+def create_gate(stream_type: str, sample_rate: Optional[int] = None) -> Optional[SilenceGate]:
+    """Return a gate for an audio stream type, or None for streams that are never gated."""
+    threshold_db = AUDIO_GATE_THRESHOLDS_DB.get(stream_type)
+    if threshold_db is None:
+        return None
+    return SilenceGate(threshold_db, sample_rate=sample_rate or PCM_SAMPLE_RATE)
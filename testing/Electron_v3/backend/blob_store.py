@@ -0,0 +1,80 @@
+import hashlib
+import os
+from typing import AsyncIterator, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+from database import db
+
+BLOB_BUCKET_NAME = os.getenv("BLOB_BUCKET_NAME", "attachments")
+BLOB_MAX_BYTES = int(os.getenv("BLOB_MAX_BYTES", str(100 * 1024 * 1024)))
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobStore:
+    """GridFS storage for startup attachments (pitch decks, logos).
+
+    Uploads and downloads are streamed one chunk at a time and never hold a
+    whole file in memory. Files are content-addressed by SHA-256: storing
+    bytes that are already present returns the existing file's reference.
+    Documents keep only that reference ({id, name, contentType, size, sha256}).
+    """
+
+    def __init__(self, bucket_name: str = BLOB_BUCKET_NAME):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+        self.indexes_ready = False
+
+    async def put(self, chunks: AsyncIterator[bytes], name: str, content_type: Optional[str]) -> dict:
+        if not self.indexes_ready:
+            await self.files.create_index("metadata.sha256")
+            self.indexes_ready = True
+
+        digest = hashlib.sha256()
+        size = 0
+        grid_in = self.bucket.open_upload_stream(name, metadata={"contentType": content_type})
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > BLOB_MAX_BYTES:
+                    raise BlobTooLarge(f"Attachment exceeds {BLOB_MAX_BYTES} bytes")
+                digest.update(chunk)
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        sha256 = digest.hexdigest()
+
+        existing = await self.files.find_one({"metadata.sha256": sha256, "length": size}, projection={"_id": 1})
+        if existing is not None:
+            # Same content already stored; keep one copy
+            await self.bucket.delete(grid_in._id)
+            file_id = existing["_id"]
+        else:
+            file_id = grid_in._id
+            await self.files.update_one({"_id": file_id}, {"$set": {"metadata.sha256": sha256}})
+        return {"id": str(file_id), "name": name, "contentType": content_type, "size": size, "sha256": sha256}
+
+    async def stat(self, blob_id: str) -> Optional[dict]:
+        """The GridFS files document (no content), or None."""
+        try:
+            return await self.files.find_one({"_id": ObjectId(blob_id)})
+        except InvalidId:
+            return None
+
+    async def iter_chunks(self, blob_id: str) -> AsyncIterator[bytes]:
+        grid_out = await self.bucket.open_download_stream(ObjectId(blob_id))
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
+
+
+store = BlobStore()
@@ -0,0 +1,46 @@
+import uuid
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from database import db
+
+# Per-collection change counters in MongoDB, bumped by the routers after
+# every write. List ETags are built from them, so a matching If-None-Match
+# costs one _id lookup instead of the list query. Every worker and replica
+# reads the same counters; the epoch is set when a counter is created, so
+# a dropped and recreated counter never repeats an old tag.
+versions = db.etag_versions
+
+async def bump(collection: str):
+    await versions.update_one(
+        {"_id": collection},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex[:8]}},
+        upsert=True,
+    )
+
+async def list_etag(collection: str) -> str:
+    counter = await versions.find_one({"_id": collection})
+    if counter is None:
+        await bump(collection)
+        counter = await versions.find_one({"_id": collection})
+    return f'"{collection}-{counter["epoch"]}-{counter["version"]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2)
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+def not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Put `etag` on the response; return a 304 to send instead if the client already has it.
+
+    no-cache makes the renderer's HTTP cache revalidate on every poll instead
+    of serving a stale copy.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
@@ -0,0 +1,160 @@
+import asyncio
+import base64
+import json
+import os
+import socket
+import threading
+from typing import Optional, Tuple
+
+from routers.stream import (
+    DEFAULT_SESSION_ID,
+    KAFKA_AVAILABLE,
+    KAFKA_BOOTSTRAP_SERVERS,
+    manager,
+)
+
+if KAFKA_AVAILABLE:
+    from confluent_kafka import Consumer, KafkaError
+
+# Topics fanned out to local viewers. Video comes from the Pathway output
+# topic, audio straight from the raw upload topics.
+RELAY_TOPICS = {
+    "video_live_out": "screen",
+    "audio_mic_stream": "mic",
+    "audio_system_stream": "system",
+}
+# Encoding of video_live_out as written by pathway_pipelines/streaming_pipeline.py
+PIPELINE_FORMAT = os.getenv("PIPELINE_FORMAT", "binary")
+# Chunks waiting for the dispatch task; past this the chunk is dropped and
+# its stream's viewers are disconnected so they resync from the init segment
+RELAY_QUEUE_SIZE = int(os.getenv("STREAM_RELAY_QUEUE_SIZE", "1000"))
+
+
+def decode_message(msg) -> Optional[Tuple[str, str, bytes, bool]]:
+    """Return (session_id, stream_type, data, is_init) for a relayed Kafka message, or None to skip it."""
+    stream_type = RELAY_TOPICS.get(msg.topic())
+    if stream_type is None:
+        return None
+    headers = dict(msg.headers() or [])
+    # Pathway marks retractions of earlier rows with pathway_diff=-1; they are not new chunks
+    if headers.get("pathway_diff") == b"-1":
+        return None
+    # Raw PCM audio is for Kafka consumers such as ASR; viewers play webm only
+    if headers.get("format") == b"pcm":
+        return None
+    key = msg.key()
+    session_id = key.decode() if key else DEFAULT_SESSION_ID
+    is_init = headers.get("init") == b"1"
+    data = msg.value()
+
+    if msg.topic() == "video_live_out" and PIPELINE_FORMAT == "json":
+        payload = json.loads(data)
+        data = base64.b64decode(payload["data"])
+        # The key and init header are authoritative; rows without them fall back to the envelope
+        if not key:
+            session_id = payload.get("session") or session_id
+        is_init = is_init or bool(payload.get("is_init"))
+    return session_id, stream_type, data, is_init
+
+
+class LiveRelay:
+    """One Kafka consumer per worker that feeds every local live viewer.
+
+    Each worker uses its own consumer group so all workers see every
+    message; offsets are never committed because viewers only care about
+    what is live from the moment the worker starts. The hand-over queue to
+    the event loop is bounded by STREAM_RELAY_QUEUE_SIZE.
+    """
+
+    def __init__(self, queue_size: int = RELAY_QUEUE_SIZE):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.queue_size = queue_size
+        self.thread: Optional[threading.Thread] = None
+        self.dispatch_task: Optional[asyncio.Task] = None
+        self.running = False
+        self.dropped = 0
+
+    def start(self):
+        if not KAFKA_AVAILABLE or self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.running = True
+        self.dispatch_task = asyncio.create_task(self._dispatch())
+        self.thread = threading.Thread(target=self._run, name="live-relay", daemon=True)
+        self.thread.start()
+
+    async def stop(self):
+        self.running = False
+        if self.dispatch_task:
+            self.dispatch_task.cancel()
+            self.dispatch_task = None
+        if self.thread:
+            await asyncio.to_thread(self.thread.join, 5)
+            self.thread = None
+
+    async def _dispatch(self):
+        # A single task broadcasts in consumption order, so chunks of one
+        # stream never interleave on a viewer socket.
+        while True:
+            session_id, stream_type, data, is_init = await self.queue.get()
+            await manager.broadcast(data, session_id, stream_type, is_init_segment=is_init)
+
+    def _enqueue(self, decoded: Tuple[str, str, bytes, bool]):
+        # Runs on the event loop
+        try:
+            self.queue.put_nowait(decoded)
+        except asyncio.QueueFull:
+            session_id, stream_type, data, is_init = decoded
+            self.dropped += 1
+            state = manager.get_stream(session_id, stream_type)
+            if is_init:
+                # Late joiners still need the new init segment
+                state.init_segment = data
+            if state.viewers:
+                print(f"[LiveRelay] Dispatch queue full, disconnecting {session_id}/{stream_type} viewers")
+                viewers, state.viewers = state.viewers, []
+                for viewer in viewers:
+                    asyncio.create_task(self._close(viewer))
+
+    @staticmethod
+    async def _close(viewer):
+        try:
+            # 1013: try again later; a reconnect starts from the cached init segment
+            await viewer.close(code=1013)
+        except Exception:
+            pass
+
+    def _run(self):
+        consumer = Consumer({
+            "bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS,
+            "group.id": f"live-relay-{socket.gethostname()}-{os.getpid()}",
+            "auto.offset.reset": "latest",
+            "enable.auto.commit": False,
+        })
+        consumer.subscribe(list(RELAY_TOPICS))
+        print(f"[LiveRelay] Consuming {', '.join(RELAY_TOPICS)}")
+        try:
+            while self.running:
+                msg = consumer.poll(0.5)
+                if msg is None:
+                    continue
+                if msg.error():
+                    if msg.error().code() != KafkaError._PARTITION_EOF:
+                        print(f"[LiveRelay] Consumer error: {msg.error()}")
+                    continue
+                try:
+                    decoded = decode_message(msg)
+                except (ValueError, KeyError) as e:
+                    print(f"[LiveRelay] Skipping undecodable message on {msg.topic()}: {e}")
+                    continue
+                if decoded is not None:
+                    # Hand over to the event loop that owns the viewer sockets
+                    self.loop.call_soon_threadsafe(self._enqueue, decoded)
+        finally:
+            consumer.close()
+            print("[LiveRelay] Stopped")
+
+
+relay = LiveRelay()
@@ -1,7 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import stream, startups, calendar
+from routers import stream, startups, calendar, recordings, attachments
 from database import client
+from live_relay import relay
+from recording_store import store as recording_store
 
 app = FastAPI()
 
@@ -12,21 +14,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 # Routers
 app.include_router(stream.router)
 app.include_router(startups.router)
 app.include_router(calendar.router)
+app.include_router(recordings.router)
+app.include_router(attachments.router)
 
 @app.on_event("startup")
 async def startup_db_client():
     print("Connected to MongoDB")
 
+@app.on_event("startup")
+async def start_live_relay():
+    if stream.STREAM_RELAY_MODE == "kafka":
+        relay.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
 
+@app.on_event("shutdown")
+async def stop_live_relay():
+    await relay.stop()
+
+@app.on_event("shutdown")
+async def stop_recording_store():
+    # Flushes and closes every open segment file
+    recording_store.stop()
+
 @app.get("/")
 async def root():
     return {"message": "VC Intelligence Backend Running"}
@@ -2,14 +2,23 @@ from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+class AttachmentRef(BaseModel):
+    """Reference to a file in the attachments GridFS bucket; documents never embed the bytes."""
+    id: Optional[str] = None
+    name: str
+    contentType: Optional[str] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    path: Optional[str] = None  # legacy entries pointed at a local file instead
+
 class Startup(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     name: str
-    logo: Optional[str] = None
+    logo: Optional[str] = None  # /attachments/<id> (legacy entries may hold a data URL)
     description: Optional[str] = None
     fundingStage: str = "Seed"
     website: Optional[str] = None
-    pdfs: List[dict] = []
+    pdfs: List[AttachmentRef] = []
     teamInfo: Optional[str] = None
     marketCategory: Optional[str] = None
     vcNotes: Optional[str] = None
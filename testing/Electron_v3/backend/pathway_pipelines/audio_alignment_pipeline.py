@@ -0,0 +1,129 @@
+import os
+import struct
+from typing import Optional
+
+import pathway as pw
+
+from streaming_pipeline import KAFKA_BOOTSTRAP_SERVERS, header_value
+
+# Mic and system chunks of one session whose capture timestamps differ by at
+# most this much are paired. Keep it below half the upload chunk interval so
+# a chunk matches at most one chunk of the other channel.
+ALIGN_TOLERANCE_S = float(os.getenv("ALIGN_TOLERANCE_MS", "100")) / 1000
+# Chunks arriving later than this behind the newest timestamp are ignored and
+# join state older than it is freed, which bounds memory over a meeting.
+ALIGN_MAX_LATENESS_S = float(os.getenv("ALIGN_MAX_LATENESS_MS", "2000")) / 1000
+# How often Pathway commits input read from Kafka, i.e. the batching latency
+ALIGN_COMMIT_MS = int(os.getenv("ALIGN_COMMIT_MS", "100"))
+
+# Value of a paired message on audio_paired_stream: mic length, system length,
+# then the mic bytes and the system bytes. A missing side has length 0.
+PAIR_HEADER = struct.Struct("<II")
+
+class AudioFrameSchema(pw.Schema):
+    key: bytes
+    timestamp: float
+    data: bytes
+
+@pw.udf
+def frame_timestamp(metadata: pw.Json) -> float:
+    # Capture timestamp set by the uploader, else the Kafka message timestamp
+    metadata = metadata.as_dict()
+    value = header_value(metadata, "timestamp")
+    return float(value) if value else (metadata.get("timestamp_millis") or 0) / 1000
+
+@pw.udf
+def pack_pair(mic: Optional[bytes], system: Optional[bytes]) -> bytes:
+    mic = mic or b""
+    system = system or b""
+    return PAIR_HEADER.pack(len(mic), len(system)) + mic + system
+
+@pw.udf
+def format_timestamp(timestamp: Optional[float]) -> str:
+    return repr(timestamp) if timestamp is not None else ""
+
+def unpack_pair(value: bytes):
+    """Split an audio_paired_stream value into (mic, system) bytes."""
+    mic_length, system_length = PAIR_HEADER.unpack_from(value)
+    start = PAIR_HEADER.size
+    return value[start:start + mic_length], value[start + mic_length:start + mic_length + system_length]
+
+def read_audio_topic(topic: str, rdkafka_settings: dict) -> pw.Table:
+    raw_audio = pw.io.kafka.read(
+        rdkafka_settings=rdkafka_settings,
+        topic=topic,
+        format="raw",
+        # The Kafka key is the session id; as the row id every chunk of a
+        # session would replace the previous one in the join
+        autogenerate_key=True,
+        with_metadata=True,
+        autocommit_duration_ms=ALIGN_COMMIT_MS,
+    )
+    return raw_audio.select(
+        key=pw.this.key,
+        timestamp=frame_timestamp(pw.this._metadata),
+        data=pw.this.data,
+    )
+
+def align_audio(mic: pw.Table, system: pw.Table) -> pw.Table:
+    """Pair mic and system chunks of the same session by capture timestamp.
+
+    Outer interval join, so a chunk with nothing on the other channel (one
+    side silent or gated) is still emitted with an empty partner. The join is
+    delayed by the tolerance, so a chunk is normally emitted once, already
+    paired, instead of first alone and then retracted.
+    """
+    return mic.interval_join_outer(
+        system,
+        mic.timestamp,
+        system.timestamp,
+        pw.temporal.interval(-ALIGN_TOLERANCE_S, ALIGN_TOLERANCE_S),
+        mic.key == system.key,
+        behavior=pw.temporal.common_behavior(
+            delay=ALIGN_TOLERANCE_S,
+            cutoff=ALIGN_MAX_LATENESS_S,
+            keep_results=True,
+        ),
+    ).select(
+        key=pw.coalesce(pw.left.key, pw.right.key),
+        timestamp=pw.coalesce(pw.left.timestamp, pw.right.timestamp),
+        mic_timestamp=pw.left.timestamp,
+        system_timestamp=pw.right.timestamp,
+        mic=pw.left.data,
+        system=pw.right.data,
+    )
+
+def audio_alignment_pipeline():
+    rdkafka_settings = {
+        "bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS,
+        "group.id": "pathway-audio-aligner",
+        "auto.offset.reset": "latest"
+    }
+    mic = read_audio_topic("audio_mic_stream", rdkafka_settings)
+    system = read_audio_topic("audio_system_stream", rdkafka_settings)
+    paired = align_audio(mic, system)
+
+    output = paired.select(
+        key=pw.this.key,
+        value=pack_pair(pw.this.mic, pw.this.system),
+        timestamp=format_timestamp(pw.this.timestamp),
+        mic_timestamp=format_timestamp(pw.this.mic_timestamp),
+        system_timestamp=format_timestamp(pw.this.system_timestamp),
+    )
+    # A chunk whose partner arrives after the delay is first emitted alone;
+    # the pair then replaces it, and the lone row is retracted with a
+    # pathway_diff=-1 message that consumers skip.
+    pw.io.kafka.write(
+        output,
+        rdkafka_settings={"bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS},
+        topic_name="audio_paired_stream",
+        format="raw",
+        key=output.key,
+        value=output.value,
+        headers=[output.timestamp, output.mic_timestamp, output.system_timestamp],
+    )
+
+    pw.run()
+
+if __name__ == "__main__":
+    audio_alignment_pipeline()
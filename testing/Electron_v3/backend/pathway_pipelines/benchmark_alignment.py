@@ -0,0 +1,87 @@
+"""Replay benchmark for the mic/system alignment join.
+
+Replays synthetic mic and system chunks for several sessions in real time
+through align_audio(), with capture jitter and occasional gated (missing)
+chunks, and reports the end-to-end lag from the later chunk of a pair
+being captured to the pair being emitted.
+
+    python pathway_pipelines/benchmark_alignment.py --sessions 20 --seconds 20
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+import pathway as pw
+
+from audio_alignment_pipeline import ALIGN_COMMIT_MS, AudioFrameSchema, align_audio
+
+
+class ChunkReplay(pw.io.python.ConnectorSubject):
+    def __init__(self, sessions: int, seconds: float, chunk_ms: int, chunk_bytes: int, drop_rate: float, seed: int):
+        super().__init__()
+        self.sessions = sessions
+        self.seconds = seconds
+        self.chunk_s = chunk_ms / 1000
+        self.payload = os.urandom(chunk_bytes)
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+
+    def run(self):
+        start = time.time()
+        step = 0
+        while time.time() - start < self.seconds:
+            capture = start + step * self.chunk_s
+            for session in range(self.sessions):
+                if self.random.random() >= self.drop_rate:
+                    self.next(
+                        key=f"session-{session}".encode(),
+                        timestamp=capture + self.random.uniform(-0.02, 0.02),
+                        data=self.payload,
+                    )
+            step += 1
+            time.sleep(max(start + step * self.chunk_s - time.time(), 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--chunk-bytes", type=int, default=8000, help="PCM 16 kHz s16le for 250 ms")
+    parser.add_argument("--drop-rate", type=float, default=0.2, help="fraction of chunks removed by the silence gate")
+    args = parser.parse_args()
+
+    def replay(seed: int) -> pw.Table:
+        subject = ChunkReplay(args.sessions, args.seconds, args.chunk_ms, args.chunk_bytes, args.drop_rate, seed)
+        return pw.io.python.read(subject, schema=AudioFrameSchema, autocommit_duration_ms=ALIGN_COMMIT_MS)
+
+    paired = align_audio(replay(1), replay(2))
+    clock = time.time
+    lags = []
+    pairs = {"paired": 0, "single": 0, "retracted": 0}
+
+    def on_change(key, row, time, is_addition):
+        if not is_addition:
+            pairs["retracted"] += 1
+            return
+        captured = [t for t in (row["mic_timestamp"], row["system_timestamp"]) if t is not None]
+        pairs["paired" if len(captured) == 2 else "single"] += 1
+        lags.append(clock() - max(captured))
+
+    pw.io.subscribe(paired, on_change=on_change)
+    pw.run(monitoring_level=pw.MonitoringLevel.NONE)
+
+    lags.sort()
+    print(f"{args.sessions} sessions, {args.seconds:.0f}s, {args.chunk_ms} ms chunks, drop rate {args.drop_rate}")
+    print(f"pairs: {pairs['paired']}  single-sided: {pairs['single']}  retractions: {pairs['retracted']}")
+    if lags:
+        print(
+            f"lag ms  p50 {statistics.median(lags) * 1000:.1f}  "
+            f"p95 {lags[int(len(lags) * 0.95)] * 1000:.1f}  max {lags[-1] * 1000:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
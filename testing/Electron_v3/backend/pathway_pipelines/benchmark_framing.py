@@ -0,0 +1,239 @@
+"""Throughput benchmark for the JSON and binary pipeline framings.
+
+By default it only measures the synthetic encode/decode cost of each
+PIPELINE_FORMAT: the serialization work a chunk goes through on the way
+producer -> video_raw_stream -> Pathway -> video_live_out -> live_relay,
+replayed in pure Python without a broker or Pathway. It reports MB/s, CPU
+time per chunk and bytes on the wire.
+
+With --kafka it times the real path instead. For each format it starts
+streaming_pipeline.py, produces chunks to video_raw_stream and decodes
+video_live_out with live_relay.decode_message. It reports MB/s and
+end-to-end latency, and needs a broker at KAFKA_BOOTSTRAP_SERVERS. It also
+checks that every chunk comes out exactly once and in order, with no
+retractions, and exits with status 1 when one does not.
+
+The binary framing is what the uploader (routers/stream.py) sends: raw
+bytes keyed by session id, with frame headers. The JSON framing is the
+envelope that json_pipeline parses; only legacy producers send it.
+
+    python pathway_pipelines/benchmark_framing.py --chunk-kb 64 --chunks 2000
+    python pathway_pipelines/benchmark_framing.py --kafka --chunks 2000
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import struct
+import subprocess
+import sys
+import time
+
+from streaming_pipeline import FRAME_HEADERS, KAFKA_BOOTSTRAP_SERVERS, header_value
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SESSION = "bench"
+WARMUP_SESSION = "bench-warmup"
+
+
+def legacy_envelope(chunk: bytes, seq: int, session: str) -> bytes:
+    return json.dumps({
+        "stream_type": "screen",
+        "session": session,
+        "timestamp": time.time(),
+        "is_init": seq == 0,
+        "data": base64.b64encode(chunk).decode(),
+    }).encode()
+
+
+def json_roundtrip(chunk: bytes, seq: int) -> int:
+    # Legacy producer wraps the chunk in a JSON envelope
+    value = legacy_envelope(chunk, seq, SESSION)
+    # Pathway parses the envelope and re-serializes it to video_live_out
+    row = json.loads(value)
+    row["data"] = base64.b64decode(row["data"])
+    row["processed_at"] = row["timestamp"]
+    row["data"] = base64.b64encode(row["data"]).decode()
+    out = json.dumps(row).encode()
+    # live_relay decodes the envelope again
+    payload = json.loads(out)
+    base64.b64decode(payload["data"])
+    return len(value) + len(out)
+
+
+def binary_roundtrip(chunk: bytes, seq: int) -> int:
+    # Uploader: raw value, session key, frame headers
+    key = SESSION.encode()
+    headers = [
+        ("stream_type", b"screen"),
+        ("timestamp", repr(time.time()).encode()),
+        ("seq", str(seq).encode()),
+        ("init", b"1" if seq == 0 else b"0"),
+    ]
+    # Pathway exposes headers base64-encoded in _metadata; only they are decoded
+    metadata = {"headers": [[name, base64.b64encode(value).decode()] for name, value in headers]}
+    for name in FRAME_HEADERS:
+        header_value(metadata, name).encode()
+    # live_relay passes the payload through untouched
+    header_bytes = sum(len(name) + len(value) for name, value in headers)
+    return 2 * (len(key) + len(chunk) + header_bytes)
+
+
+def run(name: str, roundtrip, chunk: bytes, chunks: int):
+    wire_bytes = 0
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for seq in range(chunks):
+        wire_bytes += roundtrip(chunk, seq)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    payload_mb = len(chunk) * chunks / 1e6
+    print(
+        f"{name:>6}: {payload_mb / wall:9.1f} MB/s  "
+        f"{cpu / chunks * 1e6:8.1f} us CPU/chunk  "
+        f"{wire_bytes / chunks / 1024:8.1f} KiB on wire/chunk"
+    )
+
+
+class KafkaRun:
+    """One end-to-end run of streaming_pipeline.py in one PIPELINE_FORMAT."""
+
+    def __init__(self, pipeline_format: str, timeout: float):
+        from confluent_kafka import Consumer, Producer
+        # The backend's own framing and relay decoding
+        sys.path.insert(0, os.path.dirname(HERE))
+        from routers.stream import frame_headers
+        import live_relay
+
+        live_relay.PIPELINE_FORMAT = pipeline_format
+        self.frame_headers = frame_headers
+        self.decode_message = live_relay.decode_message
+        self.pipeline_format = pipeline_format
+        self.timeout = timeout
+        # pathway_diff=-1 messages seen: the pipeline replaced a row instead of appending one
+        self.retractions = 0
+        self.producer = Producer({"bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS})
+        self.consumer = Consumer({
+            "bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS,
+            "group.id": f"benchmark-framing-{os.getpid()}-{pipeline_format}",
+            "auto.offset.reset": "latest",
+            "enable.auto.commit": False,
+        })
+
+    def produce(self, session: str, payload: bytes, seq: int):
+        if self.pipeline_format == "binary":
+            # Exactly what routers/stream.py produces
+            headers = self.frame_headers("screen", seq, time.time(), seq == 0)
+            self.producer.produce("video_raw_stream", payload, key=session.encode(), headers=headers)
+        else:
+            self.producer.produce("video_raw_stream", legacy_envelope(payload, seq, session), key=session.encode())
+        self.producer.poll(0)
+
+    def consume(self):
+        """(session, payload) of the next chunk on video_live_out, or None."""
+        msg = self.consumer.poll(0.2)
+        if msg is None or msg.error():
+            return None
+        if dict(msg.headers() or []).get("pathway_diff") == b"-1":
+            self.retractions += 1
+        decoded = self.decode_message(msg)
+        return None if decoded is None else (decoded[0], decoded[2])
+
+    def wait_until_flowing(self):
+        # The pipeline starts at the latest offset; probe until a chunk comes out
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            self.produce(WARMUP_SESSION, b"\0" * 8, 1)
+            self.producer.flush()
+            probe_until = time.monotonic() + 1
+            while time.monotonic() < probe_until:
+                out = self.consume()
+                if out is not None and out[0] == WARMUP_SESSION:
+                    return
+        raise SystemExit(f"{self.pipeline_format}: nothing reached video_live_out within {self.timeout:.0f}s")
+
+    def run(self, chunk: bytes, chunks: int) -> bool:
+        """Time one run; False if chunks were lost, repeated, reordered or retracted."""
+        pipeline = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "streaming_pipeline.py")],
+            env={**os.environ, "PIPELINE_FORMAT": self.pipeline_format},
+        )
+        self.consumer.subscribe(["video_live_out"])
+        try:
+            self.wait_until_flowing()
+            self.retractions = 0
+            sent = {}
+            start = time.perf_counter()
+            for seq in range(chunks):
+                # The sequence number rides in the payload so latency is measured per chunk
+                payload = struct.pack(">Q", seq) + chunk[8:]
+                sent[seq] = time.perf_counter()
+                self.produce(SESSION, payload, seq)
+            self.producer.flush()
+            latencies = []
+            received = []
+            deadline = time.monotonic() + self.timeout
+            while len(latencies) < chunks and time.monotonic() < deadline:
+                out = self.consume()
+                if out is None or out[0] != SESSION:
+                    continue
+                seq = struct.unpack_from(">Q", out[1])[0]
+                received.append(seq)
+                produced_at = sent.pop(seq, None)
+                if produced_at is not None:
+                    latencies.append(time.perf_counter() - produced_at)
+            wall = time.perf_counter() - start
+            # Let stragglers such as duplicates arrive before the pipeline stops
+            drain_until = time.monotonic() + 1
+            while time.monotonic() < drain_until:
+                out = self.consume()
+                if out is not None and out[0] == SESSION:
+                    received.append(struct.unpack_from(">Q", out[1])[0])
+        finally:
+            self.consumer.close()
+            pipeline.terminate()
+            pipeline.wait(10)
+
+        payload_mb = len(chunk) * len(latencies) / 1e6
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else 0.0
+        print(
+            f"{self.pipeline_format:>6}: {payload_mb / wall:9.1f} MB/s  "
+            f"p50 {statistics.median(latencies) * 1000 if latencies else 0.0:7.1f} ms  "
+            f"p99 {p99 * 1000:7.1f} ms  "
+            f"{chunks - len(latencies)} chunks missing"
+        )
+        duplicated = len(received) - len(set(received))
+        reordered = sum(1 for before, after in zip(received, received[1:]) if after < before)
+        if duplicated or reordered or self.retractions or len(latencies) < chunks:
+            print(
+                f"{self.pipeline_format:>6}: FAILED: {chunks - len(latencies)} missing, {duplicated} duplicated, "
+                f"{reordered} out of order, {self.retractions} retractions"
+            )
+            return False
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-kb", type=int, default=64, help="media chunk size in KiB")
+    parser.add_argument("--chunks", type=int, default=2000, help="chunks per mode")
+    parser.add_argument("--kafka", action="store_true", help="time streaming_pipeline.py through the broker")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for the pipeline (--kafka)")
+    args = parser.parse_args()
+
+    chunk = os.urandom(args.chunk_kb * 1024)
+    if args.kafka:
+        print(f"{args.chunks} chunks of {args.chunk_kb} KiB through streaming_pipeline.py on {KAFKA_BOOTSTRAP_SERVERS}")
+        results = [KafkaRun(pipeline_format, args.timeout).run(chunk, args.chunks) for pipeline_format in ("binary", "json")]
+        if not all(results):
+            sys.exit(1)
+    else:
+        print(f"{args.chunks} chunks of {args.chunk_kb} KiB, synthetic encode/decode cost only (no broker, no Pathway)")
+        run("json", json_roundtrip, chunk, args.chunks)
+        run("binary", binary_roundtrip, chunk, args.chunks)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,109 @@
+import base64
+import os
+
 import pathway as pw
 
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+# "binary": media bytes are the raw Kafka value, the session id is the key
+# and stream_type/timestamp/seq/init travel as Kafka headers, exactly as
+# routers/stream.py produces them. "json": legacy envelope with base64 data.
+PIPELINE_FORMAT = os.getenv("PIPELINE_FORMAT", "binary")
+
+# Kafka headers forwarded from video_raw_stream to video_live_out
+FRAME_HEADERS = ("stream_type", "timestamp", "seq", "init")
+
 class VideoSchema(pw.Schema):
     stream_type: str
     data: bytes
     timestamp: float
+    # Carried through to video_live_out so live_relay workers can route chunks
+    session: str = pw.column_definition(default_value="default")
+    is_init: bool = pw.column_definition(default_value=False)
 
-def streaming_pipeline():
-    # Read from Kafka
-    # We assume 3 topics: video_raw_stream, audio_system_stream, audio_mic_stream
-    # We can read them all or separate pipelines.
-    # For simplicity, let's use one pipeline for video.
+def header_value(metadata: dict, name: str) -> str:
+    """Return a UTF-8 Kafka header from a Pathway ``_metadata`` value, or ""."""
+    for header_name, value in metadata.get("headers") or []:
+        if header_name == name:
+            return base64.b64decode(value).decode() if value else ""
+    return ""
+
+@pw.udf
+def frame_header(metadata: pw.Json, name: str) -> str:
+    return header_value(metadata.as_dict(), name)
+
+def binary_pipeline(rdkafka_settings: dict):
+    raw_video = pw.io.kafka.read(
+        rdkafka_settings=rdkafka_settings,
+        topic="video_raw_stream",
+        format="raw",
+        # The Kafka key is the session id; as the row id every chunk would
+        # replace, and retract, the session's previous one
+        autogenerate_key=True,
+        with_metadata=True,
+    )
+
+    # Process: Just forward for now. Only the headers are decoded; the
+    # payload is never copied into an envelope.
+    processed_video = raw_video.select(
+        key=pw.this.key,
+        data=pw.this.data,
+        **{name: frame_header(pw.this._metadata, name) for name in FRAME_HEADERS},
+    )
+
+    pw.io.kafka.write(
+        processed_video,
+        rdkafka_settings={"bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS},
+        topic_name="video_live_out",
+        format="raw",
+        key=processed_video.key,
+        value=processed_video.data,
+        headers=[processed_video[name] for name in FRAME_HEADERS],
+    )
 
+def json_pipeline(rdkafka_settings: dict):
     video_stream = pw.io.kafka.read(
-        rdkafka_settings={
-            "bootstrap.servers": "localhost:9092",
-            "group.id": "pathway-video-processor",
-            "auto.offset.reset": "latest"
-        },
+        rdkafka_settings=rdkafka_settings,
         topic="video_raw_stream",
         schema=VideoSchema,
-        format="json" # or binary if we send raw bytes, but we likely wrap in JSON with metadata
+        format="json"
     )
 
     # Process: Just forward for now, maybe add processing timestamp
     processed_video = video_stream.select(
         *pw.this,
-        processed_at=pw.this.timestamp # Placeholder for processing
+        processed_at=pw.this.timestamp, # Placeholder for processing
+        init=pw.if_else(pw.this.is_init, "1", "0"),
     )
 
-    # Write back to Kafka for playback
+    # Write back to Kafka for playback, keyed by session with the init flag
+    # as a header, like the binary framing, so live_relay routes both alike
     pw.io.kafka.write(
         processed_video,
         rdkafka_settings={
-            "bootstrap.servers": "localhost:9092",
+            "bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS,
         },
         topic_name="video_live_out",
-        format="json"
+        format="json",
+        key=processed_video.session,
+        headers=[processed_video.init],
     )
 
+def streaming_pipeline(pipeline_format: str = PIPELINE_FORMAT):
+    # Read from Kafka
+    # We assume 3 topics: video_raw_stream, audio_system_stream, audio_mic_stream
+    # We can read them all or separate pipelines.
+    # For simplicity, let's use one pipeline for video.
+    rdkafka_settings = {
+        "bootstrap.servers": KAFKA_BOOTSTRAP_SERVERS,
+        "group.id": "pathway-video-processor",
+        "auto.offset.reset": "latest"
+    }
+
+    if pipeline_format == "binary":
+        binary_pipeline(rdkafka_settings)
+    else:
+        json_pipeline(rdkafka_settings)
+
     pw.run()
 
 if __name__ == "__main__":
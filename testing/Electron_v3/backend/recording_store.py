@@ -0,0 +1,276 @@
+import os
+import queue
+import re
+import shutil
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+RECORDING_ENABLED = os.getenv("RECORDING_ENABLED", "false").lower() == "true"
+# Chunk bytes waiting for the writer thread; past this a stream stops recording
+RECORDING_QUEUE_BYTES = int(os.getenv("RECORDING_QUEUE_MB", "64")) * 1024 * 1024
+# Session directories not written for this long are deleted; 0 keeps them forever
+RECORDING_RETENTION_DAYS = float(os.getenv("RECORDING_RETENTION_DAYS", "30"))
+# How often the writer thread looks for expired recordings, in seconds
+RETENTION_CHECK_INTERVAL = 3600
+# Size of the userspace write buffer of each segment file
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# One index record per chunk: byte offset in the segment file, chunk length
+# and arrival timestamp (seconds since epoch). Records are appended in
+# arrival order, so both offsets and timestamps are sorted.
+INDEX_ENTRY = struct.Struct("<QId")
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+SEGMENT_EXTENSIONS = {"screen": "webm", "mic": "webm", "system": "webm"}
+
+
+def is_valid_session_id(session_id: str) -> bool:
+    return bool(SESSION_ID_PATTERN.match(session_id))
+
+
+class SegmentWriter:
+    """Appends chunks of one upload connection to its segment and index files.
+
+    Index records are only written once the media bytes they point to have
+    been flushed, so a reader never finds an entry past the end of the file.
+    """
+
+    def __init__(self, media_path: str, index_path: str):
+        os.makedirs(os.path.dirname(media_path), exist_ok=True)
+        self.offset = os.path.getsize(media_path) if os.path.exists(media_path) else 0
+        self.media = open(media_path, "ab", buffering=WRITE_BUFFER_SIZE)
+        self.index = open(index_path, "ab")
+        self.pending: List[bytes] = []
+
+    def write(self, data: bytes, timestamp: float):
+        self.media.write(data)
+        self.pending.append(INDEX_ENTRY.pack(self.offset, len(data), timestamp))
+        self.offset += len(data)
+
+    def flush(self):
+        self.media.flush()
+        if self.pending:
+            self.index.write(b"".join(self.pending))
+            self.pending.clear()
+        self.index.flush()
+
+    def close(self):
+        self.flush()
+        self.media.close()
+        self.index.close()
+
+
+class RecordingStore:
+    """Persists uploaded chunks to per-session segment files.
+
+    The upload path only enqueues; a single writer thread does all file
+    I/O, batching whatever arrived while it was busy into one flush, so
+    recording adds no disk latency to the live broadcast.
+
+    Every upload connection starts a new part (``<stream_type>-<n>.webm``),
+    since a reconnecting uploader sends a new init segment. If the writer
+    falls more than RECORDING_QUEUE_MB behind, the stream's remaining chunks
+    are dropped until its uploader reconnects, leaving the part truncated
+    rather than with a gap in the middle.
+    """
+
+    def __init__(self, root: str = RECORDINGS_DIR, max_queued_bytes: int = RECORDING_QUEUE_BYTES,
+                 retention_days: float = RECORDING_RETENTION_DAYS):
+        self.root = root
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self.max_queued_bytes = max_queued_bytes
+        self.queued_bytes = 0
+        self.lock = threading.Lock()
+        self.retention = retention_days * 86400
+        self.last_expiry = 0.0
+        # Streams whose chunks are dropped until the uploader reconnects; only touched by the event loop
+        self.overflowed = set()
+        # Only touched by the writer thread
+        self.writers: Dict[Tuple[str, str], SegmentWriter] = {}
+
+    def paths(self, session_id: str, stream_type: str, part: int) -> Tuple[str, str]:
+        directory = os.path.join(self.root, session_id)
+        extension = SEGMENT_EXTENSIONS.get(stream_type, "bin")
+        return (
+            os.path.join(directory, f"{stream_type}-{part}.{extension}"),
+            os.path.join(directory, f"{stream_type}-{part}.idx"),
+        )
+
+    def parts(self, session_id: str, stream_type: str) -> List[int]:
+        prefix = f"{stream_type}-"
+        try:
+            names = os.listdir(os.path.join(self.root, session_id))
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(name[len(prefix):-4]) for name in names
+            if name.startswith(prefix) and name.endswith(".idx") and name[len(prefix):-4].isdigit()
+        )
+
+    def append(self, session_id: str, stream_type: str, data: bytes, timestamp: float):
+        key = (session_id, stream_type)
+        if key in self.overflowed:
+            return
+        with self.lock:
+            if self.queued_bytes + len(data) > self.max_queued_bytes:
+                full = True
+            else:
+                full = False
+                self.queued_bytes += len(data)
+        if full:
+            self.overflowed.add(key)
+            print(f"[RecordingStore] Writer is behind; recording of {session_id}/{stream_type} stopped until reconnect")
+            return
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="recording-writer", daemon=True)
+            self.thread.start()
+        self.queue.put((session_id, stream_type, data, timestamp))
+
+    def close_stream(self, session_id: str, stream_type: str):
+        self.overflowed.discard((session_id, stream_type))
+        if self.thread is not None:
+            self.queue.put((session_id, stream_type, None, None))
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=10)
+            self.thread = None
+
+    def _run(self):
+        while True:
+            self._expire()
+            try:
+                item = self.queue.get(timeout=RETENTION_CHECK_INTERVAL)
+            except queue.Empty:
+                continue
+            dirty = set()
+            while item is not None:
+                self._handle(item, dirty)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            for key in dirty:
+                if key in self.writers:
+                    self.writers[key].flush()
+            if item is None:
+                for writer in self.writers.values():
+                    writer.close()
+                self.writers.clear()
+                return
+
+    def _handle(self, item, dirty: set):
+        session_id, stream_type, data, timestamp = item
+        key = (session_id, stream_type)
+        try:
+            if data is None:
+                writer = self.writers.pop(key, None)
+                if writer:
+                    writer.close()
+                dirty.discard(key)
+                return
+            writer = self.writers.get(key)
+            if writer is None:
+                parts = self.parts(session_id, stream_type)
+                part = parts[-1] + 1 if parts else 0
+                writer = self.writers[key] = SegmentWriter(*self.paths(session_id, stream_type, part))
+            writer.write(data, timestamp)
+            dirty.add(key)
+        except OSError as e:
+            print(f"[RecordingStore] Failed to write {session_id}/{stream_type}: {e}")
+        finally:
+            if data is not None:
+                with self.lock:
+                    self.queued_bytes -= len(data)
+
+    def _expire(self):
+        now = time.time()
+        if not self.retention or now - self.last_expiry < RETENTION_CHECK_INTERVAL:
+            return
+        self.last_expiry = now
+        recording = {session_id for session_id, _ in self.writers}
+        try:
+            sessions = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for session_id in sessions:
+            directory = os.path.join(self.root, session_id)
+            if session_id in recording or not os.path.isdir(directory):
+                continue
+            try:
+                written = max(
+                    (os.path.getmtime(os.path.join(directory, name)) for name in os.listdir(directory)),
+                    default=os.path.getmtime(directory),
+                )
+                if now - written > self.retention:
+                    shutil.rmtree(directory)
+                    print(f"[RecordingStore] Deleted expired recording {session_id}")
+            except OSError as e:
+                print(f"[RecordingStore] Failed to expire {session_id}: {e}")
+
+    def read_index(self, session_id: str, stream_type: str, part: int) -> bytes:
+        _, index_path = self.paths(session_id, stream_type, part)
+        with open(index_path, "rb") as f:
+            data = f.read()
+        # Drop a trailing partial record if the writer is mid-flush
+        return data[:len(data) - len(data) % INDEX_ENTRY.size]
+
+    def entry(self, index: bytes, position: int) -> Tuple[int, int, float]:
+        return INDEX_ENTRY.unpack_from(index, position * INDEX_ENTRY.size)
+
+    def seek(self, session_id: str, stream_type: str, timestamp: float) -> Optional[dict]:
+        """Locate the last chunk that started at or before ``timestamp``.
+
+        Picks the last part that started by then, or the first part, and
+        binary searches its index; segment files are never read.
+        """
+        parts = self.parts(session_id, stream_type)
+        for part in reversed(parts):
+            index = self.read_index(session_id, stream_type, part)
+            count = len(index) // INDEX_ENTRY.size
+            if count == 0 or (self.entry(index, 0)[2] > timestamp and part != parts[0]):
+                continue
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.entry(index, mid)[2] <= timestamp:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            offset, length, start = self.entry(index, max(lo - 1, 0))
+            return {
+                "part": part,
+                "offset": offset,
+                "length": length,
+                "timestamp": start,
+                "init_size": self.entry(index, 0)[1],
+            }
+        return None
+
+    def summary(self, session_id: str) -> List[dict]:
+        recordings = []
+        for stream_type in SEGMENT_EXTENSIONS:
+            for part in self.parts(session_id, stream_type):
+                index = self.read_index(session_id, stream_type, part)
+                count = len(index) // INDEX_ENTRY.size
+                if count == 0:
+                    continue
+                first_offset, first_length, start = self.entry(index, 0)
+                last_offset, last_length, end = self.entry(index, count - 1)
+                recordings.append({
+                    "stream_type": stream_type,
+                    "part": part,
+                    "chunks": count,
+                    "size": last_offset + last_length,
+                    "init_size": first_length,
+                    "start": start,
+                    "end": end,
+                })
+        return recordings
+
+
+store = RecordingStore()
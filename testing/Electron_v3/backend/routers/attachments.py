@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from urllib.parse import quote
+from blob_store import BlobTooLarge, store
+from etags import etag_matches
+from models import AttachmentRef
+
+router = APIRouter(prefix="/attachments", tags=["attachments"])
+
+# An attachment id always refers to the same bytes
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+@router.post("/", response_model=AttachmentRef)
+async def upload_attachment(request: Request, filename: str = "attachment"):
+    """Store the raw request body (not multipart) and return its reference.
+
+    The body is streamed into GridFS, so uploads of any size use constant memory.
+    """
+    try:
+        return await store.put(request.stream(), filename, request.headers.get("content-type"))
+    except BlobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+@router.get("/{attachment_id}")
+async def download_attachment(attachment_id: str, request: Request):
+    info = await store.stat(attachment_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    metadata = info.get("metadata") or {}
+    headers = {"Cache-Control": IMMUTABLE}
+    if metadata.get("sha256"):
+        headers["ETag"] = f'"{metadata["sha256"]}"'
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+    headers["Content-Length"] = str(info["length"])
+    headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(info['filename'])}"
+    return StreamingResponse(
+        store.iter_chunks(attachment_id),
+        media_type=metadata.get("contentType") or "application/octet-stream",
+        headers=headers,
+    )
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from models import Meeting
 from typing import List
 from database import db
 from bson import ObjectId
+import etags
 
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
@@ -12,7 +13,10 @@ def fix_id(doc):
     return doc
 
 @router.get("/", response_model=List[Meeting])
-async def get_meetings():
+async def get_meetings(request: Request, response: Response):
+    unchanged = etags.not_modified(request, response, await etags.list_etag("meetings"))
+    if unchanged:
+        return unchanged
     meetings = []
     async for meeting in db.meetings.find():
         meetings.append(fix_id(meeting))
@@ -22,5 +26,6 @@ async def get_meetings():
 async def create_meeting(meeting: Meeting):
     meeting_dict = meeting.dict(exclude={"id"})
     new_meeting = await db.meetings.insert_one(meeting_dict)
+    await etags.bump("meetings")
     created_meeting = await db.meetings.find_one({"_id": new_meeting.inserted_id})
     return fix_id(created_meeting)
@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+import os
+from recording_store import SEGMENT_EXTENSIONS, is_valid_session_id, store
+
+router = APIRouter(prefix="/recordings", tags=["recordings"])
+
+MEDIA_TYPES = {"screen": "video/webm", "mic": "audio/webm", "system": "audio/webm"}
+
+# The handlers read index files from disk, so they are plain functions that
+# FastAPI runs in its threadpool rather than on the event loop
+
+def check_recording(session_id: str, stream_type: str, part: int):
+    if not is_valid_session_id(session_id) or stream_type not in SEGMENT_EXTENSIONS or part < 0:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    media_path, index_path = store.paths(session_id, stream_type, part)
+    if not os.path.exists(media_path) or not os.path.exists(index_path):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    return media_path
+
+@router.get("/{session_id}")
+def get_recording(session_id: str):
+    # Meeting.linkedRecordingId refers to this session id
+    if not is_valid_session_id(session_id):
+        raise HTTPException(status_code=404, detail="Recording not found")
+    streams = store.summary(session_id)
+    if not streams:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    return {"session_id": session_id, "streams": streams}
+
+@router.get("/{session_id}/{stream_type}")
+def play_recording(session_id: str, stream_type: str, part: int = 0):
+    # FileResponse answers single and multiple Range requests itself
+    media_path = check_recording(session_id, stream_type, part)
+    return FileResponse(media_path, media_type=MEDIA_TYPES[stream_type])
+
+@router.get("/{session_id}/{stream_type}/seek")
+def seek_recording(session_id: str, stream_type: str, t: float):
+    """Part and byte offset of the chunk playing at epoch time ``t``.
+
+    Players fetch the part's init segment (``bytes=0-{init_size - 1}``) and
+    then ``bytes={offset}-`` to start playback at ``t``.
+    """
+    if not is_valid_session_id(session_id) or stream_type not in SEGMENT_EXTENSIONS:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    entry = store.seek(session_id, stream_type, t)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Recording not found")
+    return entry
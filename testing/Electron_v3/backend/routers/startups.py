@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Body, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Request, Response
 from models import Startup
 from typing import List
 from database import db
 from bson import ObjectId
+import etags
 
 router = APIRouter(prefix="/startups", tags=["startups"])
 
@@ -12,7 +13,10 @@ def fix_id(doc):
     return doc
 
 @router.get("/", response_model=List[Startup])
-async def get_startups():
+async def get_startups(request: Request, response: Response):
+    unchanged = etags.not_modified(request, response, await etags.list_etag("startups"))
+    if unchanged:
+        return unchanged
     startups = []
     async for startup in db.startups.find():
         startups.append(fix_id(startup))
@@ -22,6 +26,7 @@ async def get_startups():
 async def create_startup(startup: Startup):
     startup_dict = startup.dict(exclude={"id"})
     new_startup = await db.startups.insert_one(startup_dict)
+    await etags.bump("startups")
     created_startup = await db.startups.find_one({"_id": new_startup.inserted_id})
     return fix_id(created_startup)
 
@@ -29,6 +34,7 @@ async def create_startup(startup: Startup):
 async def update_startup(startup_id: str, startup: Startup):
     startup_dict = startup.dict(exclude={"id"})
     result = await db.startups.update_one({"_id": ObjectId(startup_id)}, {"$set": startup_dict})
+    await etags.bump("startups")
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Startup not found")
     updated_startup = await db.startups.find_one({"_id": ObjectId(startup_id)})
@@ -37,6 +43,7 @@ async def update_startup(startup_id: str, startup: Startup):
 @router.delete("/{startup_id}")
 async def delete_startup(startup_id: str):
     result = await db.startups.delete_one({"_id": ObjectId(startup_id)})
+    await etags.bump("startups")
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Startup not found")
     return {"status": "ok"}
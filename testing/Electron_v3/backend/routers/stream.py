@@ -1,10 +1,13 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import asyncio
 import json
+import os
 import time
+from recording_store import RECORDING_ENABLED, is_valid_session_id, store as recordings
+from audio_gate import AUDIO_GATE_MODE, SilenceGate, create_gate
 # Try importing confluent_kafka, if not available, fallback to mock/direct (or error if strict)
 try:
     from confluent_kafka import Producer, Consumer
@@ -17,7 +20,12 @@ router = APIRouter(prefix="/stream", tags=["stream"])
 templates = Jinja2Templates(directory="templates")
 
 # Kafka Config
-KAFKA_BOOTSTRAP_SERVERS = "localhost:9092"
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+# "direct" broadcasts uploads to viewers on the same process. "kafka" only
+# produces uploads; every worker runs a live_relay consumer that fans the
+# Kafka topics out to its own viewers, so uploaders and viewers may land on
+# different workers or replicas.
+STREAM_RELAY_MODE = os.getenv("STREAM_RELAY_MODE", "direct")
 
 producer = None
 if KAFKA_AVAILABLE:
@@ -27,110 +35,235 @@ def delivery_report(err, msg):
     if err is not None:
         print(f'Message delivery failed: {err}')
 
+# Kafka topic per stream type; messages are keyed by session id so every
+# session stays ordered within a single partition.
+STREAM_TOPICS = {
+    "screen": "video_raw_stream",
+    "mic": "audio_mic_stream",
+    "system": "audio_system_stream",
+}
+
+# Session used by the legacy /upload/{stream_type} and /live/{stream_type} routes
+DEFAULT_SESSION_ID = "default"
+# Seconds a stream with no uploader and no viewers is kept before eviction
+SESSION_IDLE_TIMEOUT = float(os.getenv("STREAM_SESSION_IDLE_TIMEOUT", "300"))
+
+class StreamState:
+    """Live state of one stream type within one recording session."""
+
+    def __init__(self):
+        self.viewers: List[WebSocket] = []
+        # Initialization segment replayed to viewers that join mid-stream
+        self.init_segment: Optional[bytes] = None
+        self.chunk_counter = 0
+        self.uploader_connected = False
+        self.last_activity = time.monotonic()
+        # Silence gate of the current/last PCM uploader, kept for its stats
+        self.gate: Optional[SilenceGate] = None
+
+    def is_idle(self, now: float, timeout: float) -> bool:
+        return (not self.uploader_connected and not self.viewers
+                and now - self.last_activity > timeout)
+
 # In-memory connection manager for direct broadcast (fallback)
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {
-            "screen": [],
-            "mic": [],
-            "system": []
-        }
-        # Store initialization segments for each stream type
-        self.init_segments: Dict[str, Optional[bytes]] = {
-            "screen": None,
-            "mic": None,
-            "system": None
-        }
-        self.chunk_counters: Dict[str, int] = {
-            "screen": 0,
-            "mic": 0,
-            "system": 0
-        }
-
-    async def connect(self, websocket: WebSocket, stream_type: str):
+    def __init__(self, idle_timeout: float = SESSION_IDLE_TIMEOUT):
+        # Streams are created lazily on first upload or viewer and keyed by
+        # (session_id, stream_type), so concurrent sessions never share state.
+        self.streams: Dict[Tuple[str, str], StreamState] = {}
+        self.idle_timeout = idle_timeout
+        self._last_sweep = time.monotonic()
+
+    def get_stream(self, session_id: str, stream_type: str) -> StreamState:
+        key = (session_id, stream_type)
+        state = self.streams.get(key)
+        if state is None:
+            self.evict_idle()
+            state = self.streams[key] = StreamState()
+        return state
+
+    def evict_idle(self):
+        # Sweeps are amortized over stream creation and run at most once per timeout
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_timeout:
+            return
+        self._last_sweep = now
+        stale = [key for key, state in self.streams.items() if state.is_idle(now, self.idle_timeout)]
+        for key in stale:
+            del self.streams[key]
+        if stale:
+            print(f"[ConnectionManager] Evicted {len(stale)} idle streams")
+
+    async def connect(self, websocket: WebSocket, session_id: str, stream_type: str):
         await websocket.accept()
-        if stream_type in self.active_connections:
-            self.active_connections[stream_type].append(websocket)
-            # Send init segment if available
-            if self.init_segments[stream_type]:
-                try:
-                    await websocket.send_bytes(self.init_segments[stream_type])
-                    print(f"[ConnectionManager] Sent init segment to new {stream_type} viewer")
-                except Exception as e:
-                    print(f"[ConnectionManager] Error sending init segment: {e}")
-
-    def disconnect(self, websocket: WebSocket, stream_type: str):
-        if stream_type in self.active_connections:
-            if websocket in self.active_connections[stream_type]:
-                self.active_connections[stream_type].remove(websocket)
-
-    async def broadcast(self, message: bytes, stream_type: str, is_init_segment: bool = False):
+        state = self.get_stream(session_id, stream_type)
+        state.viewers.append(websocket)
+        state.last_activity = time.monotonic()
+        # Send init segment if available
+        if state.init_segment:
+            try:
+                await websocket.send_bytes(state.init_segment)
+                print(f"[ConnectionManager] Sent init segment to new {session_id}/{stream_type} viewer")
+            except Exception as e:
+                print(f"[ConnectionManager] Error sending init segment: {e}")
+
+    def disconnect(self, websocket: WebSocket, session_id: str, stream_type: str):
+        state = self.streams.get((session_id, stream_type))
+        if state and websocket in state.viewers:
+            state.viewers.remove(websocket)
+            state.last_activity = time.monotonic()
+
+    async def broadcast(self, message: bytes, session_id: str, stream_type: str, is_init_segment: bool = False):
+        state = self.get_stream(session_id, stream_type)
+        state.last_activity = time.monotonic()
         if is_init_segment:
-            self.init_segments[stream_type] = message
-            print(f"[ConnectionManager] Cached init segment for {stream_type} ({len(message)} bytes)")
-        
-        if stream_type in self.active_connections:
-            disconnected = []
-            for connection in self.active_connections[stream_type]:
-                try:
-                    await connection.send_bytes(message)
-                except:
-                    disconnected.append(connection)
-            
-            # Remove disconnected clients
-            for conn in disconnected:
-                self.active_connections[stream_type].remove(conn)
+            state.init_segment = message
+            print(f"[ConnectionManager] Cached init segment for {session_id}/{stream_type} ({len(message)} bytes)")
+
+        disconnected = []
+        for connection in state.viewers:
+            try:
+                await connection.send_bytes(message)
+            except:
+                disconnected.append(connection)
+
+        # Remove disconnected clients
+        for conn in disconnected:
+            state.viewers.remove(conn)
+
+    def reset_uploader(self, session_id: str, stream_type: str):
+        # Reset chunk counter when uploader disconnects
+        state = self.get_stream(session_id, stream_type)
+        state.uploader_connected = False
+        state.chunk_counter = 0
+        state.init_segment = None
+        state.last_activity = time.monotonic()
 
 manager = ConnectionManager()
 
-@router.websocket("/upload/{stream_type}")
-async def websocket_endpoint(websocket: WebSocket, stream_type: str):
+def frame_headers(stream_type: str, seq: int, timestamp: float, is_init: bool) -> List[Tuple[str, bytes]]:
+    """Kafka headers describing one uploaded chunk (see pathway_pipelines/streaming_pipeline.py)."""
+    return [
+        ("stream_type", stream_type.encode()),
+        ("timestamp", repr(timestamp).encode()),
+        ("seq", str(seq).encode()),
+        ("init", b"1" if is_init else b"0"),
+    ]
+
+async def handle_upload(websocket: WebSocket, session_id: str, stream_type: str):
+    # The session id also names the recording directory, so it must be path-safe
+    if stream_type not in STREAM_TOPICS or not is_valid_session_id(session_id):
+        await websocket.close(code=1008)
+        return
+
+    # ?format=pcm switches mic/system uploads to raw s16le mono PCM, which is
+    # silence-gated before it reaches Kafka
+    gate = None
+    pcm_headers = []
+    if websocket.query_params.get("format", "webm") == "pcm":
+        try:
+            sample_rate = int(websocket.query_params.get("sample_rate", 0)) or None
+        except ValueError:
+            sample_rate = None
+        gate = create_gate(stream_type, sample_rate)
+        if gate is None:
+            await websocket.close(code=1008)
+            return
+        pcm_headers = [("format", b"pcm"), ("sample_rate", str(gate.sample_rate).encode())]
+
     await websocket.accept()
-    print(f"[Upload] {stream_type} uploader connected")
+    print(f"[Upload] {session_id}/{stream_type} uploader connected")
+    state = manager.get_stream(session_id, stream_type)
+    state.uploader_connected = True
+    state.gate = gate
+    topic = STREAM_TOPICS[stream_type]
+    key = session_id.encode()
     try:
         while True:
             data = await websocket.receive_bytes()
-            
+
             # Determine if this is an initialization segment
             # The first chunk from MediaRecorder typically contains the init segment
-            is_init = manager.chunk_counters[stream_type] == 0
-            manager.chunk_counters[stream_type] += 1
-            
+            seq = state.chunk_counter
+            # PCM has no container, hence no init segment
+            is_init = seq == 0 and gate is None
+            state.chunk_counter += 1
+            timestamp = time.time()
+
+            # Recordings are webm segment files; PCM uploads are not recorded
+            if RECORDING_ENABLED and gate is None:
+                # Only enqueues; disk writes happen on the recorder thread
+                recordings.append(session_id, stream_type, data, timestamp)
+
+            silent = gate is not None and gate.is_silent(data)
+
             if KAFKA_AVAILABLE and producer:
-                topic = f"{stream_type}_raw_stream"
-                if stream_type == "screen": topic = "video_raw_stream"
-                elif stream_type == "mic": topic = "audio_mic_stream"
-                elif stream_type == "system": topic = "audio_system_stream"
-
-                # Broadcast to live viewers
-                await manager.broadcast(data, stream_type, is_init_segment=is_init)
-                
-                # Send to Kafka (fire and forget)
-                producer.produce(topic, data, callback=delivery_report)
-                producer.poll(0)
-
-            else:
-                # Fallback
-                await manager.broadcast(data, stream_type, is_init_segment=is_init)
-                
+                if not (silent and AUDIO_GATE_MODE == "drop"):
+                    # Send to Kafka (fire and forget). The payload stays raw bytes;
+                    # frame metadata goes in headers, and the init flag lets relay
+                    # workers cache the segment for late-joining viewers.
+                    headers = frame_headers(stream_type, seq, timestamp, is_init)
+                    if gate is not None:
+                        headers += pcm_headers + [("silent", b"1" if silent else b"0")]
+                    producer.produce(topic, data, key=key, headers=headers, callback=delivery_report)
+                    producer.poll(0)
+                if STREAM_RELAY_MODE == "kafka":
+                    # Viewers on every worker (this one included) are fed by the relay
+                    continue
+
+            # Broadcast to live viewers, whose players expect webm; PCM only goes to Kafka
+            if gate is None:
+                await manager.broadcast(data, session_id, stream_type, is_init_segment=is_init)
+
     except WebSocketDisconnect:
-        print(f"[Upload] {stream_type} uploader disconnected")
-        # Reset chunk counter when uploader disconnects
-        manager.chunk_counters[stream_type] = 0
-        manager.init_segments[stream_type] = None
+        print(f"[Upload] {session_id}/{stream_type} uploader disconnected")
+    finally:
+        manager.reset_uploader(session_id, stream_type)
+        recordings.close_stream(session_id, stream_type)
 
-@router.websocket("/live/{stream_type}")
-async def live_endpoint(websocket: WebSocket, stream_type: str):
+async def handle_live(websocket: WebSocket, session_id: str, stream_type: str):
     # This endpoint is for the frontend/HTML page to consume the stream.
     # We use the ConnectionManager to receive broadcasted data.
-    await manager.connect(websocket, stream_type)
-    print(f"[Live] {stream_type} viewer connected")
+    if stream_type not in STREAM_TOPICS:
+        await websocket.close(code=1008)
+        return
+
+    await manager.connect(websocket, session_id, stream_type)
+    print(f"[Live] {session_id}/{stream_type} viewer connected")
     try:
         while True:
             await websocket.receive_text() # Keep alive
     except WebSocketDisconnect:
-        manager.disconnect(websocket, stream_type)
-        print(f"[Live] {stream_type} viewer disconnected")
+        print(f"[Live] {session_id}/{stream_type} viewer disconnected")
+    finally:
+        manager.disconnect(websocket, session_id, stream_type)
+
+@router.websocket("/upload/{session_id}/{stream_type}")
+async def session_upload_endpoint(websocket: WebSocket, session_id: str, stream_type: str):
+    await handle_upload(websocket, session_id, stream_type)
+
+@router.websocket("/live/{session_id}/{stream_type}")
+async def session_live_endpoint(websocket: WebSocket, session_id: str, stream_type: str):
+    await handle_live(websocket, session_id, stream_type)
+
+# Legacy single-session routes, kept for clients that do not send a session id
+@router.websocket("/upload/{stream_type}")
+async def websocket_endpoint(websocket: WebSocket, stream_type: str):
+    await handle_upload(websocket, DEFAULT_SESSION_ID, stream_type)
+
+@router.websocket("/live/{stream_type}")
+async def live_endpoint(websocket: WebSocket, stream_type: str):
+    await handle_live(websocket, DEFAULT_SESSION_ID, stream_type)
+
+@router.get("/gate/{session_id}")
+async def get_gate_stats(session_id: str):
+    # Kafka bytes saved by silence gating for the session's PCM audio streams
+    stats = {}
+    for stream_type in ("mic", "system"):
+        state = manager.streams.get((session_id, stream_type))
+        if state and state.gate:
+            stats[stream_type] = state.gate.stats()
+    return {"session_id": session_id, "mode": AUDIO_GATE_MODE, "streams": stats}
 
 @router.get("/live/{session_id}", response_class=HTMLResponse)
 async def get_live_page(request: Request, session_id: str):
@@ -0,0 +1,47 @@
+import pathway as pw
+import pytest
+
+from audio_alignment_pipeline import AudioFrameSchema, align_audio, pack_pair, unpack_pair
+
+
+@pytest.fixture(autouse=True)
+def fresh_graph():
+    pw.internals.parse_graph.G.clear()
+    yield
+    pw.internals.parse_graph.G.clear()
+
+
+def aligned(mic_rows, system_rows) -> list:
+    mic = pw.debug.table_from_rows(AudioFrameSchema, mic_rows)
+    system = pw.debug.table_from_rows(AudioFrameSchema, system_rows)
+    paired = align_audio(mic, system)
+    output = paired.select(pw.this.key, value=pack_pair(pw.this.mic, pw.this.system))
+    keys, columns = pw.debug.table_to_dicts(output)
+    return sorted((columns["key"][key], unpack_pair(columns["value"][key])) for key in keys)
+
+
+def test_every_chunk_of_a_session_is_paired():
+    # Rows of one session share the Kafka key; each chunk must still be its own row
+    mic = [(b"s1", 10.0, b"m1"), (b"s1", 10.25, b"m2"), (b"s1", 10.5, b"m3")]
+    system = [(b"s1", 10.02, b"y1"), (b"s1", 10.27, b"y2"), (b"s1", 10.49, b"y3")]
+    assert aligned(mic, system) == [
+        (b"s1", (b"m1", b"y1")),
+        (b"s1", (b"m2", b"y2")),
+        (b"s1", (b"m3", b"y3")),
+    ]
+
+
+def test_chunks_without_a_partner_are_emitted_alone():
+    mic = [(b"s1", 10.0, b"m1"), (b"s1", 10.25, b"m2")]
+    system = [(b"s1", 10.03, b"y1"), (b"s1", 11.0, b"y2")]
+    assert aligned(mic, system) == [
+        (b"s1", (b"", b"y2")),
+        (b"s1", (b"m1", b"y1")),
+        (b"s1", (b"m2", b"")),
+    ]
+
+
+def test_sessions_are_not_paired_with_each_other():
+    mic = [(b"s1", 10.0, b"m1")]
+    system = [(b"s2", 10.0, b"y1")]
+    assert aligned(mic, system) == [(b"s1", (b"m1", b"")), (b"s2", (b"", b"y1"))]
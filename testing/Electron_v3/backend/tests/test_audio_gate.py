@@ -0,0 +1,122 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import WebSocketDisconnect
+
+from audio_gate import SilenceGate, create_gate
+from routers import stream
+
+SAMPLE_RATE = 16000
+# 20 ms frames at 16 kHz
+FRAME = 320
+
+
+def pcm(amplitude: int, frames: int) -> bytes:
+    return np.full(frames * FRAME, amplitude, dtype="<i2").tobytes()
+
+
+def gate(hangover_ms: int = 40) -> SilenceGate:
+    return SilenceGate(-45, sample_rate=SAMPLE_RATE, frame_ms=20, hangover_ms=hangover_ms)
+
+
+def test_silent_and_loud_chunks():
+    g = gate()
+    assert g.is_silent(pcm(0, 5))
+    assert not g.is_silent(pcm(8000, 5))
+
+
+def test_hangover_keeps_the_frames_after_speech():
+    g = gate(hangover_ms=40)
+    assert not g.is_silent(pcm(8000, 1))
+    # Two hangover frames carry over from the previous chunk
+    assert not g.is_silent(pcm(0, 2))
+    assert g.is_silent(pcm(0, 2))
+
+
+def test_kept_frames_mask():
+    g = gate(hangover_ms=20)
+    chunk = pcm(0, 2) + pcm(8000, 1) + pcm(0, 3)
+    assert g.voiced_frames(chunk).tolist() == [False, False, True, True, False, False]
+
+
+def test_sub_frame_chunks_are_carried_over_and_never_silent():
+    g = gate()
+    half = pcm(0, 1)[:FRAME]
+    assert not g.is_silent(half)
+    assert g.is_silent(half)
+    assert g.remainder == b""
+
+
+def test_stats_count_saved_bytes(monkeypatch):
+    monkeypatch.setattr("audio_gate.AUDIO_GATE_MODE", "drop")
+    g = gate()
+    g.is_silent(pcm(0, 5))
+    g.is_silent(pcm(8000, 5))
+    stats = g.stats()
+    assert stats["chunks_in"] == 2
+    assert stats["chunks_silent"] == 1
+    assert stats["bytes_saved_ratio"] == pytest.approx(0.5)
+
+
+def test_only_audio_streams_are_gated():
+    assert create_gate("screen") is None
+    assert create_gate("mic", 48000).sample_rate == 48000
+
+
+class FakeUploader:
+    def __init__(self, chunks, query_params):
+        self.chunks = list(chunks)
+        self.query_params = query_params
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int):
+        self.closed_with = code
+
+    async def receive_bytes(self) -> bytes:
+        if not self.chunks:
+            raise WebSocketDisconnect()
+        return self.chunks.pop(0)
+
+
+class FakeViewer:
+    def __init__(self):
+        self.received = []
+
+    async def send_bytes(self, data: bytes):
+        self.received.append(data)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = stream.ConnectionManager()
+    monkeypatch.setattr(stream, "manager", manager)
+    monkeypatch.setattr(stream, "RECORDING_ENABLED", False)
+    return manager
+
+
+def upload(manager, stream_type: str, chunks, query_params):
+    viewer = FakeViewer()
+    manager.get_stream("s", stream_type).viewers.append(viewer)
+    uploader = FakeUploader(chunks, query_params)
+    asyncio.run(stream.handle_upload(uploader, "s", stream_type))
+    return uploader, viewer
+
+
+def test_pcm_uploads_are_not_broadcast(manager):
+    _, viewer = upload(manager, "mic", [pcm(8000, 5), pcm(0, 5)], {"format": "pcm"})
+    assert viewer.received == []
+    assert manager.get_stream("s", "mic").gate.chunks_in == 2
+
+
+def test_webm_uploads_are_broadcast(manager):
+    _, viewer = upload(manager, "mic", [b"init", b"chunk"], {})
+    assert viewer.received == [b"init", b"chunk"]
+
+
+def test_pcm_video_upload_is_refused(manager):
+    uploader, _ = upload(manager, "screen", [b"x"], {"format": "pcm"})
+    assert uploader.closed_with == 1008
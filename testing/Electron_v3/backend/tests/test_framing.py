@@ -0,0 +1,54 @@
+import base64
+
+from live_relay import decode_message
+from routers.stream import frame_headers
+from streaming_pipeline import FRAME_HEADERS, header_value
+
+
+class FakeMessage:
+    def __init__(self, topic: str, value: bytes, key: bytes = None, headers=None):
+        self._topic = topic
+        self._value = value
+        self._key = key
+        self._headers = headers
+
+    def topic(self):
+        return self._topic
+
+    def value(self):
+        return self._value
+
+    def key(self):
+        return self._key
+
+    def headers(self):
+        return self._headers
+
+
+def test_frame_headers_survive_pathway_metadata():
+    headers = frame_headers("screen", 7, 1700000000.25, False)
+    assert [name for name, _ in headers] == list(FRAME_HEADERS)
+    # Pathway exposes Kafka headers base64-encoded in _metadata
+    metadata = {"headers": [[name, base64.b64encode(value).decode()] for name, value in headers]}
+    assert header_value(metadata, "stream_type") == "screen"
+    assert header_value(metadata, "seq") == "7"
+    assert float(header_value(metadata, "timestamp")) == 1700000000.25
+    assert header_value(metadata, "init") == "0"
+    assert header_value(metadata, "missing") == ""
+    assert header_value({}, "seq") == ""
+
+
+def test_binary_output_passes_the_payload_through():
+    headers = frame_headers("screen", 0, 1.0, True) + [("pathway_time", b"2"), ("pathway_diff", b"1")]
+    message = FakeMessage("video_live_out", b"\x1aE\xdf\xa3 raw webm", key=b"s1", headers=headers)
+    assert decode_message(message) == ("s1", "screen", b"\x1aE\xdf\xa3 raw webm", True)
+
+
+def test_retractions_are_not_relayed():
+    headers = frame_headers("screen", 3, 1.0, False) + [("pathway_time", b"4"), ("pathway_diff", b"-1")]
+    assert decode_message(FakeMessage("video_live_out", b"old chunk", key=b"s1", headers=headers)) is None
+
+
+def test_pcm_audio_is_not_relayed():
+    headers = [("format", b"pcm"), ("sample_rate", b"16000")]
+    assert decode_message(FakeMessage("audio_mic_stream", b"\0\0", key=b"s1", headers=headers)) is None
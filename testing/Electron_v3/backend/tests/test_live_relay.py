@@ -0,0 +1,115 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+import live_relay
+from live_relay import LiveRelay, decode_message
+from routers.stream import DEFAULT_SESSION_ID, ConnectionManager
+
+
+class FakeMessage:
+    def __init__(self, topic: str, value: bytes, key: bytes = None, headers=None):
+        self._topic = topic
+        self._value = value
+        self._key = key
+        self._headers = headers
+
+    def topic(self):
+        return self._topic
+
+    def value(self):
+        return self._value
+
+    def key(self):
+        return self._key
+
+    def headers(self):
+        return self._headers
+
+
+class FakeViewer:
+    def __init__(self):
+        self.received = []
+        self.closed_with = None
+
+    async def send_bytes(self, data: bytes):
+        self.received.append(data)
+
+    async def close(self, code: int):
+        self.closed_with = code
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ConnectionManager()
+    monkeypatch.setattr(live_relay, "manager", manager)
+    return manager
+
+
+def test_session_comes_from_the_message_key():
+    decoded = decode_message(FakeMessage("audio_mic_stream", b"pcm", key=b"s1"))
+    assert decoded == ("s1", "mic", b"pcm", False)
+
+
+def test_message_without_key_goes_to_the_default_session():
+    assert decode_message(FakeMessage("audio_system_stream", b"x"))[0] == DEFAULT_SESSION_ID
+
+
+def test_unrelayed_topic_is_skipped():
+    assert decode_message(FakeMessage("audio_paired_stream", b"x", key=b"s1")) is None
+
+
+def test_json_output_prefers_the_key_and_init_header(monkeypatch):
+    monkeypatch.setattr(live_relay, "PIPELINE_FORMAT", "json")
+    envelope = {"session": "envelope", "is_init": False, "data": base64.b64encode(b"media").decode()}
+    keyed = FakeMessage("video_live_out", json.dumps(envelope).encode(), key=b"s1", headers=[("init", b"1")])
+    assert decode_message(keyed) == ("s1", "screen", b"media", True)
+    # Rows written before the pipeline keyed its output
+    legacy = FakeMessage("video_live_out", json.dumps({**envelope, "is_init": True}).encode())
+    assert decode_message(legacy) == ("envelope", "screen", b"media", True)
+
+
+def test_dispatch_broadcasts_in_order(manager):
+    async def main():
+        relay = LiveRelay(queue_size=10)
+        relay.queue = asyncio.Queue(maxsize=relay.queue_size)
+        viewer = FakeViewer()
+        manager.get_stream("s1", "screen").viewers.append(viewer)
+        for data in (b"init", b"a", b"b"):
+            relay._enqueue(("s1", "screen", data, data == b"init"))
+        task = asyncio.create_task(relay._dispatch())
+        while not relay.queue.empty():
+            await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        task.cancel()
+        return viewer
+
+    viewer = asyncio.run(main())
+    assert viewer.received == [b"init", b"a", b"b"]
+    assert manager.get_stream("s1", "screen").init_segment == b"init"
+
+
+def test_full_queue_drops_the_chunk_and_disconnects_its_viewers(manager):
+    async def main():
+        relay = LiveRelay(queue_size=2)
+        relay.queue = asyncio.Queue(maxsize=relay.queue_size)
+        lagging, other = FakeViewer(), FakeViewer()
+        manager.get_stream("s1", "screen").viewers.append(lagging)
+        manager.get_stream("s2", "screen").viewers.append(other)
+        relay._enqueue(("s1", "screen", b"a", False))
+        relay._enqueue(("s2", "screen", b"b", False))
+        relay._enqueue(("s1", "screen", b"init-2", True))
+        await asyncio.sleep(0)
+        return relay, lagging, other
+
+    relay, lagging, other = asyncio.run(main())
+    assert relay.dropped == 1
+    assert relay.queue.qsize() == 2
+    # 1013: the viewer reconnects and restarts from the cached init segment
+    assert lagging.closed_with == 1013
+    assert manager.get_stream("s1", "screen").viewers == []
+    assert manager.get_stream("s1", "screen").init_segment == b"init-2"
+    assert other.closed_with is None
+    assert manager.get_stream("s2", "screen").viewers == [other]
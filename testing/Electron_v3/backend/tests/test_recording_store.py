@@ -0,0 +1,118 @@
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import recording_store
+from recording_store import INDEX_ENTRY, RecordingStore, is_valid_session_id
+from routers import recordings
+
+
+def record(store: RecordingStore, session_id: str, stream_type: str, chunks):
+    for data, timestamp in chunks:
+        store.append(session_id, stream_type, data, timestamp)
+    store.close_stream(session_id, stream_type)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordingStore(root=str(tmp_path), max_queued_bytes=1024, retention_days=0)
+    yield store
+    store.stop()
+
+
+def test_session_ids_must_be_path_safe():
+    assert is_valid_session_id("meeting-42_a")
+    assert not is_valid_session_id("../etc")
+    assert not is_valid_session_id("")
+
+
+def test_chunks_are_written_with_an_index(store):
+    record(store, "s", "screen", [(b"init", 100.0), (b"chunk-1", 101.0), (b"chunk-2", 102.0)])
+    store.stop()
+    media_path, _ = store.paths("s", "screen", 0)
+    with open(media_path, "rb") as f:
+        assert f.read() == b"initchunk-1chunk-2"
+    assert store.summary("s") == [{
+        "stream_type": "screen", "part": 0, "chunks": 3, "size": 18,
+        "init_size": 4, "start": 100.0, "end": 102.0,
+    }]
+
+
+def test_seek_finds_the_chunk_playing_at_a_time(store):
+    record(store, "s", "mic", [(b"init", 100.0), (b"aa", 101.0), (b"bbb", 102.0)])
+    store.stop()
+    assert store.seek("s", "mic", 101.5) == {"part": 0, "offset": 4, "length": 2, "timestamp": 101.0, "init_size": 4}
+    assert store.seek("s", "mic", 500)["offset"] == 6
+    # Before the recording started: its first chunk
+    assert store.seek("s", "mic", 1)["offset"] == 0
+    assert store.seek("s", "system", 101) is None
+
+
+def test_every_connection_starts_a_new_part(store):
+    record(store, "s", "screen", [(b"init-1", 100.0), (b"a", 101.0)])
+    record(store, "s", "screen", [(b"init-2", 200.0), (b"b", 201.0)])
+    store.stop()
+    assert store.parts("s", "screen") == [0, 1]
+    assert store.seek("s", "screen", 150)["part"] == 0
+    assert store.seek("s", "screen", 200.5) == {"part": 1, "offset": 0, "length": 6, "timestamp": 200.0, "init_size": 6}
+
+
+def test_stream_stops_recording_when_the_writer_falls_behind(store):
+    store.queued_bytes = store.max_queued_bytes - 10
+    store.append("s", "screen", b"x" * 20, 100.0)
+    store.queued_bytes = 0
+    # Dropped until the uploader reconnects, so the part is truncated, not holed
+    store.append("s", "screen", b"later", 101.0)
+    assert ("s", "screen") in store.overflowed
+    assert store.thread is None
+    store.close_stream("s", "screen")
+    record(store, "s", "screen", [(b"init", 102.0)])
+    store.stop()
+    assert [entry["chunks"] for entry in store.summary("s")] == [1]
+
+
+def test_partial_index_record_is_ignored(store):
+    record(store, "s", "mic", [(b"init", 100.0)])
+    store.stop()
+    _, index_path = store.paths("s", "mic", 0)
+    with open(index_path, "ab") as f:
+        f.write(b"\0" * (INDEX_ENTRY.size - 1))
+    assert len(store.read_index("s", "mic", 0)) == INDEX_ENTRY.size
+
+
+def test_expired_recordings_are_deleted(tmp_path):
+    store = RecordingStore(root=str(tmp_path), retention_days=1)
+    record(store, "old", "mic", [(b"init", 100.0)])
+    record(store, "new", "mic", [(b"init", 100.0)])
+    store.stop()
+    long_ago = time.time() - 2 * 86400
+    for name in os.listdir(tmp_path / "old"):
+        os.utime(tmp_path / "old" / name, (long_ago, long_ago))
+    # The writer thread checked when it started; checks are hourly
+    store._expire()
+    assert sorted(os.listdir(tmp_path)) == ["new", "old"]
+    store.last_expiry = 0
+    store._expire()
+    assert sorted(os.listdir(tmp_path)) == ["new"]
+
+
+def test_playback_and_seek_endpoints(store, monkeypatch):
+    monkeypatch.setattr(recordings, "store", store)
+    record(store, "s", "screen", [(b"init", 100.0), (b"chunk-1", 101.0)])
+    store.stop()
+    app = FastAPI()
+    app.include_router(recordings.router)
+    client = TestClient(app)
+
+    assert client.get("/recordings/s").json()["streams"][0]["chunks"] == 2
+    entry = client.get("/recordings/s/screen/seek", params={"t": 101.5}).json()
+    assert entry["offset"] == 4
+    response = client.get("/recordings/s/screen", headers={"Range": f"bytes={entry['offset']}-"})
+    assert response.status_code == 206
+    assert response.content == b"chunk-1"
+    assert client.get("/recordings/s/screen", params={"part": 1}).status_code == 404
+    assert client.get("/recordings/other").status_code == 404
+    assert client.get("/recordings/s/camera/seek", params={"t": 1}).status_code == 404
@@ -0,0 +1,93 @@
+import asyncio
+
+from routers.stream import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.accepted = False
+        self.received = []
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_bytes(self, data: bytes):
+        if self.fail:
+            raise RuntimeError("gone")
+        self.received.append(data)
+
+
+def test_sessions_do_not_share_streams():
+    async def main():
+        manager = ConnectionManager()
+        first, second = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(first, "session-a", "screen")
+        await manager.connect(second, "session-b", "screen")
+        await manager.broadcast(b"init-a", "session-a", "screen", is_init_segment=True)
+        await manager.broadcast(b"chunk-a", "session-a", "screen")
+        await manager.broadcast(b"chunk-b", "session-b", "screen")
+        return manager, first, second
+
+    manager, first, second = asyncio.run(main())
+    assert first.received == [b"init-a", b"chunk-a"]
+    assert second.received == [b"chunk-b"]
+    assert manager.get_stream("session-b", "screen").init_segment is None
+
+
+def test_late_viewer_gets_the_init_segment_first():
+    async def main():
+        manager = ConnectionManager()
+        await manager.broadcast(b"init", "s", "screen", is_init_segment=True)
+        await manager.broadcast(b"chunk-1", "s", "screen")
+        viewer = FakeWebSocket()
+        await manager.connect(viewer, "s", "screen")
+        await manager.broadcast(b"chunk-2", "s", "screen")
+        return viewer
+
+    assert asyncio.run(main()).received == [b"init", b"chunk-2"]
+
+
+def test_failed_viewer_is_removed():
+    async def main():
+        manager = ConnectionManager()
+        good, bad = FakeWebSocket(), FakeWebSocket(fail=True)
+        await manager.connect(good, "s", "mic")
+        await manager.connect(bad, "s", "mic")
+        await manager.broadcast(b"chunk", "s", "mic")
+        return manager, good
+
+    manager, good = asyncio.run(main())
+    assert manager.get_stream("s", "mic").viewers == [good]
+
+
+def test_reset_uploader_forgets_the_init_segment():
+    async def main():
+        manager = ConnectionManager()
+        await manager.broadcast(b"init", "s", "screen", is_init_segment=True)
+        manager.get_stream("s", "screen").chunk_counter = 5
+        manager.reset_uploader("s", "screen")
+        return manager.get_stream("s", "screen")
+
+    state = asyncio.run(main())
+    assert state.init_segment is None
+    assert state.chunk_counter == 0
+
+
+def test_idle_streams_are_evicted():
+    manager = ConnectionManager(idle_timeout=10)
+    idle = manager.get_stream("idle", "screen")
+    busy = manager.get_stream("busy", "screen")
+    busy.uploader_connected = True
+    idle.last_activity -= 60
+    busy.last_activity -= 60
+    manager._last_sweep -= 60
+    manager.get_stream("new", "screen")
+    assert set(manager.streams) == {("busy", "screen"), ("new", "screen")}
+
+
+def test_eviction_runs_at_most_once_per_timeout():
+    manager = ConnectionManager(idle_timeout=10)
+    manager.get_stream("idle", "screen").last_activity -= 60
+    manager.get_stream("new", "screen")
+    assert ("idle", "screen") in manager.streams
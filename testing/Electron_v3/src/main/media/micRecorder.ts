@@ -10,8 +10,8 @@ class MicRecorder {
   }
 
   private setupIPC() {
-    ipcMain.on('media:start-stream', () => {
-        this.uploader.connect();
+    ipcMain.on('media:start-stream', (_, sessionId?: string) => {
+        this.uploader.connect(sessionId);
     });
 
     ipcMain.on('media:stop-stream', () => {
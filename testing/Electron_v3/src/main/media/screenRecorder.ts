@@ -65,8 +65,8 @@ class ScreenRecorder {
         }));
     });
 
-    ipcMain.on('media:start-stream', () => {
-        this.uploader.connect();
+    ipcMain.on('media:start-stream', (_, sessionId?: string) => {
+        this.uploader.connect(sessionId);
     });
 
     ipcMain.on('media:stop-stream', () => {
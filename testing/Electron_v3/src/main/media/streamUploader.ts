@@ -1,15 +1,13 @@
 export class StreamUploader {
   private ws: WebSocket | null = null;
   private type: 'screen' | 'mic' | 'system';
-  private url: string;
 
   constructor(type: 'screen' | 'mic' | 'system') {
     this.type = type;
-    this.url = `ws://localhost:8000/stream/upload/${type}`;
   }
 
-  connect() {
-    this.ws = new WebSocket(this.url);
+  connect(sessionId: string = 'default') {
+    this.ws = new WebSocket(`ws://localhost:8000/stream/upload/${sessionId}/${this.type}`);
     this.ws.onopen = () => console.log(`[StreamUploader] ${this.type} connected`);
     this.ws.onerror = (e) => console.error(`[StreamUploader] ${this.type} error`, e);
   }
@@ -6,7 +6,7 @@ declare global {
     api: unknown
     mediaAPI: {
       getScreenSources: () => Promise<{ id: string; name: string; thumbnail: string }[]>
-      startStream: () => void
+      startStream: (sessionId?: string) => void
       stopStream: () => void
       sendScreenChunk: (chunk: ArrayBuffer) => void
       sendMicChunk: (chunk: ArrayBuffer) => void
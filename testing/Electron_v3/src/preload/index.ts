@@ -6,7 +6,7 @@ const api = {}
 
 const mediaAPI = {
   getScreenSources: () => ipcRenderer.invoke('media:get-screen-sources'),
-  startStream: () => ipcRenderer.send('media:start-stream'),
+  startStream: (sessionId?: string) => ipcRenderer.send('media:start-stream', sessionId),
   stopStream: () => ipcRenderer.send('media:stop-stream'),
   sendScreenChunk: (chunk: ArrayBuffer) => ipcRenderer.send('media:screen-chunk', chunk),
   sendMicChunk: (chunk: ArrayBuffer) => ipcRenderer.send('media:mic-chunk', chunk),
@@ -30,8 +30,8 @@ export default function Recorder() {
         }
 
         try {
-            // Notify backend to connect WebSockets
-            window.mediaAPI.startStream();
+            // Notify backend to connect WebSockets under a fresh session id
+            window.mediaAPI.startStream(crypto.randomUUID());
 
             let screenStream: MediaStream | null = null;
             let systemAudioStreamOnly: MediaStream | null = null;
@@ -1,8 +1,21 @@
 import { useState } from 'react';
-import { Startup } from '../store/useStartupStore';
+import { AttachmentRef, Startup } from '../store/useStartupStore';
 import api from '../api';
 import { ArrowLeft, Upload, X } from 'lucide-react';
 
+// Streams the file to blob storage; the startup keeps only the returned reference
+async function uploadAttachment(file: File): Promise<AttachmentRef> {
+    const res = await api.post('/attachments/', file, {
+        params: { filename: file.name },
+        headers: { 'Content-Type': file.type || 'application/octet-stream' },
+    });
+    return res.data;
+}
+
+function attachmentUrl(ref: string): string {
+    return ref.startsWith('/attachments/') ? `${api.defaults.baseURL}${ref}` : ref;
+}
+
 interface Props {
     startup?: Startup;
     onBack: () => void;
@@ -37,24 +50,22 @@ export default function StartupDetails({ startup, onBack }: Props) {
         }
     };
 
-    const handleFileUpload = (e: React.ChangeEvent<HTMLInputElement>, type: 'pdf' | 'logo') => {
+    const handleFileUpload = async (e: React.ChangeEvent<HTMLInputElement>, type: 'pdf' | 'logo') => {
         const file = e.target.files?.[0];
         if (!file) return;
 
-        if (type === 'pdf') {
-            if (file.type !== 'application/pdf') return alert('Only PDF allowed');
-            // In real app, upload to backend. Here we fake it.
-            setFormData(prev => ({
-                ...prev,
-                pdfs: [...(prev.pdfs || []), { name: file.name, path: (file as any).path }]
-            }));
-        } else if (type === 'logo') {
-            if (!file.type.startsWith('image/')) return alert('Only images allowed');
-            const reader = new FileReader();
-            reader.onload = () => {
-                setFormData(prev => ({ ...prev, logo: reader.result as string }));
-            };
-            reader.readAsDataURL(file);
+        if (type === 'pdf' && file.type !== 'application/pdf') return alert('Only PDF allowed');
+        if (type === 'logo' && !file.type.startsWith('image/')) return alert('Only images allowed');
+        try {
+            const ref = await uploadAttachment(file);
+            if (type === 'pdf') {
+                setFormData(prev => ({ ...prev, pdfs: [...(prev.pdfs || []), ref] }));
+            } else {
+                setFormData(prev => ({ ...prev, logo: `/attachments/${ref.id}` }));
+            }
+        } catch (err) {
+            alert('Upload failed');
+            console.error(err);
         }
     };
 
@@ -125,7 +136,7 @@ export default function StartupDetails({ startup, onBack }: Props) {
                     <div>
                         <label className="block text-sm text-gray-400 mb-1">Logo</label>
                         <div className="flex items-center gap-4">
-                            {formData.logo && <img src={formData.logo} className="w-16 h-16 rounded-full object-cover" />}
+                            {formData.logo && <img src={attachmentUrl(formData.logo)} className="w-16 h-16 rounded-full object-cover" />}
                             <label className="cursor-pointer bg-gray-700 hover:bg-gray-600 px-4 py-2 rounded text-sm">
                                 Upload Image
                                 <input type="file" className="hidden" accept="image/*" onChange={e => handleFileUpload(e, 'logo')} />
@@ -137,7 +148,11 @@ export default function StartupDetails({ startup, onBack }: Props) {
                         <div className="space-y-2 mb-2">
                             {formData.pdfs?.map((pdf, i) => (
                                 <div key={i} className="flex items-center justify-between bg-gray-800 p-2 rounded border border-gray-700">
-                                    <span className="text-sm truncate">{pdf.name}</span>
+                                    {pdf.id ? (
+                                        <a href={attachmentUrl(`/attachments/${pdf.id}`)} target="_blank" rel="noreferrer" className="text-sm truncate hover:underline">{pdf.name}</a>
+                                    ) : (
+                                        <span className="text-sm truncate">{pdf.name}</span>
+                                    )}
                                     <button onClick={() => setFormData(prev => ({ ...prev, pdfs: prev.pdfs?.filter((_, idx) => idx !== i) }))} className="text-red-500 hover:text-red-400"><X size={16} /></button>
                                 </div>
                             ))}
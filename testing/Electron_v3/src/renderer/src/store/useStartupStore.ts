@@ -1,13 +1,23 @@
 import { create } from 'zustand';
 
+// Reference to a file stored by the backend at /attachments/<id>
+export interface AttachmentRef {
+  id?: string;
+  name: string;
+  contentType?: string;
+  size?: number;
+  sha256?: string;
+  path?: string; // legacy entries pointed at a local file
+}
+
 export interface Startup {
   id: string;
   name: string;
-  logo: string; // Data URL or path
+  logo: string; // /attachments/<id>, or a data URL for older entries
   description: string;
   fundingStage: string;
   website: string;
-  pdfs: { name: string; path: string }[]; // In real app, path would be handled securely
+  pdfs: AttachmentRef[];
   teamInfo: string;
   marketCategory: string;
   vcNotes: string;
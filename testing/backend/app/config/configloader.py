@@ -1,27 +1,73 @@
 import dotenv
 import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueListener
+
+from .log_handlers import HotPathFilter, JsonFormatter, NonBlockingQueueHandler, parse_settings
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+_listener = None
+
+def _stop_listener():
+    # Flushes what is still queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
 
 def setup_logger():
+    """
+    Route all logging through a bounded queue. Formatting and stream I/O
+    happen on a QueueListener thread, so a log call on the event loop never
+    waits for stdout.
+    """
+    global _listener
     log_level = os.getenv("LOG_LEVEL", "INFO").upper()
     valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
 
     if log_level not in valid_levels:
         log_level = "INFO"
 
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format="%(asctime)s - %(levelname)s - %(name)s - %(message)s"
-    )
+    stream_handler = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(HotPathFilter(
+        rate=float(os.getenv("LOG_RATE_LIMIT", "100")),
+        limits=parse_settings(os.getenv("LOG_RATE_LIMITS")),
+        samples=parse_settings(os.getenv("LOG_SAMPLING")),
+    ))
+
+    _stop_listener()
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(getattr(logging, log_level))
+    # uvicorn's loggers write to their own stream handlers; send them through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    logging.info("Logger initialized with level: %s", log_level)
 
-    logging.info(f"Logger initialized with level: {log_level}")
+atexit.register(_stop_listener)
 
 def load_config(env_file: str = ".env") -> None:
     # Only load dotenv if file exists (for local dev)
     if os.path.exists(env_file):
         dotenv.load_dotenv(dotenv_path=env_file)
         setup_logger()
-        logging.info(f"Loaded environment variables from {env_file}")
+        logging.info("Loaded environment variables from %s", env_file)
     else:
         setup_logger()
         logging.info("No .env file found — relying on system/Docker environment variables.")
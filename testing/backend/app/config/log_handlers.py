@@ -0,0 +1,136 @@
+import json
+import queue
+import random
+import logging
+import datetime
+import threading
+from logging.handlers import QueueHandler
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed with extra=
+RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def parse_settings(spec: Optional[str]) -> Dict[str, float]:
+    """'MeetingHandler=0.1,uvicorn.access=0.01' -> {'MeetingHandler': 0.1, ...}"""
+    settings = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if name and value:
+            settings[name] = float(value)
+    return settings
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a QueueListener thread without formatting them.
+    When the queue is full the record is dropped instead of blocking the
+    caller; the next record that gets through carries the drop count.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is formatted by the listener thread, not the caller
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        dropped = self.dropped
+        if dropped:
+            record.dropped = dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self.dropped -= dropped
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "suppressed", "rate", "sample")
+
+    def __init__(self, rate: float, sample: float, now: float):
+        self.tokens = rate
+        self.updated = now
+        self.suppressed = 0
+        self.rate = rate
+        self.sample = sample
+
+
+class HotPathFilter(logging.Filter):
+    """
+    Sampling and per-logger rate limiting for INFO and DEBUG records.
+    A logger listed in `samples` keeps that fraction of its records (tagged
+    with `sampleRate`). Every logger may then pass at most `rate` records per
+    second (`limits` overrides it per logger) with bursts of the same size.
+    The first record after a suppressed stretch carries the `suppressed`
+    count. WARNING and above always pass. Settings apply to a logger and
+    its children.
+    """
+
+    def __init__(self, rate: float, limits: Dict[str, float], samples: Dict[str, float]):
+        super().__init__()
+        self.rate = rate
+        self.limits = limits
+        self.samples = samples
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, _Bucket] = {}
+
+    def _setting(self, settings: Dict[str, float], name: str, default: float) -> float:
+        while name:
+            if name in settings:
+                return settings[name]
+            name = name.rpartition(".")[0]
+        return default
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        bucket = self.buckets.get(record.name)
+        if bucket is None:
+            bucket = self.buckets[record.name] = _Bucket(
+                self._setting(self.limits, record.name, self.rate),
+                self._setting(self.samples, record.name, 1.0),
+                record.created,
+            )
+
+        if bucket.sample < 1.0:
+            if random.random() >= bucket.sample:
+                return False
+            record.sampleRate = bucket.sample
+        if bucket.rate <= 0:
+            return True
+        with self.lock:
+            tokens = min(bucket.rate, bucket.tokens + (record.created - bucket.updated) * bucket.rate)
+            bucket.updated = record.created
+            if tokens < 1.0:
+                bucket.tokens = tokens
+                bucket.suppressed += 1
+                return False
+            bucket.tokens = tokens - 1.0
+            if bucket.suppressed:
+                record.suppressed, bucket.suppressed = bucket.suppressed, 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra= are included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
@@ -12,8 +12,13 @@ from ..models.application_model import (
     ApplicationCreate,
     ApplicationUpdate,
     Application,
+    DuplicateCandidate,
 )
+from ..dedup.duplicates import PROJECTION, duplicate_index
+from ..models.blob_model import BlobRef
 from ..models.startup_model import Startup
+from .versions import versions
+from .read_routing import causal_session, record_write, secondary_reads, write_session
 
 
 class ApplicationsHandler:
@@ -32,6 +37,8 @@ class ApplicationsHandler:
         self.db = self.client[self.db_name]
         self.applications_collection = self.db[self.applications_collection_name]
         self.startups_collection = self.db[self.startups_collection_name]
+        # Reads go to secondaries; writes and transactions stay on the primary
+        self.applications_reads = secondary_reads(self.applications_collection)
 
     async def create_application(self, data: ApplicationCreate) -> Optional[Application]:
         try:
@@ -40,6 +47,10 @@ class ApplicationsHandler:
             company_name = data.companyName or data.startupName or ""
             description = data.description or data.startupDescription
             founder_contact = data.founderContact or (data.email if hasattr(data, "email") else None)
+            # Flag likely re-applications for reviewers; an index lookup, not a collection scan
+            duplicates = duplicate_index.candidates(
+                {"companyName": company_name, "founderContact": founder_contact, "description": description}
+            )
 
             new_app = Application(
                 _id=str(uuid.uuid4()),
@@ -60,11 +71,17 @@ class ApplicationsHandler:
                 keyInsight=data.keyInsight,
                 reminders=data.reminders,
                 dueDiligenceSummary=data.dueDiligenceSummary,
+                possibleDuplicates=[DuplicateCandidate(**candidate) for candidate in duplicates] or None,
                 status="pending",
                 createdAt=now,
                 updatedAt=now,
             )
-            await self.applications_collection.insert_one(new_app.model_dump(by_alias=True))
+            document = new_app.model_dump(by_alias=True)
+            async with write_session(self.client, self.applications_collection_name, new_app.id) as session:
+                await self.applications_collection.insert_one(document, session=session)
+            versions.bump(self.applications_collection_name, new_app.id)
+            # Visible to the next create right away; the CDC event repeats this
+            duplicate_index.upsert(new_app.id, document)
             return new_app
         except Exception as e:
             self.logger.error(f"Failed to create application: {e}", exc_info=True)
@@ -72,7 +89,8 @@ class ApplicationsHandler:
 
     async def get_application_by_id(self, application_id: str) -> Optional[Application]:
         try:
-            doc = await self.applications_collection.find_one({"_id": application_id})
+            async with causal_session(self.client, self.applications_collection_name, application_id) as session:
+                doc = await self.applications_reads.find_one({"_id": application_id}, session=session)
             if doc:
                 return Application.model_validate(doc)
             return None
@@ -80,10 +98,22 @@ class ApplicationsHandler:
             self.logger.error(f"Failed to fetch application: {e}", exc_info=True)
             return None
 
+    async def find_duplicates(self, application_id: str) -> Optional[List[DuplicateCandidate]]:
+        try:
+            async with causal_session(self.client, self.applications_collection_name, application_id) as session:
+                doc = await self.applications_reads.find_one({"_id": application_id}, PROJECTION, session=session)
+            if doc is None:
+                return None
+            return [DuplicateCandidate(**candidate) for candidate in duplicate_index.candidates(doc, exclude=application_id)]
+        except Exception as e:
+            self.logger.error(f"Failed to find duplicates of application {application_id}: {e}", exc_info=True)
+            return None
+
     async def get_all_applications(self) -> Optional[List[Application]]:
         try:
-            cursor = self.applications_collection.find({})
-            results = [Application.model_validate(doc) async for doc in cursor]
+            async with causal_session(self.client, self.applications_collection_name) as session:
+                cursor = self.applications_reads.find({}, session=session)
+                results = [Application.model_validate(doc) async for doc in cursor]
             return results
         except Exception as e:
             self.logger.error(f"Failed to fetch applications: {e}", exc_info=True)
@@ -91,8 +121,9 @@ class ApplicationsHandler:
 
     async def get_pending_applications(self) -> Optional[List[Application]]:
         try:
-            cursor = self.applications_collection.find({"status": "pending"})
-            results = [Application.model_validate(doc) async for doc in cursor]
+            async with causal_session(self.client, self.applications_collection_name) as session:
+                cursor = self.applications_reads.find({"status": "pending"}, session=session)
+                results = [Application.model_validate(doc) async for doc in cursor]
             return results
         except Exception as e:
             self.logger.error(f"Failed to fetch pending applications: {e}", exc_info=True)
@@ -104,11 +135,14 @@ class ApplicationsHandler:
             if not payload:
                 return await self.get_application_by_id(application_id)
             payload["updatedAt"] = datetime.datetime.now(datetime.timezone.utc)
-            updated = await self.applications_collection.find_one_and_update(
-                {"_id": application_id},
-                {"$set": payload},
-                return_document=ReturnDocument.AFTER,
-            )
+            async with write_session(self.client, self.applications_collection_name, application_id) as session:
+                updated = await self.applications_collection.find_one_and_update(
+                    {"_id": application_id},
+                    {"$set": payload},
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+            versions.bump(self.applications_collection_name, application_id)
             if updated:
                 return Application.model_validate(updated)
             return None
@@ -116,9 +150,43 @@ class ApplicationsHandler:
             self.logger.error(f"Failed to update application: {e}", exc_info=True)
             return None
 
+    async def application_exists(self, application_id: str) -> bool:
+        try:
+            async with causal_session(self.client, self.applications_collection_name, application_id) as session:
+                return await self.applications_reads.count_documents({"_id": application_id}, limit=1, session=session) == 1
+        except Exception as e:
+            self.logger.error(f"Failed to check application: {e}", exc_info=True)
+            return False
+
+    async def set_pitch_deck(self, application_id: str, ref: BlobRef) -> bool:
+        try:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            async with write_session(self.client, self.applications_collection_name, application_id) as session:
+                result = await self.applications_collection.update_one(
+                    {"_id": application_id},
+                    {"$set": {"pitchDeck": ref.model_dump(), "updatedAt": now}},
+                    session=session,
+                )
+            versions.bump(self.applications_collection_name, application_id)
+            return result.matched_count == 1
+        except Exception as e:
+            self.logger.error(f"Failed to set pitch deck: {e}", exc_info=True)
+            return False
+
+    async def get_pitch_deck(self, application_id: str) -> Optional[BlobRef]:
+        try:
+            async with causal_session(self.client, self.applications_collection_name, application_id) as session:
+                doc = await self.applications_reads.find_one({"_id": application_id}, projection={"pitchDeck": 1}, session=session)
+            return BlobRef.model_validate(doc["pitchDeck"]) if doc and doc.get("pitchDeck") else None
+        except Exception as e:
+            self.logger.error(f"Failed to fetch pitch deck: {e}", exc_info=True)
+            return None
+
     async def delete_application(self, application_id: str) -> bool:
         try:
-            result = await self.applications_collection.delete_one({"_id": application_id})
+            async with write_session(self.client, self.applications_collection_name, application_id) as session:
+                result = await self.applications_collection.delete_one({"_id": application_id}, session=session)
+            versions.bump(self.applications_collection_name, application_id)
             return result.deleted_count == 1
         except Exception as e:
             self.logger.error(f"Failed to delete application: {e}", exc_info=True)
@@ -136,6 +204,7 @@ class ApplicationsHandler:
             return_document=ReturnDocument.AFTER,
             session=session,
         )
+        versions.bump(self.applications_collection_name, application_id)
         if not updated:
             return None, None
 
@@ -150,6 +219,7 @@ class ApplicationsHandler:
             context=None,  # TODO: AI/Pathway pipeline enrichment hooks
         )
         await self.startups_collection.insert_one(startup_doc.model_dump(by_alias=True), session=session)
+        versions.bump(self.startups_collection_name, startup_doc.id)
         return accepted_application, startup_doc
 
     async def accept_application(self, application_id: str) -> Tuple[Optional[Application], Optional[Startup]]:
@@ -161,23 +231,33 @@ class ApplicationsHandler:
             async with await self.client.start_session() as session:
                 try:
                     async with session.start_transaction():
-                        return await self._accept_flow(application_id, session)
+                        accepted = await self._accept_flow(application_id, session)
                 except PyMongoError:
                     self.logger.warning("Transaction failed or unsupported; attempting non-transactional accept.", exc_info=True)
                     # Fallback: try without transaction; may be non-atomic in standalone deployments
-                    return await self._accept_flow(application_id, None)
+                    accepted = await self._accept_flow(application_id, session)
+                self._record_accept(session, application_id, accepted[1])
+                return accepted
         except Exception as e:
             self.logger.error(f"Failed to accept application: {e}", exc_info=True)
             return None, None
 
+    def _record_accept(self, session: ClientSession, application_id: str, startup: Optional[Startup]):
+        record_write(session, self.applications_collection_name, application_id)
+        if startup is not None:
+            record_write(session, self.startups_collection_name, startup.id)
+
     async def reject_application(self, application_id: str) -> Optional[Application]:
         try:
             now = datetime.datetime.now(datetime.timezone.utc)
-            updated = await self.applications_collection.find_one_and_update(
-                {"_id": application_id, "status": {"$ne": "rejected"}},
-                {"$set": {"status": "rejected", "updatedAt": now}},
-                return_document=ReturnDocument.AFTER,
-            )
+            async with write_session(self.client, self.applications_collection_name, application_id) as session:
+                updated = await self.applications_collection.find_one_and_update(
+                    {"_id": application_id, "status": {"$ne": "rejected"}},
+                    {"$set": {"status": "rejected", "updatedAt": now}},
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+            versions.bump(self.applications_collection_name, application_id)
             return Application.model_validate(updated) if updated else None
         except Exception as e:
             self.logger.error(f"Failed to reject application: {e}", exc_info=True)
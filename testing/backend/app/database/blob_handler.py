@@ -0,0 +1,97 @@
+import os
+import hashlib
+import logging
+from typing import AsyncIterator, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs import AsyncGridFSBucket
+from gridfs.asynchronous.grid_file import AsyncGridOut
+from gridfs.errors import NoFile
+from pymongo import AsyncMongoClient
+
+from ..models.blob_model import BlobRef
+
+
+class BlobTooLarge(Exception):
+    pass
+
+
+class BlobHandler:
+    """
+    GridFS blob storage for attachments such as pitch decks.
+    Uploads and downloads are streamed chunk by chunk and never hold a whole
+    file in memory. Files are content-addressed by SHA-256: uploading bytes
+    that are already stored returns a reference to the existing file.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("BlobHandler")
+        self.uri = os.getenv("MONGO_URI")
+        self.db_name = os.getenv("MONGO_DB_NAME")
+        self.bucket_name = os.getenv("BLOB_BUCKET_NAME", "blobs")
+        self.max_size = int(os.getenv("BLOB_MAX_BYTES", str(100 * 1024 * 1024)))
+
+        if self.uri is None or self.db_name is None:
+            self.logger.error("Configuration error: MONGO_URI or MONGO_DB_NAME not set.")
+            raise ValueError("Environment variables MONGO_URI and MONGO_DB_NAME must be set.")
+
+        self.client = AsyncMongoClient(self.uri)
+        self.db = self.client[self.db_name]
+        self.bucket = AsyncGridFSBucket(self.db, bucket_name=self.bucket_name)
+        self.files_collection = self.db[f"{self.bucket_name}.files"]
+        self.indexes_ready = False
+
+    async def put(self, chunks: AsyncIterator[bytes], name: str, content_type: Optional[str]) -> BlobRef:
+        """
+        Store a stream of bytes. Raises BlobTooLarge past BLOB_MAX_BYTES.
+        """
+        if not self.indexes_ready:
+            await self.files_collection.create_index("metadata.sha256")
+            self.indexes_ready = True
+
+        digest = hashlib.sha256()
+        size = 0
+        grid_in = self.bucket.open_upload_stream(name, metadata={"contentType": content_type})
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > self.max_size:
+                    raise BlobTooLarge(f"Blob exceeds {self.max_size} bytes")
+                digest.update(chunk)
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        await grid_in.close()
+        sha256 = digest.hexdigest()
+
+        existing = await self.files_collection.find_one(
+            {"metadata.sha256": sha256, "length": size}, projection={"_id": 1}
+        )
+        if existing is not None:
+            # Same content already stored; keep one copy
+            await self.bucket.delete(grid_in._id)
+            file_id = existing["_id"]
+        else:
+            file_id = grid_in._id
+            await self.files_collection.update_one({"_id": file_id}, {"$set": {"metadata.sha256": sha256}})
+        return BlobRef(id=str(file_id), name=name, contentType=content_type, size=size, sha256=sha256)
+
+    async def open(self, blob_id: str) -> Optional[AsyncGridOut]:
+        try:
+            return await self.bucket.open_download_stream(ObjectId(blob_id))
+        except (InvalidId, NoFile):
+            return None
+        except Exception as e:
+            self.logger.error(f"Failed to open blob {blob_id}: {e}", exc_info=True)
+            return None
+
+    @staticmethod
+    async def iter_chunks(grid_out: AsyncGridOut) -> AsyncIterator[bytes]:
+        # One GridFS chunk (255 KiB by default) at a time
+        while True:
+            chunk = await grid_out.readchunk()
+            if not chunk:
+                break
+            yield chunk
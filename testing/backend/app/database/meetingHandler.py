@@ -1,12 +1,17 @@
 import datetime
 import uuid
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
-from pymongo import AsyncMongoClient
+from pymongo import AsyncMongoClient, ReturnDocument
 import os
 import logging
 
-from ..models.meeting import MeetingCreationData, Meeting, MeetingMiniData
+from ..models.meeting import MeetingCreationData, Meeting, MeetingMiniData, TranscriptChunk
+from .versions import versions
+from .read_routing import causal_session, secondary_reads, write_session
+
+# $slice needs a count; large enough for any transcript
+MAX_TRANSCRIPT_SLICE = 2 ** 31 - 1
 
 class MeetingHandler:
     def __init__(self):
@@ -22,128 +27,216 @@ class MeetingHandler:
             self.logger.error("Configration error: MONGO_URI or MONGO_DB_NAME not set.")
             raise ValueError("Environment variables MONGO_URI and MONGO_DB_NAME must be set.")
 
-        self.logger.debug(f"MongoDB URI: {self.uri}, Database: {self.db_name}")
+        self.logger.debug("MongoDB URI: %s, Database: %s", self.uri, self.db_name)
 
         # Initialize MongoDB Client
         self.client = AsyncMongoClient(self.uri)
         self.db = self.client[self.db_name]
         self.meetings_collection = self.db[self.meeting_collection_name]
+        # Reads go to secondaries, leaving the primary to transcript writes
+        self.meetings_reads = secondary_reads(self.meetings_collection)
 
         self.logger.info("MongoDB client initialized successfully.")
-        self.logger.debug(f"Meeting collection: {self.meeting_collection_name}")
+        self.logger.debug("Meeting collection: %s", self.meeting_collection_name)
 
     async def create_meeting(self, meeting_data: MeetingCreationData) -> Optional[Meeting]:
         try:
-            self.logger.debug(f"Creating meeting with data: {meeting_data}")
+            self.logger.debug("Creating meeting with data: %s", meeting_data)
 
             # Generate new meeting object
             new_meeting = Meeting(
                 _id=str(uuid.uuid4()), # generate UUID
                 vc_id=meeting_data.vc_id,  # set VC ID
+                startup_id=meeting_data.startup_id,  # optional startup reference
                 start_time=datetime.datetime.now(datetime.timezone.utc),  # set start time (timezone-aware UTC)
                 transcript=[],  # start empty
                 status="in_progress"  # initial status
             )
 
             # Insert into MongoDB
-            await self.meetings_collection.insert_one(new_meeting.model_dump(by_alias=True))
-            self.logger.info(f"Meeting created with ID: {new_meeting.id} with VC ID: {new_meeting.vc_id}")
+            async with write_session(self.client, self.meeting_collection_name, new_meeting.id) as session:
+                await self.meetings_collection.insert_one(new_meeting.model_dump(by_alias=True), session=session)
+            versions.bump(self.meeting_collection_name, new_meeting.id)
+            self.logger.info("Meeting created with ID: %s with VC ID: %s", new_meeting.id, new_meeting.vc_id)
             return new_meeting
 
         except Exception as e:
-            self.logger.error(f"Failed to create meeting: {e}", exc_info=True)
+            self.logger.error("Failed to create meeting: %s", e, exc_info=True)
             return None
 
     async def get_meeting_by_id(self, meeting_id: str) -> Optional[Meeting]:
         try:
-            self.logger.debug(f"Fetching meeting with ID: {meeting_id}")
+            self.logger.debug("Fetching meeting with ID: %s", meeting_id)
 
             # Query MongoDB
-            meeting_data = await self.meetings_collection.find_one({"_id": meeting_id})
+            async with causal_session(self.client, self.meeting_collection_name, meeting_id) as session:
+                meeting_data = await self.meetings_reads.find_one({"_id": meeting_id}, session=session)
 
             if meeting_data:
-                self.logger.info(f"Meeting found with ID: {meeting_id}")
+                self.logger.debug("Meeting found with ID: %s", meeting_id)
                 return Meeting.model_validate(meeting_data)
             else:
-                self.logger.warning(f"No meeting found with ID: {meeting_id}")
+                self.logger.warning("No meeting found with ID: %s", meeting_id)
                 return None
 
         except Exception as e:
-            self.logger.error(f"Failed to fetch meeting: {e}", exc_info=True)
+            self.logger.error("Failed to fetch meeting: %s", e, exc_info=True)
+            return None
+
+    async def append_transcript(self, meeting_id: str, chunk: TranscriptChunk) -> Optional[int]:
+        """
+        Append a chunk to the meeting's transcript. Returns the chunk's 1-based
+        position, which is its sequence number for live subscribers.
+        """
+        try:
+            # Lists do not show transcripts; only reads of this meeting wait for the append
+            async with write_session(self.client, self.meeting_collection_name, meeting_id, listed=False) as session:
+                result = await self.meetings_collection.find_one_and_update(
+                    {"_id": meeting_id},
+                    {"$push": {"transcript": chunk.model_dump()}},
+                    projection={"_id": 0, "length": {"$size": "$transcript"}},
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+            versions.bump(self.meeting_collection_name, meeting_id)
+            if result is None:
+                self.logger.warning("No meeting found with ID: %s", meeting_id)
+                return None
+            return result["length"]
+
+        except Exception as e:
+            self.logger.error("Failed to append transcript to meeting %s: %s", meeting_id, e, exc_info=True)
+            return None
+
+    async def get_transcript_slice(self, meeting_id: str, after_seq: int = 0, limit: Optional[int] = None,
+                                   since: Optional[float] = None, until: Optional[float] = None
+                                   ) -> Optional[Tuple[int, List[Tuple[int, TranscriptChunk]]]]:
+        """
+        Transcript chunks after position `after_seq`, optionally only those with
+        since <= timestamp < until, at most `limit` of them. Returns the
+        transcript's length and (1-based position, chunk) pairs. The slice is
+        cut in MongoDB, so only the requested chunks are sent and validated.
+        """
+        try:
+            count = limit if limit is not None else MAX_TRANSCRIPT_SLICE
+            if since is None and until is None:
+                chunks = {"$slice": ["$transcript", after_seq, count]}
+            else:
+                conditions = []
+                if since is not None:
+                    conditions.append({"$gte": ["$$chunk.data.timestamp", since]})
+                if until is not None:
+                    conditions.append({"$lt": ["$$chunk.data.timestamp", until]})
+                # Pair each chunk with its position before filtering on time
+                indexed = {"$map": {
+                    "input": {"$range": [after_seq, {"$size": "$transcript"}]},
+                    "as": "i",
+                    "in": {"seq": {"$add": ["$$i", 1]}, "data": {"$arrayElemAt": ["$transcript", "$$i"]}},
+                }}
+                chunks = {"$slice": [{"$filter": {"input": indexed, "as": "chunk", "cond": {"$and": conditions}}}, count]}
+
+            async with causal_session(self.client, self.meeting_collection_name, meeting_id) as session:
+                cursor = await self.meetings_reads.aggregate([
+                    {"$match": {"_id": meeting_id}},
+                    {"$project": {"_id": 0, "total": {"$size": "$transcript"}, "chunks": chunks}},
+                ], session=session)
+                results = await cursor.to_list(1)
+            if not results:
+                self.logger.warning("No meeting found with ID: %s", meeting_id)
+                return None
+
+            result = results[0]
+            if since is None and until is None:
+                pairs = enumerate(result["chunks"], after_seq + 1)
+            else:
+                pairs = ((chunk["seq"], chunk["data"]) for chunk in result["chunks"])
+            return result["total"], [(seq, TranscriptChunk.model_validate(chunk)) for seq, chunk in pairs]
+
+        except Exception as e:
+            self.logger.error("Failed to fetch transcript of meeting %s: %s", meeting_id, e, exc_info=True)
             return None
 
     async def get_meetings_by_vc_id(self, vc_id: str) -> List[MeetingMiniData]:
         try:
-            self.logger.debug(f"Fetching meetings for VC ID: {vc_id}")
+            self.logger.debug("Fetching meetings for VC ID: %s", vc_id)
 
             # Query MongoDB for all meetings of this VC
-            meetings_cursor = self.meetings_collection.find(
-                {"vc_id": vc_id},
-                {"_id": 1, "vc_id": 1, "start_time": 1, "end_time": 1, "status": 1}  # only fetch minimal fields
-            )
-
             meetings = []
-            async for meeting_data in meetings_cursor:
-                meetings.append(MeetingMiniData.model_validate(meeting_data))
-
-            self.logger.info(f"Fetched {len(meetings)} meetings for VC ID: {vc_id}")
+            async with causal_session(self.client, self.meeting_collection_name) as session:
+                meetings_cursor = self.meetings_reads.find(
+                    {"vc_id": vc_id},
+                    {"_id": 1, "vc_id": 1, "startup_id": 1, "start_time": 1, "end_time": 1, "status": 1},  # only fetch minimal fields
+                    session=session,
+                )
+                async for meeting_data in meetings_cursor:
+                    meetings.append(MeetingMiniData.model_validate(meeting_data))
+
+            self.logger.debug("Fetched %s meetings for VC ID: %s", len(meetings), vc_id)
             return meetings
 
         except Exception as e:
-            self.logger.error(f"Failed to fetch meetings for VC ID {vc_id}: {e}", exc_info=True)
+            self.logger.error("Failed to fetch meetings for VC ID %s: %s", vc_id, e, exc_info=True)
             return []
 
     async def update_meeting(self, meeting: Meeting) -> bool:
         try:
-            self.logger.debug(f"Updating meeting with ID: {meeting.id}")
+            self.logger.debug("Updating meeting with ID: %s", meeting.id)
 
             # Update MongoDB
-            result = await self.meetings_collection.replace_one(
-                {"_id": meeting.id},
-                meeting.model_dump(by_alias=True)
-            )
+            async with write_session(self.client, self.meeting_collection_name, meeting.id) as session:
+                result = await self.meetings_collection.replace_one(
+                    {"_id": meeting.id},
+                    meeting.model_dump(by_alias=True),
+                    session=session,
+                )
+            versions.bump(self.meeting_collection_name, meeting.id)
             if result.modified_count == 1:
-                self.logger.info(f"Meeting updated with ID: {meeting.id}")
+                self.logger.info("Meeting updated with ID: %s", meeting.id)
                 return True
             else:
-                self.logger.warning(f"No meeting updated with ID: {meeting.id}")
+                self.logger.warning("No meeting updated with ID: %s", meeting.id)
                 return False
 
         except Exception as e:
-            self.logger.error(f"Failed to update meeting: {e}", exc_info=True)
+            self.logger.error("Failed to update meeting: %s", e, exc_info=True)
             return False
 
     async def delete_meeting(self, meeting: Meeting) -> bool:
         try:
-            self.logger.debug(f"Deleting meeting with ID: {meeting.id}")
+            self.logger.debug("Deleting meeting with ID: %s", meeting.id)
 
             # Delete from MongoDB
-            result = await self.meetings_collection.delete_one({"_id": meeting.id})
+            async with write_session(self.client, self.meeting_collection_name, meeting.id) as session:
+                result = await self.meetings_collection.delete_one({"_id": meeting.id}, session=session)
+            versions.bump(self.meeting_collection_name, meeting.id)
             if result.deleted_count == 1:
-                self.logger.info(f"Meeting deleted with ID: {meeting.id}")
+                self.logger.info("Meeting deleted with ID: %s", meeting.id)
                 return True
             else:
-                self.logger.warning(f"No meeting deleted with ID: {meeting.id}")
+                self.logger.warning("No meeting deleted with ID: %s", meeting.id)
                 return False
 
         except Exception as e:
-            self.logger.error(f"Failed to delete meeting: {e}", exc_info=True)
+            self.logger.error("Failed to delete meeting: %s", e, exc_info=True)
             return False
 
     async def get_all_meetings(self) -> List[MeetingMiniData]:
         try:
             self.logger.debug("Fetching all meetings base info.")
 
-            meetings_cursor = self.meetings_collection.find({}, {"_id": 1, "vc_id": 1, "start_time": 1, "end_time": 1, "status": 1})
             meetings = []
-            async for meeting_data in meetings_cursor:
-                meetings.append(MeetingMiniData.model_validate(meeting_data))
-
-            self.logger.info(f"Fetched {len(meetings)} meetings.")
+            async with causal_session(self.client, self.meeting_collection_name) as session:
+                meetings_cursor = self.meetings_reads.find(
+                    {}, {"_id": 1, "vc_id": 1, "startup_id": 1, "start_time": 1, "end_time": 1, "status": 1}, session=session
+                )
+                async for meeting_data in meetings_cursor:
+                    meetings.append(MeetingMiniData.model_validate(meeting_data))
+
+            self.logger.debug("Fetched %s meetings.", len(meetings))
             return meetings
 
         except Exception as e:
-            self.logger.error(f"Failed to fetch meetings: {e}", exc_info=True)
+            self.logger.error("Failed to fetch meetings: %s", e, exc_info=True)
             return []
 
 
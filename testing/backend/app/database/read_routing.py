@@ -0,0 +1,223 @@
+"""
+Routing of reads to replica-set secondaries without losing read-your-writes.
+
+Handlers send their list, search and report queries, and their point
+reads, through a collection view with MONGO_READ_PREFERENCE (default
+secondaryPreferred). Secondaries that lag the primary by more than
+MONGO_MAX_STALENESS_S are not selected. Writes, transactions and
+the change-stream and migration paths keep using the primary.
+
+Routed reads run in causally consistent sessions that wait, on the
+selected secondary, only for the writes they could otherwise miss:
+
+* This process's writes to the same document (a point read), or to the
+  same collection (a list). ETags come from this process's write counters
+  (see versions.py), so such a read must not return data older than a
+  write those counters already count. Writes that lists do not show, such
+  as transcript appends, only hold back reads of their own document.
+* What the calling client has seen. A response carries it in a signed
+  `x-causal-token` after the request's sessions moved it, and a client
+  sends it back on its next request, which may reach another process (see
+  CausalConsistencyMiddleware). A token only ever affects the reads of the
+  request that carries it.
+
+On a standalone server there are no positions and reads behave as before.
+"""
+import os
+import hmac
+import time
+import base64
+import hashlib
+import logging
+import contextvars
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, Optional
+
+import bson
+from bson import Timestamp
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+# Documents whose last write position is remembered; older writes have long replicated
+MAX_WRITTEN_DOCUMENTS = 10000
+# Tokens claiming a position further ahead of this process's clock are rejected
+MAX_TOKEN_SKEW_S = 60
+
+
+class CausalClock:
+    """The newest cluster time and operation time a session has reported."""
+
+    __slots__ = ("cluster_time", "operation_time")
+
+    def __init__(self, cluster_time: Optional[dict] = None, operation_time: Optional[Timestamp] = None):
+        self.cluster_time = cluster_time
+        self.operation_time = operation_time
+
+    def observe(self, session) -> bool:
+        """Advance to the session's times. Returns True if the clock moved."""
+        moved = False
+        cluster_time = session.cluster_time
+        if cluster_time is not None and (
+            self.cluster_time is None or cluster_time["clusterTime"] > self.cluster_time["clusterTime"]
+        ):
+            self.cluster_time = cluster_time
+            moved = True
+        operation_time = session.operation_time
+        if operation_time is not None and (self.operation_time is None or operation_time > self.operation_time):
+            self.operation_time = operation_time
+            moved = True
+        return moved
+
+    def apply(self, session):
+        if self.cluster_time is not None:
+            session.advance_cluster_time(self.cluster_time)
+        if self.operation_time is not None:
+            session.advance_operation_time(self.operation_time)
+
+
+class WriteClocks:
+    """
+    Positions of this process's own writes, per document and per
+    collection. Only sessions that no client token advanced are recorded,
+    so the clocks hold server-reported times only.
+    """
+
+    def __init__(self, max_documents: int = MAX_WRITTEN_DOCUMENTS):
+        self.max_documents = max_documents
+        self.documents: "OrderedDict[tuple, CausalClock]" = OrderedDict()
+        self.collections: Dict[str, CausalClock] = {}
+
+    def record(self, session, collection: str, doc_id: Optional[str] = None, listed: bool = True):
+        if doc_id is not None:
+            key = (collection, doc_id)
+            clock = self.documents.get(key)
+            if clock is None:
+                clock = self.documents[key] = CausalClock()
+                if len(self.documents) > self.max_documents:
+                    self.documents.popitem(last=False)
+            else:
+                self.documents.move_to_end(key)
+            clock.observe(session)
+        if listed:
+            self.collections.setdefault(collection, CausalClock()).observe(session)
+
+    def clocks(self, collection: str, doc_id: Optional[str] = None, related: Iterable[str] = ()) -> list:
+        """The clocks a read of one document, or of a list over `collection` and `related`, waits for."""
+        if doc_id is not None:
+            clock = self.documents.get((collection, doc_id))
+            return [clock] if clock is not None else []
+        return [self.collections[name] for name in (collection, *related) if name in self.collections]
+
+
+write_clocks = WriteClocks()
+# What the client of the current request has seen; set by CausalConsistencyMiddleware
+request_clock: contextvars.ContextVar[Optional[CausalClock]] = contextvars.ContextVar("request_clock", default=None)
+
+
+def read_preference():
+    mode = os.getenv("MONGO_READ_PREFERENCE", "secondaryPreferred")
+    preference = READ_PREFERENCES.get(mode)
+    if preference is None:
+        raise ValueError(f"MONGO_READ_PREFERENCE must be one of {', '.join(READ_PREFERENCES)}, not {mode!r}")
+    if preference is Primary:
+        return Primary()
+    # 0 means no limit; the server requires at least 90 seconds otherwise
+    max_staleness = int(os.getenv("MONGO_MAX_STALENESS_S", "90"))
+    return preference(max_staleness=max_staleness if max_staleness > 0 else -1)
+
+
+def secondary_reads(collection):
+    """A view of `collection` whose reads follow MONGO_READ_PREFERENCE. Use it inside causal_session()."""
+    return collection.with_options(read_preference=read_preference())
+
+
+def _token_key() -> Optional[bytes]:
+    # Shared by all API processes; without a key no tokens are issued or accepted
+    key = os.getenv("CAUSAL_TOKEN_KEY") or os.getenv("INTERNAL_API_KEY")
+    return hashlib.sha256(b"causal-token:" + key.encode()).digest() if key else None
+
+
+def encode_token(clock: CausalClock) -> Optional[str]:
+    key = _token_key()
+    if key is None or clock.operation_time is None:
+        return None
+    raw = bson.encode({"c": clock.cluster_time, "o": clock.operation_time, "t": int(time.time())})
+    signature = hmac.new(key, raw, hashlib.sha256).digest()[:16]
+    return f"{base64.urlsafe_b64encode(raw).decode().rstrip('=')}.{base64.urlsafe_b64encode(signature).decode().rstrip('=')}"
+
+
+def decode_token(token: str) -> Optional[CausalClock]:
+    """
+    The clock in a token from encode_token(), or None if it is malformed,
+    not signed with this deployment's key, or older than CAUSAL_TOKEN_TTL_S.
+    """
+    key = _token_key()
+    if key is None:
+        return None
+    try:
+        body, signature = token.split(".")
+        raw = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4))
+        expected = hmac.new(key, raw, hashlib.sha256).digest()[:16]
+        if not hmac.compare_digest(base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4)), expected):
+            return None
+        fields = bson.decode(raw)
+        now = time.time()
+        if not 0 <= now - fields["t"] <= float(os.getenv("CAUSAL_TOKEN_TTL_S", "300")):
+            return None
+        cluster_time, operation_time = fields.get("c"), fields.get("o")
+        if not isinstance(operation_time, Timestamp) or operation_time.time > now + MAX_TOKEN_SKEW_S:
+            return None
+        if cluster_time is not None and not isinstance(cluster_time.get("clusterTime"), Timestamp):
+            return None
+        return CausalClock(cluster_time, operation_time)
+    except Exception as e:
+        logger.debug("Ignoring malformed causal token: %s", e)
+        return None
+
+
+def record_write(session, collection: str, doc_id: Optional[str] = None, listed: bool = True):
+    """
+    Record the position of a session that wrote `doc_id` in `collection`,
+    e.g. one that ran a transaction. `listed=False` for writes that lists do
+    not show. The session must not have been advanced from a client token.
+    """
+    write_clocks.record(session, collection, doc_id, listed)
+    clock = request_clock.get()
+    if clock is not None:
+        clock.observe(session)
+
+
+@asynccontextmanager
+async def causal_session(client, collection: str, doc_id: Optional[str] = None, related: Iterable[str] = ()):
+    """
+    A causally consistent session for a routed read of one document
+    (`doc_id`) or of a list over `collection` (and the `related`
+    collections it joins). It starts after this process's writes to them
+    and after the request's client clock.
+    """
+    async with await client.start_session(causal_consistency=True) as session:
+        for clock in write_clocks.clocks(collection, doc_id, related):
+            clock.apply(session)
+        clock = request_clock.get()
+        if clock is not None:
+            clock.apply(session)
+        yield session
+        if clock is not None:
+            clock.observe(session)
+
+
+@asynccontextmanager
+async def write_session(client, collection: str, doc_id: Optional[str] = None, listed: bool = True):
+    """A causally consistent session for a write; its position is recorded when it ends."""
+    async with await client.start_session(causal_consistency=True) as session:
+        yield session
+        record_write(session, collection, doc_id, listed)
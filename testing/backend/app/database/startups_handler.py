@@ -6,7 +6,18 @@ from typing import Optional, List
 
 from pymongo import AsyncMongoClient, ReturnDocument
 
-from ..models.startup_model import Startup, StartupCreate, StartupUpdate
+from ..models.meeting import MeetingMiniData
+from ..models.startup_model import Startup, StartupCreate, StartupUpdate, StartupOverview, StartupOverviewApplication
+from .versions import versions
+from .read_routing import causal_session, secondary_reads, write_session
+
+
+# The overview's $lookup stages combine localField/foreignField with a pipeline
+OVERVIEW_MIN_SERVER_VERSION = (5, 0)
+
+
+def _projection(model) -> dict:
+    return {field: 1 for field in model.model_fields if field != "id"}
 
 
 class StartupsHandler:
@@ -15,6 +26,8 @@ class StartupsHandler:
         self.uri = os.getenv("MONGO_URI")
         self.db_name = os.getenv("MONGO_DB_NAME")
         self.startups_collection_name = os.getenv("STARTUPS_COLLECTION_NAME", "startups")
+        self.applications_collection_name = os.getenv("APPLICATIONS_COLLECTION_NAME", "applications")
+        self.meeting_collection_name = os.getenv("MEETING_COLLECTION_NAME", "meetings")
 
         if self.uri is None or self.db_name is None:
             self.logger.error("Configuration error: MONGO_URI or MONGO_DB_NAME not set.")
@@ -23,6 +36,10 @@ class StartupsHandler:
         self.client = AsyncMongoClient(self.uri)
         self.db = self.client[self.db_name]
         self.startups_collection = self.db[self.startups_collection_name]
+        self.meetings_collection = self.db[self.meeting_collection_name]
+        # Reads go to secondaries; writes stay on the primary
+        self.startups_reads = secondary_reads(self.startups_collection)
+        self.indexes_ready = False
 
     async def create_startup(self, data: StartupCreate) -> Optional[Startup]:
         try:
@@ -34,7 +51,9 @@ class StartupsHandler:
                 dateAccepted=data.dateAccepted if data.dateAccepted else now,
                 context=data.context,  # TODO: AI/Pathway pipeline enrichment
             )
-            await self.startups_collection.insert_one(new_startup.model_dump(by_alias=True))
+            async with write_session(self.client, self.startups_collection_name, new_startup.id) as session:
+                await self.startups_collection.insert_one(new_startup.model_dump(by_alias=True), session=session)
+            versions.bump(self.startups_collection_name, new_startup.id)
             return new_startup
         except Exception as e:
             self.logger.error(f"Failed to create startup: {e}", exc_info=True)
@@ -42,7 +61,8 @@ class StartupsHandler:
 
     async def get_startup_by_id(self, startup_id: str) -> Optional[Startup]:
         try:
-            doc = await self.startups_collection.find_one({"_id": startup_id})
+            async with causal_session(self.client, self.startups_collection_name, startup_id) as session:
+                doc = await self.startups_reads.find_one({"_id": startup_id}, session=session)
             return Startup.model_validate(doc) if doc else None
         except Exception as e:
             self.logger.error(f"Failed to fetch startup: {e}", exc_info=True)
@@ -50,8 +70,9 @@ class StartupsHandler:
 
     async def get_all_startups(self) -> Optional[List[Startup]]:
         try:
-            cursor = self.startups_collection.find({})
-            return [Startup.model_validate(doc) async for doc in cursor]
+            async with causal_session(self.client, self.startups_collection_name) as session:
+                cursor = self.startups_reads.find({}, session=session)
+                return [Startup.model_validate(doc) async for doc in cursor]
         except Exception as e:
             self.logger.error(f"Failed to fetch startups: {e}", exc_info=True)
             return None
@@ -61,11 +82,14 @@ class StartupsHandler:
             payload = {k: v for k, v in data.model_dump(exclude_unset=True).items()}
             if not payload:
                 return await self.get_startup_by_id(startup_id)
-            updated = await self.startups_collection.find_one_and_update(
-                {"_id": startup_id},
-                {"$set": payload},
-                return_document=ReturnDocument.AFTER,
-            )
+            async with write_session(self.client, self.startups_collection_name, startup_id) as session:
+                updated = await self.startups_collection.find_one_and_update(
+                    {"_id": startup_id},
+                    {"$set": payload},
+                    return_document=ReturnDocument.AFTER,
+                    session=session,
+                )
+            versions.bump(self.startups_collection_name, startup_id)
             return Startup.model_validate(updated) if updated else None
         except Exception as e:
             self.logger.error(f"Failed to update startup: {e}", exc_info=True)
@@ -73,10 +97,68 @@ class StartupsHandler:
 
     async def delete_startup(self, startup_id: str) -> bool:
         try:
-            result = await self.startups_collection.delete_one({"_id": startup_id})
+            async with write_session(self.client, self.startups_collection_name, startup_id) as session:
+                result = await self.startups_collection.delete_one({"_id": startup_id}, session=session)
+            versions.bump(self.startups_collection_name, startup_id)
             return result.deleted_count == 1
         except Exception as e:
             self.logger.error(f"Failed to delete startup: {e}", exc_info=True)
             return False
 
+    def _overview_pipeline(self, startup_ids: List[str]) -> list:
+        """
+        One aggregation for the startup page: startup, its application and its
+        meetings, projected to the fields the views render (no transcripts).
+        """
+        return [
+            {"$match": {"_id": {"$in": startup_ids}}},
+            {"$project": {"applicationId": 1, "companyName": 1, "dateAccepted": 1}},
+            {"$lookup": {
+                "from": self.applications_collection_name,
+                "localField": "applicationId",
+                "foreignField": "_id",
+                "pipeline": [{"$project": _projection(StartupOverviewApplication)}],
+                "as": "application",
+            }},
+            {"$lookup": {
+                "from": self.meeting_collection_name,
+                "localField": "_id",
+                "foreignField": "startup_id",
+                "pipeline": [
+                    {"$project": _projection(MeetingMiniData)},
+                    {"$sort": {"start_time": -1}},
+                ],
+                "as": "meetings",
+            }},
+            {"$set": {"application": {"$first": "$application"}}},
+        ]
+
+    async def get_startup_overviews(self, startup_ids: List[str]) -> Optional[List[StartupOverview]]:
+        try:
+            if not self.indexes_ready:
+                # The meetings $lookup probes meetings by startup_id
+                await self.meetings_collection.create_index("startup_id")
+                self.indexes_ready = True
+            # The $lookup stages read applications and meetings on the same secondary
+            async with causal_session(self.client, self.startups_collection_name, related=(self.applications_collection_name, self.meeting_collection_name)) as session:
+                cursor = await self.startups_reads.aggregate(self._overview_pipeline(startup_ids), session=session)
+                by_id = {doc["_id"]: StartupOverview.model_validate(doc) async for doc in cursor}
+            return [by_id[startup_id] for startup_id in startup_ids if startup_id in by_id]
+        except Exception as e:
+            self.logger.error(f"Failed to fetch startup overviews: {e}", exc_info=True)
+            return None
 
+    async def check_server_version(self) -> bool:
+        """Log an error if the server is too old for the overview aggregation."""
+        try:
+            info = await self.client.server_info()
+        except Exception as e:
+            self.logger.warning(f"Could not read the MongoDB server version: {e}")
+            return False
+        if tuple(info.get("versionArray", [0, 0])[:2]) < OVERVIEW_MIN_SERVER_VERSION:
+            self.logger.error(
+                "MongoDB %s is older than %s; startup overview requests will fail",
+                info.get("version"), ".".join(map(str, OVERVIEW_MIN_SERVER_VERSION)),
+            )
+            return False
+        return True
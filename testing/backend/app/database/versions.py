@@ -0,0 +1,89 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Optional
+
+from pydantic import BaseModel
+
+# Entity ETags remembered for answering If-None-Match without a query
+MAX_REMEMBERED_ETAGS = 10000
+
+
+class CollectionVersions:
+    """
+    In-process change counters per collection, bumped by the handlers after
+    every write and by CDC events (writes made by other processes), plus the
+    last ETag served per document.
+    List ETags are built from the counters and document ETags are remembered
+    until the document changes, so a matching If-None-Match is answered
+    without querying MongoDB. The counters restart with the process; the
+    epoch in list ETags makes tags from a previous process never match.
+    Both are only trusted while this process's own CDC reader is following
+    every change (set_following); otherwise there are no list ETags and no
+    remembered document ETags, and every request reads MongoDB.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counters = defaultdict(int)
+        self.etags: "OrderedDict[tuple, str]" = OrderedDict()
+        self.following = False
+        self.lock = threading.Lock()  # CDC events arrive on the consumer thread
+
+    def set_following(self, following: bool):
+        with self.lock:
+            if following == self.following:
+                return
+            self.following = following
+            if not following:
+                # Changes may be missed from here on: forget what was served
+                self.epoch = uuid.uuid4().hex[:8]
+                self.etags.clear()
+
+    def version(self, collection: str) -> int:
+        return self.counters[collection]
+
+    def bump(self, collection: str, doc_id: Optional[str] = None):
+        with self.lock:
+            self.counters[collection] += 1
+            if doc_id is not None:
+                self.etags.pop((collection, doc_id), None)
+
+    def list_etag(self, *collections: str) -> Optional[str]:
+        if not self.following:
+            return None
+        counters = ".".join(str(self.counters[collection]) for collection in collections)
+        return f'"{"+".join(collections)}-{self.epoch}-{counters}"'
+
+    def cached_etag(self, collection: str, doc_id: str) -> Optional[str]:
+        if not self.following:
+            return None
+        return self.etags.get((collection, doc_id))
+
+    def remember(self, collection: str, doc_id: str, etag: str, version: int) -> str:
+        """
+        Remember a document's ETag, unless the collection changed since
+        `version` was read (the document may already be stale).
+        """
+        with self.lock:
+            if self.following and self.counters[collection] == version:
+                self.etags[(collection, doc_id)] = etag
+                self.etags.move_to_end((collection, doc_id))
+                if len(self.etags) > MAX_REMEMBERED_ETAGS:
+                    self.etags.popitem(last=False)
+        return etag
+
+
+def entity_etag(collection: str, document: BaseModel) -> str:
+    """
+    Strong ETag of a document: from `updatedAt` when the model has one,
+    otherwise from its serialized content.
+    """
+    updated_at = getattr(document, "updatedAt", None)
+    basis = updated_at.isoformat() if updated_at is not None else document.model_dump_json(by_alias=True)
+    digest = hashlib.sha1(f"{collection}/{document.id}/{basis}".encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+versions = CollectionVersions()
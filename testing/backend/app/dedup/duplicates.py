@@ -0,0 +1,291 @@
+"""
+In-memory near-duplicate index for applications.
+
+Each application is reduced to a set of shingles: character 3-grams of
+its normalized company name, word 3-grams of its description and its
+normalized contact as a single token. A MinHash signature of DEDUP_NUM_PERM
+values estimates the Jaccard similarity of two such sets. Signatures are
+split into bands for locality-sensitive hashing; applications that share a
+band are candidates, and candidates whose estimated similarity reaches
+DEDUP_THRESHOLD, or that share the exact contact, are reported. A lookup
+touches a few dozen hash buckets instead of every application.
+
+The index is rebuilt from MongoDB when the API starts and kept current by
+the CDC consumer.
+"""
+import os
+import re
+import time
+import zlib
+import asyncio
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..pathway_pipeline.events import apply_update, updated_fields
+
+# Fields the index reads; legacy names are used when the canonical one is empty
+FIELDS = {
+    "name": ("companyName", "startupName"),
+    "contact": ("founderContact", "email"),
+    "description": ("description", "startupDescription"),
+}
+PROJECTION = {field: 1 for names in FIELDS.values() for field in names}
+
+# Legal-form words that do not tell companies apart
+NAME_STOPWORDS = {"inc", "llc", "ltd", "limited", "gmbh", "corp", "corporation", "co", "company", "the", "sa", "ag", "bv"}
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+REBUILD_BATCH = 1000
+
+
+def normalize(text: Optional[str]) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode().lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def normalize_contact(contact: Optional[str]) -> Optional[str]:
+    contact = str(contact or "").strip().lower()
+    if "@" in contact:
+        return contact
+    digits = re.sub(r"\D", "", contact)
+    # Phone numbers compare on their last 9 digits, ignoring country prefixes
+    return digits[-9:] if len(digits) >= 7 else None
+
+
+def _field(document: dict, key: str) -> Optional[str]:
+    for name in FIELDS[key]:
+        if document.get(name):
+            return document[name]
+    return None
+
+
+def shingles(document: dict) -> Tuple[Set[str], Optional[str]]:
+    tokens = set()
+    name = " ".join(word for word in normalize(_field(document, "name")).split() if word not in NAME_STOPWORDS)
+    if name:
+        padded = f" {name} "
+        tokens.update("n:" + padded[i:i + 3] for i in range(max(1, len(padded) - 2)))
+    words = normalize(_field(document, "description")).split()
+    tokens.update("d:" + " ".join(words[i:i + 3]) for i in range(max(0, len(words) - 2)))
+    if 0 < len(words) < 3:
+        tokens.add("d:" + " ".join(words))
+    contact = normalize_contact(_field(document, "contact"))
+    if contact:
+        tokens.add("c:" + contact)
+    return tokens, contact
+
+
+class DuplicateIndex:
+    """
+    MinHash signatures and LSH buckets of all applications, guarded by one
+    lock: the CDC consumer thread writes while request handlers query.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("DuplicateIndex")
+        self.configured = False
+        self.lock = threading.Lock()
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.documents: Dict[str, dict] = {}  # indexed fields per id, for CDC patches
+        self.contacts: Dict[str, Set[str]] = {}
+        self.contact_of: Dict[str, str] = {}
+        self.buckets: List[Dict[bytes, Set[str]]] = []
+        # Ids changed by CDC while a rebuild runs; the rebuild must not overwrite them
+        self.touched: Optional[Set[str]] = None
+
+    def configure(self):
+        # Read on first use, after load_config has run; the CDC thread and the event loop may race here
+        with self.lock:
+            if not self.configured:
+                self._configure()
+
+    def _configure(self):
+        self.enabled = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+        self.threshold = float(os.getenv("DEDUP_THRESHOLD", "0.5"))
+        self.num_perm = int(os.getenv("DEDUP_NUM_PERM", "128"))
+        self.bands, self.rows = self._bands(self.num_perm, self.threshold)
+        generator = np.random.RandomState(1)
+        self.a = generator.randint(1, int(MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, int(MERSENNE_PRIME), size=self.num_perm, dtype=np.uint64)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.configured = True
+
+    @staticmethod
+    def _bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+        # The banding whose 50% detection point, (1/b)^(1/r), is closest below the threshold
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            if (1 / bands) ** (1 / rows) <= threshold:
+                best = (bands, rows)
+        return best
+
+    def signature(self, tokens: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        # Overflow wraps around, which is fine for hashing
+        with np.errstate(over="ignore"):
+            permuted = (hashes[:, None] * self.a + self.b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _remove(self, doc_id: str):
+        # Caller holds the lock
+        signature = self.signatures.pop(doc_id, None)
+        if signature is not None:
+            for band, key in zip(self.buckets, self._band_keys(signature)):
+                ids = band.get(key)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del band[key]
+        contact = self.contact_of.pop(doc_id, None)
+        if contact is not None:
+            self.contacts[contact].discard(doc_id)
+            if not self.contacts[contact]:
+                del self.contacts[contact]
+        self.documents.pop(doc_id, None)
+
+    def _add(self, doc_id: str, fields: dict, signature: np.ndarray, contact: Optional[str]):
+        # Caller holds the lock
+        self._remove(doc_id)
+        self.signatures[doc_id] = signature
+        self.documents[doc_id] = fields
+        for band, key in zip(self.buckets, self._band_keys(signature)):
+            band.setdefault(key, set()).add(doc_id)
+        if contact is not None:
+            self.contacts.setdefault(contact, set()).add(doc_id)
+            self.contact_of[doc_id] = contact
+
+    def upsert(self, doc_id: str, document: dict):
+        if not self.configured:
+            self.configure()
+        if not self.enabled:
+            return
+        fields = {field: document.get(field) for field in PROJECTION if document.get(field) is not None}
+        tokens, contact = shingles(fields)
+        signature = self.signature(tokens)
+        with self.lock:
+            if self.touched is not None:
+                self.touched.add(doc_id)
+            self._add(doc_id, fields, signature, contact)
+
+    def apply_event(self, doc_id: str, op: str, document: Optional[dict], update: Optional[dict]):
+        """Keep the index current from a CDC change event on the applications collection."""
+        if not self.configured:
+            self.configure()
+        if not self.enabled:
+            return
+        if op == "d":
+            with self.lock:
+                if self.touched is not None:
+                    self.touched.add(doc_id)
+                self._remove(doc_id)
+            return
+        if document is None:
+            # Update events may only carry the changed fields
+            update = update or {}
+            changed = updated_fields(update)
+            if changed is not None:
+                if not changed & PROJECTION.keys():
+                    return
+                with self.lock:
+                    previous = self.documents.get(doc_id)
+                if previous is None:
+                    return  # not indexed yet; a running rebuild reads the whole document
+            else:
+                previous = {}
+            document = apply_update(previous, update)
+        self.upsert(doc_id, document)
+
+    def candidates(self, document: dict, exclude: Optional[str] = None, limit: int = 10) -> List[dict]:
+        """
+        Indexed applications similar to `document`, most similar first:
+        [{"applicationId", "score", "sameContact"}].
+        """
+        if not self.configured:
+            self.configure()
+        if not self.enabled:
+            return []
+        tokens, contact = shingles(document)
+        if not tokens:
+            return []
+        signature = self.signature(tokens)
+        with self.lock:
+            found = set()
+            for band, key in zip(self.buckets, self._band_keys(signature)):
+                ids = band.get(key)
+                if ids:
+                    found.update(ids)
+            same_contact = set(self.contacts.get(contact, ())) if contact else set()
+            found |= same_contact
+            found.discard(exclude)
+            scored = [
+                (float(np.mean(self.signatures[doc_id] == signature)), doc_id)
+                for doc_id in found if doc_id in self.signatures
+            ]
+        results = [
+            {"applicationId": doc_id, "score": round(score, 3), "sameContact": doc_id in same_contact}
+            for score, doc_id in scored
+            if score >= self.threshold or doc_id in same_contact
+        ]
+        results.sort(key=lambda c: (-c["score"], c["applicationId"]))
+        return results[:limit]
+
+    async def rebuild(self, collection):
+        """Index every application in `collection`. Signatures are computed off the event loop."""
+        if not self.configured:
+            self.configure()
+        if not self.enabled:
+            return
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            self.touched = set()
+        count = 0
+        try:
+            batch = []
+            async for document in collection.find({}, PROJECTION):
+                batch.append(document)
+                if len(batch) >= REBUILD_BATCH:
+                    count += await loop.run_in_executor(None, self._add_batch, batch)
+                    batch = []
+            if batch:
+                count += await loop.run_in_executor(None, self._add_batch, batch)
+        except Exception as e:
+            # CDC events keep what was indexed current; the rest is indexed on the next start
+            self.logger.error(f"Duplicate index rebuild failed after {count} applications: {e}", exc_info=True)
+            return
+        finally:
+            with self.lock:
+                self.touched = None
+        self.logger.info(
+            "Indexed %s applications for duplicate detection in %.1fs (%s bands x %s rows)",
+            count, time.monotonic() - started, self.bands, self.rows,
+        )
+
+    def _add_batch(self, documents: List[dict]) -> int:
+        prepared = []
+        for document in documents:
+            fields = {field: document.get(field) for field in PROJECTION if document.get(field) is not None}
+            tokens, contact = shingles(fields)
+            prepared.append((str(document["_id"]), fields, self.signature(tokens), contact))
+        with self.lock:
+            for doc_id, fields, signature, contact in prepared:
+                # A CDC event since the rebuild started is newer than this read
+                if doc_id not in self.touched:
+                    self._add(doc_id, fields, signature, contact)
+        return len(prepared)
+
+
+duplicate_index = DuplicateIndex()
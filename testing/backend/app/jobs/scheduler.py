@@ -0,0 +1,307 @@
+import os
+import uuid
+import random
+import socket
+import asyncio
+import inspect
+import logging
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from pymongo import ASCENDING, AsyncMongoClient, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 50
+PRIORITY_BULK = 100
+
+MAX_RETRY_DELAY_S = 3600
+# Finished job records are kept this long for inspection
+RETENTION_S = 7 * 24 * 3600
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying the job cannot succeed."""
+
+
+class JobType:
+    __slots__ = ("handler", "concurrency", "max_attempts", "retry_delay_s", "running")
+
+    def __init__(self, handler: Callable, concurrency: int, max_attempts: int, retry_delay_s: float):
+        self.handler = handler  # def handler(job) runs in a worker thread; async def on the loop
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_delay_s = retry_delay_s
+        self.running = 0
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+class JobScheduler:
+    """
+    In-process background job scheduler with job records persisted in MongoDB.
+    Jobs are claimed from JOBS_COLLECTION_NAME in priority order under a lease
+    that is renewed while they run, so a job whose process died is picked up
+    again once its lease expires. Each job type has its own concurrency limit,
+    at most one queued job exists per (type, entity id), and failed jobs are
+    retried with exponential backoff.
+    Blocking handlers run on the scheduler's own threads, never on the event
+    loop or the default executor, and bulk-priority jobs cannot take the last
+    JOBS_RESERVED_SLOTS running slots.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("JobScheduler")
+        self.types: Dict[str, JobType] = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.started = False
+
+    def register(self, job_type: str, handler: Callable, concurrency: int = 1,
+                 max_attempts: int = 5, retry_delay_s: float = 10.0):
+        """
+        Register the handler for a job type. JOBS_<TYPE>_CONCURRENCY overrides
+        the concurrency when the scheduler starts.
+        """
+        self.types[job_type] = JobType(handler, concurrency, max_attempts, retry_delay_s)
+
+    async def start(self):
+        # Configuration is read here, after load_config has run
+        uri = os.getenv("MONGO_URI")
+        db_name = os.getenv("MONGO_DB_NAME")
+        if uri is None or db_name is None:
+            self.logger.error("Configuration error: MONGO_URI or MONGO_DB_NAME not set.")
+            raise ValueError("Environment variables MONGO_URI and MONGO_DB_NAME must be set.")
+        collection_name = os.getenv("JOBS_COLLECTION_NAME", "jobs")
+        self.max_running = int(os.getenv("JOBS_MAX_RUNNING", "8"))
+        self.reserved_slots = int(os.getenv("JOBS_RESERVED_SLOTS", "1"))
+        self.poll_interval = float(os.getenv("JOBS_POLL_INTERVAL_S", "5"))
+        self.lease = float(os.getenv("JOBS_LEASE_S", "300"))
+        for name, spec in self.types.items():
+            spec.concurrency = int(os.getenv(f"JOBS_{name.upper()}_CONCURRENCY", str(spec.concurrency)))
+
+        self.client = AsyncMongoClient(uri)
+        self.collection = self.client[db_name][collection_name]
+        # Enqueues from consumer threads use a synchronous client and stay off the loop
+        self.sync_client = MongoClient(uri)
+        self.sync_collection = self.sync_client[db_name][collection_name]
+        await self._create_indexes()
+
+        self.executor = ThreadPoolExecutor(max_workers=self.max_running, thread_name_prefix="job")
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.dispatcher = asyncio.create_task(self._dispatch())
+        self.heartbeat = asyncio.create_task(self._renew_leases())
+        self.started = True
+        self.logger.info("Job scheduler started as %s with types %s", self.owner, sorted(self.types))
+
+    async def stop(self, grace_s: float = 10.0):
+        if not self.started:
+            return
+        self.started = False
+        self.dispatcher.cancel()
+        self.heartbeat.cancel()
+        if self.tasks:
+            await asyncio.wait(list(self.tasks.values()), timeout=grace_s)
+        for job_id, task in list(self.tasks.items()):
+            task.cancel()
+            # Hand the job back now rather than after its lease expires
+            await self._requeue(job_id, _now(), None)
+        self.executor.shutdown(wait=False)
+        await self.client.close()
+        self.sync_client.close()
+        self.logger.info("Job scheduler stopped")
+
+    async def _create_indexes(self):
+        await self.collection.create_index([("status", ASCENDING), ("priority", ASCENDING), ("runAt", ASCENDING)])
+        # Dedup: one queued job per entity; a running one may have a queued successor
+        await self.collection.create_index(
+            [("type", ASCENDING), ("entityId", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"status": "queued"},
+            name="queued_entity_unique",
+        )
+        await self.collection.create_index("finishedAt", expireAfterSeconds=RETENTION_S)
+
+    def _enqueue_update(self, job_type: str, entity_id: str, payload: Any, priority: int, delay_s: float):
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type: {job_type}")
+        now = _now()
+        query = {"type": job_type, "entityId": entity_id, "status": "queued"}
+        update = {
+            # A queued job keeps the most urgent priority and the latest payload
+            "$min": {"priority": priority},
+            "$set": {"payload": payload, "updatedAt": now},
+            "$setOnInsert": {
+                "_id": str(uuid.uuid4()),
+                "attempts": 0,
+                "maxAttempts": self.types[job_type].max_attempts,
+                "runAt": now + datetime.timedelta(seconds=delay_s),
+                "createdAt": now,
+            },
+        }
+        return query, update
+
+    async def enqueue(self, job_type: str, entity_id: str, payload: Any = None,
+                      priority: int = PRIORITY_NORMAL, delay_s: float = 0) -> bool:
+        """
+        Queue a job, merging it with an already queued job for the same entity.
+        """
+        query, update = self._enqueue_update(job_type, entity_id, payload, priority, delay_s)
+        try:
+            await self.collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            pass  # a concurrent enqueue created it
+        except PyMongoError as e:
+            self.logger.error(f"Failed to enqueue {job_type} for {entity_id}: {e}", exc_info=True)
+            return False
+        self.wakeup.set()
+        return True
+
+    def enqueue_threadsafe(self, job_type: str, entity_id: str, payload: Any = None,
+                           priority: int = PRIORITY_NORMAL, delay_s: float = 0) -> bool:
+        """
+        enqueue() for worker threads such as the CDC consumer. The write is made
+        on the calling thread; the event loop is only woken up.
+        """
+        if not self.started:
+            self.logger.warning(f"Job scheduler not running; dropped {job_type} for {entity_id}")
+            return False
+        query, update = self._enqueue_update(job_type, entity_id, payload, priority, delay_s)
+        try:
+            self.sync_collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            pass
+        except PyMongoError as e:
+            self.logger.error(f"Failed to enqueue {job_type} for {entity_id}: {e}", exc_info=True)
+            return False
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+        return True
+
+    async def _claim(self) -> Optional[dict]:
+        ready = [name for name, spec in self.types.items() if spec.running < spec.concurrency]
+        if not ready or len(self.tasks) >= self.max_running:
+            return None
+        now = _now()
+        query = {
+            "type": {"$in": ready},
+            "$or": [
+                {"status": "queued", "runAt": {"$lte": now}},
+                # Lease expired: the process that claimed it is gone
+                {"status": "running", "leaseUntil": {"$lt": now}},
+            ],
+        }
+        if len(self.tasks) >= self.max_running - self.reserved_slots:
+            query["priority"] = {"$lt": PRIORITY_BULK}
+        return await self.collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": "running",
+                    "owner": self.owner,
+                    "startedAt": now,
+                    "leaseUntil": now + datetime.timedelta(seconds=self.lease),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", ASCENDING), ("runAt", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _dispatch(self):
+        while True:
+            try:
+                job = await self._claim()
+            except PyMongoError as e:
+                self.logger.error(f"Failed to claim a job: {e}", exc_info=True)
+                job = None
+                await asyncio.sleep(self.poll_interval)
+            if job is not None:
+                self.types[job["type"]].running += 1
+                self.tasks[job["_id"]] = asyncio.create_task(self._run(job))
+                continue
+            # Sleep until a job is enqueued, a slot frees up or a retry comes due
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job: dict):
+        spec = self.types[job["type"]]
+        try:
+            if job["attempts"] > job["maxAttempts"]:
+                # Its process kept dying mid-job
+                await self._finish(job["_id"], "failed", "Exceeded attempts")
+                return
+            if inspect.iscoroutinefunction(spec.handler):
+                await spec.handler(job)
+            else:
+                await self.loop.run_in_executor(self.executor, spec.handler, job)
+            await self._finish(job["_id"], "done", None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if isinstance(e, PermanentJobError) or job["attempts"] >= job["maxAttempts"]:
+                self.logger.error(f"Job {job['type']} {job['entityId']} failed: {e}", exc_info=True)
+                await self._finish(job["_id"], "failed", str(e))
+            else:
+                delay = min(spec.retry_delay_s * 2 ** (job["attempts"] - 1), MAX_RETRY_DELAY_S)
+                delay *= random.uniform(0.5, 1.5)
+                self.logger.warning(
+                    f"Job {job['type']} {job['entityId']} attempt {job['attempts']} failed: {e}; "
+                    f"retrying in {delay:.0f}s"
+                )
+                await self._requeue(job["_id"], _now() + datetime.timedelta(seconds=delay), str(e))
+        finally:
+            spec.running -= 1
+            self.tasks.pop(job["_id"], None)
+            self.wakeup.set()
+
+    async def _finish(self, job_id: str, status: str, error: Optional[str]):
+        try:
+            await self.collection.update_one(
+                {"_id": job_id, "owner": self.owner},
+                {"$set": {"status": status, "error": error, "finishedAt": _now()}, "$unset": {"leaseUntil": ""}},
+            )
+        except PyMongoError as e:
+            self.logger.error(f"Failed to record job {job_id} as {status}: {e}", exc_info=True)
+
+    async def _requeue(self, job_id: str, run_at: datetime.datetime, error: Optional[str]):
+        try:
+            await self.collection.update_one(
+                {"_id": job_id, "owner": self.owner},
+                {"$set": {"status": "queued", "runAt": run_at, "error": error}, "$unset": {"owner": "", "leaseUntil": ""}},
+            )
+        except DuplicateKeyError:
+            # A newer job for the same entity is already queued and supersedes this one
+            await self._finish(job_id, "superseded", error)
+        except PyMongoError as e:
+            self.logger.error(f"Failed to requeue job {job_id}: {e}", exc_info=True)
+
+    async def _renew_leases(self):
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            if not self.tasks:
+                continue
+            try:
+                await self.collection.update_many(
+                    {"_id": {"$in": list(self.tasks)}, "owner": self.owner},
+                    {"$set": {"leaseUntil": _now() + datetime.timedelta(seconds=self.lease)}},
+                )
+            except PyMongoError as e:
+                self.logger.error(f"Failed to renew job leases: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "owner": self.owner,
+            "running": {name: spec.running for name, spec in self.types.items()},
+        }
+
+
+scheduler = JobScheduler()
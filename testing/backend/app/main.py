@@ -1,36 +1,65 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 import uvicorn
 import asyncio
 
-from .pathway_pipeline.consumer import start_consumer
+from .jobs.scheduler import PRIORITY_BULK, scheduler
+from .pathway_pipeline.consumer import start_cache_consumer, start_consumer
 from .config.configloader import load_config
 load_config(".env")
 
 from .routers.meetingRouter import router as meeting_router
-from .routers.applications_router import router as applications_router
-from .routers.startups_router import router as startups_router
+from .routers.applications_router import router as applications_router, applications_handler
+from .routers.startups_router import router as startups_router, startups_handler
+from .routers.admission_router import router as admission_router
+from .middleware.admission import AdmissionMiddleware
+from .middleware.profiling import ProfilingMiddleware
+from .middleware.causal import CausalConsistencyMiddleware
+from .migrations.runner import MIGRATION_JOB
+from .migrations import application_fields  # noqa: F401  registers the migration
+from .dedup.duplicates import duplicate_index
 import os
 import logging
 
 logger = logging.getLogger(__name__)
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await scheduler.start()
+    # Queued once across workers; a finished migration returns immediately
+    for name in filter(None, os.getenv("MIGRATIONS_ON_STARTUP", "").split(",")):
+        await scheduler.enqueue(MIGRATION_JOB, name.strip(), priority=PRIORITY_BULK)
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, start_consumer)
+    loop.run_in_executor(None, start_cache_consumer)
+    # Creates check for duplicates against whatever is indexed while this runs
+    rebuild = asyncio.create_task(duplicate_index.rebuild(applications_handler.applications_reads))
+    # Startup overviews need MongoDB 5.0+; reported in the log, without holding up startup
+    version_check = asyncio.create_task(startups_handler.check_server_version())
+    yield
+    rebuild.cancel()
+    version_check.cancel()
+    await scheduler.stop()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(meeting_router, tags=["Meetings"])
 app.include_router(applications_router, tags=["Applications"])
 app.include_router(startups_router, tags=["Startups"])
+app.include_router(admission_router, tags=["Admission"])
+app.add_middleware(CausalConsistencyMiddleware)
+# Added last runs first: admission wait is not part of a profile
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AdmissionMiddleware)
 
 @app.get("/")
 async def read_root():
     logger.debug("Root endpoint hit.")
     return {"Hello": "World"}
 
-@app.on_event("startup")
-async def start_pathway_consumer():
-    loop = asyncio.get_event_loop()
-    loop.run_in_executor(None, start_consumer)
-
 if __name__ == "__main__":
     host = "0.0.0.0"
     port = 8000
-    logger.info(f"Starting FastAPI server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port)
+    logger.info("Starting FastAPI server on %s:%s", host, port)
+    # log_config=None keeps uvicorn's loggers on the queued handlers from setup_logger
+    uvicorn.run(app, host=host, port=port, log_config=None)
 
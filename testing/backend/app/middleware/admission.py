@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Dict, List, Optional, Tuple
+
+# Route classes, most urgent first. A waiter with a lower priority number is
+# admitted before queued waiters with higher ones.
+POINT = "point"  # single-document reads: /fetch/{id}, /{id}/overview
+WRITE = "write"  # create, update, delete, accept/reject
+LIST = "list"  # collection scans: /fetch/all, /fetch/pending, /fetch_by_vc, batched overviews
+TRANSFER = "transfer"  # pitch deck uploads and downloads
+
+PRIORITIES = {POINT: 0, WRITE: 1, LIST: 2, TRANSFER: 2}
+DEFAULT_LIMITS = {POINT: 32, WRITE: 16, LIST: 4, TRANSFER: 4}
+# Longest a request may wait for admission before it is refused
+DEFAULT_BUDGETS_MS = {POINT: 250, WRITE: 1000, LIST: 2000, TRANSFER: 2000}
+
+LIST_PATH = re.compile(r"/fetch/(all|pending)$|/fetch_by_vc/[^/]+$|^/api/startups/overview$")
+
+# Smoothing factor of the per-limiter service time average
+EWMA_ALPHA = 0.1
+
+
+def classify(method: str, path: str) -> str:
+    if path.endswith("/pitch-deck"):
+        return TRANSFER
+    if method not in ("GET", "HEAD"):
+        return WRITE
+    if LIST_PATH.search(path):
+        return LIST
+    return POINT
+
+
+class Limiter:
+    """
+    A concurrency limit with a priority-ordered wait queue. It keeps a moving
+    average of how long a slot is held so callers can estimate the wait
+    before they queue.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self.seq = itertools.count()
+        self.service_s = 0.05
+
+    def estimated_wait(self, priority: int) -> float:
+        ahead = sum(1 for p, _, f in self.waiters if p <= priority and not f.done())
+        excess = self.in_use + ahead + 1 - self.limit
+        if excess <= 0:
+            return 0.0
+        # Slots free up `limit` at a time, one service time apart
+        return math.ceil(excess / self.limit) * self.service_s
+
+    async def acquire(self, priority: int, timeout: float) -> bool:
+        if self.in_use < self.limit and not self.waiters:
+            self.in_use += 1
+            return True
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = (priority, next(self.seq), future)
+        heapq.heappush(self.waiters, entry)
+        timer = loop.call_later(timeout, lambda: future.done() or future.set_result(False))
+        try:
+            granted = await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and future.result():
+                # Client went away after the slot was passed to it
+                self.release(None)
+            else:
+                self._discard(entry)
+            raise
+        finally:
+            timer.cancel()
+        if not granted:
+            self._discard(entry)
+        return granted
+
+    def _discard(self, entry):
+        if entry in self.waiters:
+            self.waiters.remove(entry)
+            heapq.heapify(self.waiters)
+
+    def release(self, held_s: Optional[float]):
+        if held_s:
+            self.service_s += EWMA_ALPHA * (held_s - self.service_s)
+        self.in_use -= 1
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                # Pass the slot straight to the next waiter
+                self.in_use += 1
+                future.set_result(True)
+                break
+
+    @property
+    def idle(self) -> bool:
+        return self.in_use == 0 and not self.waiters
+
+
+class AdmissionController:
+    """
+    Admission control for the HTTP API.
+    A request takes a slot from its x-api-key's limiter, its route class's
+    limiter and the process-wide limiter, in that order. When the estimated
+    wait for those slots exceeds the class budget, or the wait runs past it,
+    the request is refused at once with 503 and Retry-After instead of
+    queueing behind a saturated MongoDB pool. Point reads are admitted ahead
+    of lists and transfers, and WebSockets are never queued.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("AdmissionController")
+        self.enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+        self.global_limiter = Limiter(int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64")))
+        self.key_limit = int(os.getenv("ADMISSION_KEY_CONCURRENCY", "48"))
+        self.key_limiters: Dict[str, Limiter] = {}
+        self.class_limiters: Dict[str, Limiter] = {}
+        self.budgets: Dict[str, float] = {}
+        self.stats_by_class: Dict[str, dict] = {}
+        for route_class, limit in DEFAULT_LIMITS.items():
+            name = route_class.upper()
+            self.class_limiters[route_class] = Limiter(int(os.getenv(f"ADMISSION_{name}_CONCURRENCY", str(limit))))
+            budget_ms = float(os.getenv(f"ADMISSION_{name}_BUDGET_MS", str(DEFAULT_BUDGETS_MS[route_class])))
+            self.budgets[route_class] = budget_ms / 1000
+            self.stats_by_class[route_class] = {
+                "admitted": 0, "shed": 0, "timedOut": 0, "queued": 0, "queueSeconds": 0.0, "maxQueueSeconds": 0.0,
+            }
+        self.streams = 0  # WebSockets and event streams, which bypass admission
+
+    def _limiters(self, route_class: str, api_key: str) -> List[Limiter]:
+        key_limiter = self.key_limiters.get(api_key)
+        if key_limiter is None:
+            key_limiter = self.key_limiters[api_key] = Limiter(self.key_limit)
+        return [key_limiter, self.class_limiters[route_class], self.global_limiter]
+
+    async def admit(self, route_class: str, api_key: str) -> Tuple[Optional[List[Limiter]], float]:
+        """
+        Acquire the request's slots. Returns (limiters, queue seconds) on
+        success, or (None, retry-after seconds) when the request is shed.
+        """
+        priority = PRIORITIES[route_class]
+        budget = self.budgets[route_class]
+        stats = self.stats_by_class[route_class]
+        limiters = self._limiters(route_class, api_key)
+
+        estimate = max(limiter.estimated_wait(priority) for limiter in limiters)
+        if estimate > budget:
+            stats["shed"] += 1
+            self.logger.debug("Shed %s request: estimated wait %.3fs > %.3fs", route_class, estimate, budget)
+            self._forget_key(api_key)
+            return None, estimate
+
+        started = time.monotonic()
+        acquired = []
+        for limiter in limiters:
+            remaining = budget - (time.monotonic() - started)
+            try:
+                ok = remaining > 0 and await limiter.acquire(priority, remaining)
+            except asyncio.CancelledError:
+                self.release(acquired, None, api_key)
+                raise
+            if not ok:
+                self.release(acquired, None, api_key)
+                stats["timedOut"] += 1
+                return None, budget
+            acquired.append(limiter)
+
+        queued_s = time.monotonic() - started
+        stats["admitted"] += 1
+        if queued_s > 0.001:
+            stats["queued"] += 1
+        stats["queueSeconds"] += queued_s
+        stats["maxQueueSeconds"] = max(stats["maxQueueSeconds"], queued_s)
+        return limiters, queued_s
+
+    def release(self, limiters: List[Limiter], held_s: Optional[float], api_key: str):
+        for limiter in reversed(limiters):
+            limiter.release(held_s)
+        self._forget_key(api_key)
+
+    def _forget_key(self, api_key: str):
+        # Keys are untrusted input; keep limiters only while they are in use
+        limiter = self.key_limiters.get(api_key)
+        if limiter is not None and limiter.idle:
+            del self.key_limiters[api_key]
+
+    def stats(self) -> dict:
+        classes = {}
+        for route_class, stats in self.stats_by_class.items():
+            limiter = self.class_limiters[route_class]
+            classes[route_class] = {
+                **stats,
+                "queueSeconds": round(stats["queueSeconds"], 3),
+                "maxQueueSeconds": round(stats["maxQueueSeconds"], 3),
+                "avgQueueMs": round(1000 * stats["queueSeconds"] / stats["admitted"], 2) if stats["admitted"] else 0.0,
+                "limit": limiter.limit,
+                "inFlight": limiter.in_use,
+                "waiting": len(limiter.waiters),
+                "serviceMs": round(1000 * limiter.service_s, 2),
+                "budgetMs": round(1000 * self.budgets[route_class]),
+            }
+        return {
+            "enabled": self.enabled,
+            "inFlight": self.global_limiter.in_use,
+            "limit": self.global_limiter.limit,
+            "waiting": len(self.global_limiter.waiters),
+            "streams": self.streams,
+            "activeKeys": len(self.key_limiters),
+            "classes": classes,
+        }
+
+
+admission = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying `admission` to /api/ HTTP requests. Admitted
+    responses carry the time spent waiting as `Server-Timing: queue;dur=<ms>`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "websocket" or scope.get("path", "").endswith("/stream"):
+            # Long-lived connections are counted, not queued: they would hold a slot for their lifetime
+            admission.streams += 1
+            try:
+                return await self.app(scope, receive, send)
+            finally:
+                admission.streams -= 1
+        if scope["type"] != "http" or not admission.enabled or not scope["path"].startswith("/api/"):
+            return await self.app(scope, receive, send)
+
+        route_class = classify(scope["method"], scope["path"])
+        api_key = ""
+        for name, value in scope["headers"]:
+            if name == b"x-api-key":
+                api_key = value.decode("latin-1")
+                break
+
+        limiters, waited_s = await admission.admit(route_class, api_key)
+        if limiters is None:
+            await self._reject(send, waited_s)
+            return
+
+        timing = f"queue;dur={waited_s * 1000:.1f}".encode()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing)]
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            admission.release(limiters, time.monotonic() - started, api_key)
+
+    @staticmethod
+    async def _reject(send, retry_after_s: float):
+        body = json.dumps({"detail": "Server busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after_s))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,43 @@
+from ..database.read_routing import CausalClock, decode_token, encode_token, request_clock
+
+HEADER = b"x-causal-token"
+
+
+class CausalConsistencyMiddleware:
+    """
+    ASGI middleware that carries a client's causal position between
+    requests. A request may send the `x-causal-token` of an earlier
+    response; its reads then see everything that response had seen, on any
+    API process. A response carries an updated token when the request's
+    database sessions moved the position, e.g. after a write. Tokens are
+    signed, expire after CAUSAL_TOKEN_TTL_S, and only affect the request
+    that sends them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        clock = None
+        for name, value in scope["headers"]:
+            if name == HEADER:
+                clock = decode_token(value.decode("latin-1"))
+                break
+        clock = clock or CausalClock()
+        received = clock.operation_time
+
+        async def send_with_token(message):
+            if message["type"] == "http.response.start" and clock.operation_time != received:
+                token = encode_token(clock)
+                if token is not None:
+                    message["headers"] = list(message.get("headers", [])) + [(HEADER, token.encode())]
+            await send(message)
+
+        reset = request_clock.set(clock)
+        try:
+            await self.app(scope, receive, send_with_token)
+        finally:
+            request_clock.reset(reset)
@@ -0,0 +1,45 @@
+from urllib.parse import parse_qs
+
+from ..profiling.sampler import profiler
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles a request or WebSocket connection when it
+    carries `x-profile: <PROFILE_KEY>` (`?profile=<PROFILE_KEY>` for
+    WebSockets, which cannot set headers), or when it is picked by
+    PROFILE_SAMPLE_RATE. Profiled HTTP responses name their profile in
+    `x-profile-id`. With neither setting configured it only forwards.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or not profiler.enabled or not self._wanted(scope):
+            return await self.app(scope, receive, send)
+
+        label = f"{scope.get('method', 'WS')} {scope['path']}"
+        session = profiler.start_task(label)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", session.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id if scope["type"] == "http" else send)
+        finally:
+            profiler.stop(session)
+
+    @staticmethod
+    def _wanted(scope) -> bool:
+        if profiler.key:
+            if scope["type"] == "http":
+                for name, value in scope["headers"]:
+                    if name == b"x-profile":
+                        return value.decode("latin-1") == profiler.key
+            elif b"profile=" in scope.get("query_string", b""):
+                query = parse_qs(scope["query_string"].decode("latin-1"))
+                return query.get("profile", [None])[0] == profiler.key
+        return profiler.sampled()
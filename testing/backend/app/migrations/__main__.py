@@ -0,0 +1,33 @@
+"""
+Run a migration in the foreground, e.g. from a one-off container:
+
+    python -m app.migrations application_fields [--restart]
+"""
+import argparse
+import asyncio
+
+from ..config.configloader import load_config
+from . import application_fields  # noqa: F401  registers the migration
+from .runner import MigrationRunner, migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a document migration")
+    parser.add_argument("name", choices=sorted(migrations))
+    parser.add_argument("--restart", action="store_true", help="Start over from the first document")
+    args = parser.parse_args()
+    load_config(".env")
+
+    async def run():
+        runner = MigrationRunner(migrations[args.name])
+        try:
+            checkpoint = await runner.run(restart=args.restart)
+            print(f"{args.name}: {checkpoint['status']} {MigrationRunner.counts(checkpoint)}")
+        finally:
+            await runner.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
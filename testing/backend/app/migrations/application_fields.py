@@ -0,0 +1,56 @@
+"""
+Rewrites applications stored with the legacy ApplicationCreate fields
+(startupName, startupDescription, email, pitchDeckUrl) or without the
+timestamps and status into the canonical Application schema.
+"""
+import datetime
+from typing import List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ..models.application_model import Application
+from .runner import InvalidDocument, Migration, register
+
+# legacy field -> canonical field, the same mapping create_application applies
+LEGACY_FIELDS = {
+    "startupName": "companyName",
+    "startupDescription": "description",
+    "email": "founderContact",
+    "pitchDeckUrl": "pitchDeckPath",
+}
+
+
+def canonicalize(doc: dict) -> Optional[Tuple[dict, List[str]]]:
+    to_set = {}
+    for legacy, field in LEGACY_FIELDS.items():
+        if doc.get(legacy) and not doc.get(field):
+            to_set[field] = doc[legacy]
+    to_unset = [legacy for legacy in LEGACY_FIELDS if legacy in doc]
+    if doc.get("companyName") is None and "companyName" not in to_set:
+        to_set["companyName"] = ""
+
+    # Oldest known timestamp stands in for missing ones
+    known = [doc[field] for field in ("dateAdded", "createdAt", "updatedAt") if isinstance(doc.get(field), datetime.datetime)]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    created = min(known) if known else now
+    for field in ("dateAdded", "createdAt"):
+        if doc.get(field) is None:
+            to_set[field] = created
+    if doc.get("status") is None:
+        to_set["status"] = "pending"
+
+    if not to_set and not to_unset:
+        return None
+    # The document's content changes, so its updatedAt (and ETag) does too
+    to_set["updatedAt"] = now
+
+    migrated = {key: value for key, value in doc.items() if key not in to_unset}
+    migrated.update(to_set)
+    try:
+        Application.model_validate(migrated)
+    except ValidationError as e:
+        raise InvalidDocument(f"{e.error_count()} validation errors: {e.errors()[0]['loc']} {e.errors()[0]['msg']}")
+    return to_set, to_unset
+
+
+register(Migration("application_fields", "APPLICATIONS_COLLECTION_NAME", "applications", canonicalize))
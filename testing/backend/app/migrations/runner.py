@@ -0,0 +1,256 @@
+"""
+Online, resumable document migrations.
+
+A migration walks one collection in `_id` order, a batch at a time. Its
+transform returns the fields to $set and $unset for each document (None
+when the document is already canonical) and the batch is written with one
+unordered bulk_write. Each update only applies if the fields it touches
+still hold the values that were read, so a foreground write that lands in
+between wins; such documents are re-read and transformed again.
+
+Progress is checkpointed to MIGRATIONS_COLLECTION_NAME after every batch,
+under a lease, so an interrupted run resumes where it stopped and two
+runners never work on the same migration.
+
+Throttling follows the latency of the migration's own reads and writes: the
+batch grows while batches finish within MIGRATION_TARGET_MS and is halved
+when they don't, and after each batch the runner pauses so that it keeps
+MongoDB busy at most MIGRATION_DUTY_CYCLE of the time. Transforms run in the
+default executor, so a batch of validation never holds up the event loop.
+
+    python -m app.migrations application_fields [--restart]
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, AsyncMongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..jobs.scheduler import PermanentJobError, scheduler
+from ..database.versions import versions
+
+MIGRATION_JOB = "migration"
+# Re-reads of documents changed concurrently by foreground writes, per batch
+MAX_CONFLICT_RETRIES = 3
+
+# doc -> ({field: value} to $set, [fields] to $unset), or None if nothing changes
+Transform = Callable[[dict], Optional[Tuple[dict, List[str]]]]
+
+
+class InvalidDocument(Exception):
+    """The document cannot be brought into the canonical shape; it is counted and left as is."""
+
+
+class MigrationBusy(Exception):
+    """Another runner holds the migration's lease."""
+
+
+class Migration:
+    __slots__ = ("name", "collection_env", "default_collection", "transform")
+
+    def __init__(self, name: str, collection_env: str, default_collection: str, transform: Transform):
+        self.name = name
+        self.collection_env = collection_env
+        self.default_collection = default_collection
+        self.transform = transform
+
+
+migrations: Dict[str, Migration] = {}
+
+
+def register(migration: Migration):
+    migrations[migration.name] = migration
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _guard(doc: dict, fields) -> dict:
+    # Match only while every field the update touches still has the value that was read
+    query = {"_id": doc["_id"]}
+    for field in fields:
+        query[field] = doc[field] if field in doc else {"$exists": False}
+    return query
+
+
+class MigrationRunner:
+    def __init__(self, migration: Migration):
+        self.logger = logging.getLogger("MigrationRunner")
+        self.migration = migration
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        uri = os.getenv("MONGO_URI")
+        db_name = os.getenv("MONGO_DB_NAME")
+        if uri is None or db_name is None:
+            self.logger.error("Configuration error: MONGO_URI or MONGO_DB_NAME not set.")
+            raise ValueError("Environment variables MONGO_URI and MONGO_DB_NAME must be set.")
+        self.collection_name = os.getenv(migration.collection_env, migration.default_collection)
+        self.batch_size = int(os.getenv("MIGRATION_BATCH_SIZE", "100"))
+        self.min_batch = int(os.getenv("MIGRATION_MIN_BATCH", "10"))
+        self.max_batch = int(os.getenv("MIGRATION_MAX_BATCH", "1000"))
+        self.target_s = float(os.getenv("MIGRATION_TARGET_MS", "100")) / 1000
+        self.duty_cycle = min(1.0, max(0.01, float(os.getenv("MIGRATION_DUTY_CYCLE", "0.25"))))
+        self.lease = float(os.getenv("MIGRATION_LEASE_S", "120"))
+
+        self.client = AsyncMongoClient(uri)
+        db = self.client[db_name]
+        self.collection = db[self.collection_name]
+        self.checkpoints = db[os.getenv("MIGRATIONS_COLLECTION_NAME", "migrations")]
+
+    async def _claim(self, restart: bool) -> dict:
+        now = _now()
+        update = {
+            "$set": {"owner": self.owner, "leaseUntil": now + datetime.timedelta(seconds=self.lease)},
+            "$setOnInsert": {"collection": self.collection_name, "startedAt": now},
+        }
+        fresh = {"status": "running", "lastId": None, "scanned": 0, "updated": 0, "conflicts": 0, "invalid": 0}
+        update["$set" if restart else "$setOnInsert"].update(fresh)
+        try:
+            return await self.checkpoints.find_one_and_update(
+                {"_id": self.migration.name, "leaseUntil": {"$lt": now}},
+                update,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # The checkpoint exists and its lease has not expired
+            raise MigrationBusy(f"Migration {self.migration.name} is running elsewhere")
+
+    async def _release(self):
+        await self.checkpoints.update_one(
+            {"_id": self.migration.name, "owner": self.owner},
+            {"$set": {"leaseUntil": _now()}, "$unset": {"owner": ""}},
+        )
+
+    async def run(self, restart: bool = False) -> dict:
+        """Run the migration to the end of the collection; returns the final checkpoint."""
+        checkpoint = await self._claim(restart)
+        try:
+            if checkpoint["status"] == "done":
+                self.logger.info("Migration %s already done", self.migration.name)
+                return checkpoint
+            self.logger.info(
+                "Migration %s on %s starting after _id %s",
+                self.migration.name, self.collection_name, checkpoint["lastId"],
+            )
+            last_id = checkpoint["lastId"]
+            while True:
+                started = time.monotonic()
+                query = {} if last_id is None else {"_id": {"$gt": last_id}}
+                docs = await self.collection.find(query).sort("_id", ASCENDING).limit(self.batch_size).to_list()
+                if not docs:
+                    checkpoint = await self._save({"status": "done", "finishedAt": _now()}, {})
+                    self.logger.info("Migration %s done: %s", self.migration.name, self.counts(checkpoint))
+                    return checkpoint
+
+                updated, conflicts, invalid = await self._migrate_batch(docs)
+                last_id = docs[-1]["_id"]
+                elapsed = time.monotonic() - started
+                checkpoint = await self._save(
+                    {"lastId": last_id, "batchSize": self.batch_size, "lastBatchMs": round(elapsed * 1000, 1)},
+                    {"scanned": len(docs), "updated": updated, "conflicts": conflicts, "invalid": invalid},
+                )
+                self._adapt(elapsed)
+                self.logger.debug(
+                    "Migration %s: %s docs in %.0f ms, next batch %s",
+                    self.migration.name, len(docs), elapsed * 1000, self.batch_size,
+                )
+                # Leave MongoDB to foreground traffic for the rest of the cycle
+                await asyncio.sleep(elapsed * (1 - self.duty_cycle) / self.duty_cycle)
+        finally:
+            await self._release()
+
+    async def _migrate_batch(self, docs: List[dict]) -> Tuple[int, int, int]:
+        loop = asyncio.get_running_loop()
+        updated = conflicts = 0
+        invalid = set()
+        for attempt in range(MAX_CONFLICT_RETRIES + 1):
+            # Validating a batch is CPU work; keep it off the loop that serves requests
+            ops, changed = await loop.run_in_executor(None, self._transform_batch, docs, invalid)
+            if not ops:
+                break
+            result = await self.collection.bulk_write(ops, ordered=False)
+            updated += result.modified_count
+            for doc_id in changed:
+                versions.bump(self.collection_name, doc_id)
+            missed = len(ops) - result.matched_count
+            if not missed:
+                break
+            conflicts += missed
+            if attempt == MAX_CONFLICT_RETRIES:
+                self.logger.warning("Migration %s gave up on %s contended documents", self.migration.name, missed)
+                break
+            # Some documents changed under us: re-read them; the ones already migrated transform to None
+            docs = await self.collection.find({"_id": {"$in": changed}}).to_list()
+        return updated, conflicts, len(invalid)
+
+    def _transform_batch(self, docs: List[dict], invalid: set) -> Tuple[List[UpdateOne], list]:
+        ops, changed = [], []
+        for doc in docs:
+            try:
+                change = self.migration.transform(doc)
+            except InvalidDocument as e:
+                if doc["_id"] not in invalid:
+                    invalid.add(doc["_id"])
+                    self.logger.warning("Migration %s skipped %s: %s", self.migration.name, doc["_id"], e)
+                continue
+            if change is None:
+                continue
+            to_set, to_unset = change
+            update = {}
+            if to_set:
+                update["$set"] = to_set
+            if to_unset:
+                update["$unset"] = {field: "" for field in to_unset}
+            ops.append(UpdateOne(_guard(doc, list(to_set) + to_unset), update))
+            changed.append(doc["_id"])
+        return ops, changed
+
+    def _adapt(self, elapsed: float) -> int:
+        # AIMD on the batch size, driven by how long the batch took
+        if elapsed <= self.target_s:
+            self.batch_size = min(self.max_batch, self.batch_size + self.min_batch)
+        else:
+            self.batch_size = max(self.min_batch, self.batch_size // 2)
+        return self.batch_size
+
+    async def _save(self, fields: dict, counts: dict) -> dict:
+        fields = {**fields, "updatedAt": _now(), "leaseUntil": _now() + datetime.timedelta(seconds=self.lease)}
+        checkpoint = await self.checkpoints.find_one_and_update(
+            {"_id": self.migration.name, "owner": self.owner},
+            {"$set": fields, "$inc": counts},
+            return_document=ReturnDocument.AFTER,
+        )
+        if checkpoint is None:
+            raise MigrationBusy(f"Lost the lease on migration {self.migration.name}")
+        return checkpoint
+
+    @staticmethod
+    def counts(checkpoint: dict) -> dict:
+        return {key: checkpoint.get(key, 0) for key in ("scanned", "updated", "conflicts", "invalid")}
+
+    async def close(self):
+        await self.client.close()
+
+
+async def run_migration_job(job: dict):
+    migration = migrations.get(job["entityId"])
+    if migration is None:
+        raise PermanentJobError(f"Unknown migration: {job['entityId']}")
+    runner = MigrationRunner(migration)
+    try:
+        await runner.run(restart=bool((job.get("payload") or {}).get("restart")))
+    finally:
+        await runner.close()
+
+
+# A migration runs as one long job; MigrationBusy is retried until the other runner's lease lapses
+scheduler.register(MIGRATION_JOB, run_migration_job, concurrency=1, retry_delay_s=60)
+
@@ -2,6 +2,14 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, Literal, Dict, Any, List, Union
 from datetime import datetime
 
+from .blob_model import BlobRef
+
+
+class DuplicateCandidate(BaseModel):
+    applicationId: str
+    score: float  # estimated Jaccard similarity of name, description and contact shingles
+    sameContact: bool = False
+
 
 # applications → full CRM & due-diligence storage
 class Application(BaseModel):
@@ -21,10 +29,12 @@ class Application(BaseModel):
     dateAdded: datetime
     source: Optional[str] = None
     description: Optional[str] = None
-    pitchDeckPath: Optional[str] = None  # local file path; not binary
+    pitchDeckPath: Optional[str] = None  # legacy local file path; new uploads go to pitchDeck
+    pitchDeck: Optional[BlobRef] = None  # uploaded deck in blob storage (reference only)
     keyInsight: Optional[str] = None
     reminders: Optional[Union[List[str], str]] = None
     dueDiligenceSummary: Optional[Dict[str, Any]] = None  # TODO: AI pipeline to populate structured categories
+    possibleDuplicates: Optional[List[DuplicateCandidate]] = None  # similar applications found at creation
 
     # Workflow
     status: Literal["pending", "accepted", "rejected"] = "pending"
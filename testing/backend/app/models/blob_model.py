@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+# Reference to a file in blob storage; documents embed this, never the bytes
+class BlobRef(BaseModel):
+    id: str  # GridFS file id
+    name: str
+    contentType: Optional[str] = None
+    size: int
+    sha256: str
@@ -4,7 +4,8 @@ from datetime import datetime
 
 
 class TranscriptChunk(BaseModel):
-    timestamp: float  # seconds since epoch
+    timestamp: float  # seconds since epoch; the client's capture time with the meeting.v1 protocol
+    seq: Optional[int] = None  # audio frame sequence number (meeting.v1)
     speaker: Optional[str] = None
     text: str
 
@@ -12,6 +13,7 @@ class TranscriptChunk(BaseModel):
 class Meeting(BaseModel):
     id: str = Field(alias="_id")
     vc_id: str
+    startup_id: Optional[str] = None  # reference to startups._id, if the meeting is about a startup
     start_time: datetime
     end_time: Optional[datetime] = None
     status: str = "in_progress"  # in_progress | completed | canceled
@@ -28,10 +30,12 @@ class Meeting(BaseModel):
 
 class MeetingCreationData(BaseModel):
     vc_id: str
+    startup_id: Optional[str] = None
 
 class MeetingMiniData(BaseModel):
     id: str = Field(alias="_id")
     vc_id: str
+    startup_id: Optional[str] = None
     start_time: datetime
     end_time: Optional[datetime] = None
     status: str = "in_progress"  # in_progress | completed | canceled
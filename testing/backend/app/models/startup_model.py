@@ -1,7 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 
+from .meeting import MeetingMiniData
+
 
 # startups → only accepted applications, minimal doc
 class Startup(BaseModel):
@@ -30,3 +32,35 @@ class StartupUpdate(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+# Startup page: the startup with the application fields and meetings the views render
+class StartupOverviewApplication(BaseModel):
+    id: str = Field(alias="_id")
+    status: Optional[str] = None
+    industry: Optional[str] = None
+    location: Optional[str] = None
+    stage: Optional[str] = None
+    roundType: Optional[str] = None
+    amountRaising: Optional[Union[str, float, int]] = None
+    valuation: Optional[Union[str, float, int]] = None
+    founderName: Optional[str] = None
+    dealLeadVCId: Optional[str] = None
+    description: Optional[str] = None
+    keyInsight: Optional[str] = None
+
+    class Config:
+        validate_by_name = True
+
+
+class StartupOverview(BaseModel):
+    id: str = Field(alias="_id")
+    applicationId: str
+    companyName: str
+    dateAccepted: datetime
+    application: Optional[StartupOverviewApplication] = None
+    meetings: List[MeetingMiniData] = []
+
+    class Config:
+        validate_by_name = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat(),
+        }
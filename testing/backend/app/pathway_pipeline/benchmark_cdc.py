@@ -0,0 +1,105 @@
+"""
+Change-to-handler latency benchmark for the CDC sources.
+
+Inserts marked documents into the applications collection at a fixed rate
+while the Kafka/Debezium source and the MongoDB change stream source read
+concurrently, and reports the delay from insert to the event reaching the
+handler for each. The marked documents are deleted afterwards. Needs the
+running stack (MongoDB replica set, and Kafka + Connect with the connector
+registered for the kafka path).
+
+    python -m app.pathway_pipeline.benchmark_cdc --docs 500 --rate 50
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+import uuid
+
+from pymongo import MongoClient
+
+from ..config.configloader import load_config
+from .sources import ChangeStreamCdcSource, KafkaCdcSource
+
+MARKER = "cdc-bench-"
+
+
+def collect(source, sent: dict, lags: list, expected: int):
+    for event in source.events():
+        # Only the inserts made by this run
+        if event.op != "c" or event.key not in sent:
+            continue
+        lags.append(time.time() - sent[event.key])
+        if len(lags) >= expected:
+            source.close()
+
+
+def report(name: str, lags: list, expected: int):
+    if not lags:
+        print(f"{name:>7}: no events received")
+        return
+    lags = sorted(lags)
+    print(
+        f"{name:>7}: {len(lags)}/{expected} events  "
+        f"p50 {statistics.median(lags) * 1000:.1f} ms  "
+        f"p95 {lags[int(len(lags) * 0.95)] * 1000:.1f} ms  "
+        f"max {lags[-1] * 1000:.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CDC source latency benchmark")
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=50, help="inserts per second")
+    parser.add_argument("--sources", default="kafka,mongo")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds to wait for consumers to attach")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    load_config(".env")
+    name = f"cdc-benchmark-{os.getpid()}"
+    collection = MongoClient(os.getenv("MONGO_URI"))[os.getenv("MONGO_DB_NAME")][
+        os.getenv("APPLICATIONS_COLLECTION_NAME", "applications")
+    ]
+    sent = {}
+    sources = {}
+    if "kafka" in args.sources:
+        sources["kafka"] = KafkaCdcSource(["applications"], name)
+    if "mongo" in args.sources:
+        sources["mongo"] = ChangeStreamCdcSource(["applications"], name)
+
+    lags = {kind: [] for kind in sources}
+    threads = [
+        threading.Thread(target=collect, args=(source, sent, lags[kind], args.docs), daemon=True)
+        for kind, source in sources.items()
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+
+    start = time.time()
+    try:
+        for i in range(args.docs):
+            doc_id = f"{MARKER}{uuid.uuid4()}"
+            sent[doc_id] = time.time()
+            collection.insert_one({"_id": doc_id, "companyName": f"Benchmark {i}", "status": "pending"})
+            time.sleep(max(start + (i + 1) / args.rate - time.time(), 0))
+        deadline = time.time() + args.timeout
+        for thread in threads:
+            thread.join(max(deadline - time.time(), 0))
+    finally:
+        for source in sources.values():
+            source.close()
+        for thread in threads:
+            thread.join(5)
+        collection.delete_many({"_id": {"$regex": f"^{MARKER}"}})
+        collection.database[os.getenv("CDC_RESUME_COLLECTION_NAME", "cdc_resume_tokens")].delete_one({"_id": name})
+
+    print(f"{args.docs} inserts at {args.rate:.0f}/s")
+    for kind in sources:
+        report(kind, lags[kind], args.docs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for decoding Debezium MongoDB change events.
+
+Decodes synthetic application change events (create/update/delete, with
+converter schemas and extended-JSON dates) on one core and reports events
+per second of CPU time, with orjson (when installed) and with the stdlib.
+
+    python -m app.pathway_pipeline.benchmark_decode --events 100000
+"""
+import argparse
+import json
+import time
+import uuid
+
+from . import events
+
+
+def make_messages(count: int):
+    messages = []
+    for i in range(count):
+        doc_id = str(uuid.uuid4())
+        key = json.dumps({"schema": {"type": "struct"}, "payload": {"id": json.dumps(doc_id)}}).encode()
+        document = {
+            "_id": doc_id,
+            "companyName": f"Company {i}",
+            "industry": "Fintech",
+            "founderName": "Jane Doe",
+            "amountRaising": {"$numberLong": "2500000"},
+            "description": "Payments infrastructure for emerging markets. " * 4,
+            "status": "pending",
+            "dateAdded": {"$date": 1731000000000 + i},
+            "createdAt": {"$date": 1731000000000 + i},
+            "updatedAt": {"$date": 1731000000000 + i},
+        }
+        payload = {
+            "source": {"collection": "applications", "ts_ms": 1731000000000 + i},
+            "ts_ms": 1731000000000 + i,
+            "op": "c",
+            "after": json.dumps(document),
+        }
+        if i % 3 == 1:
+            payload["op"] = "u"
+            payload["after"] = None
+            payload["patch"] = json.dumps({"$v": 1, "$set": {"status": "accepted", "updatedAt": {"$date": 1731000000001}}})
+        elif i % 10 == 9:
+            payload["op"] = "d"
+            payload["after"] = None
+        value = json.dumps({"schema": {"type": "struct", "fields": []}, "payload": payload}).encode()
+        messages.append((key, value))
+    return messages
+
+
+def run(name: str, messages) -> None:
+    start = time.process_time()
+    for key, value in messages:
+        events.decode_event(key, value)
+    elapsed = time.process_time() - start
+    print(f"{name:>8}: {len(messages) / elapsed:12,.0f} events/s per core  ({elapsed * 1e6 / len(messages):.1f} us/event)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Debezium change event decoding benchmark")
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.events)
+    if events.FAST_JSON:
+        run("orjson", messages)
+    # Force the stdlib path for comparison
+    events.FAST_JSON, events._loads = False, json.loads
+    run("json", messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark for pitch deck text extraction.
+
+Extracts a set of PDFs (synthetic text decks, or the files in --dir) in the
+same spawn process pool the extraction stage uses and reports pages per
+second overall and per core of worker CPU time.
+
+    python -m app.pathway_pipeline.benchmark_extraction --decks 40 --pages 25 --workers 4
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .pdf_text import extract_pages
+
+
+def make_deck(path: str, pages: int) -> None:
+    # A minimal hand-written PDF: one Helvetica text stream per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(1, pages + 1):
+        lines = [f"Slide {number}: market, traction and team"] + [
+            f"Line {i}: revenue grew {i * number % 97}% quarter over quarter in region {i}" for i in range(30)
+        ]
+        text = "".join(f"({line}) Tj 0 -20 Td " for line in lines)
+        stream = f"BT /F1 12 Tf 50 800 Td {text}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 842 595] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pitch deck extraction benchmark")
+    parser.add_argument("--dir", help="Extract the PDFs in this directory instead of synthetic decks")
+    parser.add_argument("--decks", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.dir:
+            paths = sorted(glob.glob(os.path.join(args.dir, "*.pdf")))
+        else:
+            paths = [os.path.join(tmp, f"deck-{i}.pdf") for i in range(args.decks)]
+            for path in paths:
+                make_deck(path, args.pages)
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+            # Start the workers before timing
+            list(pool.map(abs, range(args.workers)))
+            start = time.monotonic()
+            results = list(pool.map(extract_pages, paths, [60.0] * len(paths)))
+            elapsed = time.monotonic() - start
+
+    pages = sum(r["pageCount"] for r in results)
+    cpu = sum(r["cpuSeconds"] for r in results)
+    print(f"{len(paths)} files, {pages} pages, {args.workers} worker(s)")
+    print(f"  overall:  {pages / elapsed:10,.1f} pages/s  ({elapsed:.2f}s wall)")
+    print(f"  per core: {pages / cpu:10,.1f} pages/s  ({cpu:.2f}s worker CPU)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,43 @@
 import os
-import json
-from kafka import KafkaConsumer
-from .pipeline import process_event
+import time
+import socket
+import logging
+from ..database.versions import versions
+from ..profiling.sampler import profiler
+from .pipeline import invalidate, process_event
+from .sources import CDC_COLLECTIONS, create_source
 
-KAFKA_BROKER = os.getenv("KAFKA_BROKER", "kafka:9092")
+logger = logging.getLogger(__name__)
 
-consumer = KafkaConsumer(
-    'fullCRM.Pathway.applications',             # USE THESE TOPICS FOR PATHWAY PIPELINE
-    'fullCRM.Pathway.meetings',                     #
-    'fullCRM.Pathway.startups',                     #
-    bootstrap_servers=KAFKA_BROKER,
-    group_id='fastapi-pathway',
-    value_deserializer=lambda m: json.loads(m.decode('utf-8'))
-)
+# Pause before the cache consumer reconnects after an error
+RECONNECT_DELAY_S = 5
 
 def start_consumer():
-    print("Pathway consumer started...")
-    for message in consumer:
-        payload = message.value
-        process_event(payload)
+    # CDC_SOURCE=kafka reads the Debezium topics, CDC_SOURCE=mongo watches MongoDB directly
+    # The API processes share this reader, so each change is handled by one of them
+    source = create_source(CDC_COLLECTIONS, "fastapi-pathway")
+    logger.info("Pathway consumer started (%s)", type(source).__name__)
+    for event in source.events():
+        # PROFILE_SAMPLE_RATE of the consumer's time is profiled in windows
+        profiler.maybe_profile_window("cdc-consumer")
+        process_event(event)
+
+def start_cache_consumer():
+    """
+    This process's own reader, starting at the newest change: every API
+    process sees every change and keeps its ETags and duplicate index
+    current. ETags are only remembered while the reader reports healthy.
+    """
+    name = f"fastapi-cache-{socket.gethostname()}-{os.getpid()}"
+    while True:
+        source = create_source(CDC_COLLECTIONS, name, bootstrap=False, resume=False)
+        source.on_health = versions.set_following
+        try:
+            logger.info("Cache consumer started (%s)", type(source).__name__)
+            for event in source.events():
+                invalidate(event)
+        except Exception as e:
+            logger.error(f"Cache consumer failed, reconnecting in {RECONNECT_DELAY_S}s: {e}", exc_info=True)
+        finally:
+            versions.set_following(False)
+        time.sleep(RECONNECT_DELAY_S)
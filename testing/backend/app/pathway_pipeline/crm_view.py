@@ -0,0 +1,144 @@
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import pathway as pw
+
+from ..config.configloader import load_config
+from .events import ChangeEvent, apply_update, updated_fields
+from .sources import CdcSource, create_source
+
+logger = logging.getLogger(__name__)
+
+
+class ApplicationSchema(pw.Schema):
+    doc_id: str = pw.column_definition(primary_key=True)
+    companyName: Optional[str]
+    industry: Optional[str]
+    stage: Optional[str]
+    founderName: Optional[str]
+    dealLeadVCId: Optional[str]
+    status: Optional[str]
+
+
+class StartupSchema(pw.Schema):
+    doc_id: str = pw.column_definition(primary_key=True)
+    applicationId: Optional[str]
+    companyName: Optional[str]
+
+
+class MeetingSchema(pw.Schema):
+    doc_id: str = pw.column_definition(primary_key=True)
+    startup_id: Optional[str]
+    vc_id: Optional[str]
+    status: Optional[str]
+
+
+class CdcSubject(pw.io.python.ConnectorSubject):
+    """
+    Upsert source for one CRM collection fed by its change events.
+    Every change becomes an upsert or delete of the row keyed by the document
+    id, so downstream joins are updated incrementally per row.
+    The tables only live in memory, so every start loads the current
+    documents first and keeps no stream position to resume from: resuming
+    into empty tables would lose the existing rows and apply update patches
+    to nothing.
+    """
+
+    def __init__(self, collection: str, schema: type[pw.Schema], source: Optional[CdcSource] = None):
+        super().__init__(session_type="upsert")
+        self.collection = collection
+        self.fields = [name for name in schema.column_names() if name != "doc_id"]
+        self.source = source
+        # Last known row fields per id; update events may only carry the patch.
+        # Only the projected fields are kept, not e.g. meeting transcripts.
+        self.documents: Dict[str, dict] = {}
+
+    def run(self):
+        source = self.source
+        if source is None:
+            source = create_source([self.collection], f"pathway-crm-view-{self.collection}", bootstrap=True, resume=False)
+        for event in source.events():
+            if event.key is not None:
+                self.apply(event)
+
+    def apply(self, event: ChangeEvent):
+        doc_id = str(event.key)
+        if event.op == "d":
+            document = self.documents.pop(doc_id, None)
+            if document is not None:
+                self.delete(**self.row(doc_id, document))
+            return
+        document = event.document
+        if document is None:
+            cached = self.documents.get(doc_id)
+            changed = updated_fields(event.update or {})
+            if cached is not None and changed is not None and changed.isdisjoint(self.fields):
+                return  # e.g. a transcript append; the row is unchanged
+            document = apply_update(cached or {}, event.update or {})
+        self.documents[doc_id] = {field: document[field] for field in self.fields if field in document}
+        self.next(**self.row(doc_id, document))
+
+    def row(self, doc_id: str, document: dict) -> Dict[str, Any]:
+        values = {"doc_id": doc_id}
+        for field in self.fields:
+            value = document.get(field)
+            values[field] = None if value is None else str(value)
+        return values
+
+
+def build_startup_view(applications: pw.Table, startups: pw.Table, meetings: pw.Table) -> pw.Table:
+    """
+    startup ⟷ originating application ⟷ related meetings, one row per startup.
+    All operators are incremental: an application update only re-emits the
+    row of the startup that references it.
+    """
+    with_application = startups.join_left(
+        applications, pw.left.applicationId == pw.right.doc_id, id=pw.left.id
+    ).select(
+        startup_id=pw.left.doc_id,
+        companyName=pw.left.companyName,
+        applicationId=pw.left.applicationId,
+        applicationStatus=pw.right.status,
+        industry=pw.right.industry,
+        stage=pw.right.stage,
+        founderName=pw.right.founderName,
+        dealLeadVCId=pw.right.dealLeadVCId,
+    )
+
+    meetings_by_startup = meetings.filter(pw.this.startup_id.is_not_none()).groupby(pw.this.startup_id).reduce(
+        startup_id=pw.this.startup_id,
+        meeting_ids=pw.reducers.sorted_tuple(pw.this.doc_id),
+        meeting_count=pw.reducers.count(),
+    )
+
+    return with_application.join_left(
+        meetings_by_startup, pw.left.startup_id == pw.right.startup_id, id=pw.left.id
+    ).select(
+        *pw.left,
+        meeting_ids=pw.coalesce(pw.right.meeting_ids, ()),
+        meeting_count=pw.coalesce(pw.right.meeting_count, 0),
+    )
+
+
+def run_startup_view():
+    applications = pw.io.python.read(CdcSubject("applications", ApplicationSchema), schema=ApplicationSchema)
+    startups = pw.io.python.read(CdcSubject("startups", StartupSchema), schema=StartupSchema)
+    meetings = pw.io.python.read(CdcSubject("meetings", MeetingSchema), schema=MeetingSchema)
+    view = build_startup_view(applications, startups, meetings)
+
+    # Snapshot mode keeps exactly one read-model document per startup up to date
+    pw.io.mongodb.write(
+        view,
+        connection_string=os.getenv("MONGO_URI"),
+        database=os.getenv("MONGO_DB_NAME"),
+        collection=os.getenv("STARTUP_VIEW_COLLECTION_NAME", "startup_views"),
+        output_table_type="snapshot",
+    )
+    logger.info("[Pathway] Startup view pipeline started")
+    pw.run()
+
+
+if __name__ == "__main__":
+    load_config(".env")
+    run_startup_view()
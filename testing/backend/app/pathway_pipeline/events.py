@@ -0,0 +1,334 @@
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from typing import Any, List, Optional
+
+from bson import Binary, Decimal128, ObjectId, Timestamp
+
+# Use orjson when it is installed; it parses several times faster than json.
+try:
+    import orjson
+
+    _loads = orjson.loads
+    FAST_JSON = True
+except ImportError:
+    _loads = json.loads
+    FAST_JSON = False
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def _date(value: Any) -> datetime.datetime:
+    if isinstance(value, dict):  # canonical form: {"$numberLong": "<ms>"}
+        value = int(value["$numberLong"])
+    if isinstance(value, str):  # relaxed form: ISO-8601
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return _EPOCH + datetime.timedelta(milliseconds=value)
+
+
+def _binary(value: Any, obj: dict) -> Any:
+    data = value["base64"] if isinstance(value, dict) else value
+    sub_type = value.get("subType") if isinstance(value, dict) else obj.get("$type")
+    raw = base64.b64decode(data)
+    return str(uuid.UUID(bytes=raw)) if sub_type in ("04", "03") and len(raw) == 16 else raw
+
+
+# Extended JSON (https://www.mongodb.com/docs/manual/reference/mongodb-extended-json/)
+# wrappers mapped to native Python values
+_EXTENDED_TYPES = {
+    "$oid": lambda value, obj: value,
+    "$date": lambda value, obj: _date(value),
+    "$numberLong": lambda value, obj: int(value),
+    "$numberInt": lambda value, obj: int(value),
+    "$numberDouble": lambda value, obj: float(value),
+    "$numberDecimal": lambda value, obj: Decimal(value),
+    "$binary": _binary,
+    "$uuid": lambda value, obj: value,
+    "$timestamp": lambda value, obj: _EPOCH + datetime.timedelta(seconds=value["t"]),
+    "$symbol": lambda value, obj: value,
+}
+
+
+def _object_hook(obj: dict) -> Any:
+    if len(obj) <= 2:
+        for name, value in obj.items():
+            convert = _EXTENDED_TYPES.get(name)
+            if convert is not None:
+                return convert(value, obj)
+    return obj
+
+
+def _convert(value: Any) -> Any:
+    if isinstance(value, dict):
+        converted = {name: _convert(item) for name, item in value.items()}
+        return _object_hook(converted)
+    if isinstance(value, list):
+        return [_convert(item) for item in value]
+    return value
+
+
+def loads_extended(text: Any) -> Any:
+    """Parse a MongoDB extended-JSON string into native Python values."""
+    if not FAST_JSON:
+        # The hook converts wrappers while parsing, bottom-up, in a single pass
+        return json.loads(text, object_hook=_object_hook)
+    value = _loads(text)
+    # Plain documents carry no "$" wrappers; skip the conversion walk for them
+    marker = '"$' if isinstance(text, str) else b'"$'
+    return _convert(value) if marker in text else value
+
+
+def _unwrap(value: Any) -> Any:
+    # JsonConverter with schemas enabled wraps everything in {"schema", "payload"}
+    if isinstance(value, dict) and "payload" in value and "schema" in value:
+        return value["payload"]
+    return value
+
+
+class ChangeEvent:
+    """One decoded Debezium MongoDB change."""
+
+    __slots__ = ("op", "key", "ts_ms", "collection", "document", "update", "position")
+
+    def __init__(self, op: str, key: Any, ts_ms: Optional[int], collection: Optional[str],
+                 document: Optional[dict], update: Optional[dict], position: Optional[tuple] = None):
+        self.op = op  # c=create, r=snapshot read, u=update, d=delete
+        self.key = key  # typed _id
+        self.ts_ms = ts_ms  # source (MongoDB oplog) timestamp in ms
+        self.collection = collection
+        self.document = document  # full typed document, when the event carries one
+        self.update = update  # {"$set": {...}, "$unset": {...}} or a replacement document
+        self.position = position  # oplog (seconds, increment); orders events against a snapshot
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent(op={self.op!r}, key={self.key!r}, collection={self.collection!r}, ts_ms={self.ts_ms})"
+
+
+def decode_key(key: Optional[bytes]) -> Any:
+    if key is None:
+        return None
+    payload = _unwrap(_loads(key))
+    doc_id = payload.get("id") if isinstance(payload, dict) else payload
+    return loads_extended(doc_id) if isinstance(doc_id, str) else doc_id
+
+
+def decode_event(key: Optional[bytes], value: Optional[bytes]) -> Optional[ChangeEvent]:
+    """
+    Decode the Kafka key and value of a Debezium MongoDB change message.
+    Handles the 1.x (after/patch/filter) and 2.x (after/updateDescription)
+    envelopes, with or without converter schemas. Tombstones decode to None.
+    """
+    if value is None:
+        return None
+    envelope = _unwrap(_loads(value))
+    if not isinstance(envelope, dict) or "op" not in envelope:
+        return None
+
+    source = envelope.get("source") or {}
+    after = envelope.get("after")
+    document = loads_extended(after) if after else None
+
+    update = None
+    patch = envelope.get("patch")
+    description = envelope.get("updateDescription")
+    if patch:
+        update = loads_extended(patch)
+    elif description:
+        updated = description.get("updatedFields")
+        update = {
+            "$set": loads_extended(updated) if updated else {},
+            "$unset": {field: True for field in description.get("removedFields") or []},
+        }
+
+    doc_id = decode_key(key)
+    if doc_id is None:
+        if document is not None:
+            doc_id = document.get("_id")
+        elif envelope.get("filter"):
+            doc_id = loads_extended(envelope["filter"]).get("_id")
+
+    # source.ts_ms and source.ord are the seconds and increment of the oplog entry
+    position = None
+    if "ts_ms" in source and "ord" in source:
+        position = (source["ts_ms"] // 1000, source["ord"])
+
+    return ChangeEvent(
+        op=envelope["op"],
+        key=doc_id,
+        ts_ms=source.get("ts_ms", envelope.get("ts_ms")),
+        collection=source.get("collection"),
+        document=document,
+        update=update,
+        position=position,
+    )
+
+
+def _apply_diff(value: Any, diff: dict) -> Any:
+    """
+    Apply one level of a `$v: 2` oplog diff: "u"/"i" set fields, "d" removes
+    them and "s<field>" holds the diff of a sub-document or array. Array
+    diffs are marked with "a", may truncate to length "l" and address
+    elements as "u<index>"/"s<index>".
+    """
+    if diff.get("a") is True:
+        array = list(value) if isinstance(value, list) else []
+        if "l" in diff:
+            del array[diff["l"]:]
+        for key, item in diff.items():
+            if key in ("a", "l"):
+                continue
+            index = int(key[1:])
+            while len(array) <= index:
+                array.append(None)
+            array[index] = item if key[0] == "u" else _apply_diff(array[index], item)
+        return array
+    document = dict(value) if isinstance(value, dict) else {}
+    for key, item in diff.items():
+        if key in ("u", "i"):
+            document.update(item)
+        elif key == "d":
+            for field in item:
+                document.pop(field, None)
+        elif key.startswith("s"):
+            document[key[1:]] = _apply_diff(document.get(key[1:]), item)
+    return document
+
+
+def _apply_path(value: Any, path: List[str], item: Any, remove: bool) -> Any:
+    """
+    Set or remove the field at a dotted $set/$unset path such as
+    "pitchDeck.sha256" or "transcript.3.text". Numeric parts address array
+    elements; unsetting one leaves null in its place, as MongoDB does.
+    Containers along the path are copied, never modified.
+    """
+    if remove and not isinstance(value, (dict, list)):
+        return value
+    key, rest = path[0], path[1:]
+    if isinstance(value, list) and key.isdigit():
+        array = list(value)
+        index = int(key)
+        if remove:
+            if index < len(array):
+                array[index] = _apply_path(array[index], rest, item, remove) if rest else None
+            return array
+        while len(array) <= index:
+            array.append(None)
+        array[index] = _apply_path(array[index], rest, item, remove) if rest else item
+        return array
+    document = dict(value) if isinstance(value, dict) else {}
+    if not rest:
+        if remove:
+            document.pop(key, None)
+        else:
+            document[key] = item
+    elif not remove or key in document:
+        document[key] = _apply_path(document.get(key), rest, item, remove)
+    return document
+
+
+def updated_fields(update: dict) -> Optional[set]:
+    """Top-level fields an update description changes, or None for a replacement document."""
+    if not any(field.startswith("$") for field in update):
+        return None
+    if update.get("$v") == 2 and "diff" in update:
+        fields = set()
+        for key, item in update["diff"].items():
+            if key in ("u", "i", "d"):
+                fields.update(item)
+            elif key.startswith("s"):
+                fields.add(key[1:])
+        return fields
+    return {field.split(".", 1)[0] for field in (*update.get("$set", {}), *update.get("$unset", {}))}
+
+
+def apply_update(document: dict, update: dict) -> dict:
+    """
+    Apply a MongoDB update description to the last known document: a
+    replacement, $set/$unset with dotted paths into sub-documents and
+    arrays, or the `$v: 2` diff that Debezium passes on from the oplog of
+    MongoDB 5.0+.
+    """
+    if not any(field.startswith("$") for field in update):
+        return update  # replacement document
+    if update.get("$v") == 2 and "diff" in update:
+        return _apply_diff(document, update["diff"])
+    document = dict(document)
+    for path, value in update.get("$set", {}).items():
+        document = _apply_path(document, path.split("."), value, remove=False)
+    for path in update.get("$unset", {}):
+        document = _apply_path(document, path.split("."), None, remove=True)
+    return document
+
+
+def _native(value: Any) -> Any:
+    # BSON values from a change stream mapped to what the extended-JSON path yields
+    if isinstance(value, dict):
+        return {name: _native(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_native(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Binary):
+        if value.subtype in (3, 4) and len(value) == 16:
+            return str(uuid.UUID(bytes=bytes(value)))
+        return bytes(value)
+    if isinstance(value, Timestamp):
+        return _EPOCH + datetime.timedelta(seconds=value.time)
+    return value
+
+
+# Change stream operation types and their Debezium op codes
+CHANGE_STREAM_OPS = {"insert": "c", "update": "u", "replace": "u", "delete": "d"}
+
+
+def event_from_change(change: dict) -> Optional[ChangeEvent]:
+    """
+    Normalize a MongoDB change stream document into the same ChangeEvent
+    the Debezium path produces. Other operation types (drop, invalidate,
+    ...) decode to None.
+    """
+    op = CHANGE_STREAM_OPS.get(change.get("operationType"))
+    if op is None:
+        return None
+
+    document = change.get("fullDocument")
+    update = None
+    if change["operationType"] == "update":
+        description = change.get("updateDescription") or {}
+        update = {
+            "$set": _native(description.get("updatedFields") or {}),
+            "$unset": {field: True for field in description.get("removedFields") or []},
+        }
+    elif change["operationType"] == "replace":
+        update = _native(document)
+
+    wall_time = change.get("wallTime")
+    if wall_time is not None:  # MongoDB 6.0+
+        if wall_time.tzinfo is None:  # BSON dates are UTC
+            wall_time = wall_time.replace(tzinfo=datetime.timezone.utc)
+        ts_ms = int(wall_time.timestamp() * 1000)
+    else:
+        ts_ms = change["clusterTime"].time * 1000
+
+    return ChangeEvent(
+        op=op,
+        key=_native(change["documentKey"]["_id"]),
+        ts_ms=ts_ms,
+        collection=change["ns"]["coll"],
+        document=_native(document) if document is not None else None,
+        update=update,
+        position=(change["clusterTime"].time, change["clusterTime"].inc),
+    )
+
+
+def event_from_snapshot(collection: str, document: dict) -> ChangeEvent:
+    """A document read during bootstrap, as a Debezium-style snapshot read."""
+    document = _native(document)
+    return ChangeEvent(op="r", key=document.get("_id"), ts_ms=None, collection=collection,
+                       document=document, update=None)
@@ -0,0 +1,157 @@
+import os
+import time
+import logging
+import datetime
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from bson import ObjectId
+from gridfs import GridFSBucket
+from pymongo import MongoClient
+
+from ..jobs.scheduler import scheduler
+from .events import ChangeEvent, apply_update
+from .pdf_text import ExtractionTimeout, extract_pages
+
+# Extra time the parent waits past the worker's own timer before giving up on it
+TIMEOUT_GRACE_S = 5
+EXTRACTION_JOB = "extract_pitch_deck"
+
+
+def pitch_deck_ref(event: ChangeEvent) -> Optional[dict]:
+    """The pitchDeck blob reference set by an application change, if any."""
+    if event.document is not None:
+        return event.document.get("pitchDeck")
+    # The fields the update sets; a new upload changes at least id and sha256
+    return apply_update({}, event.update or {}).get("pitchDeck")
+
+
+class ExtractionStage:
+    """
+    Background text extraction for pitch decks.
+    Application create/update events queue an EXTRACTION_JOB for the deck's
+    blob reference. The job thread downloads the blob to a temporary file and
+    a worker process parses it with a per-file timeout. Results are stored in
+    EXTRACTION_COLLECTION_NAME keyed by the blob's SHA-256, so re-uploads and
+    duplicate decks are served from that cache without parsing again.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("ExtractionStage")
+        self.lock = threading.Lock()
+        self.started = False
+        self.jobs = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.pages = 0
+        self.cpu_seconds = 0.0
+
+    def _start(self):
+        # Configuration is read on first use, after load_config has run
+        self.workers = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 1)))
+        self.timeout = float(os.getenv("EXTRACTION_TIMEOUT_S", "60"))
+        self.client = MongoClient(os.getenv("MONGO_URI"))
+        db = self.client[os.getenv("MONGO_DB_NAME")]
+        self.results = db[os.getenv("EXTRACTION_COLLECTION_NAME", "extractions")]
+        self.bucket = GridFSBucket(db, bucket_name=os.getenv("BLOB_BUCKET_NAME", "blobs"))
+        # The timeout covers parsing only, not waiting for a free worker
+        self.slots = threading.BoundedSemaphore(self.workers)
+        self.pool = self._new_pool()
+        self.started = True
+        self.logger.info("Extraction stage started with %s worker process(es)", self.workers)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: forking a process that runs the event loop and consumer threads is unsafe
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def run(self, ref: dict):
+        """
+        Extract one deck unless its hash is cached. Unparseable and timed-out
+        files are recorded as failed; database errors propagate so the job is
+        retried.
+        """
+        with self.lock:
+            if not self.started:
+                self._start()
+        sha256 = ref["sha256"]
+        if self.results.count_documents({"_id": sha256, "status": "done"}, limit=1):
+            with self.lock:
+                self.cache_hits += 1
+            return
+        started = time.monotonic()
+        result = self._extract(ref)
+        result["wallSeconds"] = time.monotonic() - started
+        result["createdAt"] = datetime.datetime.now(datetime.timezone.utc)
+        self.results.replace_one({"_id": sha256}, result, upsert=True)
+
+    def _extract(self, ref: dict) -> dict:
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as tmp:
+            # Streamed to disk chunk by chunk; the workers read the file themselves
+            self.bucket.download_to_stream(ObjectId(ref["id"]), tmp)
+            tmp.flush()
+            with self.slots:
+                pool = self.pool
+                future = pool.submit(extract_pages, tmp.name, self.timeout)
+                try:
+                    result = future.result(timeout=self.timeout + TIMEOUT_GRACE_S)
+                except (ExtractionTimeout, FutureTimeout) as e:
+                    if isinstance(e, FutureTimeout):
+                        self._recycle_pool(pool)
+                    self.logger.warning(f"Extraction of {ref['sha256']} timed out after {self.timeout}s")
+                    return self._failed("timeout", ref)
+                except BrokenProcessPool:
+                    self._recycle_pool(pool)
+                    return self._failed("crashed", ref)
+                except Exception as e:
+                    self.logger.warning(f"Could not parse {ref['sha256']}: {e}")
+                    return self._failed(f"error: {e}", ref)
+
+        with self.lock:
+            self.jobs += 1
+            self.pages += result["pageCount"]
+            self.cpu_seconds += result["cpuSeconds"]
+        self.logger.info(
+            f"Extracted {result['pageCount']} pages from {ref.get('name')} "
+            f"({result['pageCount'] / max(result['cpuSeconds'], 1e-9):.1f} pages/s per core)"
+        )
+        result["status"] = "done"
+        return result
+
+    def _failed(self, status: str, ref: dict) -> dict:
+        with self.lock:
+            self.failures += 1
+        return {"status": "failed", "error": status, "name": ref.get("name")}
+
+    def _recycle_pool(self, pool: ProcessPoolExecutor):
+        # A worker that ignored its timer is stuck in native code; replace the pool
+        with self.lock:
+            if self.pool is not pool:
+                return  # another job already replaced it
+            self.pool = self._new_pool()
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "jobs": self.jobs,
+                "cacheHits": self.cache_hits,
+                "failures": self.failures,
+                "pages": self.pages,
+                "cpuSeconds": round(self.cpu_seconds, 3),
+                "pagesPerSecondPerCore": round(self.pages / self.cpu_seconds, 1) if self.cpu_seconds else None,
+            }
+
+
+stage = ExtractionStage()
+scheduler.register(
+    EXTRACTION_JOB,
+    lambda job: stage.run(job["payload"]),
+    # Jobs beyond EXTRACTION_WORKERS wait for a worker process
+    concurrency=os.cpu_count() or 1,
+)
@@ -0,0 +1,50 @@
+import signal
+import time
+
+import pypdf
+
+
+class ExtractionTimeout(BaseException):
+    # BaseException so pypdf's broad `except Exception` recovery cannot swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout()
+
+
+def extract_pages(path: str, timeout: float) -> dict:
+    """
+    Extract the text and page structure of a PDF. Runs in a worker process;
+    imports only pypdf so spawned workers start quickly.
+    The timeout is enforced inside the worker with an interval timer where
+    the platform has one, so a pathological file frees its worker.
+    """
+    started = time.process_time()
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        reader = pypdf.PdfReader(path)
+        pages = []
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            pages.append({
+                "number": number,
+                "text": text,
+                "chars": len(text),
+                "width": float(page.mediabox.width),
+                "height": float(page.mediabox.height),
+            })
+        metadata = {name.lstrip("/"): str(value) for name, value in (reader.metadata or {}).items()}
+        return {
+            "pages": pages,
+            "pageCount": len(pages),
+            "metadata": metadata,
+            "extractor": f"pypdf {pypdf.__version__}",
+            "cpuSeconds": time.process_time() - started,
+        }
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
@@ -1,8 +1,35 @@
+import os
 import logging
 
+from ..database.versions import versions
+from .events import ChangeEvent
+from ..jobs.scheduler import PRIORITY_BULK, PRIORITY_NORMAL, scheduler
+from .extraction import EXTRACTION_JOB, pitch_deck_ref
+from ..dedup.duplicates import duplicate_index
+
 logger = logging.getLogger(__name__)
 
-def process_event(event: dict):
-    op = event.get('op')  # c=create, u=update, d=delete
-    data = event.get('after') or event.get('before')
-    logger.info(f"[Pathway] {op} operation detected on _id={data.get('_id')}")
+def invalidate(event: ChangeEvent):
+    """
+    Per-process state derived from the collections. Every API process
+    receives every change here, its own writes included.
+    """
+    # Writes made by other processes invalidate this process's ETags too
+    if event.collection is not None:
+        versions.bump(event.collection, str(event.key))
+
+    if event.collection == os.getenv("APPLICATIONS_COLLECTION_NAME", "applications") and event.key is not None:
+        duplicate_index.apply_event(str(event.key), event.op, event.document, event.update)
+
+def process_event(event: ChangeEvent):
+    """Work done once per change, by whichever API process receives it."""
+    # op: c=create, r=snapshot read, u=update, d=delete
+    logger.debug("[Pathway] %s operation detected on %s _id=%s", event.op, event.collection, event.key)
+
+    # Extract the pitch deck text of new and updated applications in the background
+    if event.collection == os.getenv("APPLICATIONS_COLLECTION_NAME", "applications") and event.op in ("c", "r", "u"):
+        ref = pitch_deck_ref(event)
+        if ref and ref.get("id") and ref.get("sha256"):
+            # Snapshot reads are a backfill and yield to live changes
+            priority = PRIORITY_BULK if event.op == "r" else PRIORITY_NORMAL
+            scheduler.enqueue_threadsafe(EXTRACTION_JOB, ref["sha256"], ref, priority=priority)
@@ -0,0 +1,339 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+from bson import Timestamp
+from kafka import KafkaConsumer, TopicPartition
+from pymongo import MongoClient
+from pymongo.errors import OperationFailure
+
+from .events import ChangeEvent, decode_event, event_from_change, event_from_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Collections captured for the Pathway pipeline
+CDC_COLLECTIONS = ("applications", "meetings", "startups")
+# Error code returned when a resume token has fallen off the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+# Documents buffered between the snapshot cursors and the consumer
+SNAPSHOT_QUEUE_SIZE = 10000
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+def mongo_client() -> MongoClient:
+    uri = os.getenv("MONGO_URI")
+    if uri is None or os.getenv("MONGO_DB_NAME") is None:
+        logger.error("Configuration error: MONGO_URI or MONGO_DB_NAME not set.")
+        raise ValueError("Environment variables MONGO_URI and MONGO_DB_NAME must be set.")
+    return MongoClient(uri, tz_aware=True)
+
+
+class SnapshotLoader:
+    """
+    Reads the current documents of the collections in parallel, one
+    snapshot-read cursor per collection, and records the cluster time each
+    snapshot was taken at. Change events at or before that time are already
+    reflected in the snapshot and are dropped by `is_new`.
+    Snapshot reads need MongoDB 5.0+ and must finish within the server's
+    snapshot history window (minSnapshotHistoryWindowInSeconds, 5 min).
+    """
+
+    def __init__(self, client: MongoClient, collections: Sequence[str]):
+        self.client = client
+        self.db = client[os.getenv("MONGO_DB_NAME")]
+        self.collections = list(collections)
+        self.snapshot_times: Dict[str, tuple] = {}
+        self.results = queue.Queue(maxsize=SNAPSHOT_QUEUE_SIZE)
+        self.stopped = threading.Event()
+
+    def events(self) -> Iterator[ChangeEvent]:
+        started = time.monotonic()
+        threads = [
+            threading.Thread(target=self.read, args=(collection,), daemon=True)
+            for collection in self.collections
+        ]
+        for thread in threads:
+            thread.start()
+        count = 0
+        remaining = len(threads)
+        try:
+            while remaining:
+                item = self.results.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    count += 1
+                    yield item
+        finally:
+            # Unblock the readers if the consumer stopped early or a reader failed
+            self.stopped.set()
+        logger.info(
+            f"[Pathway] Bootstrapped {count} documents from {', '.join(self.collections)} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+
+    def put(self, item) -> bool:
+        while not self.stopped.is_set():
+            try:
+                self.results.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read(self, collection: str):
+        try:
+            with self.client.start_session(snapshot=True) as session:
+                cursor = self.db[collection].find({}, session=session, batch_size=SNAPSHOT_BATCH_SIZE)
+                for document in cursor:
+                    if not self.put(event_from_snapshot(collection, document)):
+                        return
+                # Every read in a snapshot session runs at the same cluster time
+                snapshot_time = session.operation_time
+            self.snapshot_times[collection] = (snapshot_time.time, snapshot_time.inc)
+            self.put(None)
+        except Exception as e:
+            self.put(e)
+
+    def is_new(self, event: ChangeEvent) -> bool:
+        snapshot_time = self.snapshot_times.get(event.collection)
+        return snapshot_time is None or event.position is None or event.position > snapshot_time
+
+
+class CdcSource:
+    """
+    A stream of normalized ChangeEvents for a set of collections.
+    `name` identifies the reader: the Kafka consumer group, or the key under
+    which the change stream resume token is stored. Without `resume` the
+    reader keeps no position and starts at the newest change.
+    With `bootstrap`, the stream starts with the current documents as "r"
+    events and then continues with the changes made after that snapshot,
+    so a restart costs a read of the collections rather than a replay of the
+    whole change history.
+    `on_health`, when set, is called with False whenever the source cannot
+    vouch that it is receiving every change, and with True once it can again.
+    """
+
+    def __init__(self, collections: Sequence[str], name: str, bootstrap: bool = False, resume: bool = True):
+        self.collections = list(collections)
+        self.name = name
+        self.bootstrap = bootstrap
+        self.resume = resume
+        self.closed = False
+        self.on_health: Optional[Callable[[bool], None]] = None
+        self.healthy: Optional[bool] = None
+
+    def report_health(self, healthy: bool):
+        if self.on_health is not None and healthy != self.healthy:
+            self.healthy = healthy
+            self.on_health(healthy)
+
+    def events(self) -> Iterator[ChangeEvent]:
+        raise NotImplementedError
+
+    def close(self):
+        self.closed = True
+
+
+class KafkaCdcSource(CdcSource):
+    """
+    Debezium MongoDB connector -> Kafka -> here.
+    On bootstrap the end offsets of the topics are recorded before the
+    snapshot is read, and the consumer then seeks to them; the overlap
+    (changes published after those offsets but already in the snapshot) is
+    skipped by oplog position.
+    With `on_health` set the source also follows Debezium's heartbeat
+    topic: it is healthy while the broker is connected and a change or a
+    heartbeat arrived within CDC_STALE_AFTER_S, so a stopped connector is
+    noticed even when nothing is written.
+    """
+
+    def __init__(self, collections: Sequence[str], name: str, offset_reset: str = "latest", bootstrap: bool = False,
+                 resume: bool = True):
+        super().__init__(collections, name, bootstrap, resume)
+        prefix = os.getenv("CDC_TOPIC_PREFIX", "fullCRM.Pathway")
+        self.topics = [f"{prefix}.{collection}" for collection in self.collections]
+        self.heartbeat_topic = os.getenv("CDC_HEARTBEAT_TOPIC", "__debezium-heartbeat.fullCRM")
+        self.stale_after = float(os.getenv("CDC_STALE_AFTER_S", "30"))
+        self.offset_reset = offset_reset
+        self.consumer: Optional[KafkaConsumer] = None
+        self.last_seen = time.monotonic()
+        self.last_check = 0.0
+
+    def check_health(self):
+        now = time.monotonic()
+        if self.on_health is None or now - self.last_check < 1:
+            return
+        self.last_check = now
+        self.report_health(self.consumer.bootstrap_connected() and now - self.last_seen < self.stale_after)
+
+    def events(self) -> Iterator[ChangeEvent]:
+        self.consumer = KafkaConsumer(
+            bootstrap_servers=os.getenv("KAFKA_BROKER", "kafka:9092"),
+            group_id=self.name,
+            auto_offset_reset=self.offset_reset,
+            # A reader without resume has nothing to come back to
+            enable_auto_commit=self.resume,
+            consumer_timeout_ms=1000,  # wake up periodically to notice close()
+        )
+        try:
+            snapshot = None
+            if self.bootstrap:
+                snapshot = yield from self.load_snapshot()
+            elif self.on_health is not None:
+                self.consumer.subscribe(self.topics + [self.heartbeat_topic])
+            else:
+                self.consumer.subscribe(self.topics)
+            self.last_seen = time.monotonic()
+            while not self.closed:
+                for message in self.consumer:
+                    self.last_seen = time.monotonic()
+                    self.check_health()
+                    if message.topic == self.heartbeat_topic:
+                        continue
+                    try:
+                        event = decode_event(message.key, message.value)
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning(f"[Pathway] Skipping undecodable event on {message.topic}: {e}")
+                        continue
+                    if event is not None and (snapshot is None or snapshot.is_new(event)):
+                        yield event
+                    if self.closed:
+                        break
+                self.check_health()
+        finally:
+            self.consumer.close()
+
+    def load_snapshot(self):
+        partitions = []
+        for topic in self.topics:
+            ids = self.consumer.partitions_for_topic(topic)
+            if not ids:
+                logger.warning(f"[Pathway] Topic {topic} not found; its changes are not followed")
+                continue
+            partitions.extend(TopicPartition(topic, partition) for partition in ids)
+        self.consumer.assign(partitions)
+        handoff = self.consumer.end_offsets(partitions)
+
+        client = mongo_client()
+        try:
+            snapshot = SnapshotLoader(client, self.collections)
+            yield from snapshot.events()
+        finally:
+            client.close()
+
+        for partition, offset in handoff.items():
+            self.consumer.seek(partition, offset)
+        return snapshot
+
+
+class ChangeStreamCdcSource(CdcSource):
+    """
+    Watches the collections directly with a MongoDB change stream; needs a
+    replica set (a single-node one is enough) but no Kafka or Debezium.
+    The resume token is saved in MongoDB so a restart continues where the
+    previous run stopped. It is saved after the consumer has handled the
+    event, at most once per CDC_RESUME_SAVE_INTERVAL seconds while busy, so
+    a crash replays at most that window (at-least-once delivery).
+    On bootstrap the stream starts at the earliest snapshot time instead of
+    the saved token, and a lost token triggers a new bootstrap.
+    """
+
+    def __init__(self, collections: Sequence[str], name: str, bootstrap: bool = False, resume: bool = True):
+        super().__init__(collections, name, bootstrap, resume)
+        self.save_interval = float(os.getenv("CDC_RESUME_SAVE_INTERVAL", "1"))
+        self.client = mongo_client()
+        self.db = self.client[os.getenv("MONGO_DB_NAME")]
+        self.tokens = self.db[os.getenv("CDC_RESUME_COLLECTION_NAME", "cdc_resume_tokens")]
+        self.saved_token = None
+
+    def load_token(self):
+        if not self.resume:
+            return None
+        saved = self.tokens.find_one({"_id": self.name})
+        self.saved_token = saved["token"] if saved else None
+        return self.saved_token
+
+    def save_token(self, token):
+        if token is None or token == self.saved_token or not self.resume:
+            return
+        self.tokens.update_one({"_id": self.name}, {"$set": {"token": token}}, upsert=True)
+        self.saved_token = token
+
+    def forget_token(self):
+        self.tokens.delete_one({"_id": self.name})
+        self.saved_token = None
+
+    def events(self) -> Iterator[ChangeEvent]:
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": self.collections},
+            "operationType": {"$in": ["insert", "update", "replace", "delete"]},
+        }}]
+        bootstrap = self.bootstrap
+        try:
+            while not self.closed:
+                snapshot = None
+                start_at = None
+                if bootstrap:
+                    snapshot = SnapshotLoader(self.client, self.collections)
+                    yield from snapshot.events()
+                    if snapshot.snapshot_times:
+                        start_at = Timestamp(*min(snapshot.snapshot_times.values()))
+                    bootstrap = False
+                try:
+                    token = None if start_at is not None else self.load_token()
+                    yield from self.watch(pipeline, token, start_at, snapshot)
+                except OperationFailure as e:
+                    if e.code != CHANGE_STREAM_HISTORY_LOST:
+                        raise
+                    # Down for longer than the oplog window; changes in between are lost
+                    self.forget_token()
+                    if self.bootstrap:
+                        logger.warning(f"[Pathway] Resume token for {self.name} expired, bootstrapping again: {e}")
+                        bootstrap = True
+                    else:
+                        logger.warning(f"[Pathway] Resume token for {self.name} expired, watching from now: {e}")
+        finally:
+            self.client.close()
+
+    def watch(self, pipeline, token, start_at, snapshot: Optional[SnapshotLoader]) -> Iterator[ChangeEvent]:
+        with self.db.watch(
+            pipeline, resume_after=token, start_at_operation_time=start_at, max_await_time_ms=1000
+        ) as stream:
+            last_saved = time.monotonic()
+            while stream.alive and not self.closed:
+                change = stream.try_next()
+                # try_next returns within max_await_time_ms while the server is reachable
+                self.report_health(True)
+                if change is not None:
+                    event = event_from_change(change)
+                    if event is not None and (snapshot is None or snapshot.is_new(event)):
+                        yield event
+                # Save when idle, or periodically while changes keep coming
+                if change is None or time.monotonic() - last_saved >= self.save_interval:
+                    self.save_token(stream.resume_token)
+                    last_saved = time.monotonic()
+            self.save_token(stream.resume_token)
+
+
+def create_source(collections: Sequence[str], name: str, offset_reset: str = "latest",
+                  bootstrap: Optional[bool] = None, resume: bool = True) -> CdcSource:
+    """
+    Build the CDC source selected by CDC_SOURCE: "kafka" (Debezium, the
+    default) or "mongo" (direct change stream). CDC_BOOTSTRAP=true loads
+    the current documents first (see CdcSource) unless `bootstrap` says
+    otherwise.
+    """
+    kind = os.getenv("CDC_SOURCE", "kafka").lower()
+    if bootstrap is None:
+        bootstrap = os.getenv("CDC_BOOTSTRAP", "false").lower() == "true"
+    if kind == "mongo":
+        return ChangeStreamCdcSource(collections, name, bootstrap=bootstrap, resume=resume)
+    if kind == "kafka":
+        return KafkaCdcSource(collections, name, offset_reset=offset_reset, bootstrap=bootstrap, resume=resume)
+    raise ValueError(f"Unknown CDC_SOURCE {kind!r}; expected 'kafka' or 'mongo'")
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import logging
+import datetime
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Leaf markers appended to stacks that were not running on a CPU
+AWAIT = "[await]"
+AWAIT_MONGO = "[await mongo]"
+OFF_CPU = "[off-cpu]"
+OFF_CPU_MONGO = "[off-cpu mongo]"
+
+PYMONGO_PATH = f"{os.sep}pymongo{os.sep}"
+
+
+def _thread_clock(thread_id: int) -> Optional[int]:
+    # CPU-time clock of another thread; POSIX only
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class Session:
+    """
+    One profiled unit of work: an asyncio task (a request or WebSocket
+    connection) or a thread (the CDC consumer) for a window of time.
+    """
+
+    __slots__ = ("id", "label", "task", "root_code", "loop", "thread_id", "clock", "last_cpu", "last_wall",
+                 "started", "started_at", "deadline", "cpu", "wall", "counts")
+
+    def __init__(self, label: str, thread: threading.Thread, max_s: float,
+                 task: Optional[asyncio.Task] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.id = f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.task = task
+        self.root_code = task.get_coro().cr_code if task is not None else None
+        self.loop = loop
+        self.thread_id = thread.ident
+        self.clock = _thread_clock(thread.ident)
+        self.last_cpu = time.clock_gettime(self.clock) if self.clock is not None else 0.0
+        self.started = self.last_wall = time.monotonic()
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.deadline = self.started + max_s
+        self.cpu: Counter = Counter()
+        self.wall: Counter = Counter()
+        self.counts: Counter = Counter()
+
+
+class Profiler:
+    """
+    Low-overhead sampling profiler for selected requests, WebSocket
+    connections and consumer windows.
+    A sampler thread runs only while a session is active. Every
+    PROFILE_INTERVAL_MS it records the stack of each session's thread. A
+    task that is not currently running on the event loop is sampled from its
+    chain of suspended coroutines instead, so time spent awaiting MongoDB
+    shows up under the awaiting call. Each session writes flamegraph-style
+    collapsed stacks to PROFILE_DIR: `<id>.wall.collapsed` (all samples, with
+    [await]/[off-cpu] leaves), `<id>.cpu.collapsed` (on-CPU samples only)
+    and a `<id>.json` summary.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger("Profiler")
+        self.configured = False
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Session] = {}
+        self.finished: List[Session] = []
+        self.sampler: Optional[threading.Thread] = None
+        self.labels: Dict[object, str] = {}
+        self.next_window: Dict[str, float] = {}
+
+    def configure(self):
+        # Read on first use, after load_config has run
+        self.key = os.getenv("PROFILE_KEY") or None
+        self.rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+        self.interval = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+        self.max_s = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+        self.window_s = float(os.getenv("PROFILE_WINDOW_SECONDS", "10"))
+        self.directory = os.getenv("PROFILE_DIR", "profiles")
+        self.configured = True
+
+    @property
+    def enabled(self) -> bool:
+        if not self.configured:
+            self.configure()
+        return bool(self.key or self.rate)
+
+    def sampled(self) -> bool:
+        return self.rate > 0 and random.random() < self.rate
+
+    def start_task(self, label: str) -> Session:
+        """Profile the calling asyncio task until stop()."""
+        return self._start(Session(
+            label, threading.current_thread(), self.max_s,
+            task=asyncio.current_task(), loop=asyncio.get_running_loop(),
+        ))
+
+    def start_thread(self, label: str, duration_s: float) -> Session:
+        """Profile the calling thread for duration_s seconds."""
+        return self._start(Session(label, threading.current_thread(), duration_s))
+
+    def maybe_profile_window(self, label: str):
+        """
+        Called from a loop such as the CDC consumer. Once per
+        PROFILE_WINDOW_SECONDS, with probability PROFILE_SAMPLE_RATE, profiles
+        the calling thread for the next window, so about that fraction of
+        the loop's time is covered.
+        """
+        if not self.enabled or not self.rate:
+            return
+        now = time.monotonic()
+        if now < self.next_window.get(label, 0):
+            return
+        self.next_window[label] = now + self.window_s
+        if self.sampled():
+            self.start_thread(label, self.window_s)
+
+    def _start(self, session: Session) -> Session:
+        with self.lock:
+            self.sessions[session.id] = session
+            if self.sampler is None:
+                self.sampler = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self.sampler.start()
+        return session
+
+    def stop(self, session: Session):
+        # Files are written by the sampler thread, off the event loop
+        with self.lock:
+            if self.sessions.pop(session.id, None) is not None:
+                self.finished.append(session)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                now = time.monotonic()
+                for session in [s for s in self.sessions.values() if now > s.deadline]:
+                    del self.sessions[session.id]
+                    self.finished.append(session)
+                active = list(self.sessions.values())
+                finished, self.finished = self.finished, []
+                if not active and not finished:
+                    self.sampler = None
+                    return
+            if active:
+                frames = sys._current_frames()
+                for session in active:
+                    try:
+                        self._sample(session, frames)
+                    except Exception as e:
+                        self.logger.debug("Sample of %s failed: %s", session.label, e)
+                del frames
+            for session in finished:
+                self._write(session)
+
+    def _sample(self, session: Session, frames: dict):
+        on_cpu = self._on_cpu(session)
+        frame = frames.get(session.thread_id)
+        if session.task is not None and (frame is None or asyncio.current_task(session.loop) is not session.task):
+            # Suspended: walk the coroutines it is awaiting through
+            stack = self._await_stack(session.task.get_coro())
+            if not stack:
+                return
+            kind = AWAIT_MONGO if any(PYMONGO_PATH in filename for _, filename in stack) else AWAIT
+            self._record(session, [label for label, _ in stack], kind)
+            return
+        if frame is None:
+            return
+        stack = []
+        while frame is not None:
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        stack.reverse()
+        if session.root_code is not None and session.root_code in stack:
+            # Drop the event loop frames below the task
+            stack = stack[stack.index(session.root_code):]
+        if on_cpu:
+            kind = None
+        elif any(PYMONGO_PATH in code.co_filename for code in stack):
+            kind = OFF_CPU_MONGO
+        else:
+            kind = OFF_CPU
+        self._record(session, [self._label(code) for code in stack], kind)
+
+    def _await_stack(self, coro) -> list:
+        stack = []
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            stack.append((self._label(frame.f_code), frame.f_code.co_filename))
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        return stack
+
+    @staticmethod
+    def _on_cpu(session: Session) -> bool:
+        # The thread counts as on-CPU if it used at least half of the last interval
+        if session.clock is None:
+            return True
+        cpu, wall = time.clock_gettime(session.clock), time.monotonic()
+        busy = (cpu - session.last_cpu) >= (wall - session.last_wall) / 2
+        session.last_cpu, session.last_wall = cpu, wall
+        return busy
+
+    def _label(self, code) -> str:
+        label = self.labels.get(code)
+        if label is None:
+            path = code.co_filename
+            for marker in ("site-packages" + os.sep, os.sep + "app" + os.sep):
+                if marker in path:
+                    path = path[path.rindex(marker) + len(marker):]
+                    break
+            # Collapsed-stack frames must not contain ';'
+            label = self.labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+        return label
+
+    def _record(self, session: Session, labels: List[str], kind: Optional[str]):
+        stack = ";".join(labels)
+        if kind is None:
+            session.cpu[stack] += 1
+            session.wall[stack] += 1
+            session.counts["cpu"] += 1
+        else:
+            session.wall[f"{stack};{kind}"] += 1
+            session.counts[kind.strip("[]")] += 1
+
+    def _write(self, session: Session):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            base = os.path.join(self.directory, session.id)
+            for suffix, counter in (("wall", session.wall), ("cpu", session.cpu)):
+                with open(f"{base}.{suffix}.collapsed", "w") as f:
+                    for stack, count in counter.most_common():
+                        f.write(f"{stack} {count}\n")
+            samples = sum(session.counts.values())
+            summary = {
+                "id": session.id,
+                "label": session.label,
+                "startedAt": session.started_at.isoformat(),
+                "durationS": round(time.monotonic() - session.started, 3),
+                "intervalMs": self.interval * 1000,
+                "samples": samples,
+                # Approximate: sample counts times the interval
+                "ms": {kind: round(count * self.interval * 1000, 1) for kind, count in session.counts.items()},
+            }
+            with open(f"{base}.json", "w") as f:
+                json.dump(summary, f, indent=2)
+            self.logger.info("Profile %s (%s): %s samples written to %s.*", session.id, session.label, samples, base)
+        except OSError as e:
+            self.logger.error(f"Failed to write profile {session.id}: {e}", exc_info=True)
+
+
+profiler = Profiler()
@@ -0,0 +1,30 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, status, Header
+
+from ..middleware.admission import admission
+
+router = APIRouter(
+    prefix="/api/admission",
+)
+
+INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+
+
+async def verify_internal_api_key(x_api_key: str = Header(...)):
+    if x_api_key != INTERNAL_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API key"
+        )
+
+
+@router.get("/stats")
+async def admission_stats_endpoint(
+    _: None = Depends(verify_internal_api_key)
+):
+    """
+    Per route class: limits, in-flight and waiting requests, admitted and
+    shed counts, and time spent queueing for admission.
+    """
+    return {"status": "success", "data": admission.stats()}
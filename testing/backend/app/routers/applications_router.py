@@ -1,17 +1,24 @@
 import logging
 import os
+from urllib.parse import quote
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
+from fastapi.responses import StreamingResponse
 
 from ..models.application_model import ApplicationCreate, ApplicationUpdate
 from ..database.applications_handler import ApplicationsHandler
+from ..database.blob_handler import BlobHandler, BlobTooLarge
+from ..database.versions import versions, entity_etag
+from .conditional import not_modified
 
 router = APIRouter(
     prefix="/api/applications",
 )
 
 applications_handler = ApplicationsHandler()
+blob_handler = BlobHandler()
+APPLICATIONS = applications_handler.applications_collection_name
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 logger = logging.getLogger(__name__)
 
@@ -35,27 +42,19 @@ async def create_application_endpoint(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create application"
         )
-    return {"application_id": new_app.id}
-
-
-@router.get("/fetch/{application_id}")
-async def get_application_endpoint(
-    application_id: str,
-    _: None = Depends(verify_internal_api_key)
-):
-    app = await applications_handler.get_application_by_id(application_id)
-    if app is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Application not found"
-        )
-    return {"status": "success", "data": app}
+    return {"application_id": new_app.id, "possible_duplicates": new_app.possibleDuplicates or []}
 
 
+# Declared before /fetch/{id}, which would otherwise match it
 @router.get("/fetch/all")
 async def get_all_applications_endpoint(
+    request: Request,
+    response: Response,
     _: None = Depends(verify_internal_api_key)
 ):
+    unchanged = not_modified(request, response, versions.list_etag(APPLICATIONS))
+    if unchanged:
+        return unchanged
     apps = await applications_handler.get_all_applications()
     if apps is None:
         raise HTTPException(
@@ -67,8 +66,13 @@ async def get_all_applications_endpoint(
 
 @router.get("/fetch/pending")
 async def get_pending_applications_endpoint(
+    request: Request,
+    response: Response,
     _: None = Depends(verify_internal_api_key)
 ):
+    unchanged = not_modified(request, response, versions.list_etag(APPLICATIONS))
+    if unchanged:
+        return unchanged
     apps = await applications_handler.get_pending_applications()
     if apps is None:
         raise HTTPException(
@@ -78,6 +82,30 @@ async def get_pending_applications_endpoint(
     return {"status": "success", "data": apps}
 
 
+@router.get("/fetch/{application_id}")
+async def get_application_endpoint(
+    application_id: str,
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_internal_api_key)
+):
+    unchanged = not_modified(request, response, versions.cached_etag(APPLICATIONS, application_id))
+    if unchanged:
+        return unchanged
+    version = versions.version(APPLICATIONS)
+    app = await applications_handler.get_application_by_id(application_id)
+    if app is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Application not found"
+        )
+    etag = versions.remember(APPLICATIONS, application_id, entity_etag(APPLICATIONS, app), version)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
+    return {"status": "success", "data": app}
+
+
 @router.put("/update/{application_id}")
 async def update_application_endpoint(
     application_id: str,
@@ -142,3 +170,83 @@ async def reject_application_endpoint(
     return {"status": "success", "message": "Application rejected"}
 
 
+@router.get("/{application_id}/duplicates")
+async def get_application_duplicates_endpoint(
+    application_id: str,
+    _: None = Depends(verify_internal_api_key)
+):
+    """
+    Applications whose name, description or contact look like this one's,
+    most similar first, from the in-memory duplicate index.
+    """
+    duplicates = await applications_handler.find_duplicates(application_id)
+    if duplicates is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Application not found"
+        )
+    return {"status": "success", "data": duplicates}
+
+
+@router.put("/{application_id}/pitch-deck")
+async def upload_pitch_deck_endpoint(
+    application_id: str,
+    request: Request,
+    filename: str = "pitch-deck.pdf",
+    _: None = Depends(verify_internal_api_key)
+):
+    """
+    Upload the pitch deck as the raw request body (not multipart); it is
+    streamed into blob storage and the application keeps only a reference.
+    """
+    if not await applications_handler.application_exists(application_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Application not found"
+        )
+    try:
+        ref = await blob_handler.put(request.stream(), filename, request.headers.get("content-type"))
+    except BlobTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    if not await applications_handler.set_pitch_deck(application_id, ref):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to attach pitch deck"
+        )
+    return {"status": "success", "data": ref}
+
+
+@router.get("/{application_id}/pitch-deck")
+async def download_pitch_deck_endpoint(
+    application_id: str,
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_internal_api_key)
+):
+    ref = await applications_handler.get_pitch_deck(application_id)
+    if ref is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pitch deck not found"
+        )
+    # Blob content never changes, so its hash is a strong ETag
+    unchanged = not_modified(request, response, f'"{ref.sha256}"')
+    if unchanged:
+        return unchanged
+    grid_out = await blob_handler.open(ref.id)
+    if grid_out is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pitch deck not found"
+        )
+    headers = {
+        "ETag": response.headers["ETag"],
+        "Cache-Control": response.headers["Cache-Control"],
+        "Content-Length": str(ref.size),
+        "Content-Disposition": f"inline; filename*=UTF-8''{quote(ref.name)}",
+    }
+    return StreamingResponse(
+        blob_handler.iter_chunks(grid_out),
+        media_type=ref.contentType or "application/octet-stream",
+        headers=headers,
+    )
@@ -0,0 +1,27 @@
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2)
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in (tag.removeprefix("W/") for tag in candidates)
+
+
+def not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Put `etag` on the response; return a 304 to send instead when the
+    request's If-None-Match already has it.
+    no-cache makes HTTP caches (the renderer's included) revalidate every
+    time instead of serving a stale copy.
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return None
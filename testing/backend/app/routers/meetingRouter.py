@@ -1,19 +1,37 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, WebSocket, WebSocketDisconnect, Request, Response
 import os
 from ..models.meeting import MeetingCreationData
 from ..database.meetingHandler import MeetingHandler
+from ..database.versions import versions, entity_etag
+from .conditional import not_modified
 import asyncio
 import json
+import time
+from typing import Optional
 from ..models.meeting import TranscriptChunk
+from .meeting_protocol import SUBPROTOCOL, FrameType, ProtocolError, Reorderer, decode_frame, encode_frame
+from .meeting_outbox import DROPPABLE, RELIABLE, Outbox, OutboxOverflow, open_outboxes, totals
+from .transcript_hub import TranscriptHub, transcript_message
+from fastapi.websockets import WebSocketState
 
 router = APIRouter(
     prefix="/api/meetings",
 )
 
 meeting_handler = MeetingHandler()
+MEETINGS = meeting_handler.meeting_collection_name
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
+OUTBOX_SIZE = int(os.getenv("MEETING_WS_OUTBOX_SIZE", "256"))
+OUTBOX_MAX_LAG_S = float(os.getenv("MEETING_WS_MAX_LAG_S", "10"))
+transcript_hub = TranscriptHub(int(os.getenv("MEETING_TRANSCRIPT_BACKLOG", "256")))
+# How long a viewer waits for a transcript chunk published out of order before reading it from MongoDB
+TRANSCRIPT_GAP_S = float(os.getenv("MEETING_TRANSCRIPT_GAP_S", "1"))
+# Gap checks after which chunks that MongoDB does not have either are skipped
+TRANSCRIPT_GAP_RETRIES = 10
+# Longest an audio frame waits for the frames before it on the meeting socket
+REORDER_WAIT_S = float(os.getenv("MEETING_WS_REORDER_WAIT_MS", "500")) / 1000
 logger = logging.getLogger(__name__)
 
 
@@ -26,6 +44,19 @@ async def verify_internal_api_key(x_api_key: str = Header(...)):
         )
 
 
+# EventSource cannot send headers, so streams also take the key as ?x_api_key=, like the WebSockets
+async def verify_stream_api_key(
+        x_api_key: Optional[str] = Header(None),
+        query_key: Optional[str] = Query(None, alias="x_api_key")
+):
+    key = x_api_key or query_key
+    if key is None or key != INTERNAL_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing API key"
+        )
+
+
 @router.post("/create", status_code=status.HTTP_201_CREATED)
 async def create_meeting_endpoint(
         meeting_data: MeetingCreationData,
@@ -46,11 +77,38 @@ async def create_meeting_endpoint(
 
     return {"meeting_id": new_meeting.id, "vc_id": new_meeting.vc_id}
 
+# Declared before /fetch/{id}, which would otherwise match it
+@router.get("/fetch/all")
+async def get_all_meetings_endpoint(
+        request: Request,
+        response: Response,
+        _: None = Depends(verify_internal_api_key)
+):
+    unchanged = not_modified(request, response, versions.list_etag(MEETINGS))
+    if unchanged:
+        return unchanged
+    logger.info("Fetching all meetings")
+    output = await meeting_handler.get_all_meetings()
+    if output is None:
+        logger.warning("No meetings found in database")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No meetings found"
+        )
+    logger.debug("Successfully fetched %s meeting(s)", len(output))
+    return {"status": "success", "data": output}
+
 @router.get("/fetch/{meeting_id}")
 async def get_meeting_endpoint(
         meeting_id: str,
+        request: Request,
+        response: Response,
         _: None = Depends(verify_internal_api_key)
 ):
+    unchanged = not_modified(request, response, versions.cached_etag(MEETINGS, meeting_id))
+    if unchanged:
+        return unchanged
+    version = versions.version(MEETINGS)
 
     output = await meeting_handler.get_meeting_by_id(meeting_id)
 
@@ -60,6 +118,10 @@ async def get_meeting_endpoint(
             detail="Meeting not found"
         )
 
+    etag = versions.remember(MEETINGS, meeting_id, entity_etag(MEETINGS, output), version)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
     return {"status": "success", "data": output}
 
 
@@ -75,6 +137,22 @@ async def process_chat_query(text: str) -> str:
     return f"Chatbot reply to '{text}'"
 
 
+# Outbox policy per pushed message type (binary frame type or JSON "type"):
+# partial transcripts coalesce, acks and errors may be dropped, the rest never are
+PUSH_POLICIES = {
+    FrameType.TRANSCRIPT: (RELIABLE, None),
+    FrameType.TRANSCRIPT_PARTIAL: (DROPPABLE, "partial"),
+    FrameType.CHAT_RESPONSE: (RELIABLE, None),
+    FrameType.CONTROL_ACK: (DROPPABLE, None),
+    FrameType.ERROR: (DROPPABLE, None),
+    "transcript": (RELIABLE, None),
+    "transcript_partial": (DROPPABLE, "partial"),
+    "chat_response": (RELIABLE, None),
+    "control_ack": (DROPPABLE, None),
+    "error": (DROPPABLE, None),
+}
+
+
 @router.websocket("/ws/{meeting_id}")
 async def meeting_ws(
     ws: WebSocket,
@@ -86,78 +164,365 @@ async def meeting_ws(
         await ws.close(code=1008)
         return
 
-    await ws.accept()
-    print(f"Client connected for meeting {meeting_id}")
-
-    send_queue = asyncio.Queue()
+    # Clients offering the meeting.v1 subprotocol use binary frames (see meeting_protocol);
+    # others keep the JSON text protocol
+    binary = SUBPROTOCOL in ws.scope.get("subprotocols", [])
+    await ws.accept(subprotocol=SUBPROTOCOL if binary else None)
+    logger.info("Client connected for meeting %s (%s)", meeting_id, SUBPROTOCOL if binary else "json")
+
+    outbox = Outbox(meeting_id, SUBPROTOCOL if binary else "json", OUTBOX_SIZE, OUTBOX_MAX_LAG_S)
+    open_outboxes.add(outbox)
+    out_seq = 0
+
+    async def send(message):
+        nonlocal out_seq
+        if binary:
+            # Numbered when sent, so coalesced and dropped messages leave no gaps
+            frame_type, body, capture_us, msgpack_body = message
+            out_seq += 1
+            await ws.send_bytes(encode_frame(frame_type, out_seq, capture_us, body, msgpack_body))
+        else:
+            await ws.send_json(message)
 
     async def backend_push_task():
-        while True:
-            msg = await send_queue.get()
-            await ws.send_json(msg)
+        try:
+            await outbox.run(send)
+        except OutboxOverflow as e:
+            logger.warning("Disconnecting slow client from meeting %s: %s", meeting_id, e)
+            if ws.application_state != WebSocketState.DISCONNECTED:
+                # 1013: try again later
+                await ws.close(code=1013)
 
     push_task = asyncio.create_task(backend_push_task())
 
+    async def save_transcript(audio_chunk: bytes, captured_at: float, seq=None) -> str:
+        transcript_text = await process_audio_chunk(audio_chunk)
+
+        # Save transcript to MongoDB, then push it to live viewers
+        transcript_obj = TranscriptChunk(timestamp=captured_at, seq=seq, text=transcript_text)
+        position = await meeting_handler.append_transcript(meeting_id, transcript_obj)
+        if position is not None:
+            transcript_hub.publish(meeting_id, position, transcript_obj.model_dump())
+        return transcript_text
+
+    reorderer = Reorderer(max_wait=REORDER_WAIT_S)
+    use_msgpack = False
+
+    async def send_frame(frame_type: FrameType, body, capture_us: int):
+        policy, coalesce = PUSH_POLICIES[frame_type]
+        outbox.put((frame_type, body, capture_us, use_msgpack), policy, coalesce)
+
+    async def send_message(msg: dict):
+        policy, coalesce = PUSH_POLICIES[msg["type"]]
+        outbox.put(msg, policy, coalesce)
+
+    async def transcribe(frames):
+        for audio in frames:
+            text = await save_transcript(bytes(audio.payload), audio.capture_us / 1e6, audio.seq)
+            await send_frame(FrameType.TRANSCRIPT, text, audio.capture_us)
+
+    receive_task = None
     try:
         while True:
-            message = await ws.receive()
+            if receive_task is None:
+                receive_task = asyncio.create_task(ws.receive())
+            # Wake up when frames held back for a gap have waited long enough
+            done, _ = await asyncio.wait({receive_task}, timeout=reorderer.timeout())
+            if not done:
+                await transcribe(reorderer.expire())
+                continue
+            message, receive_task = receive_task.result(), None
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            if binary:
+                if message.get("bytes") is None:
+                    await send_frame(FrameType.ERROR, f"Text frames are not used with {SUBPROTOCOL}", 0)
+                    continue
+                try:
+                    frame = decode_frame(message["bytes"])
+                    use_msgpack = frame.msgpack
+                    if frame.type == FrameType.AUDIO:
+                        # Transcribed in sequence order, stamped with the client's capture time
+                        await transcribe(reorderer.push(frame))
+                    elif frame.type == FrameType.CONTROL:
+                        await send_frame(FrameType.CONTROL_ACK, {"status": "ok", "received": frame.body()}, frame.capture_us)
+                    elif frame.type == FrameType.CHAT:
+                        await send_frame(FrameType.CHAT_RESPONSE, await process_chat_query(frame.body()), frame.capture_us)
+                    else:
+                        await send_frame(FrameType.ERROR, "Unexpected frame type", frame.capture_us)
+                except ProtocolError as e:
+                    await send_frame(FrameType.ERROR, str(e), 0)
 
-            if "text" in message:
+            elif "text" in message and message["text"] is not None:
                 try:
                     payload = json.loads(message["text"])
                     msg_type = payload.get("type")
                     data = payload.get("data")
 
                     if msg_type == "control":
-                        await send_queue.put({
+                        await send_message({
                             "type": "control_ack",
                             "data": {"status": "ok", "received": data}
                         })
 
                     elif msg_type == "chat":
                         reply = await process_chat_query(data)
-                        await send_queue.put({
+                        await send_message({
                             "type": "chat_response",
                             "data": reply
                         })
 
                     else:
-                        await send_queue.put({"type": "error", "data": "Unknown text message type"})
+                        await send_message({"type": "error", "data": "Unknown text message type"})
                 except json.JSONDecodeError:
-                    await send_queue.put({"type": "error", "data": "Invalid JSON"})
-
-            elif "bytes" in message:
-                audio_chunk = message["bytes"]
-                transcript_text = await process_audio_chunk(audio_chunk)
-
-                # Save transcript to MongoDB
-                transcript_obj = TranscriptChunk(
-                    timestamp=asyncio.get_event_loop().time(),
-                    text=transcript_text
-                )
-                await meeting_handler.meetings_collection.update_one(
-                    {"_id": meeting_id},
-                    {"$push": {"transcript": transcript_obj.model_dump()}}
-                )
-
-                await send_queue.put({
+                    await send_message({"type": "error", "data": "Invalid JSON"})
+
+            elif message.get("bytes") is not None:
+                # Untagged audio; arrival time is the best available timestamp
+                transcript_text = await save_transcript(message["bytes"], time.time())
+
+                await send_message({
                     "type": "transcript",
                     "data": transcript_text
                 })
 
     except WebSocketDisconnect:
-        print(f"Client disconnected from meeting {meeting_id}")
+        logger.info("Client disconnected from meeting %s", meeting_id)
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.warning("WebSocket error on meeting %s: %s", meeting_id, e)
     finally:
+        if receive_task is not None:
+            receive_task.cancel()
+        # Audio still waiting for a gap is stored anyway; there is nobody left to reply to
+        try:
+            for audio in reorderer.flush():
+                await save_transcript(bytes(audio.payload), audio.capture_us / 1e6, audio.seq)
+        except Exception as e:
+            logger.warning("Failed to store held-back audio of meeting %s: %s", meeting_id, e)
         push_task.cancel()
-        await ws.close()
+        open_outboxes.discard(outbox)
+        if ws.application_state != WebSocketState.DISCONNECTED:
+            await ws.close()
+
+@router.get("/{meeting_id}/transcript")
+async def get_transcript_endpoint(
+        meeting_id: str,
+        since: Optional[float] = Query(None, description="Only chunks captured at or after this time (seconds since epoch)"),
+        until: Optional[float] = Query(None, description="Only chunks captured before this time (seconds since epoch)"),
+        after_seq: int = Query(0, ge=0, description="Only chunks after this position"),
+        limit: int = Query(500, ge=1, le=5000),
+        _: None = Depends(verify_internal_api_key)
+):
+    """
+    Part of a meeting's transcript, without the rest of the meeting. Chunks
+    are returned as {"seq": position, "data": chunk}, like the live feed;
+    pass the last `seq` as `after_seq` to fetch the next page or new chunks.
+    """
+    result = await meeting_handler.get_transcript_slice(meeting_id, after_seq, limit, since, until)
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Meeting not found"
+        )
+
+    total, chunks = result
+    return {"status": "success", "data": {
+        "total": total,
+        "chunks": [{"seq": seq, "data": chunk.model_dump()} for seq, chunk in chunks],
+        "lastSeq": chunks[-1][0] if chunks else after_seq,
+    }}
+
+
+async def follow_transcript(meeting_id: str, since: int, outbox: Outbox, send):
+    """
+    Send a viewer the transcript chunks after `since`, then live chunks as
+    the ingest socket stores them, until the client goes away or falls
+    behind (OutboxOverflow). Catch-up is sent directly, so a long transcript
+    does not have to fit in the outbox.
+    """
+    subscriber = transcript_hub.subscribe(meeting_id, outbox, since)
+    try:
+        backlog = transcript_hub.backlog_since(meeting_id, since)
+        if backlog is None:
+            _, chunks = await meeting_handler.get_transcript_slice(meeting_id, after_seq=since) or (0, [])
+            backlog = [transcript_message(seq, chunk.model_dump()) for seq, chunk in chunks]
+        for message in backlog:
+            await send(message)
+            subscriber.last_seq = message["seq"]
+        transcript_hub.go_live(subscriber)
+        gap_task = asyncio.create_task(fill_transcript_gaps(meeting_id, subscriber))
+        try:
+            await outbox.run(send)
+        finally:
+            gap_task.cancel()
+    finally:
+        transcript_hub.unsubscribe(meeting_id, subscriber)
+
+
+async def fill_transcript_gaps(meeting_id: str, subscriber):
+    """
+    Read chunks that a viewer is missing from MongoDB. Live chunks can be
+    published out of order, or by another API process; the chunks after a
+    gap are held back until TRANSCRIPT_GAP_S passes without progress, then
+    the gap is read. If it is still missing after TRANSCRIPT_GAP_RETRIES
+    checks it is skipped.
+    """
+    misses = 0
+    while True:
+        await asyncio.sleep(TRANSCRIPT_GAP_S)
+        gap = subscriber.gap()
+        if gap is None or time.monotonic() - subscriber.gap_since < TRANSCRIPT_GAP_S:
+            misses = 0
+            continue
+        after, before = gap
+        _, chunks = await meeting_handler.get_transcript_slice(meeting_id, after_seq=after, limit=before - after - 1) or (0, [])
+        for seq, chunk in chunks:
+            subscriber.deliver(transcript_message(seq, chunk.model_dump()))
+        if subscriber.gap() != gap:
+            misses = 0
+            continue
+        misses += 1
+        if misses >= TRANSCRIPT_GAP_RETRIES:
+            logger.warning("Skipping missing transcript chunks %s-%s of meeting %s", after + 1, before - 1, meeting_id)
+            subscriber.skip_gap()
+            misses = 0
+
+
+@router.websocket("/ws/{meeting_id}/transcript")
+async def meeting_transcript_ws(
+    ws: WebSocket,
+    meeting_id: str,
+    x_api_key: str,
+    since: int = 0
+):
+    """
+    Read-only live transcript. Each message is
+    {"type": "transcript", "seq": n, "data": chunk}; reconnect with
+    ?since=<last seq> to resume.
+    """
+    if x_api_key != INTERNAL_API_KEY:
+        await ws.close(code=1008)
+        return
+
+    await ws.accept()
+    outbox = Outbox(meeting_id, "viewer-ws", OUTBOX_SIZE, OUTBOX_MAX_LAG_S)
+    open_outboxes.add(outbox)
+    push_task = asyncio.create_task(follow_transcript(meeting_id, since, outbox, ws.send_json))
+    receive_task = asyncio.create_task(ws.receive())
+    try:
+        while True:
+            # Viewers do not send anything; only watch for the disconnect
+            done, _ = await asyncio.wait({push_task, receive_task}, return_when=asyncio.FIRST_COMPLETED)
+            if push_task in done:
+                push_task.result()
+                break
+            if receive_task.result()["type"] == "websocket.disconnect":
+                break
+            receive_task = asyncio.create_task(ws.receive())
+    except OutboxOverflow as e:
+        logger.warning("Disconnecting slow transcript viewer of meeting %s: %s", meeting_id, e)
+        await ws.close(code=1013)
+    except Exception as e:
+        logger.warning("Transcript WebSocket error on meeting %s: %s", meeting_id, e)
+    finally:
+        push_task.cancel()
+        receive_task.cancel()
+        open_outboxes.discard(outbox)
+        if ws.application_state != WebSocketState.DISCONNECTED:
+            await ws.close()
+
+
+class TranscriptEventStream(Response):
+    """
+    Server-sent events for one transcript viewer. Each chunk is an event
+    with the chunk's sequence number as its id, so a reconnecting
+    EventSource resumes with Last-Event-ID.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, meeting_id: str, since: int):
+        self.meeting_id = meeting_id
+        self.since = since
+        self.status_code = 200
+        self.background = None
+        self.raw_headers = [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            # Keeps reverse proxies from buffering the stream
+            (b"x-accel-buffering", b"no"),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        async def send_event(message: dict):
+            event = f"id: {message['seq']}\nevent: transcript\ndata: {json.dumps(message['data'])}\n\n"
+            await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+
+        async def wait_for_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        outbox = Outbox(self.meeting_id, "viewer-sse", OUTBOX_SIZE, OUTBOX_MAX_LAG_S)
+        open_outboxes.add(outbox)
+        stream_task = asyncio.create_task(follow_transcript(self.meeting_id, self.since, outbox, send_event))
+        disconnect_task = asyncio.create_task(wait_for_disconnect())
+        try:
+            await asyncio.wait({stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+            if stream_task.done():
+                try:
+                    stream_task.result()
+                except OutboxOverflow as e:
+                    logger.warning("Ending slow transcript stream of meeting %s: %s", self.meeting_id, e)
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            stream_task.cancel()
+            disconnect_task.cancel()
+            open_outboxes.discard(outbox)
+
+
+@router.get("/{meeting_id}/transcript/stream")
+async def stream_transcript_endpoint(
+        meeting_id: str,
+        since: int = 0,
+        last_event_id: Optional[int] = Header(None),
+        _: None = Depends(verify_stream_api_key)
+):
+    """
+    Live transcript as server-sent events, starting after chunk `since`
+    (or the Last-Event-ID of a reconnecting EventSource).
+    """
+    return TranscriptEventStream(meeting_id, max(since, last_event_id or 0))
+
+
+@router.get("/connections")
+async def get_connections_endpoint(
+        _: None = Depends(verify_internal_api_key)
+):
+    """
+    Outbound queue depth, lag and message counts for each open meeting
+    WebSocket in this process, plus totals since start.
+    """
+    connections = sorted((outbox.stats() for outbox in open_outboxes), key=lambda c: -c["lagMs"])
+    return {"status": "success", "data": {
+        "connections": connections,
+        "totals": dict(totals),
+        "transcriptHub": transcript_hub.stats(),
+    }}
 
 @router.get("/fetch_by_vc/{vc_id}")
 async def get_meetings_by_vc_endpoint(
         vc_id: str,
+        request: Request,
+        response: Response,
         _: None = Depends(verify_internal_api_key)
 ):
+    unchanged = not_modified(request, response, versions.list_etag(MEETINGS))
+    if unchanged:
+        return unchanged
     output = await meeting_handler.get_meetings_by_vc_id(vc_id)
 
     if output is None:
@@ -176,13 +541,13 @@ async def update_meeting_endpoint(
     success = await meeting_handler.update_meeting(meeting)
 
     if not success:
-        logger.error(f"Failed to update Meeting with ID: {meeting.id}")
+        logger.error("Failed to update Meeting with ID: %s", meeting.id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update meeting"
         )
 
-    logger.info(f"Updated Meeting with ID: {meeting.id}")
+    logger.info("Updated Meeting with ID: %s", meeting.id)
     return {"status": "success", "message": "Meeting updated successfully"}
 
 
@@ -192,38 +557,22 @@ async def delete_meeting_endpoint(
         _: None = Depends(verify_internal_api_key)
 ):
     meeting = await meeting_handler.get_meeting_by_id(meeting_id)
-    logger.info(f"Deleting meeting with ID: {meeting.id}")
     if not meeting:
-        logger.warning(f"Meeting with ID: {meeting.id} not found")
+        logger.warning("Meeting with ID: %s not found", meeting_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Meeting not found"
         )
 
+    logger.info("Deleting meeting with ID: %s", meeting.id)
     success = await meeting_handler.delete_meeting(meeting)
 
-
     if not success:
-        logger.error(f"Meeting with ID: {meeting.id} not found")
+        logger.error("Failed to delete Meeting with ID: %s", meeting.id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to delete meeting"
         )
 
-    logger.info(f"Meeting with ID: {meeting.id} deleted successfully")
+    logger.info("Meeting with ID: %s deleted successfully", meeting.id)
     return {"status": "success", "message": "Meeting deleted successfully"}
-
-@router.get("/fetch/all")
-async def get_all_meetings_endpoint(
-        _: None = Depends(verify_internal_api_key)
-):
-    logger.info("Fetching all meetings")
-    output = await meeting_handler.get_all_meetings()
-    if output is None:
-        logger.warning("No meetings found in database")
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No meetings found"
-        )
-    logger.info(f"Successfully fetched {len(output)} meeting(s)")
-    return {"status": "success", "data": output}
\ No newline at end of file
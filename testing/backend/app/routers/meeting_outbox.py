@@ -0,0 +1,129 @@
+"""
+Bounded queue for the messages a meeting WebSocket pushes to its client.
+A client on a slow network cannot make the server buffer without limit:
+consecutive partial transcripts collapse into the latest one, acks are
+dropped when the outbox is full, and a client that falls too far behind
+on messages that must not be dropped is disconnected.
+"""
+import time
+import asyncio
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Optional, Set
+
+# Delivery policies
+RELIABLE = "reliable"    # chat responses and final transcripts; never dropped
+DROPPABLE = "droppable"  # acks, errors and partial transcripts; dropped when the outbox is full
+
+# Message and closed-connection counts across all connections since start
+totals: Counter = Counter()
+
+
+class OutboxOverflow(Exception):
+    """The client fell too far behind; its connection should be closed."""
+
+
+class Outbox:
+    """
+    Holds at most `max_messages` unsent messages for one connection. A
+    message put with a `coalesce` key replaces the newest queued message
+    if it has the same key. Putting a RELIABLE message into a full outbox,
+    or the oldest unsent message becoming older than `max_lag_s`, closes
+    the outbox; run() then raises OutboxOverflow.
+    """
+
+    def __init__(self, meeting_id: str, protocol: str, max_messages: int, max_lag_s: float):
+        self.meeting_id = meeting_id
+        self.protocol = protocol
+        self.max_messages = max_messages
+        self.max_lag_s = max_lag_s
+        self.entries = deque()  # [message, coalesce key, enqueued at]
+        self.ready = asyncio.Event()
+        self.closed: Optional[str] = None
+        self.inflight_since: Optional[float] = None
+        self.connected_at = time.monotonic()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def lag(self) -> float:
+        """Age in seconds of the oldest message not yet written to the socket."""
+        oldest = self.inflight_since
+        if oldest is None and self.entries:
+            oldest = self.entries[0][2]
+        return 0.0 if oldest is None else time.monotonic() - oldest
+
+    def put(self, message: Any, policy: str = RELIABLE, coalesce: Optional[str] = None) -> bool:
+        """Queue a message without waiting. Returns False if it was not queued."""
+        if self.closed is not None:
+            return False
+        if coalesce is not None and self.entries and self.entries[-1][1] == coalesce:
+            # Still unsent: the client only needs the latest one; keep its place and age
+            self.entries[-1][0] = message
+            self.coalesced += 1
+            totals["coalesced"] += 1
+            return True
+        if len(self.entries) >= self.max_messages:
+            if policy == DROPPABLE:
+                self.dropped += 1
+                totals["dropped"] += 1
+                return False
+            self._close(f"outbox full ({len(self.entries)} messages)")
+            return False
+        if self.lag() > self.max_lag_s:
+            self._close(f"client {self.lag():.1f}s behind")
+            return False
+        self.entries.append([message, coalesce, time.monotonic()])
+        self.max_depth = max(self.max_depth, len(self.entries))
+        self.ready.set()
+        return True
+
+    def _close(self, reason: str):
+        self.closed = reason
+        totals["closed"] += 1
+        self.ready.set()
+
+    async def run(self, send: Callable[[Any], Awaitable[None]]):
+        """
+        Send queued messages in order until the outbox is closed. A single
+        send may take at most the remaining lag budget of its message.
+        """
+        while True:
+            if self.closed is not None:
+                raise OutboxOverflow(self.closed)
+            if not self.entries:
+                self.ready.clear()
+                await self.ready.wait()
+                continue
+            if self.lag() > self.max_lag_s:
+                self._close(f"client {self.lag():.1f}s behind")
+                continue
+            message, _, enqueued = self.entries.popleft()
+            self.inflight_since = enqueued
+            budget = self.max_lag_s - (time.monotonic() - enqueued)
+            try:
+                await asyncio.wait_for(send(message), timeout=max(budget, 0.001))
+            except asyncio.TimeoutError:
+                self._close(f"send stalled for {self.max_lag_s:.1f}s")
+                continue
+            finally:
+                self.inflight_since = None
+            self.sent += 1
+            totals["sent"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "meetingId": self.meeting_id,
+            "protocol": self.protocol,
+            "connectedS": round(time.monotonic() - self.connected_at, 1),
+            "depth": len(self.entries),
+            "maxDepth": self.max_depth,
+            "lagMs": round(self.lag() * 1000, 1),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+
+# Outboxes of the open connections in this process
+open_outboxes: Set[Outbox] = set()
@@ -0,0 +1,182 @@
+"""
+Binary framing for the meeting WebSocket, negotiated with the
+`meeting.v1` subprotocol. Every message is one binary frame:
+
+    0       1       2       3       4               8                       16
+    +-------+-------+-------+-------+---------------+-----------------------+---------
+    |version| type  | flags |  (0)  |  seq (u32)    |  capture time (u64 µs) | payload
+    +-------+-------+-------+-------+---------------+-----------------------+---------
+
+All integers are big-endian. `seq` counts frames per direction and
+sender. The capture time is the sender's wall clock in microseconds since
+the Unix epoch, when the audio was recorded or the message was written.
+Server replies carry the capture time of the frame they answer.
+
+Audio payloads are raw audio bytes. Control bodies are JSON, or MessagePack
+when FLAG_MSGPACK is set. Chat, transcript and error bodies are UTF-8 text,
+or a MessagePack string with FLAG_MSGPACK. The server answers in the
+encoding of the client's last frame.
+"""
+import json
+import time
+import struct
+from enum import IntEnum
+from typing import Any, Dict, List, Optional
+
+# MessagePack bodies are optional; without msgpack installed only JSON/UTF-8 bodies are accepted.
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+SUBPROTOCOL = "meeting.v1"
+VERSION = 1
+HEADER = struct.Struct("!BBBxIQ")
+
+FLAG_MSGPACK = 0x01
+
+
+class FrameType(IntEnum):
+    # client -> server
+    AUDIO = 0x01
+    CONTROL = 0x02
+    CHAT = 0x03
+    # server -> client
+    CONTROL_ACK = 0x82
+    CHAT_RESPONSE = 0x83
+    TRANSCRIPT = 0x84
+    TRANSCRIPT_PARTIAL = 0x85  # superseded by the next partial or the final TRANSCRIPT
+    ERROR = 0xFF
+
+
+# Types whose body is a structured value rather than text
+STRUCTURED = {FrameType.CONTROL, FrameType.CONTROL_ACK}
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class Frame:
+    __slots__ = ("type", "flags", "seq", "capture_us", "payload")
+
+    def __init__(self, frame_type: FrameType, flags: int, seq: int, capture_us: int, payload: bytes):
+        self.type = frame_type
+        self.flags = flags
+        self.seq = seq
+        self.capture_us = capture_us
+        self.payload = payload
+
+    @property
+    def msgpack(self) -> bool:
+        return bool(self.flags & FLAG_MSGPACK)
+
+    def body(self) -> Any:
+        """The decoded control or text body."""
+        if self.msgpack:
+            if msgpack is None:
+                raise ProtocolError("MessagePack bodies are not supported by this server")
+            try:
+                return msgpack.unpackb(self.payload, raw=False)
+            except (ValueError, TypeError) as e:
+                raise ProtocolError(f"Invalid MessagePack body: {e}")
+        try:
+            text = bytes(self.payload).decode("utf-8")
+            return json.loads(text) if self.type in STRUCTURED else text
+        except ValueError as e:
+            raise ProtocolError(f"Invalid body: {e}")
+
+
+def decode_frame(data: bytes) -> Frame:
+    if len(data) < HEADER.size:
+        raise ProtocolError("Frame shorter than its header")
+    version, frame_type, flags, seq, capture_us = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+    try:
+        frame_type = FrameType(frame_type)
+    except ValueError:
+        raise ProtocolError(f"Unknown frame type {frame_type}")
+    # A memoryview avoids copying audio payloads
+    return Frame(frame_type, flags, seq, capture_us, memoryview(data)[HEADER.size:])
+
+
+def encode_frame(frame_type: FrameType, seq: int, capture_us: int, body: Any, use_msgpack: bool = False) -> bytes:
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        payload, flags = bytes(body), 0
+    elif use_msgpack and msgpack is not None:
+        payload, flags = msgpack.packb(body), FLAG_MSGPACK
+    elif frame_type in STRUCTURED:
+        payload, flags = json.dumps(body, separators=(",", ":")).encode(), 0
+    else:
+        payload, flags = str(body).encode(), 0
+    return HEADER.pack(VERSION, frame_type, flags, seq & 0xFFFFFFFF, capture_us) + payload
+
+
+class Reorderer:
+    """
+    Releases frames in sequence order. Frames that arrive early wait until
+    the gap before them is filled; the gap is given up on once more than
+    `window` frames are waiting, or once frames have waited `max_wait`
+    seconds without progress (see expire()). Duplicates and frames behind
+    the released sequence are dropped.
+    """
+
+    def __init__(self, window: int = 32, max_wait: float = 0.5):
+        self.window = window
+        self.max_wait = max_wait
+        self.next_seq: Optional[int] = None
+        self.pending: Dict[int, Frame] = {}
+        # When frames last started waiting, or the waiting ones last made progress
+        self.waiting_since: Optional[float] = None
+        self.skipped = 0
+        self.dropped = 0
+
+    def push(self, frame: Frame) -> List[Frame]:
+        if self.next_seq is None:
+            self.next_seq = frame.seq
+        if frame.seq < self.next_seq or frame.seq in self.pending:
+            self.dropped += 1
+            return []
+        self.pending[frame.seq] = frame
+        ready = self._release()
+        while len(self.pending) > self.window:
+            # Missing frames are not coming; continue from the oldest waiting one
+            ready += self._skip_gap()
+        return ready
+
+    def timeout(self) -> Optional[float]:
+        """Seconds until expire() should be called, or None while nothing waits."""
+        if not self.pending:
+            return None
+        return max(0.0, self.waiting_since + self.max_wait - time.monotonic())
+
+    def expire(self) -> List[Frame]:
+        """Give up on the gap once the waiting frames have waited `max_wait`."""
+        if not self.pending or time.monotonic() - self.waiting_since < self.max_wait:
+            return []
+        return self._skip_gap()
+
+    def flush(self) -> List[Frame]:
+        """Release every waiting frame in order, e.g. when the sender disconnects."""
+        ready = []
+        while self.pending:
+            ready += self._skip_gap()
+        return ready
+
+    def _skip_gap(self) -> List[Frame]:
+        oldest = min(self.pending)
+        self.skipped += oldest - self.next_seq
+        self.next_seq = oldest
+        return self._release()
+
+    def _release(self) -> List[Frame]:
+        ready = []
+        while self.next_seq in self.pending:
+            ready.append(self.pending.pop(self.next_seq))
+            self.next_seq += 1
+        if not self.pending:
+            self.waiting_since = None
+        elif ready or self.waiting_since is None:
+            self.waiting_since = time.monotonic()
+        return ready
@@ -1,18 +1,30 @@
 import logging
 import os
+from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request, Response
 
 from ..models.startup_model import StartupCreate, StartupUpdate
 from ..database.startups_handler import StartupsHandler
+from ..database.versions import versions, entity_etag
+from .conditional import not_modified
 
 router = APIRouter(
     prefix="/api/startups",
 )
 
 startups_handler = StartupsHandler()
+STARTUPS = startups_handler.startups_collection_name
+# Collections an overview is built from
+OVERVIEW_COLLECTIONS = (
+    STARTUPS,
+    startups_handler.applications_collection_name,
+    startups_handler.meeting_collection_name,
+)
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 logger = logging.getLogger(__name__)
+# Upper bound on ids per batched overview request
+MAX_OVERVIEW_IDS = 100
 
 
 async def verify_internal_api_key(x_api_key: str = Header(...)):
@@ -37,31 +49,95 @@ async def create_startup_endpoint(
     return {"startup_id": new_startup.id}
 
 
+# Declared before /fetch/{id}, which would otherwise match it
+@router.get("/fetch/all")
+async def get_all_startups_endpoint(
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_internal_api_key)
+):
+    unchanged = not_modified(request, response, versions.list_etag(STARTUPS))
+    if unchanged:
+        return unchanged
+    sts = await startups_handler.get_all_startups()
+    if sts is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No startups found"
+        )
+    return {"status": "success", "data": sts}
+
+
 @router.get("/fetch/{startup_id}")
 async def get_startup_endpoint(
     startup_id: str,
+    request: Request,
+    response: Response,
     _: None = Depends(verify_internal_api_key)
 ):
+    unchanged = not_modified(request, response, versions.cached_etag(STARTUPS, startup_id))
+    if unchanged:
+        return unchanged
+    version = versions.version(STARTUPS)
     st = await startups_handler.get_startup_by_id(startup_id)
     if st is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Startup not found"
         )
+    etag = versions.remember(STARTUPS, startup_id, entity_etag(STARTUPS, st), version)
+    unchanged = not_modified(request, response, etag)
+    if unchanged:
+        return unchanged
     return {"status": "success", "data": st}
 
 
-@router.get("/fetch/all")
-async def get_all_startups_endpoint(
+@router.get("/overview")
+async def get_startup_overviews_endpoint(
+    request: Request,
+    response: Response,
+    ids: List[str] = Query(...),
     _: None = Depends(verify_internal_api_key)
 ):
-    sts = await startups_handler.get_all_startups()
-    if sts is None:
+    if len(ids) > MAX_OVERVIEW_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_OVERVIEW_IDS} ids per request"
+        )
+    unchanged = not_modified(request, response, versions.list_etag(*OVERVIEW_COLLECTIONS))
+    if unchanged:
+        return unchanged
+    overviews = await startups_handler.get_startup_overviews(ids)
+    if overviews is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch startup overviews"
+        )
+    return {"status": "success", "data": overviews}
+
+
+@router.get("/{startup_id}/overview")
+async def get_startup_overview_endpoint(
+    startup_id: str,
+    request: Request,
+    response: Response,
+    _: None = Depends(verify_internal_api_key)
+):
+    unchanged = not_modified(request, response, versions.list_etag(*OVERVIEW_COLLECTIONS))
+    if unchanged:
+        return unchanged
+    overviews = await startups_handler.get_startup_overviews([startup_id])
+    if overviews is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch startup overview"
+        )
+    if not overviews:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="No startups found"
+            detail="Startup not found"
         )
-    return {"status": "success", "data": sts}
+    return {"status": "success", "data": overviews[0]}
 
 
 @router.put("/update/{startup_id}")
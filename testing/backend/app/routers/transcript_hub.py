@@ -0,0 +1,152 @@
+"""
+In-process fan-out of live meeting transcripts. The meeting's ingest
+WebSocket publishes each stored chunk once; read-only viewers (WebSocket
+or SSE) receive it through their own bounded Outbox.
+
+A chunk's sequence number is its 1-based position in the meeting's
+`transcript` array, so it stays valid across reconnects and restarts. A
+viewer that reconnects with the last sequence it saw is caught up from the
+hub's backlog when it reaches back far enough, otherwise from MongoDB.
+
+Chunks can be published out of order, e.g. when two ingest sockets of one
+meeting finish their appends in the opposite order. Each subscriber holds
+back chunks that arrive ahead of a missing one, so a viewer always
+receives the transcript in sequence.
+"""
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from .meeting_outbox import RELIABLE, Outbox
+
+
+def transcript_message(seq: int, chunk: dict) -> dict:
+    return {"type": "transcript", "seq": seq, "data": chunk}
+
+
+class Subscriber:
+    __slots__ = ("outbox", "last_seq", "pending", "waiting", "gap_since")
+
+    def __init__(self, outbox: Outbox, since: int):
+        self.outbox = outbox
+        self.last_seq = since
+        # Live chunks published while the subscriber is being caught up
+        self.pending: Optional[List[dict]] = []
+        # Chunks that arrived ahead of a missing one, by sequence
+        self.waiting: Dict[int, dict] = {}
+        # When the subscriber last made progress while chunks were waiting
+        self.gap_since: Optional[float] = None
+
+    def deliver(self, message: dict):
+        seq = message["seq"]
+        # Catch-up and live chunks may overlap; each sequence is sent once
+        if seq <= self.last_seq:
+            return
+        if seq > self.last_seq + 1:
+            self.waiting[seq] = message
+            if self.gap_since is None:
+                self.gap_since = time.monotonic()
+            if len(self.waiting) > self.outbox.max_messages:
+                self.skip_gap()
+            return
+        self._send(message)
+        while self.last_seq + 1 in self.waiting:
+            self._send(self.waiting.pop(self.last_seq + 1))
+        self.gap_since = time.monotonic() if self.waiting else None
+
+    def gap(self) -> Optional[Tuple[int, int]]:
+        """(last sequence sent, first sequence held back) while a chunk is missing."""
+        if not self.waiting:
+            return None
+        return self.last_seq, min(self.waiting)
+
+    def skip_gap(self):
+        """Give up on the missing chunks and send the held-back ones in order."""
+        for seq in sorted(self.waiting):
+            self._send(self.waiting[seq])
+        self.waiting.clear()
+        self.gap_since = None
+
+    def _send(self, message: dict):
+        self.last_seq = message["seq"]
+        self.outbox.put(message, RELIABLE)
+
+
+class Topic:
+    __slots__ = ("backlog", "subscribers")
+
+    def __init__(self, backlog: int):
+        self.backlog = deque(maxlen=backlog)
+        self.subscribers: Set[Subscriber] = set()
+
+
+class TranscriptHub:
+    """
+    A topic exists only while a meeting has viewers; publishing to a meeting
+    nobody watches costs one dict lookup. Each topic keeps its last
+    `backlog` messages for catch-up.
+    """
+
+    def __init__(self, backlog: int):
+        self.backlog = backlog
+        self.topics: Dict[str, Topic] = {}
+        self.published = 0
+
+    def publish(self, meeting_id: str, seq: int, chunk: dict):
+        topic = self.topics.get(meeting_id)
+        if topic is None:
+            return
+        message = transcript_message(seq, chunk)
+        topic.backlog.append(message)
+        self.published += 1
+        for subscriber in topic.subscribers:
+            if subscriber.pending is not None:
+                subscriber.pending.append(message)
+            else:
+                subscriber.deliver(message)
+
+    def subscribe(self, meeting_id: str, outbox: Outbox, since: int) -> Subscriber:
+        """
+        Register a viewer that has seen chunks up to `since`. Live chunks are
+        held back until go_live(), after the caller has sent the catch-up.
+        """
+        topic = self.topics.get(meeting_id)
+        if topic is None:
+            topic = self.topics[meeting_id] = Topic(self.backlog)
+        subscriber = Subscriber(outbox, since)
+        topic.subscribers.add(subscriber)
+        return subscriber
+
+    def backlog_since(self, meeting_id: str, since: int) -> Optional[List[dict]]:
+        """
+        Messages after `since` in sequence order, or None if the backlog does
+        not hold every one of them.
+        """
+        topic = self.topics.get(meeting_id)
+        if topic is None or not topic.backlog:
+            return None
+        newer = {message["seq"]: message for message in topic.backlog if message["seq"] > since}
+        messages = [newer[seq] for seq in sorted(newer)]
+        if any(message["seq"] != since + i for i, message in enumerate(messages, 1)):
+            return None
+        return messages
+
+    def go_live(self, subscriber: Subscriber):
+        pending, subscriber.pending = subscriber.pending, None
+        for message in pending:
+            subscriber.deliver(message)
+
+    def unsubscribe(self, meeting_id: str, subscriber: Subscriber):
+        topic = self.topics.get(meeting_id)
+        if topic is None:
+            return
+        topic.subscribers.discard(subscriber)
+        if not topic.subscribers:
+            del self.topics[meeting_id]
+
+    def stats(self) -> dict:
+        return {
+            "meetings": len(self.topics),
+            "subscribers": sum(len(topic.subscribers) for topic in self.topics.values()),
+            "published": self.published,
+        }
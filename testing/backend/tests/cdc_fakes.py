@@ -0,0 +1,104 @@
+"""
+In-memory stand-ins for the pymongo objects the CDC sources use: snapshot
+sessions, find cursors, change streams and the resume token collection.
+"""
+from bson import Timestamp
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = {document["_id"]: dict(document) for document in documents}
+
+    def find(self, query=None, session=None, batch_size=None):
+        return iter([dict(document) for document in self.documents.values()])
+
+    def find_one(self, query):
+        document = self.documents.get(query["_id"])
+        return dict(document) if document is not None else None
+
+    def update_one(self, query, update, upsert=False):
+        document = self.documents.setdefault(query["_id"], {"_id": query["_id"]})
+        document.update(update["$set"])
+
+    def delete_one(self, query):
+        self.documents.pop(query["_id"], None)
+
+
+class FakeSession:
+    def __init__(self, operation_time: Timestamp):
+        self.operation_time = operation_time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeChangeStream:
+    """Returns its changes, then None once, then ends."""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.alive = True
+        self.resume_token = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def try_next(self):
+        if not self.changes:
+            self.alive = False
+            return None
+        change = self.changes.pop(0)
+        self.resume_token = change["_id"]
+        return change
+
+
+class FakeDatabase:
+    def __init__(self, collections, streams):
+        self.collections = {name: FakeCollection(documents) for name, documents in collections.items()}
+        self.streams = list(streams)
+        self.watches = []
+
+    def __getitem__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def watch(self, pipeline, resume_after=None, start_at_operation_time=None, max_await_time_ms=None):
+        self.watches.append({"resume_after": resume_after, "start_at": start_at_operation_time})
+        stream = self.streams.pop(0)
+        if isinstance(stream, Exception):
+            raise stream
+        return stream
+
+
+class FakeClient:
+    def __init__(self, collections=None, streams=(), snapshot_time=Timestamp(100, 1)):
+        self.db = FakeDatabase(collections or {}, streams)
+        self.snapshot_time = snapshot_time
+        self.closed = False
+
+    def __getitem__(self, name):
+        return self.db
+
+    def start_session(self, snapshot=False):
+        return FakeSession(self.snapshot_time)
+
+    def close(self):
+        self.closed = True
+
+
+def change(operation: str, doc_id, token: str, time: int, inc: int = 1, **fields) -> dict:
+    """A change stream document."""
+    document = {
+        "_id": {"_data": token},
+        "operationType": operation,
+        "documentKey": {"_id": doc_id},
+        "ns": {"db": "crm", "coll": fields.pop("collection", "applications")},
+        "clusterTime": Timestamp(time, inc),
+    }
+    document.update(fields)
+    return document
@@ -0,0 +1,7 @@
+import os
+
+# Handlers and routers read their configuration at import. Clients connect
+# lazily, so nothing here reaches a server.
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "crm_test")
+os.environ.setdefault("INTERNAL_API_KEY", "test-key")
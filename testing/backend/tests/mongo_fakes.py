@@ -0,0 +1,57 @@
+"""
+In-memory stand-ins for AsyncMongoClient sessions and cursors, for handler
+tests that check what a handler does with the results of its queries.
+"""
+from typing import Optional
+
+from bson import Timestamp
+
+
+class FakeSession:
+    """A causally consistent session; `operation_time` is what the server reported."""
+
+    def __init__(self, operation_time: Optional[Timestamp] = None):
+        self.operation_time = operation_time
+        self.cluster_time = None if operation_time is None else {"clusterTime": operation_time}
+        self.advanced_to: Optional[Timestamp] = None
+
+    def advance_cluster_time(self, cluster_time: dict):
+        pass
+
+    def advance_operation_time(self, operation_time: Timestamp):
+        if self.advanced_to is None or operation_time > self.advanced_to:
+            self.advanced_to = operation_time
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncClient:
+    """Hands out sessions whose operation time is `operation_time` when they end."""
+
+    def __init__(self, operation_time: Optional[Timestamp] = None):
+        self.operation_time = operation_time
+        self.sessions = []
+
+    async def start_session(self, causal_consistency=True):
+        session = FakeSession(self.operation_time)
+        self.sessions.append(session)
+        return session
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = list(documents)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+    async def to_list(self, length: Optional[int] = None):
+        return self.documents[:length]
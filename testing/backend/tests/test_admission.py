@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+
+from app.middleware.admission import LIST, POINT, TRANSFER, WRITE, AdmissionController, Limiter, classify
+
+
+def test_classify():
+    assert classify("GET", "/api/applications/fetch/abc") == POINT
+    assert classify("GET", "/api/applications/fetch/all") == LIST
+    assert classify("GET", "/api/startups/overview") == LIST
+    assert classify("POST", "/api/applications/create") == WRITE
+    assert classify("GET", "/api/applications/abc/pitch-deck") == TRANSFER
+
+
+def test_acquires_immediately_below_the_limit():
+    async def main():
+        limiter = Limiter(2)
+        results = [await limiter.acquire(0, 1.0), await limiter.acquire(0, 1.0)]
+        return limiter, results
+
+    limiter, results = asyncio.run(main())
+    assert results == [True, True]
+    assert limiter.in_use == 2
+
+
+def test_release_passes_the_slot_to_the_most_urgent_waiter():
+    async def main():
+        limiter = Limiter(1)
+        await limiter.acquire(0, 1.0)
+        order = []
+
+        async def waiter(name, priority):
+            await limiter.acquire(priority, 1.0)
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter("list", 2)), asyncio.create_task(waiter("point", 0))]
+        await asyncio.sleep(0)
+        limiter.release(None)
+        await asyncio.sleep(0)
+        limiter.release(None)
+        await asyncio.gather(*tasks)
+        return limiter, order
+
+    limiter, order = asyncio.run(main())
+    assert order == ["point", "list"]
+    assert limiter.in_use == 1
+
+
+def test_equal_priorities_are_first_come_first_served():
+    async def main():
+        limiter = Limiter(1)
+        await limiter.acquire(0, 1.0)
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire(1, 1.0)
+            order.append(name)
+            limiter.release(None)
+
+        tasks = [asyncio.create_task(waiter(name)) for name in "abc"]
+        await asyncio.sleep(0)
+        limiter.release(None)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+
+def test_wait_past_the_timeout_is_refused():
+    async def main():
+        limiter = Limiter(1)
+        await limiter.acquire(0, 1.0)
+        granted = await limiter.acquire(0, 0.01)
+        return limiter, granted
+
+    limiter, granted = asyncio.run(main())
+    assert granted is False
+    assert limiter.waiters == []
+    assert limiter.in_use == 1
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def main():
+        limiter = Limiter(1)
+        await limiter.acquire(0, 1.0)
+        task = asyncio.create_task(limiter.acquire(0, 1.0))
+        await asyncio.sleep(0)
+        # The slot is handed over, then the client goes away before it runs
+        limiter.release(None)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.in_use == 0
+    assert limiter.idle
+
+
+def test_estimated_wait_counts_waiters_ahead():
+    async def main():
+        limiter = Limiter(2)
+        limiter.service_s = 0.1
+        await limiter.acquire(0, 1.0)
+        free = limiter.estimated_wait(0)
+        await limiter.acquire(0, 1.0)
+        full = limiter.estimated_wait(0)
+        tasks = [asyncio.create_task(limiter.acquire(priority, 1.0)) for priority in (0, 0, 2)]
+        await asyncio.sleep(0)
+        estimates = limiter.estimated_wait(0), limiter.estimated_wait(2)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return free, full, estimates
+
+    free, full, (point, low) = asyncio.run(main())
+    assert free == 0.0
+    assert full == pytest.approx(0.1)
+    # Two waiters of equal priority are ahead of a new point read, three of a new list read
+    assert point == pytest.approx(0.2)
+    assert low == pytest.approx(0.2)
+
+
+def test_release_updates_the_service_time_average():
+    limiter = Limiter(1)
+    limiter.in_use = 1
+    limiter.release(1.05)
+    assert limiter.service_s == pytest.approx(0.05 + 0.1 * (1.05 - 0.05))
+
+
+def test_admission_sheds_when_the_estimate_exceeds_the_budget():
+    async def main():
+        controller = AdmissionController()
+        limiter = controller.class_limiters[LIST]
+        limiter.in_use = limiter.limit
+        limiter.service_s = 10.0
+        limiters, retry_after = await controller.admit(LIST, "key")
+        return controller, limiters, retry_after
+
+    controller, limiters, retry_after = asyncio.run(main())
+    assert limiters is None
+    assert retry_after == pytest.approx(10.0)
+    assert controller.stats_by_class[LIST]["shed"] == 1
+    # A shed request leaves no per-key limiter behind
+    assert controller.key_limiters == {}
+
+
+def test_admitted_request_releases_every_limiter():
+    async def main():
+        controller = AdmissionController()
+        limiters, _ = await controller.admit(POINT, "key")
+        in_use = [limiter.in_use for limiter in limiters]
+        controller.release(limiters, 0.01, "key")
+        return controller, limiters, in_use
+
+    controller, limiters, in_use = asyncio.run(main())
+    assert in_use == [1, 1, 1]
+    assert [limiter.in_use for limiter in limiters] == [0, 0, 0]
+    assert controller.key_limiters == {}
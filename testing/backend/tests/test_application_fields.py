@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from app.migrations.application_fields import canonicalize
+from app.migrations.runner import InvalidDocument
+
+CREATED = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+UPDATED = datetime.datetime(2024, 3, 4, tzinfo=datetime.timezone.utc)
+
+
+def canonical(**fields) -> dict:
+    doc = {
+        "_id": "app-1",
+        "companyName": "Acme",
+        "dateAdded": CREATED,
+        "createdAt": CREATED,
+        "updatedAt": UPDATED,
+        "status": "pending",
+    }
+    doc.update(fields)
+    return doc
+
+
+def test_canonical_document_is_left_alone():
+    assert canonicalize(canonical()) is None
+
+
+def test_legacy_fields_are_renamed():
+    doc = canonical(startupName="Acme Old", startupDescription="Rockets", email="a@acme.test", pitchDeckUrl="/d.pdf")
+    del doc["companyName"]
+    to_set, to_unset = canonicalize(doc)
+    assert to_set["companyName"] == "Acme Old"
+    assert to_set["description"] == "Rockets"
+    assert to_set["founderContact"] == "a@acme.test"
+    assert to_set["pitchDeckPath"] == "/d.pdf"
+    assert sorted(to_unset) == ["email", "pitchDeckUrl", "startupDescription", "startupName"]
+    assert to_set["updatedAt"] > UPDATED
+
+
+def test_canonical_fields_win_over_legacy_ones():
+    to_set, to_unset = canonicalize(canonical(startupName="Old name"))
+    assert "companyName" not in to_set
+    assert to_unset == ["startupName"]
+
+
+def test_missing_timestamps_and_status_are_filled_in():
+    doc = canonical()
+    del doc["dateAdded"], doc["createdAt"], doc["status"]
+    to_set, to_unset = canonicalize(doc)
+    # The oldest known timestamp stands in for the missing ones
+    assert to_set["dateAdded"] == UPDATED
+    assert to_set["createdAt"] == UPDATED
+    assert to_set["status"] == "pending"
+    assert to_unset == []
+
+
+def test_missing_company_name_becomes_empty():
+    doc = canonical()
+    del doc["companyName"]
+    to_set, _ = canonicalize(doc)
+    assert to_set["companyName"] == ""
+
+
+def test_document_that_cannot_validate_is_invalid():
+    with pytest.raises(InvalidDocument):
+        canonicalize(canonical(status="archived", startupName="Acme"))
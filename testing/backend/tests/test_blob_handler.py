@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database.blob_handler import BlobHandler, BlobTooLarge
+from app.models.blob_model import BlobRef
+from app.routers import applications_router
+from app.routers.applications_router import applications_handler
+
+HEADERS = {"x-api-key": os.environ["INTERNAL_API_KEY"]}
+
+
+class FakeGridIn:
+    def __init__(self, bucket, name, metadata):
+        self._id = ObjectId()
+        self.bucket = bucket
+        self.name = name
+        self.metadata = metadata
+        self.data = b""
+        self.aborted = False
+
+    async def write(self, chunk):
+        self.data += chunk
+
+    async def abort(self):
+        self.aborted = True
+
+    async def close(self):
+        self.bucket.files[self._id] = {"_id": self._id, "length": len(self.data), "metadata": dict(self.metadata)}
+        self.bucket.data[self._id] = self.data
+
+
+class FakeGridOut:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    async def readchunk(self):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+class FakeBucket:
+    def __init__(self):
+        self.files = {}
+        self.data = {}
+        self.uploads = []
+
+    def open_upload_stream(self, name, metadata=None):
+        grid_in = FakeGridIn(self, name, metadata or {})
+        self.uploads.append(grid_in)
+        return grid_in
+
+    async def delete(self, file_id):
+        del self.files[file_id], self.data[file_id]
+
+    async def open_download_stream(self, file_id):
+        from gridfs.errors import NoFile
+
+        if file_id not in self.data:
+            raise NoFile(file_id)
+        data = self.data[file_id]
+        return FakeGridOut(data[i:i + 4] for i in range(0, len(data), 4))
+
+
+class FakeFiles:
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    async def create_index(self, keys):
+        pass
+
+    async def find_one(self, query, projection=None):
+        for doc in self.bucket.files.values():
+            if doc["metadata"].get("sha256") == query["metadata.sha256"] and doc["length"] == query["length"]:
+                return doc
+        return None
+
+    async def update_one(self, query, update):
+        self.bucket.files[query["_id"]]["metadata"]["sha256"] = update["$set"]["metadata.sha256"]
+
+
+@pytest.fixture
+def blobs(monkeypatch):
+    handler = BlobHandler()
+    bucket = FakeBucket()
+    monkeypatch.setattr(handler, "bucket", bucket)
+    monkeypatch.setattr(handler, "files_collection", FakeFiles(bucket))
+    return handler
+
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_put_hashes_the_stream(blobs):
+    ref = asyncio.run(blobs.put(stream(b"%PDF", b"-1.7"), "deck.pdf", "application/pdf"))
+    assert ref.sha256 == hashlib.sha256(b"%PDF-1.7").hexdigest()
+    assert ref.size == 8
+    assert blobs.bucket.data[ObjectId(ref.id)] == b"%PDF-1.7"
+    assert blobs.bucket.files[ObjectId(ref.id)]["metadata"]["sha256"] == ref.sha256
+
+
+def test_same_content_is_stored_once(blobs):
+    first = asyncio.run(blobs.put(stream(b"same bytes"), "a.pdf", None))
+    second = asyncio.run(blobs.put(stream(b"same ", b"bytes"), "b.pdf", None))
+    assert second.id == first.id
+    assert second.name == "b.pdf"
+    assert len(blobs.bucket.files) == 1
+
+
+def test_too_large_upload_is_aborted(blobs):
+    blobs.max_size = 5
+    with pytest.raises(BlobTooLarge):
+        asyncio.run(blobs.put(stream(b"abc", b"def"), "big.pdf", None))
+    assert blobs.bucket.uploads[0].aborted
+    assert blobs.bucket.files == {}
+
+
+def test_download_is_streamed_in_chunks(blobs):
+    ref = asyncio.run(blobs.put(stream(b"0123456789"), "deck.pdf", None))
+
+    async def read():
+        grid_out = await blobs.open(ref.id)
+        return [chunk async for chunk in blobs.iter_chunks(grid_out)]
+
+    assert asyncio.run(read()) == [b"0123", b"4567", b"89"]
+
+
+def test_unknown_or_invalid_blob_is_none(blobs):
+    assert asyncio.run(blobs.open(str(ObjectId()))) is None
+    assert asyncio.run(blobs.open("not-an-object-id")) is None
+
+
+@pytest.fixture
+def client(blobs, monkeypatch):
+    monkeypatch.setattr(applications_router, "blob_handler", blobs)
+    app = FastAPI()
+    app.include_router(applications_router.router)
+    return TestClient(app)
+
+
+def returning(value):
+    async def method(*args):
+        return value
+    return method
+
+
+def test_upload_attaches_a_reference(client, monkeypatch):
+    attached = []
+
+    async def set_pitch_deck(application_id, ref):
+        attached.append((application_id, ref))
+        return True
+
+    monkeypatch.setattr(applications_handler, "application_exists", returning(True))
+    monkeypatch.setattr(applications_handler, "set_pitch_deck", set_pitch_deck)
+    response = client.put("/api/applications/app-1/pitch-deck", params={"filename": "deck.pdf"},
+                          content=b"%PDF-1.7", headers={**HEADERS, "content-type": "application/pdf"})
+    assert response.status_code == 200
+    application_id, ref = attached[0]
+    assert application_id == "app-1"
+    assert ref.contentType == "application/pdf"
+    assert response.json()["data"]["sha256"] == ref.sha256
+
+
+def test_upload_statuses(client, blobs, monkeypatch):
+    monkeypatch.setattr(applications_handler, "application_exists", returning(False))
+    assert client.put("/api/applications/app-1/pitch-deck", content=b"x", headers=HEADERS).status_code == 404
+
+    monkeypatch.setattr(applications_handler, "application_exists", returning(True))
+    blobs.max_size = 1
+    assert client.put("/api/applications/app-1/pitch-deck", content=b"xy", headers=HEADERS).status_code == 413
+
+
+def test_download_and_revalidation(client, blobs, monkeypatch):
+    ref = asyncio.run(blobs.put(stream(b"%PDF-1.7 deck"), "pitch deck.pdf", "application/pdf"))
+    monkeypatch.setattr(applications_handler, "get_pitch_deck", returning(ref))
+
+    response = client.get("/api/applications/app-1/pitch-deck", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.7 deck"
+    assert response.headers["etag"] == f'"{ref.sha256}"'
+    assert response.headers["content-length"] == str(ref.size)
+    assert response.headers["content-disposition"] == "inline; filename*=UTF-8''pitch%20deck.pdf"
+
+    response = client.get("/api/applications/app-1/pitch-deck", headers={**HEADERS, "If-None-Match": f'"{ref.sha256}"'})
+    assert response.status_code == 304
+
+
+def test_missing_deck_is_404(client, monkeypatch):
+    monkeypatch.setattr(applications_handler, "get_pitch_deck", returning(None))
+    assert client.get("/api/applications/app-1/pitch-deck", headers=HEADERS).status_code == 404
+
+    missing = BlobRef(id=str(ObjectId()), name="deck.pdf", size=1, sha256="0" * 64)
+    monkeypatch.setattr(applications_handler, "get_pitch_deck", returning(missing))
+    assert client.get("/api/applications/app-1/pitch-deck", headers=HEADERS).status_code == 404
@@ -0,0 +1,130 @@
+import pytest
+from bson import Timestamp
+from pymongo.errors import OperationFailure
+
+from app.pathway_pipeline import sources
+from app.pathway_pipeline.events import ChangeEvent
+from app.pathway_pipeline.sources import (
+    CHANGE_STREAM_HISTORY_LOST,
+    ChangeStreamCdcSource,
+    KafkaCdcSource,
+    SnapshotLoader,
+)
+from cdc_fakes import FakeChangeStream, FakeClient, change
+
+COLLECTIONS = {
+    "applications": [{"_id": "a1", "companyName": "Acme"}, {"_id": "a2", "companyName": "Beta"}],
+    "startups": [{"_id": "s1", "applicationId": "a1"}],
+}
+
+
+@pytest.fixture(autouse=True)
+def mongo_env(monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://localhost:27017")
+    monkeypatch.setenv("MONGO_DB_NAME", "crm")
+
+
+def position_event(collection: str, position: tuple) -> ChangeEvent:
+    return ChangeEvent(op="u", key="a1", ts_ms=0, collection=collection, document=None, update={}, position=position)
+
+
+def test_snapshot_reads_every_collection():
+    loader = SnapshotLoader(FakeClient(COLLECTIONS, snapshot_time=Timestamp(100, 5)), list(COLLECTIONS))
+    events = list(loader.events())
+    assert sorted((event.collection, event.key) for event in events) == [
+        ("applications", "a1"), ("applications", "a2"), ("startups", "s1"),
+    ]
+    assert {event.op for event in events} == {"r"}
+    assert loader.snapshot_times == {"applications": (100, 5), "startups": (100, 5)}
+
+
+def test_changes_contained_in_the_snapshot_are_dropped():
+    loader = SnapshotLoader(FakeClient(COLLECTIONS, snapshot_time=Timestamp(100, 5)), list(COLLECTIONS))
+    list(loader.events())
+    assert not loader.is_new(position_event("applications", (100, 5)))
+    assert not loader.is_new(position_event("applications", (99, 9)))
+    assert loader.is_new(position_event("applications", (100, 6)))
+    # Collections outside the snapshot and events without a position pass
+    assert loader.is_new(position_event("meetings", (1, 1)))
+    assert loader.is_new(position_event("applications", None))
+
+
+def test_snapshot_reader_errors_propagate():
+    class BrokenClient(FakeClient):
+        def start_session(self, snapshot=False):
+            raise OperationFailure("snapshot too old")
+
+    with pytest.raises(OperationFailure):
+        list(SnapshotLoader(BrokenClient(COLLECTIONS), list(COLLECTIONS)).events())
+
+
+def test_change_stream_bootstrap_hands_off_at_the_snapshot_time(monkeypatch):
+    client = FakeClient(COLLECTIONS, snapshot_time=Timestamp(100, 5), streams=[FakeChangeStream([
+        change("update", "a1", "t1", 100, 5, updateDescription={"updatedFields": {"stage": "seed"}}),
+        change("update", "a1", "t2", 100, 6, updateDescription={"updatedFields": {"stage": "A"}}),
+    ])])
+    client.db["cdc_resume_tokens"].update_one({"_id": "reader"}, {"$set": {"token": {"_data": "old"}}})
+    monkeypatch.setattr(sources, "mongo_client", lambda: client)
+    source = ChangeStreamCdcSource(["applications", "startups"], "reader", bootstrap=True)
+    events = source.events()
+    received = [next(events) for _ in range(4)]
+    source.close()
+    list(events)
+
+    assert [event.op for event in received] == ["r", "r", "r", "u"]
+    assert received[-1].update["$set"] == {"stage": "A"}
+    # The saved token is ignored; the stream starts at the snapshot
+    assert client.db.watches == [{"resume_after": None, "start_at": Timestamp(100, 5)}]
+
+
+def test_lost_token_bootstraps_again(monkeypatch):
+    client = FakeClient(COLLECTIONS, streams=[
+        OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST),
+        FakeChangeStream([]),
+    ])
+    monkeypatch.setattr(sources, "mongo_client", lambda: client)
+    source = ChangeStreamCdcSource(["applications"], "reader", bootstrap=True)
+    events = source.events()
+    received = [next(events) for _ in range(4)]
+    source.close()
+    list(events)
+    assert [event.key for event in received] == ["a1", "a2", "a1", "a2"]
+
+
+class FakeConsumer:
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.assigned = None
+        self.seeks = {}
+
+    def partitions_for_topic(self, topic):
+        return self.partitions.get(topic)
+
+    def assign(self, partitions):
+        self.assigned = partitions
+
+    def end_offsets(self, partitions):
+        return {partition: 40 + partition.partition for partition in partitions}
+
+    def seek(self, partition, offset):
+        self.seeks[(partition.topic, partition.partition)] = offset
+
+
+def test_kafka_bootstrap_seeks_to_the_offsets_taken_before_the_snapshot(monkeypatch):
+    client = FakeClient(COLLECTIONS)
+    monkeypatch.setattr(sources, "mongo_client", lambda: client)
+    monkeypatch.setenv("CDC_TOPIC_PREFIX", "crm")
+    source = KafkaCdcSource(["applications", "startups"], "reader", bootstrap=True)
+    # The startups topic does not exist yet
+    source.consumer = FakeConsumer({"crm.applications": {0, 1}})
+
+    loading = source.load_snapshot()
+    documents = []
+    with pytest.raises(StopIteration) as done:
+        while True:
+            documents.append(next(loading))
+
+    assert len(documents) == 3
+    assert done.value.value.snapshot_times
+    assert source.consumer.seeks == {("crm.applications", 0): 40, ("crm.applications", 1): 41}
+    assert client.closed
@@ -0,0 +1,208 @@
+import asyncio
+import time
+
+import pytest
+from bson import Timestamp
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database import read_routing
+from app.database.read_routing import (
+    CausalClock, WriteClocks, causal_session, decode_token, encode_token, request_clock, write_session,
+)
+from app.middleware.causal import CausalConsistencyMiddleware
+from mongo_fakes import FakeAsyncClient, FakeSession
+
+NOW = int(time.time())
+
+
+def clock(seconds: int = NOW, inc: int = 1) -> CausalClock:
+    operation_time = Timestamp(seconds, inc)
+    return CausalClock({"clusterTime": operation_time, "signature": {"keyId": 1}}, operation_time)
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.delenv("CAUSAL_TOKEN_KEY", raising=False)
+    monkeypatch.setenv("INTERNAL_API_KEY", "test-key")
+    monkeypatch.delenv("CAUSAL_TOKEN_TTL_S", raising=False)
+
+
+@pytest.fixture
+def write_clocks(monkeypatch):
+    write_clocks = WriteClocks()
+    monkeypatch.setattr(read_routing, "write_clocks", write_clocks)
+    return write_clocks
+
+
+def test_token_round_trip():
+    decoded = decode_token(encode_token(clock()))
+    assert decoded.operation_time == Timestamp(NOW, 1)
+    assert decoded.cluster_time["clusterTime"] == Timestamp(NOW, 1)
+
+
+def test_tampered_tokens_are_rejected():
+    body, signature = encode_token(clock()).split(".")
+    forged = encode_token(clock(NOW, 99)).split(".")[0]
+    assert decode_token(f"{forged}.{signature}") is None
+    flipped = ("B" if signature[0] == "A" else "A") + signature[1:]
+    assert decode_token(f"{body}.{flipped}") is None
+    for malformed in ("", "abc", "a.b.c", "!!!.???", f"{body}."):
+        assert decode_token(malformed) is None
+
+
+def test_tokens_from_another_deployment_are_rejected(monkeypatch):
+    token = encode_token(clock())
+    monkeypatch.setenv("CAUSAL_TOKEN_KEY", "other-deployment")
+    assert decode_token(token) is None
+    # CAUSAL_TOKEN_KEY takes precedence over INTERNAL_API_KEY
+    assert decode_token(encode_token(clock())) is not None
+
+
+def test_no_key_means_no_tokens(monkeypatch):
+    token = encode_token(clock())
+    monkeypatch.delenv("INTERNAL_API_KEY")
+    assert encode_token(clock()) is None
+    assert decode_token(token) is None
+
+
+def test_clock_without_operation_time_has_no_token():
+    assert encode_token(CausalClock()) is None
+
+
+def test_expired_and_future_issued_tokens_are_rejected(monkeypatch):
+    monkeypatch.setenv("CAUSAL_TOKEN_TTL_S", "300")
+    monkeypatch.setattr(read_routing.time, "time", lambda: NOW)
+    token = encode_token(clock())
+    monkeypatch.setattr(read_routing.time, "time", lambda: NOW + 299)
+    assert decode_token(token) is not None
+    monkeypatch.setattr(read_routing.time, "time", lambda: NOW + 301)
+    assert decode_token(token) is None
+    monkeypatch.setattr(read_routing.time, "time", lambda: NOW - 10)
+    assert decode_token(token) is None
+
+
+def test_positions_far_ahead_are_rejected():
+    assert decode_token(encode_token(clock(NOW + 30))) is not None
+    assert decode_token(encode_token(clock(NOW + 3600))) is None
+
+
+def test_cluster_time_must_be_a_timestamp():
+    token = encode_token(CausalClock({"clusterTime": "soon"}, Timestamp(NOW, 1)))
+    assert decode_token(token) is None
+
+
+def test_clock_only_moves_forward():
+    causal = CausalClock()
+    assert causal.observe(FakeSession(Timestamp(NOW, 2)))
+    assert not causal.observe(FakeSession(Timestamp(NOW, 1)))
+    assert not causal.observe(FakeSession(None))
+    assert causal.operation_time == Timestamp(NOW, 2)
+    assert causal.observe(FakeSession(Timestamp(NOW, 3)))
+
+
+def test_write_clocks_per_document_and_collection():
+    clocks = WriteClocks()
+    clocks.record(FakeSession(Timestamp(NOW, 1)), "applications", "a1")
+    clocks.record(FakeSession(Timestamp(NOW, 5)), "meetings", "m1", listed=False)
+    assert [c.operation_time for c in clocks.clocks("applications", "a1")] == [Timestamp(NOW, 1)]
+    assert clocks.clocks("applications", "a2") == []
+    assert [c.operation_time for c in clocks.clocks("meetings", "m1")] == [Timestamp(NOW, 5)]
+    # Unlisted writes do not hold back lists
+    assert clocks.clocks("meetings") == []
+    assert [c.operation_time for c in clocks.clocks("startups", related=("applications", "meetings"))] == [
+        Timestamp(NOW, 1),
+    ]
+
+
+def test_write_clocks_remember_recent_documents():
+    clocks = WriteClocks(max_documents=2)
+    for doc_id in ("a1", "a2"):
+        clocks.record(FakeSession(Timestamp(NOW, 1)), "applications", doc_id)
+    clocks.record(FakeSession(Timestamp(NOW, 2)), "applications", "a1")  # refreshed
+    clocks.record(FakeSession(Timestamp(NOW, 3)), "applications", "a3")
+    assert clocks.clocks("applications", "a2") == []
+    assert clocks.clocks("applications", "a1") != []
+
+
+def test_reads_wait_for_own_writes_and_the_client_clock(write_clocks):
+    async def main():
+        async with write_session(FakeAsyncClient(Timestamp(NOW, 4)), "applications", "a1"):
+            pass
+        client = FakeAsyncClient(Timestamp(NOW, 9))
+        async with causal_session(client, "applications", "a1") as point:
+            pass
+        async with causal_session(client, "applications", "a2") as other:
+            pass
+        async with causal_session(client, "applications") as listing:
+            pass
+
+        reset = request_clock.set(clock(NOW, 6))
+        try:
+            async with causal_session(client, "applications", "a2") as with_token:
+                pass
+            seen = request_clock.get().operation_time
+        finally:
+            request_clock.reset(reset)
+        return point, other, listing, with_token, seen
+
+    point, other, listing, with_token, seen = asyncio.run(main())
+    assert point.advanced_to == Timestamp(NOW, 4)
+    assert other.advanced_to is None
+    assert listing.advanced_to == Timestamp(NOW, 4)
+    assert with_token.advanced_to == Timestamp(NOW, 6)
+    # The client has now seen what the read saw
+    assert seen == Timestamp(NOW, 9)
+
+
+def test_writes_move_the_request_clock(write_clocks):
+    async def main():
+        reset = request_clock.set(CausalClock())
+        try:
+            async with write_session(FakeAsyncClient(Timestamp(NOW, 7)), "meetings", "m1", listed=False):
+                pass
+            return request_clock.get()
+        finally:
+            request_clock.reset(reset)
+
+    assert asyncio.run(main()).operation_time == Timestamp(NOW, 7)
+    assert write_clocks.clocks("meetings") == []
+
+
+@pytest.fixture
+def client(write_clocks):
+    app = FastAPI()
+    app.add_middleware(CausalConsistencyMiddleware)
+    seen = []
+
+    @app.post("/write")
+    async def write():
+        async with write_session(FakeAsyncClient(Timestamp(NOW, 8)), "applications", "a1"):
+            pass
+        return {}
+
+    @app.get("/read")
+    async def read():
+        async with causal_session(FakeAsyncClient(), "applications", "a9") as session:
+            seen.append(session.advanced_to)
+        return {}
+
+    test_client = TestClient(app)
+    test_client.seen = seen
+    return test_client
+
+
+def test_write_response_carries_a_token_the_next_request_uses(client):
+    token = client.post("/write").headers["x-causal-token"]
+    assert decode_token(token).operation_time == Timestamp(NOW, 8)
+
+    response = client.get("/read", headers={"x-causal-token": token})
+    assert client.seen == [Timestamp(NOW, 8)]
+    # Nothing moved the position: no new token
+    assert "x-causal-token" not in response.headers
+
+
+def test_requests_without_a_valid_token_read_as_before(client):
+    assert "x-causal-token" not in client.get("/read").headers
+    client.get("/read", headers={"x-causal-token": "forged.token"})
+    assert client.seen == [None, None]
@@ -0,0 +1,189 @@
+import datetime
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.database.versions import CollectionVersions, entity_etag
+from app.models.application_model import Application
+from app.pathway_pipeline import pipeline
+from app.pathway_pipeline.events import ChangeEvent
+from app.routers import applications_router
+from app.routers.applications_router import APPLICATIONS, applications_handler
+from app.routers.conditional import etag_matches
+
+HEADERS = {"x-api-key": os.environ["INTERNAL_API_KEY"]}
+CREATED = datetime.datetime(2024, 1, 2, tzinfo=datetime.timezone.utc)
+
+
+def application(updated_at: datetime.datetime = CREATED, **fields) -> Application:
+    return Application(id="app-1", companyName="Acme", dateAdded=CREATED, createdAt=CREATED,
+                       updatedAt=updated_at, **fields)
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    versions = CollectionVersions()
+    versions.set_following(True)
+    monkeypatch.setattr(applications_router, "versions", versions)
+    monkeypatch.setattr(pipeline, "versions", versions)
+    return versions
+
+
+def test_list_etag_changes_with_the_counter(versions):
+    before = versions.list_etag("applications")
+    assert versions.list_etag("applications") == before
+    versions.bump("applications")
+    assert versions.list_etag("applications") != before
+    # Other collections do not affect the tag
+    after = versions.list_etag("applications")
+    versions.bump("meetings")
+    assert versions.list_etag("applications") == after
+    assert versions.list_etag("applications", "meetings") != versions.list_etag("applications")
+
+
+def test_nothing_is_trusted_without_cdc():
+    versions = CollectionVersions()
+    assert versions.list_etag("applications") is None
+    versions.set_following(True)
+    version = versions.version("applications")
+    versions.remember("applications", "a1", '"tag"', version)
+    before = versions.list_etag("applications")
+
+    versions.set_following(False)
+    assert versions.list_etag("applications") is None
+    assert versions.cached_etag("applications", "a1") is None
+
+    # Tags served before the gap never match again
+    versions.set_following(True)
+    assert versions.list_etag("applications") != before
+    assert versions.cached_etag("applications", "a1") is None
+
+
+def test_remembered_etag_is_dropped_on_change(versions):
+    versions.remember("applications", "a1", '"tag"', versions.version("applications"))
+    assert versions.cached_etag("applications", "a1") == '"tag"'
+    versions.bump("applications", "a2")
+    assert versions.cached_etag("applications", "a1") == '"tag"'
+    versions.bump("applications", "a1")
+    assert versions.cached_etag("applications", "a1") is None
+
+
+def test_etag_read_before_a_change_is_not_remembered(versions):
+    version = versions.version("applications")
+    versions.bump("applications", "a2")
+    assert versions.remember("applications", "a1", '"tag"', version) == '"tag"'
+    assert versions.cached_etag("applications", "a1") is None
+
+
+def test_remembered_etags_are_bounded(versions, monkeypatch):
+    from app.database import versions as versions_module
+
+    monkeypatch.setattr(versions_module, "MAX_REMEMBERED_ETAGS", 2)
+    for doc_id in ("a1", "a2", "a3"):
+        versions.remember("applications", doc_id, f'"{doc_id}"', versions.version("applications"))
+    assert versions.cached_etag("applications", "a1") is None
+    assert versions.cached_etag("applications", "a3") == '"a3"'
+
+
+def test_entity_etag_follows_updated_at():
+    first = entity_etag(APPLICATIONS, application())
+    assert first == entity_etag(APPLICATIONS, application(industry="AI"))
+    assert first != entity_etag(APPLICATIONS, application(CREATED + datetime.timedelta(seconds=1)))
+    assert first != entity_etag("startups", application())
+
+
+def test_etag_matches():
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"x", W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+    assert not etag_matches("", '"a"')
+
+
+def test_cdc_events_invalidate(versions):
+    versions.remember("startups", "s1", '"tag"', versions.version("startups"))
+    before = versions.list_etag("startups")
+    pipeline.invalidate(ChangeEvent("u", "s1", 0, "startups", None, {"$set": {"companyName": "B"}}))
+    assert versions.list_etag("startups") != before
+    assert versions.cached_etag("startups", "s1") is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(applications_router.router)
+    return TestClient(app)
+
+
+class Reads:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self, *args):
+        self.calls += 1
+        return self.value
+
+
+def test_list_endpoint_answers_304_without_a_query(client, versions, monkeypatch):
+    reads = Reads([application()])
+    monkeypatch.setattr(applications_handler, "get_all_applications", reads)
+    response = client.get("/api/applications/fetch/all", headers=HEADERS)
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get("/api/applications/fetch/all", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert reads.calls == 1
+
+    versions.bump(APPLICATIONS, "app-1")
+    response = client.get("/api/applications/fetch/all", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert reads.calls == 2
+
+
+def test_list_endpoint_without_cdc_always_reads(client, versions, monkeypatch):
+    versions.set_following(False)
+    reads = Reads([application()])
+    monkeypatch.setattr(applications_handler, "get_all_applications", reads)
+    response = client.get("/api/applications/fetch/all", headers={**HEADERS, "If-None-Match": "*"})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert reads.calls == 1
+
+
+def test_detail_endpoint_remembers_the_etag(client, versions, monkeypatch):
+    reads = Reads(application())
+    monkeypatch.setattr(applications_handler, "get_application_by_id", reads)
+    response = client.get("/api/applications/fetch/app-1", headers=HEADERS)
+    etag = response.headers["etag"]
+    assert etag == entity_etag(APPLICATIONS, application())
+
+    response = client.get("/api/applications/fetch/app-1", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert reads.calls == 1
+
+    # A write that left the document as it was: one read, then 304 again
+    versions.bump(APPLICATIONS, "app-1")
+    response = client.get("/api/applications/fetch/app-1", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert reads.calls == 2
+
+    versions.bump(APPLICATIONS, "app-1")
+    reads.value = application(CREATED + datetime.timedelta(minutes=1))
+    response = client.get("/api/applications/fetch/app-1", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_missing_document_is_404_without_an_etag(client, versions, monkeypatch):
+    monkeypatch.setattr(applications_handler, "get_application_by_id", Reads(None))
+    response = client.get("/api/applications/fetch/missing", headers=HEADERS)
+    assert response.status_code == 404
+    assert "etag" not in response.headers
@@ -0,0 +1,91 @@
+import pathway as pw
+import pytest
+
+from app.pathway_pipeline.crm_view import (
+    ApplicationSchema,
+    CdcSubject,
+    MeetingSchema,
+    StartupSchema,
+    build_startup_view,
+)
+from app.pathway_pipeline.events import ChangeEvent
+
+
+class RecordingSubject(CdcSubject):
+    """CdcSubject that records the rows it emits instead of feeding Pathway."""
+
+    def __init__(self, schema):
+        super().__init__("meetings", schema)
+        self.emitted = []
+
+    def next(self, **row):
+        self.emitted.append(("upsert", row))
+
+    def delete(self, **row):
+        self.emitted.append(("delete", row))
+
+
+def event(op: str, doc_id: str, document=None, update=None) -> ChangeEvent:
+    return ChangeEvent(op=op, key=doc_id, ts_ms=0, collection="meetings", document=document, update=update)
+
+
+def test_only_projected_fields_are_cached():
+    subject = RecordingSubject(MeetingSchema)
+    subject.apply(event("c", "m1", document={
+        "_id": "m1", "startup_id": "s1", "vc_id": "v1", "status": "live", "transcript": [{"text": "hi"}] * 100,
+    }))
+    assert subject.documents["m1"] == {"startup_id": "s1", "vc_id": "v1", "status": "live"}
+    assert subject.emitted == [("upsert", {"doc_id": "m1", "startup_id": "s1", "vc_id": "v1", "status": "live"})]
+
+
+def test_updates_outside_the_projection_are_skipped():
+    subject = RecordingSubject(MeetingSchema)
+    subject.apply(event("c", "m1", document={"_id": "m1", "startup_id": "s1", "status": "live"}))
+    subject.apply(event("u", "m1", update={"$set": {"transcript.7": {"text": "more"}}}))
+    subject.apply(event("u", "m1", update={"$v": 2, "diff": {"stranscript": {"a": True, "u7": {"text": "more"}}}}))
+    assert len(subject.emitted) == 1
+    assert "transcript" not in subject.documents["m1"]
+
+
+def test_partial_update_rebuilds_the_row():
+    subject = RecordingSubject(MeetingSchema)
+    subject.apply(event("c", "m1", document={"_id": "m1", "startup_id": "s1", "vc_id": "v1", "status": "live"}))
+    subject.apply(event("u", "m1", update={"$set": {"status": "ended"}, "$unset": {"vc_id": True}}))
+    assert subject.emitted[-1] == ("upsert", {"doc_id": "m1", "startup_id": "s1", "vc_id": None, "status": "ended"})
+
+
+def test_delete_retracts_the_cached_row():
+    subject = RecordingSubject(MeetingSchema)
+    subject.apply(event("c", "m1", document={"_id": "m1", "startup_id": "s1"}))
+    subject.apply(event("d", "m1"))
+    subject.apply(event("d", "unknown"))
+    assert subject.emitted[-1] == ("delete", {"doc_id": "m1", "startup_id": "s1", "vc_id": None, "status": None})
+    assert subject.documents == {}
+
+
+@pytest.fixture
+def fresh_graph():
+    pw.internals.parse_graph.G.clear()
+    yield
+    pw.internals.parse_graph.G.clear()
+
+
+def test_startup_view_joins_application_and_meetings(fresh_graph):
+    applications = pw.debug.table_from_rows(ApplicationSchema, [
+        ("a1", "Acme", "AI", "seed", "Ada", "vc1", "accepted"),
+    ])
+    startups = pw.debug.table_from_rows(StartupSchema, [("s1", "a1", "Acme"), ("s2", None, "Solo")])
+    meetings = pw.debug.table_from_rows(MeetingSchema, [
+        ("m2", "s1", "vc1", "ended"), ("m1", "s1", "vc1", "live"), ("m3", None, "vc1", "live"),
+    ])
+    view = build_startup_view(applications, startups, meetings)
+    keys, columns = pw.debug.table_to_dicts(view)
+    rows = {columns["startup_id"][key]: {name: values[key] for name, values in columns.items()} for key in keys}
+
+    assert rows["s1"]["applicationStatus"] == "accepted"
+    assert rows["s1"]["industry"] == "AI"
+    assert rows["s1"]["meeting_ids"] == ("m1", "m2")
+    assert rows["s1"]["meeting_count"] == 2
+    assert rows["s2"]["applicationStatus"] is None
+    assert rows["s2"]["meeting_ids"] == ()
+    assert rows["s2"]["meeting_count"] == 0
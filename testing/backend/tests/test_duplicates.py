@@ -0,0 +1,195 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.dedup.duplicates import MAX_HASH, DuplicateIndex, normalize, normalize_contact, shingles
+
+DESCRIPTION = "Autonomous warehouse robots that pick and pack orders for mid-sized retailers"
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setenv("DEDUP_ENABLED", "true")
+    monkeypatch.setenv("DEDUP_THRESHOLD", "0.5")
+    monkeypatch.setenv("DEDUP_NUM_PERM", "128")
+    index = DuplicateIndex()
+    index.configure()
+    return index
+
+
+def application(name: str, description: str = DESCRIPTION, contact: str = None) -> dict:
+    document = {"companyName": name, "description": description}
+    if contact:
+        document["founderContact"] = contact
+    return document
+
+
+def ids(candidates) -> list:
+    return [candidate["applicationId"] for candidate in candidates]
+
+
+@pytest.mark.parametrize("num_perm, threshold, banding", [(128, 0.5, (32, 4)), (128, 0.8, (16, 8)), (64, 0.3, (32, 2))])
+def test_banding_detects_below_the_threshold(num_perm, threshold, banding):
+    bands, rows = DuplicateIndex._bands(num_perm, threshold)
+    assert (bands, rows) == banding
+    assert bands * rows == num_perm
+    assert (1 / bands) ** (1 / rows) <= threshold
+
+
+def test_normalization():
+    assert normalize("  Café-Robotics, Inc. ") == "cafe robotics inc"
+    assert normalize(None) == ""
+    assert normalize_contact(" Founder@Acme.io ") == "founder@acme.io"
+    # Phone numbers compare on their last 9 digits
+    assert normalize_contact("+49 (0) 151 2345-6789") == normalize_contact("0151 23456789")
+    assert normalize_contact("12-34") is None
+
+
+def test_shingles_ignore_legal_forms_and_use_legacy_fields():
+    tokens, contact = shingles({"startupName": "The Acme GmbH", "email": "A@acme.io", "startupDescription": "Robots"})
+    assert tokens == {"n: ac", "n:acm", "n:cme", "n:me ", "d:robots", "c:a@acme.io"}
+    assert contact == "a@acme.io"
+    # The canonical field wins over the legacy one
+    tokens, _ = shingles({"companyName": "Beta", "startupName": "Acme"})
+    assert "n:bet" in tokens and "n:acm" not in tokens
+
+
+def test_signature_estimates_jaccard_similarity(index):
+    first = {f"t{i}" for i in range(100)}
+    second = {f"t{i}" for i in range(50, 150)}  # Jaccard 50 / 150
+    estimate = float(np.mean(index.signature(first) == index.signature(second)))
+    assert estimate == pytest.approx(1 / 3, abs=0.12)
+    assert np.array_equal(index.signature(first), index.signature(sorted(first)))
+    assert (index.signature([]) == MAX_HASH).all()
+
+
+def test_near_duplicates_are_candidates(index):
+    index.upsert("a1", application("Acme Robotics Inc"))
+    index.upsert("a2", application("Globex", "Payroll software for restaurants and cafes in small towns"))
+    candidates = index.candidates(application("ACME Robotics"))
+    assert ids(candidates) == ["a1"]
+    assert candidates[0]["score"] >= 0.5
+    assert candidates[0]["sameContact"] is False
+
+
+def test_same_contact_is_reported_regardless_of_similarity(index):
+    index.upsert("a1", application("Acme Robotics", contact="founder@acme.io"))
+    candidates = index.candidates(application("Completely Different", "Nothing alike here at all", "Founder@Acme.io"))
+    assert candidates == [{"applicationId": "a1", "score": candidates[0]["score"], "sameContact": True}]
+    assert candidates[0]["score"] < 0.5
+
+
+def test_candidates_are_ordered_excluded_and_limited(index):
+    index.upsert("exact", application("Acme Robotics"))
+    index.upsert("close", application("Acme Robotic"))
+    index.upsert("self", application("Acme Robotics"))
+    candidates = index.candidates(application("Acme Robotics"), exclude="self")
+    assert ids(candidates) == ["exact", "close"]
+    assert candidates[0]["score"] == 1.0
+    assert ids(index.candidates(application("Acme Robotics"), limit=1)) == ["exact"]
+    assert index.candidates({}) == []
+
+
+def test_disabled_index_finds_nothing(monkeypatch):
+    monkeypatch.setenv("DEDUP_ENABLED", "false")
+    index = DuplicateIndex()
+    index.upsert("a1", application("Acme"))
+    assert index.candidates(application("Acme")) == []
+    assert index.signatures == {}
+
+
+def test_delete_removes_every_trace(index):
+    index.upsert("a1", application("Acme Robotics", contact="founder@acme.io"))
+    index.apply_event("a1", "d", None, None)
+    assert index.signatures == {} and index.documents == {} and index.contacts == {}
+    assert all(band == {} for band in index.buckets)
+    assert index.candidates(application("Acme Robotics", contact="founder@acme.io")) == []
+
+
+def test_set_update_patches_the_indexed_fields(index):
+    index.upsert("a1", application("Acme Robotics", contact="founder@acme.io"))
+    index.apply_event("a1", "u", None, {"$set": {"companyName": "Initech", "status": "accepted"}})
+    assert index.documents["a1"]["companyName"] == "Initech"
+    # Fields the event does not carry are kept
+    assert index.documents["a1"]["founderContact"] == "founder@acme.io"
+    assert ids(index.candidates(application("Initech"))) == ["a1"]
+
+
+def test_v2_diff_patches_the_indexed_fields(index):
+    index.upsert("a1", application("Acme Robotics", contact="founder@acme.io"))
+    index.apply_event("a1", "u", None, {"$v": 2, "diff": {"u": {"companyName": "Initech"}, "d": {"founderContact": False}}})
+    assert index.documents["a1"] == {"companyName": "Initech", "description": DESCRIPTION}
+    assert index.contacts == {}
+
+
+def test_updates_that_cannot_change_the_index_are_skipped(index):
+    index.upsert("a1", application("Acme Robotics"))
+    signature = index.signatures["a1"]
+    index.apply_event("a1", "u", None, {"$set": {"status": "accepted", "updatedAt": 1}})
+    assert index.signatures["a1"] is signature
+    # An id that is not indexed yet is left to the rebuild
+    index.apply_event("a2", "u", None, {"$set": {"companyName": "Acme Robotics"}})
+    assert "a2" not in index.signatures
+
+
+def test_replacement_and_full_document_events(index):
+    index.apply_event("a1", "u", None, application("Acme Robotics"))
+    assert "a1" in index.signatures
+    index.apply_event("a2", "c", application("Initech"), None)
+    assert ids(index.candidates(application("Initech"))) == ["a2"]
+
+
+class RacingCollection:
+    """Yields `documents`, calling `during()` after the first one, as a CDC event racing the rebuild would."""
+
+    def __init__(self, documents, during=None, error=None):
+        self.documents = documents
+        self.during = during
+        self.error = error
+
+    def find(self, query, projection):
+        return self._iterate()
+
+    async def _iterate(self):
+        for position, document in enumerate(self.documents):
+            yield document
+            if position == 0 and self.during is not None:
+                self.during()
+        if self.error is not None:
+            raise self.error
+
+
+def test_rebuild_indexes_every_document(index, monkeypatch):
+    monkeypatch.setattr("app.dedup.duplicates.REBUILD_BATCH", 2)
+    documents = [{"_id": f"a{i}", **application(f"Company {i}")} for i in range(5)]
+    asyncio.run(index.rebuild(RacingCollection(documents)))
+    assert sorted(index.signatures) == [f"a{i}" for i in range(5)]
+    assert index.touched is None
+
+
+def test_cdc_changes_during_a_rebuild_win(index):
+    def during():
+        index.apply_event("a2", "c", application("Initech"), None)
+        index.apply_event("a3", "d", None, None)
+
+    documents = [
+        {"_id": "a1", **application("Acme Robotics")},
+        {"_id": "a2", **application("Stale Name")},  # read before the change above
+        {"_id": "a3", **application("Deleted Co")},
+    ]
+    asyncio.run(index.rebuild(RacingCollection(documents, during)))
+    assert index.documents["a2"]["companyName"] == "Initech"
+    assert "a3" not in index.signatures
+    assert "a1" in index.signatures
+
+
+def test_failed_rebuild_keeps_what_was_indexed(index, monkeypatch):
+    monkeypatch.setattr("app.dedup.duplicates.REBUILD_BATCH", 1)
+    documents = [{"_id": "a1", **application("Acme Robotics")}]
+    asyncio.run(index.rebuild(RacingCollection(documents, error=RuntimeError("cursor killed"))))
+    assert "a1" in index.signatures
+    assert index.touched is None
+    # CDC changes after a failed rebuild are applied normally
+    index.upsert("a2", application("Initech"))
+    assert "a2" in index.signatures
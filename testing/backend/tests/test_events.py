@@ -0,0 +1,95 @@
+import datetime
+import json
+
+from app.pathway_pipeline.events import apply_update, decode_event, updated_fields
+
+
+def envelope(**fields) -> bytes:
+    message = {"op": "u", "source": {"collection": "applications", "ts_ms": 1700000000000, "ord": 3}}
+    message.update(fields)
+    return json.dumps(message).encode()
+
+
+def test_decode_debezium_2_update():
+    key = json.dumps({"id": json.dumps({"$oid": "65f0c0ffee0000000000abcd"})}).encode()
+    value = envelope(updateDescription={
+        "updatedFields": json.dumps({"pitchDeck.sha256": "zz", "updatedAt": {"$date": 1700000000000}}),
+        "removedFields": ["keyInsight"],
+    })
+    event = decode_event(key, value)
+    assert event.op == "u"
+    assert event.key == "65f0c0ffee0000000000abcd"
+    assert event.collection == "applications"
+    assert event.position == (1700000000, 3)
+    assert event.update["$set"]["updatedAt"] == datetime.datetime(2023, 11, 14, 22, 13, 20, tzinfo=datetime.timezone.utc)
+    assert event.update["$unset"] == {"keyInsight": True}
+
+
+def test_decode_create_and_tombstone():
+    value = envelope(op="c", after=json.dumps({"_id": "a1", "amount": {"$numberLong": "5"}}))
+    event = decode_event(json.dumps({"id": json.dumps("a1")}).encode(), value)
+    assert event.document == {"_id": "a1", "amount": 5}
+    assert decode_event(b"{}", None) is None
+
+
+def test_decode_schema_wrapped_patch():
+    value = json.dumps({"schema": {}, "payload": {"op": "u", "patch": json.dumps({"$set": {"status": "accepted"}})}})
+    event = decode_event(json.dumps({"schema": {}, "payload": {"id": json.dumps("a1")}}).encode(), value.encode())
+    assert event.key == "a1"
+    assert event.update == {"$set": {"status": "accepted"}}
+
+
+def test_replacement_document():
+    assert apply_update({"a": 1}, {"_id": "x", "b": 2}) == {"_id": "x", "b": 2}
+
+
+def test_top_level_set_and_unset():
+    document = {"companyName": "Acme", "stage": "seed"}
+    updated = apply_update(document, {"$set": {"companyName": "Other"}, "$unset": {"stage": True}})
+    assert updated == {"companyName": "Other"}
+    assert document == {"companyName": "Acme", "stage": "seed"}
+
+
+def test_nested_set_and_unset():
+    document = {"pitchDeck": {"id": "d1", "sha256": "aa", "name": "deck.pdf"}}
+    updated = apply_update(document, {"$set": {"pitchDeck.sha256": "zz"}, "$unset": {"pitchDeck.name": True}})
+    assert updated == {"pitchDeck": {"id": "d1", "sha256": "zz"}}
+    # The cached document and its sub-documents are not modified
+    assert document["pitchDeck"]["sha256"] == "aa"
+
+
+def test_array_element_paths():
+    document = {"transcript": [{"text": "a"}, {"text": "b"}]}
+    updated = apply_update(document, {"$set": {"transcript.1.text": "B", "transcript.2": {"text": "c"}}})
+    assert updated == {"transcript": [{"text": "a"}, {"text": "B"}, {"text": "c"}]}
+    # Unsetting an element leaves null in its place
+    assert apply_update(updated, {"$unset": {"transcript.0": True}})["transcript"][0] is None
+
+
+def test_paths_into_missing_fields():
+    assert apply_update({}, {"$set": {"pitchDeck.id": "d1"}}) == {"pitchDeck": {"id": "d1"}}
+    assert apply_update({"a": 1}, {"$unset": {"pitchDeck.id": True, "a.b": True}}) == {"a": 1}
+
+
+def test_v2_diff_fields():
+    document = {"companyName": "Acme", "stage": "seed"}
+    updated = apply_update(document, {"$v": 2, "diff": {"u": {"companyName": "Other"}, "i": {"industry": "AI"}, "d": {"stage": False}}})
+    assert updated == {"companyName": "Other", "industry": "AI"}
+
+
+def test_v2_diff_sub_documents_and_arrays():
+    document = {"pitchDeck": {"id": "d1", "sha256": "aa"}, "transcript": [{"text": "a"}, {"text": "b"}, {"text": "c"}]}
+    diff = {
+        "spitchDeck": {"u": {"sha256": "zz"}},
+        "stranscript": {"a": True, "l": 2, "s1": {"u": {"text": "B"}}, "u3": {"text": "d"}},
+    }
+    updated = apply_update(document, {"$v": 2, "diff": diff})
+    assert updated["pitchDeck"] == {"id": "d1", "sha256": "zz"}
+    assert updated["transcript"] == [{"text": "a"}, {"text": "B"}, None, {"text": "d"}]
+    assert document["transcript"][1] == {"text": "b"}
+
+
+def test_updated_fields():
+    assert updated_fields({"_id": "x", "a": 1}) is None
+    assert updated_fields({"$set": {"pitchDeck.sha256": "zz"}, "$unset": {"stage": True}}) == {"pitchDeck", "stage"}
+    assert updated_fields({"$v": 2, "diff": {"u": {"a": 1}, "d": {"b": False}, "sc": {"u": {"x": 1}}}}) == {"a", "b", "c"}
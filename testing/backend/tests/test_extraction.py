@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from bson import ObjectId
+
+from app.jobs.scheduler import PRIORITY_BULK, PRIORITY_NORMAL
+from app.pathway_pipeline import pipeline
+from app.pathway_pipeline.benchmark_extraction import make_deck
+from app.pathway_pipeline.events import ChangeEvent
+from app.pathway_pipeline.extraction import EXTRACTION_JOB, ExtractionStage, pitch_deck_ref
+from app.pathway_pipeline.pdf_text import ExtractionTimeout, extract_pages
+
+REF = {"id": str(ObjectId()), "name": "deck.pdf", "sha256": "ab" * 32, "size": 10}
+
+
+def test_extract_pages(tmp_path):
+    path = tmp_path / "deck.pdf"
+    make_deck(str(path), 3)
+    result = extract_pages(str(path), timeout=30)
+    assert result["pageCount"] == 3
+    assert [page["number"] for page in result["pages"]] == [1, 2, 3]
+    assert "Slide 2" in result["pages"][1]["text"]
+    assert result["pages"][0]["chars"] == len(result["pages"][0]["text"])
+    assert (result["pages"][0]["width"], result["pages"][0]["height"]) == (842.0, 595.0)
+
+
+def test_unparseable_file_raises(tmp_path):
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(b"not a pdf")
+    with pytest.raises(Exception):
+        extract_pages(str(path), timeout=30)
+
+
+def test_pitch_deck_ref():
+    assert pitch_deck_ref(ChangeEvent("c", "a1", 0, "applications", {"pitchDeck": REF}, None)) == REF
+    assert pitch_deck_ref(ChangeEvent("u", "a1", 0, "applications", None, {"$set": {"pitchDeck": REF}})) == REF
+    # A new upload replaces the reference's fields one by one
+    update = {"$set": {"pitchDeck.id": REF["id"], "pitchDeck.sha256": REF["sha256"]}}
+    assert pitch_deck_ref(ChangeEvent("u", "a1", 0, "applications", None, update)) == {
+        "id": REF["id"], "sha256": REF["sha256"],
+    }
+    assert pitch_deck_ref(ChangeEvent("u", "a1", 0, "applications", None, {"$set": {"status": "accepted"}})) is None
+
+
+class FakeResults:
+    def __init__(self, documents=()):
+        self.documents = {doc["_id"]: doc for doc in documents}
+
+    def count_documents(self, query, limit=0):
+        doc = self.documents.get(query["_id"])
+        return int(doc is not None and doc["status"] == query["status"])
+
+    def replace_one(self, query, document, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **document}
+
+
+class FakeBucket:
+    def __init__(self):
+        self.downloads = []
+
+    def download_to_stream(self, file_id, stream):
+        self.downloads.append(file_id)
+        stream.write(b"%PDF-1.4")
+
+
+class FakePool:
+    """Runs the job inline, or fails it the way a process pool would."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.shut_down = False
+
+    def submit(self, fn, path, timeout):
+        future = Future()
+        if self.error is not None:
+            future.set_exception(self.error)
+        else:
+            future.set_result({"pages": [], "pageCount": 4, "metadata": {}, "extractor": "fake", "cpuSeconds": 0.5})
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def stage(monkeypatch):
+    stage = ExtractionStage()
+    stage.started = True
+    stage.timeout = 1.0
+    stage.results = FakeResults()
+    stage.bucket = FakeBucket()
+    stage.slots = threading.BoundedSemaphore(1)
+    stage.pool = FakePool()
+    monkeypatch.setattr(stage, "_new_pool", FakePool)
+    return stage
+
+
+def test_extracted_deck_is_stored_by_hash(stage):
+    stage.run(REF)
+    stored = stage.results.documents[REF["sha256"]]
+    assert stored["status"] == "done"
+    assert stored["pageCount"] == 4
+    assert stored["wallSeconds"] >= 0
+    assert stage.bucket.downloads == [ObjectId(REF["id"])]
+    stats = stage.stats()
+    assert (stats["jobs"], stats["pages"], stats["pagesPerSecondPerCore"]) == (1, 4, 8.0)
+
+
+def test_cached_hash_is_not_extracted_again(stage):
+    stage.results = FakeResults([{"_id": REF["sha256"], "status": "done"}])
+    stage.run(REF)
+    assert stage.bucket.downloads == []
+    assert stage.stats()["cacheHits"] == 1
+
+
+def test_failed_extraction_is_retried_on_the_next_upload(stage):
+    stage.results = FakeResults([{"_id": REF["sha256"], "status": "failed"}])
+    stage.run(REF)
+    assert stage.results.documents[REF["sha256"]]["status"] == "done"
+
+
+@pytest.mark.parametrize("error, status, recycled", [
+    (ExtractionTimeout(), "timeout", False),
+    (FutureTimeout(), "timeout", True),
+    (BrokenProcessPool(), "crashed", True),
+    (ValueError("bad xref"), "error: bad xref", False),
+])
+def test_failures_are_recorded(stage, error, status, recycled):
+    pool = stage.pool = FakePool(error)
+    stage.run(REF)
+    stored = stage.results.documents[REF["sha256"]]
+    assert (stored["status"], stored["error"]) == ("failed", status)
+    assert stage.stats()["failures"] == 1
+    # A stuck or broken pool is replaced
+    assert (stage.pool is not pool) is recycled
+    assert pool.shut_down is recycled
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue_threadsafe(self, job_type, entity_id, payload=None, priority=PRIORITY_NORMAL, delay_s=0):
+        self.jobs.append((job_type, entity_id, priority))
+        return True
+
+
+@pytest.mark.parametrize("op, priority", [("c", PRIORITY_NORMAL), ("u", PRIORITY_NORMAL), ("r", PRIORITY_BULK)])
+def test_application_changes_queue_an_extraction(monkeypatch, op, priority):
+    scheduler = FakeScheduler()
+    monkeypatch.setattr(pipeline, "scheduler", scheduler)
+    pipeline.process_event(ChangeEvent(op, "a1", 0, "applications", {"_id": "a1", "pitchDeck": REF}, None))
+    pipeline.process_event(ChangeEvent(op, "a2", 0, "applications", {"_id": "a2"}, None))
+    pipeline.process_event(ChangeEvent(op, "s1", 0, "startups", {"_id": "s1", "pitchDeck": REF}, None))
+    assert scheduler.jobs == [(EXTRACTION_JOB, REF["sha256"], priority)]
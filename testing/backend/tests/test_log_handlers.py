@@ -0,0 +1,125 @@
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from app.config import configloader
+from app.config.log_handlers import HotPathFilter, JsonFormatter, NonBlockingQueueHandler, parse_settings
+
+
+def record(name: str = "app", level: int = logging.INFO, created: float = 1000.0, msg: str = "hello", **extra):
+    return logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level),
+                                  "msg": msg, "created": created, **extra})
+
+
+def test_parse_settings():
+    assert parse_settings("MeetingHandler=0.1, uvicorn.access=0.01,bad,=2") == {
+        "MeetingHandler": 0.1, "uvicorn.access": 0.01,
+    }
+    assert parse_settings(None) == {}
+
+
+def test_full_queue_drops_and_reports_the_count():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(record(msg="kept"))
+    handler.handle(record(msg="dropped 1"))
+    handler.handle(record(msg="dropped 2"))
+    assert handler.dropped == 2
+
+    assert handler.queue.get_nowait().msg == "kept"
+    handler.handle(record(msg="next"))
+    delivered = handler.queue.get_nowait()
+    assert delivered.dropped == 2
+    assert handler.dropped == 0
+
+
+def test_records_are_queued_unformatted():
+    handler = NonBlockingQueueHandler(queue.Queue())
+    handler.handle(record(msg="value %s", args=(42,)))
+    queued = handler.queue.get_nowait()
+    assert queued.msg == "value %s"
+    assert queued.args == (42,)
+
+
+def test_rate_limit_allows_a_burst_then_reports_suppressed():
+    log_filter = HotPathFilter(rate=2, limits={}, samples={})
+    passed = [log_filter.filter(record(created=1000.0)) for _ in range(4)]
+    assert passed == [True, True, False, False]
+
+    # Half a second refills one token at 2/s
+    later = record(created=1000.5)
+    assert log_filter.filter(later)
+    assert later.suppressed == 2
+    assert not log_filter.filter(record(created=1000.5))
+
+
+def test_warnings_are_never_limited():
+    log_filter = HotPathFilter(rate=1, limits={}, samples={})
+    assert log_filter.filter(record())
+    assert not log_filter.filter(record())
+    assert log_filter.filter(record(level=logging.WARNING))
+    assert log_filter.filter(record(level=logging.ERROR))
+
+
+def test_limits_apply_to_child_loggers():
+    log_filter = HotPathFilter(rate=1, limits={"uvicorn": 0}, samples={})
+    # 0 turns the limit off
+    assert all(log_filter.filter(record(name="uvicorn.access")) for _ in range(10))
+    assert log_filter.filter(record(name="app"))
+    assert not log_filter.filter(record(name="app"))
+
+
+def test_sampling_keeps_a_fraction(monkeypatch):
+    log_filter = HotPathFilter(rate=0, limits={}, samples={"MeetingHandler": 0.25})
+    draws = iter([0.1, 0.5, 0.3, 0.2])
+    monkeypatch.setattr("app.config.log_handlers.random.random", lambda: next(draws))
+    kept = [record(name="MeetingHandler") for _ in range(4)]
+    assert [log_filter.filter(item) for item in kept] == [True, False, False, True]
+    assert kept[0].sampleRate == 0.25
+    assert log_filter.filter(record(name="Other"))
+
+
+def test_json_formatter_includes_extra_fields():
+    formatter = JsonFormatter()
+    entry = json.loads(formatter.format(record(msg="took %sms", args=(5,), meeting_id="m1", dropped=3)))
+    assert entry["msg"] == "took 5ms"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app"
+    assert entry["meeting_id"] == "m1"
+    assert entry["dropped"] == 3
+    assert entry["ts"] == "1970-01-01T00:16:40.000+00:00"
+
+
+def test_json_formatter_includes_the_exception():
+    formatter = JsonFormatter()
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        failed = logging.getLogger("app").makeRecord("app", logging.ERROR, __file__, 1, "failed: %s", ("boom",), sys.exc_info())
+    entry = json.loads(formatter.format(failed))
+    assert entry["msg"] == "failed: boom"
+    assert "ValueError: boom" in entry["exc"]
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    configloader._stop_listener()
+    root.handlers, root.level = handlers, level
+
+
+def test_setup_logger_writes_json_through_the_queue(root_logger, monkeypatch, capsys):
+    monkeypatch.setenv("LOG_LEVEL", "debug")
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    configloader.setup_logger()
+    assert isinstance(root_logger.handlers[0], NonBlockingQueueHandler)
+    assert root_logger.level == logging.DEBUG
+    logging.getLogger("app.test").warning("disk %s%% full", 91)
+    configloader._stop_listener()
+
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert {"level": "WARNING", "logger": "app.test", "msg": "disk 91% full"}.items() <= lines[-1].items()
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.routers import meeting_outbox
+from app.routers.meeting_outbox import DROPPABLE, RELIABLE, Outbox, OutboxOverflow
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(meeting_outbox.time, "monotonic", clock)
+    return clock
+
+
+def messages(outbox: Outbox) -> list:
+    return [entry[0] for entry in outbox.entries]
+
+
+def test_partials_coalesce_into_the_latest():
+    outbox = Outbox("m", "json", max_messages=10, max_lag_s=5)
+    outbox.put("partial 1", DROPPABLE, coalesce="partial")
+    outbox.put("partial 2", DROPPABLE, coalesce="partial")
+    outbox.put("final", RELIABLE)
+    outbox.put("partial 3", DROPPABLE, coalesce="partial")
+    assert messages(outbox) == ["partial 2", "final", "partial 3"]
+    assert outbox.coalesced == 1
+
+
+def test_coalesced_message_keeps_its_age(clock):
+    outbox = Outbox("m", "json", max_messages=10, max_lag_s=5)
+    outbox.put("partial 1", DROPPABLE, coalesce="partial")
+    clock.now += 2
+    outbox.put("partial 2", DROPPABLE, coalesce="partial")
+    assert outbox.lag() == pytest.approx(2)
+
+
+def test_full_outbox_drops_droppable_messages():
+    outbox = Outbox("m", "json", max_messages=2, max_lag_s=5)
+    assert outbox.put("a")
+    assert outbox.put("b")
+    assert not outbox.put("ack", DROPPABLE)
+    assert outbox.dropped == 1
+    assert outbox.closed is None
+
+
+def test_full_outbox_closes_on_a_reliable_message():
+    outbox = Outbox("m", "json", max_messages=2, max_lag_s=5)
+    outbox.put("a")
+    outbox.put("b")
+    assert not outbox.put("c", RELIABLE)
+    assert outbox.closed is not None
+    assert not outbox.put("d", DROPPABLE)
+
+    async def send(message):
+        pass
+
+    with pytest.raises(OutboxOverflow):
+        asyncio.run(outbox.run(send))
+
+
+def test_client_lagging_behind_is_closed(clock):
+    outbox = Outbox("m", "json", max_messages=10, max_lag_s=5)
+    outbox.put("a")
+    clock.now += 6
+    assert not outbox.put("b")
+    assert "behind" in outbox.closed
+
+
+def test_run_sends_in_order_until_closed():
+    sent = []
+
+    async def main():
+        outbox = Outbox("m", "json", max_messages=10, max_lag_s=5)
+
+        async def send(message):
+            sent.append(message)
+            if message == "c":
+                outbox._close("done")
+
+        task = asyncio.create_task(outbox.run(send))
+        for message in "abc":
+            outbox.put(message)
+            await asyncio.sleep(0)
+        with pytest.raises(OutboxOverflow):
+            await task
+        return outbox
+
+    outbox = asyncio.run(main())
+    assert sent == ["a", "b", "c"]
+    assert outbox.sent == 3
+
+
+def test_stalled_send_closes_the_outbox():
+    outbox = Outbox("m", "json", max_messages=10, max_lag_s=0.05)
+
+    async def send(message):
+        await asyncio.sleep(10)
+
+    outbox.put("a")
+    with pytest.raises(OutboxOverflow, match="stalled"):
+        asyncio.run(asyncio.wait_for(outbox.run(send), timeout=5))
@@ -0,0 +1,223 @@
+import os
+
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.meeting import Meeting
+from app.routers import meeting_protocol, meetingRouter
+from app.routers.meeting_protocol import (
+    FLAG_MSGPACK, HEADER, SUBPROTOCOL, VERSION, FrameType, ProtocolError, Reorderer, decode_frame, encode_frame,
+)
+from app.routers.meetingRouter import meeting_handler
+
+API_KEY = os.environ["INTERNAL_API_KEY"]
+HEADERS = {"x-api-key": API_KEY}
+
+
+def test_control_frame_round_trip():
+    data = encode_frame(FrameType.CONTROL, 7, 1_700_000_000_123_456, {"action": "mute"})
+    frame = decode_frame(data)
+    assert (frame.type, frame.flags, frame.seq, frame.capture_us) == (FrameType.CONTROL, 0, 7, 1_700_000_000_123_456)
+    assert frame.body() == {"action": "mute"}
+    assert len(data) == HEADER.size + len(b'{"action":"mute"}')
+
+
+def test_text_and_audio_bodies():
+    assert decode_frame(encode_frame(FrameType.CHAT, 1, 0, "héllo")).body() == "héllo"
+    audio = decode_frame(encode_frame(FrameType.AUDIO, 1, 0, b"\x00\x01\x02"))
+    assert bytes(audio.payload) == b"\x00\x01\x02"
+
+
+def test_msgpack_bodies():
+    data = encode_frame(FrameType.CONTROL_ACK, 1, 0, {"status": "ok"}, use_msgpack=True)
+    frame = decode_frame(data)
+    assert frame.flags == FLAG_MSGPACK
+    assert frame.body() == {"status": "ok"}
+
+
+def test_msgpack_without_the_package_is_refused(monkeypatch):
+    frame = decode_frame(HEADER.pack(VERSION, FrameType.CHAT, FLAG_MSGPACK, 1, 0) + msgpack.packb("hi"))
+    monkeypatch.setattr(meeting_protocol, "msgpack", None)
+    with pytest.raises(ProtocolError, match="MessagePack"):
+        frame.body()
+
+
+def test_sequence_numbers_wrap():
+    assert decode_frame(encode_frame(FrameType.AUDIO, 2 ** 32 + 5, 0, b"")).seq == 5
+
+
+@pytest.mark.parametrize("data, error", [
+    (b"\x01\x01", "shorter"),
+    (HEADER.pack(2, FrameType.AUDIO, 0, 1, 0), "version 2"),
+    (HEADER.pack(VERSION, 0x42, 0, 1, 0), "Unknown frame type"),
+])
+def test_malformed_frames(data, error):
+    with pytest.raises(ProtocolError, match=error):
+        decode_frame(data)
+
+
+def test_malformed_bodies():
+    with pytest.raises(ProtocolError):
+        decode_frame(HEADER.pack(VERSION, FrameType.CONTROL, 0, 1, 0) + b"{not json").body()
+    with pytest.raises(ProtocolError):
+        decode_frame(HEADER.pack(VERSION, FrameType.CHAT, 0, 1, 0) + b"\xff\xfe").body()
+
+
+def audio(seq: int):
+    return decode_frame(encode_frame(FrameType.AUDIO, seq, seq * 1000, b"a"))
+
+
+def seqs(frames) -> list:
+    return [frame.seq for frame in frames]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(meeting_protocol.time, "monotonic", clock)
+    return clock
+
+
+def test_reorderer_releases_in_sequence(clock):
+    reorderer = Reorderer()
+    assert seqs(reorderer.push(audio(10))) == [10]
+    assert seqs(reorderer.push(audio(12))) == []
+    assert seqs(reorderer.push(audio(13))) == []
+    assert seqs(reorderer.push(audio(11))) == [11, 12, 13]
+    assert reorderer.timeout() is None
+
+
+def test_reorderer_drops_duplicates_and_late_frames(clock):
+    reorderer = Reorderer()
+    reorderer.push(audio(1))
+    reorderer.push(audio(3))
+    assert reorderer.push(audio(3)) == []
+    assert reorderer.push(audio(1)) == []
+    assert reorderer.dropped == 2
+
+
+def test_reorderer_gives_up_on_a_gap_past_the_window(clock):
+    reorderer = Reorderer(window=2)
+    reorderer.push(audio(1))
+    assert seqs(reorderer.push(audio(3))) == []
+    assert seqs(reorderer.push(audio(4))) == []
+    assert seqs(reorderer.push(audio(5))) == [3, 4, 5]
+    assert reorderer.skipped == 1
+    # The missing frame arriving later is behind the released sequence
+    assert reorderer.push(audio(2)) == []
+
+
+def test_reorderer_gives_up_on_a_gap_after_max_wait(clock):
+    reorderer = Reorderer(max_wait=0.5)
+    reorderer.push(audio(1))
+    reorderer.push(audio(3))
+    assert reorderer.timeout() == pytest.approx(0.5)
+    clock.now += 0.3
+    assert reorderer.expire() == []
+    assert reorderer.timeout() == pytest.approx(0.2)
+    clock.now += 0.2
+    assert seqs(reorderer.expire()) == [3]
+    assert reorderer.timeout() is None
+
+
+def test_reorderer_flush_releases_everything_in_order(clock):
+    reorderer = Reorderer()
+    reorderer.push(audio(1))
+    for seq in (6, 4, 9):
+        reorderer.push(audio(seq))
+    assert seqs(reorderer.flush()) == [4, 6, 9]
+    assert reorderer.skipped == 2 + 1 + 2
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    stored = []
+
+    async def append_transcript(meeting_id, chunk):
+        stored.append(chunk)
+        return len(stored)
+
+    async def process_audio_chunk(chunk: bytes) -> str:
+        return f"text {chunk.decode()}"
+
+    monkeypatch.setattr(meeting_handler, "append_transcript", append_transcript)
+    monkeypatch.setattr(meetingRouter, "process_audio_chunk", process_audio_chunk)
+    return stored
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(meetingRouter.router)
+    return TestClient(app)
+
+
+def test_binary_socket_transcribes_in_sequence_with_capture_times(client, stored):
+    url = f"/api/meetings/ws/m1?x_api_key={API_KEY}"
+    with client.websocket_connect(url, subprotocols=[SUBPROTOCOL]) as ws:
+        assert ws.accepted_subprotocol == SUBPROTOCOL
+        ws.send_bytes(encode_frame(FrameType.CONTROL, 1, 5, {"action": "start"}))
+        ack = decode_frame(ws.receive_bytes())
+        assert (ack.type, ack.capture_us, ack.body()["received"]) == (FrameType.CONTROL_ACK, 5, {"action": "start"})
+
+        ws.send_bytes(encode_frame(FrameType.AUDIO, 1, 1_000_000, b"one"))
+        ws.send_bytes(encode_frame(FrameType.AUDIO, 3, 3_000_000, b"three"))
+        ws.send_bytes(encode_frame(FrameType.AUDIO, 2, 2_000_000, b"two"))
+        replies = [decode_frame(ws.receive_bytes()) for _ in range(3)]
+
+        ws.send_bytes(b"\x01")
+        error = decode_frame(ws.receive_bytes())
+
+    assert [(reply.type, reply.body()) for reply in replies] == [
+        (FrameType.TRANSCRIPT, "text one"), (FrameType.TRANSCRIPT, "text two"), (FrameType.TRANSCRIPT, "text three"),
+    ]
+    # Server frames are numbered in the order they are sent
+    assert [reply.seq for reply in replies] == [2, 3, 4]
+    assert [(chunk.seq, chunk.timestamp) for chunk in stored] == [(1, 1.0), (2, 2.0), (3, 3.0)]
+    assert error.type == FrameType.ERROR
+
+
+def test_json_socket_is_unchanged(client, stored):
+    with client.websocket_connect(f"/api/meetings/ws/m1?x_api_key={API_KEY}") as ws:
+        assert ws.accepted_subprotocol is None
+        ws.send_json({"type": "control", "data": {"action": "start"}})
+        assert ws.receive_json() == {"type": "control_ack", "data": {"status": "ok", "received": {"action": "start"}}}
+        ws.send_bytes(b"audio")
+        assert ws.receive_json() == {"type": "transcript", "data": "text audio"}
+    assert stored[0].seq is None
+
+
+def meeting() -> Meeting:
+    return Meeting(id="m1", vc_id="vc1", start_time="2024-05-01T10:00:00Z")
+
+
+def returning(value):
+    async def method(*args):
+        return value
+    return method
+
+
+def test_deleting_a_missing_meeting_is_404(client, monkeypatch):
+    deleted = []
+    monkeypatch.setattr(meeting_handler, "get_meeting_by_id", returning(None))
+    monkeypatch.setattr(meeting_handler, "delete_meeting", lambda meeting: deleted.append(meeting))
+    assert client.delete("/api/meetings/delete/missing", headers=HEADERS).status_code == 404
+    assert deleted == []
+
+
+def test_delete_meeting_statuses(client, monkeypatch):
+    monkeypatch.setattr(meeting_handler, "get_meeting_by_id", returning(meeting()))
+    monkeypatch.setattr(meeting_handler, "delete_meeting", returning(False))
+    assert client.delete("/api/meetings/delete/m1", headers=HEADERS).status_code == 500
+    monkeypatch.setattr(meeting_handler, "delete_meeting", returning(True))
+    assert client.delete("/api/meetings/delete/m1", headers=HEADERS).status_code == 200
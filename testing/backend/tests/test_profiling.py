@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware import profiling
+from app.middleware.profiling import ProfilingMiddleware
+from app.profiling.sampler import AWAIT, Profiler, Session
+
+
+@pytest.fixture
+def profiler(monkeypatch, tmp_path):
+    monkeypatch.setenv("PROFILE_KEY", "secret")
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0")
+    monkeypatch.setenv("PROFILE_INTERVAL_MS", "1")
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    profiler = Profiler()
+    profiler.configure()
+    return profiler
+
+
+def wait_for(predicate, timeout_s: float = 5.0):
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_disabled_without_key_or_rate(monkeypatch):
+    monkeypatch.delenv("PROFILE_KEY", raising=False)
+    monkeypatch.delenv("PROFILE_SAMPLE_RATE", raising=False)
+    assert not Profiler().enabled
+
+
+def test_label_is_relative_and_collapsible(profiler):
+    def frame_with_semicolon():
+        pass
+
+    code = frame_with_semicolon.__code__.replace(co_filename="/venv/lib/site-packages/pkg;x/mod.py")
+    assert profiler._label(code) == f"frame_with_semicolon (pkg,x/mod.py:{code.co_firstlineno})"
+
+
+def test_samples_are_written_as_collapsed_stacks(profiler, tmp_path):
+    session = Session("GET /x", threading.current_thread(), 60)
+    profiler._record(session, ["handler", "query"], None)
+    profiler._record(session, ["handler", "query"], None)
+    profiler._record(session, ["handler"], AWAIT)
+    profiler._write(session)
+
+    assert (tmp_path / f"{session.id}.cpu.collapsed").read_text() == "handler;query 2\n"
+    wall = (tmp_path / f"{session.id}.wall.collapsed").read_text().splitlines()
+    assert wall == ["handler;query 2", "handler;[await] 1"]
+    summary = json.loads((tmp_path / f"{session.id}.json").read_text())
+    assert summary["label"] == "GET /x"
+    assert summary["samples"] == 3
+    assert summary["ms"] == {"cpu": 2.0, "await": 1.0}
+
+
+def test_suspended_task_is_sampled_through_its_awaits(profiler):
+    async def find_one(event):
+        await event.wait()
+
+    async def endpoint(event):
+        await find_one(event)
+
+    async def main():
+        event = asyncio.Event()
+        task = asyncio.create_task(endpoint(event))
+        await asyncio.sleep(0)
+        session = Session("GET /x", threading.current_thread(), 60, task=task, loop=asyncio.get_running_loop())
+        # Sampled from another thread while this task waits
+        profiler._sample(session, {})
+        event.set()
+        await task
+        return session
+
+    session = asyncio.run(main())
+    (stack, count), = session.wall.items()
+    labels = stack.split(";")
+    assert labels[0].startswith("endpoint (")
+    assert labels[1].startswith("find_one (")
+    assert labels[-1] == AWAIT
+    assert session.cpu == {}
+
+
+def test_consumer_windows_are_rate_limited(profiler, monkeypatch):
+    started = []
+    profiler.rate = 1.0
+    monkeypatch.setattr(profiler, "start_thread", lambda label, duration_s: started.append(label))
+    profiler.maybe_profile_window("consumer")
+    profiler.maybe_profile_window("consumer")
+    assert started == ["consumer"]
+    profiler.next_window["consumer"] = 0
+    profiler.maybe_profile_window("consumer")
+    assert started == ["consumer", "consumer"]
+
+
+@pytest.fixture
+def client(profiler, monkeypatch):
+    monkeypatch.setattr(profiling, "profiler", profiler)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/ping")
+    async def ping():
+        await asyncio.sleep(0.02)
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_request_with_the_key_is_profiled(client, profiler, tmp_path):
+    response = client.get("/ping", headers={"x-profile": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    wait_for(lambda: (tmp_path / f"{profile_id}.json").exists())
+    summary = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert summary["label"] == "GET /ping"
+    assert summary["samples"] > 0
+    # The sampler thread exits once nothing is being profiled
+    wait_for(lambda: profiler.sampler is None)
+
+
+def test_request_without_the_key_is_not_profiled(client, profiler):
+    assert "x-profile-id" not in client.get("/ping").headers
+    assert "x-profile-id" not in client.get("/ping", headers={"x-profile": "wrong"}).headers
+    assert profiler.sessions == {} and profiler.sampler is None
+
+
+def test_sample_rate_picks_requests(client, profiler):
+    profiler.key = None
+    profiler.rate = 1.0
+    assert "x-profile-id" in client.get("/ping").headers
@@ -0,0 +1,328 @@
+import asyncio
+import copy
+import datetime
+
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from app.jobs import scheduler as scheduler_module
+from app.jobs.scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    JobScheduler,
+    PermanentJobError,
+)
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$lt" and (value is None or not value < operand):
+                    return False
+                if op == "$lte" and (value is None or not value <= operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeJobs:
+    """
+    The parts of the jobs collection the scheduler uses, including the
+    queued_entity_unique partial index.
+    """
+
+    def __init__(self):
+        self.docs = {}
+
+    def _apply(self, doc: dict, update: dict, inserting: bool) -> dict:
+        doc = copy.deepcopy(doc)
+        for field, value in update.get("$set", {}).items():
+            doc[field] = value
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        for field, value in update.get("$inc", {}).items():
+            doc[field] = doc.get(field, 0) + value
+        for field, value in update.get("$min", {}).items():
+            doc[field] = value if field not in doc else min(doc[field], value)
+        if inserting:
+            doc.update(update.get("$setOnInsert", {}))
+        return doc
+
+    def _store(self, doc: dict):
+        if doc["status"] == "queued":
+            for other in self.docs.values():
+                if (other["_id"] != doc["_id"] and other["status"] == "queued"
+                        and (other["type"], other["entityId"]) == (doc["type"], doc["entityId"])):
+                    raise DuplicateKeyError("queued_entity_unique")
+        self.docs[doc["_id"]] = doc
+
+    def _first(self, query: dict, sort=None):
+        found = [doc for doc in self.docs.values() if matches(doc, query)]
+        for field, _ in reversed(sort or []):
+            found.sort(key=lambda doc: doc[field])
+        return found[0] if found else None
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        doc = self._first(query, sort)
+        if doc is None:
+            return None
+        doc = self._apply(doc, update, inserting=False)
+        self._store(doc)
+        return copy.deepcopy(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self._first(query)
+        if doc is not None:
+            self._store(self._apply(doc, update, inserting=False))
+        elif upsert:
+            base = {field: value for field, value in query.items() if not isinstance(value, dict)}
+            self._store(self._apply(base, update, inserting=True))
+
+    async def update_many(self, query, update):
+        for doc in [doc for doc in self.docs.values() if matches(doc, query)]:
+            self._store(self._apply(doc, update, inserting=False))
+
+
+def make_scheduler(max_running: int = 4, reserved_slots: int = 1) -> JobScheduler:
+    """A scheduler wired to FakeJobs, without its dispatcher and heartbeat tasks."""
+    scheduler = JobScheduler()
+    scheduler.collection = FakeJobs()
+    scheduler.max_running = max_running
+    scheduler.reserved_slots = reserved_slots
+    scheduler.poll_interval = 0.01
+    scheduler.lease = 60.0
+    scheduler.wakeup = asyncio.Event()
+    scheduler.loop = asyncio.get_running_loop()
+    return scheduler
+
+
+def queued(scheduler: JobScheduler, job_type: str, entity_id: str) -> list:
+    return [
+        doc for doc in scheduler.collection.docs.values()
+        if doc["type"] == job_type and doc["entityId"] == entity_id and doc["status"] == "queued"
+    ]
+
+
+async def noop(job):
+    pass
+
+
+async def claim_and_run(scheduler: JobScheduler) -> dict:
+    job = await scheduler._claim()
+    scheduler.types[job["type"]].running += 1
+    await scheduler._run(job)
+    return scheduler.collection.docs[job["_id"]]
+
+
+def test_claims_by_priority_then_run_at():
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.register("extract", noop, concurrency=10)
+        await scheduler.enqueue("extract", "bulk", priority=PRIORITY_BULK)
+        await scheduler.enqueue("extract", "normal-1", priority=PRIORITY_NORMAL)
+        await scheduler.enqueue("extract", "interactive", priority=PRIORITY_INTERACTIVE)
+        await scheduler.enqueue("extract", "normal-2", priority=PRIORITY_NORMAL)
+        await scheduler.enqueue("extract", "later", priority=PRIORITY_INTERACTIVE, delay_s=60)
+
+        claimed = []
+        while True:
+            job = await scheduler._claim()
+            if job is None:
+                break
+            scheduler.tasks[job["_id"]] = None
+            claimed.append(job["entityId"])
+        return claimed
+
+    # The delayed job is not due yet; the bulk one waits for a free non-reserved slot
+    assert asyncio.run(main()) == ["interactive", "normal-1", "normal-2"]
+
+
+def test_claim_respects_type_concurrency():
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.register("extract", noop, concurrency=1)
+        await scheduler.enqueue("extract", "a")
+        await scheduler.enqueue("extract", "b")
+        scheduler.types["extract"].running = 1
+        return await scheduler._claim()
+
+    assert asyncio.run(main()) is None
+
+
+def test_enqueue_merges_into_the_queued_job():
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.register("extract", noop)
+        await scheduler.enqueue("extract", "app-1", payload={"v": 1}, priority=PRIORITY_BULK)
+        await scheduler.enqueue("extract", "app-1", payload={"v": 2}, priority=PRIORITY_INTERACTIVE)
+        await scheduler.enqueue("extract", "app-1", payload={"v": 3}, priority=PRIORITY_NORMAL)
+        return queued(scheduler, "extract", "app-1")
+
+    jobs = asyncio.run(main())
+    assert len(jobs) == 1
+    assert jobs[0]["payload"] == {"v": 3}
+    assert jobs[0]["priority"] == PRIORITY_INTERACTIVE
+
+
+def test_running_job_gets_a_queued_successor():
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.register("extract", noop)
+        await scheduler.enqueue("extract", "app-1", payload={"v": 1})
+        running = await scheduler._claim()
+        await scheduler.enqueue("extract", "app-1", payload={"v": 2})
+        successor = queued(scheduler, "extract", "app-1")
+        # Requeueing the running job would collide with its successor
+        await scheduler._requeue(running["_id"], datetime.datetime.now(datetime.timezone.utc), "boom")
+        return successor, scheduler.collection.docs[running["_id"]]
+
+    successor, running = asyncio.run(main())
+    assert [job["payload"] for job in successor] == [{"v": 2}]
+    assert running["status"] == "superseded"
+
+
+def test_enqueue_rejects_unknown_type():
+    async def main():
+        await make_scheduler().enqueue("missing", "app-1")
+
+    with pytest.raises(ValueError):
+        asyncio.run(main())
+
+
+def test_expired_lease_is_taken_over():
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.register("extract", noop)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for job_id, lease_until in (("live", now + datetime.timedelta(seconds=30)),
+                                    ("dead", now - datetime.timedelta(seconds=1))):
+            scheduler.collection.docs[job_id] = {
+                "_id": job_id, "type": "extract", "entityId": job_id, "status": "running",
+                "owner": "other-host", "priority": PRIORITY_NORMAL, "runAt": now,
+                "leaseUntil": lease_until, "attempts": 1, "maxAttempts": 5,
+            }
+        job = await scheduler._claim()
+        return scheduler, job, await scheduler._claim()
+
+    scheduler, job, nothing_else = asyncio.run(main())
+    assert job["_id"] == "dead"
+    assert job["owner"] == scheduler.owner
+    assert job["attempts"] == 2
+    assert nothing_else is None
+
+
+def test_job_exceeding_attempts_after_takeover_fails():
+    async def main():
+        scheduler = make_scheduler()
+        calls = []
+
+        async def handler(job):
+            calls.append(job)
+
+        scheduler.register("extract", handler, max_attempts=2)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        scheduler.collection.docs["dead"] = {
+            "_id": "dead", "type": "extract", "entityId": "app-1", "status": "running",
+            "owner": "other-host", "priority": PRIORITY_NORMAL, "runAt": now,
+            "leaseUntil": now - datetime.timedelta(seconds=1), "attempts": 2, "maxAttempts": 2,
+        }
+        return calls, await claim_and_run(scheduler)
+
+    calls, job = asyncio.run(main())
+    assert calls == []
+    assert job["status"] == "failed"
+
+
+def test_failed_job_is_retried_with_exponential_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: 1.0)
+
+    async def main():
+        scheduler = make_scheduler()
+
+        async def handler(job):
+            raise RuntimeError("flaky")
+
+        scheduler.register("extract", handler, max_attempts=3, retry_delay_s=10)
+        await scheduler.enqueue("extract", "app-1")
+        delays = []
+        for _ in range(3):
+            started = datetime.datetime.now(datetime.timezone.utc)
+            job = await claim_and_run(scheduler)
+            if job["status"] == "queued":
+                delays.append((job["runAt"] - started).total_seconds())
+                # Make the retry due now
+                job["runAt"] = started
+        return delays, job
+
+    delays, job = asyncio.run(main())
+    assert [round(delay) for delay in delays] == [10, 20]
+    assert job["status"] == "failed"
+    assert job["error"] == "flaky"
+    assert job["attempts"] == 3
+
+
+def test_permanent_error_is_not_retried():
+    async def main():
+        scheduler = make_scheduler()
+
+        async def handler(job):
+            raise PermanentJobError("bad input")
+
+        scheduler.register("extract", handler, max_attempts=5)
+        await scheduler.enqueue("extract", "app-1")
+        return await claim_and_run(scheduler)
+
+    job = asyncio.run(main())
+    assert job["status"] == "failed"
+    assert job["attempts"] == 1
+
+
+def test_blocking_handler_runs_on_the_executor():
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+
+    async def main():
+        scheduler = make_scheduler()
+        scheduler.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job")
+        threads = []
+        scheduler.register("extract", lambda job: threads.append(threading.current_thread().name))
+        await scheduler.enqueue("extract", "app-1")
+        job = await claim_and_run(scheduler)
+        scheduler.executor.shutdown()
+        return threads, job
+
+    threads, job = asyncio.run(main())
+    assert threads[0].startswith("job")
+    assert job["status"] == "done"
+
+
+def test_bulk_jobs_leave_the_reserved_slots_free():
+    async def main():
+        scheduler = make_scheduler(max_running=2, reserved_slots=1)
+        scheduler.register("extract", noop, concurrency=10)
+        await scheduler.enqueue("extract", "bulk-1", priority=PRIORITY_BULK)
+        await scheduler.enqueue("extract", "bulk-2", priority=PRIORITY_BULK)
+        first = await scheduler._claim()
+        scheduler.tasks[first["_id"]] = None
+        blocked = await scheduler._claim()
+        await scheduler.enqueue("extract", "urgent", priority=PRIORITY_INTERACTIVE)
+        reserved = await scheduler._claim()
+        scheduler.tasks[reserved["_id"]] = None
+        full = await scheduler._claim()
+        return first, blocked, reserved, full
+
+    first, blocked, reserved, full = asyncio.run(main())
+    assert first["entityId"] == "bulk-1"
+    assert blocked is None
+    assert reserved["entityId"] == "urgent"
+    assert full is None
@@ -0,0 +1,135 @@
+import datetime
+import uuid
+
+import pytest
+from bson import Binary, Decimal128, ObjectId, Timestamp
+from pymongo.errors import OperationFailure
+
+from app.pathway_pipeline import sources
+from app.pathway_pipeline.events import event_from_change
+from app.pathway_pipeline.sources import (
+    CHANGE_STREAM_HISTORY_LOST,
+    ChangeStreamCdcSource,
+    KafkaCdcSource,
+    create_source,
+)
+from cdc_fakes import FakeChangeStream, FakeClient, change
+
+
+@pytest.fixture(autouse=True)
+def mongo_env(monkeypatch):
+    monkeypatch.setenv("MONGO_URI", "mongodb://localhost:27017")
+    monkeypatch.setenv("MONGO_DB_NAME", "crm")
+
+
+def source_with(monkeypatch, client: FakeClient, **kwargs) -> ChangeStreamCdcSource:
+    monkeypatch.setattr(sources, "mongo_client", lambda: client)
+    return ChangeStreamCdcSource(["applications"], "test-reader", **kwargs)
+
+
+def test_create_source_follows_cdc_source(monkeypatch):
+    monkeypatch.setattr(sources, "mongo_client", lambda: FakeClient())
+    monkeypatch.delenv("CDC_SOURCE", raising=False)
+    assert isinstance(create_source(["applications"], "reader"), KafkaCdcSource)
+    monkeypatch.setenv("CDC_SOURCE", "mongo")
+    monkeypatch.setenv("CDC_BOOTSTRAP", "true")
+    source = create_source(["applications"], "reader")
+    assert isinstance(source, ChangeStreamCdcSource)
+    assert source.bootstrap
+    assert not create_source(["applications"], "reader", bootstrap=False).bootstrap
+    monkeypatch.setenv("CDC_SOURCE", "redis")
+    with pytest.raises(ValueError):
+        create_source(["applications"], "reader")
+
+
+def test_change_stream_update_matches_the_debezium_shape():
+    event = event_from_change(change(
+        "update", ObjectId("65f0c0ffee0000000000abcd"), "t1", 1700000000, 4,
+        updateDescription={"updatedFields": {"pitchDeck.sha256": "zz"}, "removedFields": ["stage"]},
+    ))
+    assert event.op == "u"
+    assert event.key == "65f0c0ffee0000000000abcd"
+    assert event.ts_ms == 1700000000000
+    assert event.position == (1700000000, 4)
+    assert event.update == {"$set": {"pitchDeck.sha256": "zz"}, "$unset": {"stage": True}}
+
+
+def test_change_stream_values_are_native():
+    doc_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    event = event_from_change(change(
+        "insert", Binary.from_uuid(doc_id), "t1", 1700000000,
+        wallTime=datetime.datetime(2024, 1, 1, 12, 0),
+        fullDocument={"_id": "a1", "amount": Decimal128("1.5"), "owner": ObjectId("65f0c0ffee0000000000abcd")},
+    ))
+    assert event.op == "c"
+    assert event.key == str(doc_id)
+    assert event.ts_ms == int(datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc).timestamp() * 1000)
+    assert event.document == {"_id": "a1", "amount": Decimal128("1.5").to_decimal(), "owner": "65f0c0ffee0000000000abcd"}
+
+
+def test_replace_delete_and_other_operations():
+    replace = event_from_change(change("replace", "a1", "t1", 1, fullDocument={"_id": "a1", "x": 1}))
+    assert (replace.op, replace.update) == ("u", {"_id": "a1", "x": 1})
+    assert event_from_change(change("delete", "a1", "t2", 2)).op == "d"
+    assert event_from_change(change("drop", "a1", "t3", 3)) is None
+
+
+def test_resume_token_is_saved_and_used_on_restart(monkeypatch):
+    client = FakeClient(streams=[
+        FakeChangeStream([change("insert", "a1", "t1", 10, fullDocument={"_id": "a1"})]),
+        FakeChangeStream([change("insert", "a2", "t2", 11, fullDocument={"_id": "a2"})]),
+    ])
+    first = source_with(monkeypatch, client)
+    events = first.events()
+    assert next(events).key == "a1"
+    first.close()
+    list(events)
+    assert client.db["cdc_resume_tokens"].find_one({"_id": "test-reader"})["token"] == {"_data": "t1"}
+
+    second = source_with(monkeypatch, client)
+    events = second.events()
+    assert next(events).key == "a2"
+    second.close()
+    list(events)
+    assert client.db.watches[1]["resume_after"] == {"_data": "t1"}
+
+
+def test_reader_without_resume_keeps_no_token(monkeypatch):
+    client = FakeClient(streams=[FakeChangeStream([change("insert", "a1", "t1", 10, fullDocument={"_id": "a1"})])])
+    source = source_with(monkeypatch, client, resume=False)
+    events = source.events()
+    next(events)
+    source.close()
+    list(events)
+    assert client.db["cdc_resume_tokens"].documents == {}
+
+
+def test_lost_resume_token_watches_from_now(monkeypatch):
+    client = FakeClient(streams=[
+        OperationFailure("history lost", code=CHANGE_STREAM_HISTORY_LOST),
+        FakeChangeStream([change("insert", "a2", "t2", 11, fullDocument={"_id": "a2"})]),
+    ])
+    client.db["cdc_resume_tokens"].update_one({"_id": "test-reader"}, {"$set": {"token": {"_data": "old"}}})
+    source = source_with(monkeypatch, client)
+    events = source.events()
+    assert next(events).key == "a2"
+    source.close()
+    list(events)
+    assert [watch["resume_after"] for watch in client.db.watches] == [{"_data": "old"}, None]
+
+
+def test_other_stream_errors_propagate(monkeypatch):
+    client = FakeClient(streams=[OperationFailure("unauthorized", code=13)])
+    source = source_with(monkeypatch, client)
+    with pytest.raises(OperationFailure):
+        next(source.events())
+    assert client.closed
+
+
+def test_health_is_reported_on_change():
+    source = sources.CdcSource(["applications"], "reader")
+    reports = []
+    source.on_health = reports.append
+    for healthy in (True, True, False, False, True):
+        source.report_health(healthy)
+    assert reports == [True, False, True]
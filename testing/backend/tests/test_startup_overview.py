@@ -0,0 +1,118 @@
+import asyncio
+import datetime
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import startups_router
+from app.routers.startups_router import MAX_OVERVIEW_IDS, startups_handler
+from mongo_fakes import FakeAsyncClient, FakeCursor
+
+ACCEPTED = datetime.datetime(2024, 5, 1, tzinfo=datetime.timezone.utc)
+HEADERS = {"x-api-key": os.environ["INTERNAL_API_KEY"]}
+
+
+def overview(startup_id: str) -> dict:
+    return {
+        "_id": startup_id,
+        "applicationId": f"app-{startup_id}",
+        "companyName": startup_id.title(),
+        "dateAccepted": ACCEPTED,
+        "application": {"_id": f"app-{startup_id}", "status": "accepted", "industry": "AI"},
+        "meetings": [{"_id": "m1", "vc_id": "vc1", "startup_id": startup_id, "start_time": ACCEPTED}],
+    }
+
+
+class FakeReads:
+    def __init__(self, documents=(), error=None):
+        self.documents = documents
+        self.error = error
+        self.pipelines = []
+
+    async def aggregate(self, pipeline, session=None):
+        self.pipelines.append(pipeline)
+        if self.error:
+            raise self.error
+        return FakeCursor(self.documents)
+
+
+class FakeMeetings:
+    async def create_index(self, keys):
+        pass
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(startups_handler, "client", FakeAsyncClient())
+    monkeypatch.setattr(startups_handler, "meetings_collection", FakeMeetings())
+    return startups_handler
+
+
+def test_pipeline_projects_away_transcripts(handler):
+    pipeline = handler._overview_pipeline(["s1"])
+    assert pipeline[0] == {"$match": {"_id": {"$in": ["s1"]}}}
+    meetings = next(stage["$lookup"] for stage in pipeline if stage.get("$lookup", {}).get("as") == "meetings")
+    projection = meetings["pipeline"][0]["$project"]
+    assert "transcript" not in projection
+    assert projection["start_time"] == 1
+
+
+def test_overviews_keep_the_requested_order(handler, monkeypatch):
+    monkeypatch.setattr(handler, "startups_reads", FakeReads([overview("beta"), overview("acme")]))
+    overviews = asyncio.run(handler.get_startup_overviews(["acme", "missing", "beta"]))
+    assert [item.id for item in overviews] == ["acme", "beta"]
+    assert overviews[0].application.industry == "AI"
+    assert overviews[0].meetings[0].vc_id == "vc1"
+
+
+def test_failed_aggregation_returns_none(handler, monkeypatch):
+    monkeypatch.setattr(handler, "startups_reads", FakeReads(error=RuntimeError("$lookup unsupported")))
+    assert asyncio.run(handler.get_startup_overviews(["acme"])) is None
+
+
+@pytest.mark.parametrize("version, supported", [([4, 4, 29], False), ([5, 0, 0], True), ([7, 0, 2], True)])
+def test_server_version_check(handler, monkeypatch, version, supported):
+    class Client(FakeAsyncClient):
+        async def server_info(self):
+            return {"version": ".".join(map(str, version)), "versionArray": version}
+
+    monkeypatch.setattr(handler, "client", Client())
+    assert asyncio.run(handler.check_server_version()) is supported
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(startups_router.router)
+    return TestClient(app)
+
+
+def returning(value):
+    async def get_startup_overviews(startup_ids):
+        return value(startup_ids) if callable(value) else value
+    return get_startup_overviews
+
+
+def test_overview_endpoint_statuses(client, monkeypatch):
+    monkeypatch.setattr(startups_handler, "get_startup_overviews", returning(lambda ids: []))
+    assert client.get("/api/startups/acme/overview", headers=HEADERS).status_code == 404
+    monkeypatch.setattr(startups_handler, "get_startup_overviews", returning(None))
+    assert client.get("/api/startups/acme/overview", headers=HEADERS).status_code == 500
+    assert client.get("/api/startups/overview", params={"ids": ["acme"]}, headers=HEADERS).status_code == 500
+
+
+def test_overview_endpoint_returns_the_startup(client, monkeypatch):
+    from app.models.startup_model import StartupOverview
+
+    monkeypatch.setattr(startups_handler, "get_startup_overviews",
+                        returning(lambda ids: [StartupOverview.model_validate(overview(ids[0]))]))
+    response = client.get("/api/startups/acme/overview", headers=HEADERS)
+    assert response.status_code == 200
+    assert response.json()["data"]["companyName"] == "Acme"
+
+
+def test_batch_overview_is_capped(client):
+    ids = [f"s{i}" for i in range(MAX_OVERVIEW_IDS + 1)]
+    assert client.get("/api/startups/overview", params={"ids": ids}, headers=HEADERS).status_code == 400
@@ -0,0 +1,124 @@
+from app.routers.meeting_outbox import Outbox
+from app.routers.transcript_hub import TranscriptHub
+
+
+def make_outbox(max_messages: int = 100) -> Outbox:
+    return Outbox("m", "json", max_messages=max_messages, max_lag_s=60)
+
+
+def sent(outbox: Outbox) -> list:
+    return [entry[0]["seq"] for entry in outbox.entries]
+
+
+def chunk(seq: int) -> dict:
+    return {"text": f"chunk {seq}"}
+
+
+def live(hub: TranscriptHub, outbox: Outbox, since: int = 0):
+    subscriber = hub.subscribe("m", outbox, since)
+    hub.go_live(subscriber)
+    return subscriber
+
+
+def test_publish_without_viewers_is_dropped():
+    hub = TranscriptHub(backlog=10)
+    hub.publish("m", 1, chunk(1))
+    assert hub.topics == {}
+    assert hub.published == 0
+
+
+def test_catch_up_from_the_backlog_then_live():
+    hub = TranscriptHub(backlog=10)
+    first = make_outbox()
+    live(hub, first)
+    for seq in (1, 2, 3):
+        hub.publish("m", seq, chunk(seq))
+
+    # A viewer reconnecting after seq 1; chunk 4 arrives while it is caught up
+    outbox = make_outbox()
+    subscriber = hub.subscribe("m", outbox, since=1)
+    hub.publish("m", 4, chunk(4))
+    catch_up = hub.backlog_since("m", 1)
+    assert [message["seq"] for message in catch_up] == [2, 3, 4]
+    assert sent(outbox) == []
+    for message in catch_up:
+        subscriber.deliver(message)
+    hub.go_live(subscriber)
+    hub.publish("m", 5, chunk(5))
+
+    assert sent(outbox) == [2, 3, 4, 5]
+    assert sent(first) == [1, 2, 3, 4, 5]
+
+
+def test_backlog_that_does_not_reach_back_is_not_used():
+    hub = TranscriptHub(backlog=2)
+    live(hub, make_outbox())
+    for seq in (1, 2, 3):
+        hub.publish("m", seq, chunk(seq))
+    assert hub.backlog_since("m", 0) is None
+    assert [message["seq"] for message in hub.backlog_since("m", 1)] == [2, 3]
+    assert hub.backlog_since("m", 3) == []
+    assert hub.backlog_since("other", 0) is None
+
+
+def test_backlog_with_a_missing_chunk_is_not_used():
+    hub = TranscriptHub(backlog=10)
+    live(hub, make_outbox())
+    hub.publish("m", 1, chunk(1))
+    hub.publish("m", 3, chunk(3))
+    assert hub.backlog_since("m", 0) is None
+    hub.publish("m", 2, chunk(2))
+    assert [message["seq"] for message in hub.backlog_since("m", 0)] == [1, 2, 3]
+
+
+def test_out_of_order_chunks_are_delivered_in_sequence():
+    hub = TranscriptHub(backlog=10)
+    outbox = make_outbox()
+    subscriber = live(hub, outbox)
+    hub.publish("m", 2, chunk(2))
+    hub.publish("m", 3, chunk(3))
+    assert sent(outbox) == []
+    assert subscriber.gap() == (0, 2)
+    hub.publish("m", 1, chunk(1))
+    # Duplicates, e.g. the same chunk from catch-up and live, are sent once
+    hub.publish("m", 2, chunk(2))
+    assert sent(outbox) == [1, 2, 3]
+    assert subscriber.gap() is None
+    assert subscriber.gap_since is None
+
+
+def test_skipping_a_gap_sends_the_held_back_chunks():
+    hub = TranscriptHub(backlog=10)
+    outbox = make_outbox()
+    subscriber = live(hub, outbox)
+    hub.publish("m", 1, chunk(1))
+    hub.publish("m", 4, chunk(4))
+    hub.publish("m", 3, chunk(3))
+    assert subscriber.gap() == (1, 3)
+    subscriber.skip_gap()
+    hub.publish("m", 5, chunk(5))
+    hub.publish("m", 2, chunk(2))
+    assert sent(outbox) == [1, 3, 4, 5]
+
+
+def test_too_many_held_back_chunks_skip_the_gap():
+    hub = TranscriptHub(backlog=10)
+    outbox = make_outbox(max_messages=2)
+    subscriber = live(hub, outbox)
+    for seq in (2, 3, 4):
+        hub.publish("m", seq, chunk(seq))
+    assert subscriber.gap() is None
+    assert subscriber.last_seq == 4
+    # As many chunks as the outbox holds: the viewer is disconnected and catches up on reconnect
+    assert sent(outbox) == [2, 3]
+    assert outbox.closed is not None
+
+
+def test_last_unsubscribe_removes_the_topic():
+    hub = TranscriptHub(backlog=10)
+    first = live(hub, make_outbox())
+    second = live(hub, make_outbox())
+    hub.unsubscribe("m", first)
+    assert hub.stats()["subscribers"] == 1
+    hub.unsubscribe("m", second)
+    assert hub.topics == {}
@@ -0,0 +1,161 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.models.meeting import TranscriptChunk
+from app.routers import meetingRouter
+from app.routers.meetingRouter import meeting_handler
+from mongo_fakes import FakeAsyncClient, FakeCursor
+
+HEADERS = {"x-api-key": os.environ["INTERNAL_API_KEY"]}
+
+
+def evaluate(expr, document: dict, variables: dict):
+    """The aggregation expressions get_transcript_slice uses, evaluated in Python."""
+    if isinstance(expr, str) and expr.startswith("$$"):
+        name, *path = expr[2:].split(".")
+        value = variables[name]
+        for key in path:
+            value = value[key]
+        return value
+    if isinstance(expr, str) and expr.startswith("$"):
+        return document[expr[1:]]
+    if not isinstance(expr, dict):
+        return expr
+    if not next(iter(expr)).startswith("$"):
+        return {key: evaluate(value, document, variables) for key, value in expr.items()}
+    (op, args), = expr.items()
+    if op in ("$map", "$filter"):
+        items = evaluate(args["input"], document, variables)
+        body = args["in"] if op == "$map" else args["cond"]
+        results = [(item, evaluate(body, document, {**variables, args["as"]: item})) for item in items]
+        return [result for item, result in results] if op == "$map" else [item for item, keep in results if keep]
+    values = [evaluate(arg, document, variables) for arg in (args if isinstance(args, list) else [args])]
+    if op == "$slice":
+        array, *bounds = values
+        start, count = bounds if len(bounds) == 2 else (0, bounds[0])
+        return array[start:start + count]
+    return {
+        "$size": lambda array: len(array),
+        "$range": lambda start, end: list(range(start, end)),
+        "$arrayElemAt": lambda array, index: array[index],
+        "$add": lambda *numbers: sum(numbers),
+        "$gte": lambda a, b: a >= b,
+        "$lt": lambda a, b: a < b,
+        "$and": lambda *conditions: all(conditions),
+    }[op](*values)
+
+
+class FakeMeetings:
+    def __init__(self, meetings: dict):
+        self.meetings = meetings
+        self.pipelines = []
+
+    async def aggregate(self, pipeline, session=None):
+        self.pipelines.append(pipeline)
+        match, project = pipeline[0]["$match"], pipeline[1]["$project"]
+        results = []
+        for meeting_id, document in self.meetings.items():
+            if meeting_id == match["_id"]:
+                results.append({key: evaluate(expr, document, {}) for key, expr in project.items() if key != "_id"})
+        return FakeCursor(results)
+
+
+def transcript(count: int) -> list:
+    # Chunk n is captured at 100 + 10n seconds
+    return [TranscriptChunk(timestamp=100 + 10 * n, seq=n, text=f"chunk {n}").model_dump() for n in range(1, count + 1)]
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    reads = FakeMeetings({"m1": {"transcript": transcript(10)}, "empty": {"transcript": []}})
+    monkeypatch.setattr(meeting_handler, "client", FakeAsyncClient())
+    monkeypatch.setattr(meeting_handler, "meetings_reads", reads)
+    return reads
+
+
+def get_slice(*args, **kwargs):
+    result = asyncio.run(meeting_handler.get_transcript_slice(*args, **kwargs))
+    if result is None:
+        return None
+    total, chunks = result
+    assert all(chunk.seq == seq for seq, chunk in chunks)
+    return total, [seq for seq, _ in chunks]
+
+
+def test_whole_transcript(reads):
+    assert get_slice("m1") == (10, list(range(1, 11)))
+
+
+def test_after_seq_and_limit(reads):
+    assert get_slice("m1", after_seq=3) == (10, [4, 5, 6, 7, 8, 9, 10])
+    assert get_slice("m1", after_seq=3, limit=2) == (10, [4, 5])
+    assert get_slice("m1", after_seq=10) == (10, [])
+    # Only the requested chunks leave MongoDB
+    assert "$filter" not in str(reads.pipelines[-1])
+
+
+def test_time_range(reads):
+    # since is inclusive and until exclusive: chunks captured at 130, 140 and 150
+    assert get_slice("m1", since=130, until=160) == (10, [3, 4, 5])
+    assert get_slice("m1", since=175) == (10, [8, 9, 10])
+    assert get_slice("m1", until=125) == (10, [1, 2])
+    assert get_slice("m1", since=500) == (10, [])
+
+
+def test_time_range_with_after_seq_and_limit(reads):
+    # Positions stay those of the whole transcript, not of the filtered chunks
+    assert get_slice("m1", after_seq=4, since=130) == (10, [5, 6, 7, 8, 9, 10])
+    assert get_slice("m1", after_seq=4, since=130, limit=2) == (10, [5, 6])
+
+
+def test_empty_and_missing_meetings(reads):
+    assert get_slice("empty") == (0, [])
+    assert get_slice("empty", since=0) == (0, [])
+    assert get_slice("missing") is None
+
+
+def test_failed_query_returns_none(reads, monkeypatch):
+    async def aggregate(pipeline, session=None):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(reads, "aggregate", aggregate)
+    assert get_slice("m1") is None
+
+
+@pytest.fixture
+def client(reads):
+    app = FastAPI()
+    app.include_router(meetingRouter.router)
+    return TestClient(app)
+
+
+def test_endpoint_pages_with_last_seq(client):
+    response = client.get("/api/meetings/m1/transcript", params={"limit": 4}, headers=HEADERS)
+    data = response.json()["data"]
+    assert data["total"] == 10
+    assert [chunk["seq"] for chunk in data["chunks"]] == [1, 2, 3, 4]
+    assert data["chunks"][0]["data"]["text"] == "chunk 1"
+
+    response = client.get("/api/meetings/m1/transcript", params={"after_seq": data["lastSeq"], "limit": 4},
+                          headers=HEADERS)
+    assert [chunk["seq"] for chunk in response.json()["data"]["chunks"]] == [5, 6, 7, 8]
+
+    # Nothing new: lastSeq stays where the client was
+    response = client.get("/api/meetings/m1/transcript", params={"after_seq": 10}, headers=HEADERS)
+    assert response.json()["data"] == {"total": 10, "chunks": [], "lastSeq": 10}
+
+
+def test_endpoint_time_range(client):
+    response = client.get("/api/meetings/m1/transcript", params={"since": 130, "until": 150}, headers=HEADERS)
+    assert [chunk["seq"] for chunk in response.json()["data"]["chunks"]] == [3, 4]
+
+
+def test_endpoint_validation(client):
+    assert client.get("/api/meetings/missing/transcript", headers=HEADERS).status_code == 404
+    assert client.get("/api/meetings/m1/transcript", params={"after_seq": -1}, headers=HEADERS).status_code == 422
+    assert client.get("/api/meetings/m1/transcript", params={"limit": 0}, headers=HEADERS).status_code == 422
+    assert client.get("/api/meetings/m1/transcript", params={"limit": 5001}, headers=HEADERS).status_code == 422